@@ -39,6 +39,12 @@ def create_app(config_class=Config):
     from app.routes.owners import owners_bp
     from app.routes.clients import clients_bp
     from app.routes.transactions import transactions_bp
+    from app.routes.imports import imports_bp
+    from app.routes.exports import exports_bp
+    from app.routes.uploads import uploads_bp
+    from app.routes.files import files_bp
+    from app.routes.admin import admin_bp
+    from app.routes.metrics import metrics_bp
     from app.routes.main import main_bp
 
     app.register_blueprint(auth_bp, url_prefix='/auth')
@@ -46,8 +52,30 @@ def create_app(config_class=Config):
     app.register_blueprint(owners_bp, url_prefix='/api/owners')
     app.register_blueprint(clients_bp, url_prefix='/api/clients')
     app.register_blueprint(transactions_bp, url_prefix='/api/transactions')
+    app.register_blueprint(imports_bp, url_prefix='/api/import')
+    app.register_blueprint(exports_bp, url_prefix='/api/export')
+    app.register_blueprint(uploads_bp, url_prefix='/api/uploads')
+    app.register_blueprint(files_bp, url_prefix='/files')
+    app.register_blueprint(admin_bp, url_prefix='/api/admin')
+    app.register_blueprint(metrics_bp)  # /metrics (Prometheus)
     app.register_blueprint(main_bp)  # Routes principales sans préfixe
 
+    # Mesure des requêtes SQL de chaque requête (Server-Timing, journal, budgets)
+    from app.services.sql_metrics import init_sql_metrics
+    init_sql_metrics(app)
+
+    # Métriques Prometheus (requêtes HTTP, pool de connexions)
+    from app.services.metrics import init_metrics
+    init_metrics(app)
+
+    # Profilage à la demande (seulement si PROFILING_ENABLED est activé)
+    from app.services.profiling import init_profiling
+    init_profiling(app)
+
+    # Enregistrement des commandes CLI
+    from app.commands import register_commands
+    register_commands(app)
+
     # Gestion des erreurs
     @app.errorhandler(404)
     def page_not_found(e):
@@ -0,0 +1,265 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Commandes en ligne de commande de l'application.
+Ce fichier définit les commandes disponibles via `flask <commande>`.
+"""
+
+import click
+
+def register_commands(app):
+    """
+    Enregistre les commandes CLI sur l'application.
+    
+    Args:
+        app (Flask): Application Flask
+    """
+    
+    @app.cli.command('rebuild-stats')
+    def rebuild_stats_command():
+        """Reconstruit entièrement la table d'agrégats du tableau de bord."""
+        from app.services.dashboard_service import rebuild_dashboard_stats
+        
+        counters = rebuild_dashboard_stats()
+        click.echo(f"Statistiques du tableau de bord reconstruites ({len(counters)} compteurs).")
+    
+    @app.cli.command('check-indexes')
+    def check_indexes_command():
+        """Vérifie que chaque filtre et tri des services est servi par un index."""
+        from app.services.index_check import find_missing_indexes, find_unsupported_filters
+        
+        missing = find_missing_indexes()
+        for name in missing:
+            click.echo(f"Index absent de la base : {name} (exécuter `flask db upgrade`)")
+        
+        unsupported = find_unsupported_filters()
+        for label, column, usage in unsupported:
+            click.echo(f"Aucun index pour le {usage} sur {column} ({label})")
+        
+        if missing or unsupported:
+            raise click.ClickException(
+                f"{len(unsupported)} colonne(s) non couverte(s), {len(missing)} index manquant(s)."
+            )
+        click.echo("Tous les filtres et tris des services sont couverts par un index.")
+    
+    @app.cli.command('property-snapshot')
+    @click.option('--full', is_flag=True, help="Reconstruit l'instantané entièrement au lieu de le rafraîchir.")
+    def property_snapshot_command(full):
+        """Construit ou rafraîchit l'instantané en colonnes des biens immobiliers."""
+        from app.services.property_snapshot import np, refresh_property_snapshot
+        
+        if np is None:
+            raise click.ClickException("NumPy n'est pas installé : l'instantané des biens n'est pas disponible.")
+        
+        size = refresh_property_snapshot(full=full)
+        click.echo(f"Instantané des biens publié ({size} biens).")
+    
+    @app.cli.command('import')
+    @click.argument('entity', type=click.Choice(['properties', 'owners', 'clients']))
+    @click.argument('path', type=click.Path(exists=True, dir_okay=False, allow_dash=True))
+    @click.option('--format', 'file_format', type=click.Choice(['csv', 'ndjson']),
+                  help="Format du fichier (déduit de l'extension par défaut).")
+    @click.option('--user', 'username', help="Nom de l'utilisateur enregistré comme créateur.")
+    @click.option('--on-duplicate', type=click.Choice(['error', 'skip']), default='error', show_default=True,
+                  help="Traitement des doublons (code de référence, email).")
+    @click.option('--dry-run', is_flag=True, help="Valide le fichier sans rien insérer.")
+    @click.option('--chunk-size', type=int, default=None, help="Nombre d'enregistrements par lot.")
+    def import_command(entity, path, file_format, username, on_duplicate, dry_run, chunk_size):
+        """Importe en masse des biens, propriétaires ou clients depuis un fichier CSV ou NDJSON."""
+        import io
+        import sys
+        from app.services.auth_service import get_user_by_username
+        from app.services.import_service import import_records, detect_format
+        
+        file_format = file_format or detect_format(path)
+        if file_format is None:
+            raise click.ClickException("Format inconnu : préciser --format csv ou --format ndjson.")
+        
+        created_by = None
+        if username:
+            user = get_user_by_username(username)
+            if user is None:
+                raise click.ClickException(f"Utilisateur introuvable : {username}")
+            created_by = user.id
+        
+        def progress(report):
+            click.echo(f"{report['processed']} lignes lues, {report['inserted']} insérées, "
+                       f"{report['skipped']} ignorées, {report['error_count']} en erreur", err=True)
+        
+        if path == '-':
+            stream = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8-sig', newline='')
+        else:
+            stream = open(path, encoding='utf-8-sig', newline='')
+        try:
+            with stream:
+                report = import_records(entity, stream, file_format, created_by=created_by,
+                                        on_duplicate=on_duplicate, dry_run=dry_run,
+                                        chunk_size=chunk_size or app.config.get('IMPORT_CHUNK_SIZE', 1000),
+                                        progress=progress)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+        
+        if report['ignored_columns']:
+            click.echo(f"Colonnes ignorées : {', '.join(report['ignored_columns'])}")
+        for error in report['errors']:
+            details = '; '.join(f'{field}: {message}' for field, message in error['errors'].items())
+            click.echo(f"Ligne {error['line']} : {details}")
+        if report['error_count'] > len(report['errors']):
+            click.echo(f"... {report['error_count'] - len(report['errors'])} autres lignes en erreur")
+        
+        action = 'validées' if dry_run else 'importées'
+        click.echo(f"{report['inserted']} lignes {action} sur {report['processed']} "
+                   f"({report['skipped']} doublons ignorés, {report['error_count']} en erreur).")
+        if report['error_count']:
+            sys.exit(1)
+    
+    @app.cli.command('export')
+    @click.argument('entity', type=click.Choice(['properties', 'transactions', 'visits']))
+    @click.option('--output', '-o', default='-', show_default=True,
+                  help="Fichier de sortie ('-' pour la sortie standard).")
+    @click.option('--format', 'file_format', type=click.Choice(['csv', 'ndjson']),
+                  help="Format de l'export (déduit de l'extension du fichier, csv par défaut).")
+    @click.option('--gzip', 'compress', is_flag=True, help="Compresse l'export en gzip (implicite pour un fichier .gz).")
+    @click.option('--filter', '-f', 'filter_options', multiple=True, metavar='CLÉ=VALEUR',
+                  help="Filtre de l'API correspondante (ex: -f city=Paris -f min_price=100000).")
+    def export_command(entity, output, file_format, compress, filter_options):
+        """Exporte en flux les biens, transactions ou visites au format CSV ou NDJSON."""
+        import sys
+        from app.services.import_service import detect_format
+        from app.services.export_service import export_records, parse_export_filters
+        
+        if output.endswith('.gz'):
+            compress = True
+        file_format = file_format or detect_format(output[:-3] if output.endswith('.gz') else output) or 'csv'
+        
+        args = {}
+        for option in filter_options:
+            key, separator, value = option.partition('=')
+            if not separator:
+                raise click.BadParameter(f"'{option}' (CLÉ=VALEUR attendu)", param_hint='--filter')
+            args[key.strip()] = value.strip()
+        filters = parse_export_filters(entity, args)
+        ignored = set(args) - set(filters)
+        if ignored:
+            raise click.BadParameter(f"filtre(s) inconnu(s) ou invalide(s) : {', '.join(sorted(ignored))}",
+                                     param_hint='--filter')
+        
+        try:
+            chunks = export_records(entity, filters, file_format, compress)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+        
+        stream = sys.stdout.buffer if output == '-' else open(output, 'wb')
+        try:
+            for chunk in chunks:
+                stream.write(chunk)
+        finally:
+            if stream is not sys.stdout.buffer:
+                stream.close()
+    
+    @app.cli.command('process-images')
+    @click.option('--property', 'property_id', type=int, help="Limite le traitement aux images d'un bien.")
+    @click.option('--all', 'reprocess', is_flag=True, help="Régénère aussi les déclinaisons existantes.")
+    @click.option('--workers', type=int, default=None, help="Nombre de processus (IMAGE_PROCESS_WORKERS par défaut).")
+    def process_images_command(property_id, reprocess, workers):
+        """Génère les déclinaisons (vignette, carte, pleine taille) des images qui n'en ont pas."""
+        from app.services.image_service import process_images
+        
+        def progress(image_id, success):
+            if not success:
+                click.echo(f"Image {image_id} : génération impossible (voir le journal).", err=True)
+        
+        processed, failed = process_images(property_id, reprocess, workers, progress)
+        click.echo(f"{processed - failed} image(s) traitée(s), {failed} échec(s).")
+        if failed:
+            raise click.ClickException(f"{failed} image(s) sans déclinaisons.")
+    
+    @app.cli.command('storage-gc')
+    @click.option('--grace', type=int, default=None,
+                  help="Âge minimal en secondes d'un fichier supprimé (STORAGE_ORPHAN_GRACE par défaut).")
+    def storage_gc_command(grace):
+        """Recalcule les références des fichiers stockés et supprime ceux qui ne sont plus utilisés."""
+        from app.services.storage import collect_garbage
+        
+        fixed, deleted = collect_garbage(grace)
+        click.echo(f"{fixed} compteur(s) de références corrigé(s), {deleted} fichier(s) supprimé(s).")
+    
+    @app.cli.command('storage-migrate')
+    @click.option('--batch-size', type=int, default=100, show_default=True, help="Nombre d'objets par transaction.")
+    def storage_migrate_command(batch_size):
+        """Transfère dans le stockage les images et documents envoyés avant le stockage par contenu."""
+        from app.services.storage import migrate_legacy_files
+        
+        def progress(count):
+            click.echo(f"{count} fichier(s) transféré(s)...")
+        
+        migrated, missing = migrate_legacy_files(batch_size, progress)
+        for path in missing:
+            click.echo(f"Fichier introuvable : {path}", err=True)
+        click.echo(f"{migrated} fichier(s) transféré(s), {len(missing)} introuvable(s). "
+                   "Exécuter `flask process-images` pour régénérer les déclinaisons des images.")
+    
+    @app.cli.command('uploads-gc')
+    def uploads_gc_command():
+        """Supprime les envois de documents expirés et leurs fichiers temporaires."""
+        from app.services.upload_service import expire_upload_sessions
+        
+        expired = expire_upload_sessions()
+        click.echo(f"{expired} envoi(s) expiré(s) supprimé(s).")
+    
+    @app.cli.command('worker')
+    @click.option('--threads', type=int, default=None,
+                  help="Threads par processus (JOB_WORKER_THREADS par défaut).")
+    @click.option('--processes', type=int, default=1, show_default=True, help="Nombre de processus.")
+    @click.option('--queue', 'queues', multiple=True, help="File à traiter (répétable ; toutes par défaut).")
+    @click.option('--burst', is_flag=True, help="S'arrête dès qu'il n'y a plus de tâche à exécuter.")
+    def worker_command(threads, processes, queues, burst):
+        """Exécute les tâches d'arrière-plan de la file (jusqu'à SIGTERM ou Ctrl+C)."""
+        from flask import current_app
+        from app.services.job_queue import run_workers
+        
+        if processes < 1 or (threads is not None and threads < 1):
+            raise click.ClickException("--threads et --processes doivent être au moins 1.")
+        run_workers(current_app._get_current_object(), processes, threads, queues or None, burst)
+    
+    @app.cli.command('jobs')
+    @click.option('--retry-failed', is_flag=True, help="Remet en file les tâches en échec.")
+    @click.option('--name', default=None, help="Limite --retry-failed aux tâches de ce nom.")
+    def jobs_command(retry_failed, name):
+        """Affiche le nombre de tâches par nom et par état."""
+        from app.services.job_queue import get_job_counts, retry_failed_jobs
+        
+        if retry_failed:
+            click.echo(f"{retry_failed_jobs(name)} tâche(s) remise(s) en file.")
+        for job_name, status, count in get_job_counts():
+            click.echo(f"{job_name:<30} {status:<10} {count}")
+    
+    @app.cli.command('seed')
+    @click.option('--scale', type=int, default=1, show_default=True,
+                  help="Échelle du jeu de données (une unité : 500 biens, 300 clients, 100 propriétaires).")
+    @click.option('--skew', type=float, default=1.0, show_default=True,
+                  help="Asymétrie des choix (villes, propriétaires, biens demandés, agents) ; 0 pour des choix uniformes.")
+    @click.option('--seed', 'random_seed', type=int, default=42, show_default=True,
+                  help="Graine du générateur (mêmes paramètres, mêmes données).")
+    @click.option('--reset', is_flag=True, help="Vide TOUTES les tables de la base avant la génération.")
+    @click.option('--yes', is_flag=True, help="Ne demande pas de confirmation pour --reset.")
+    @click.option('--password', default=None, help="Mot de passe des utilisateurs générés (aléatoire par défaut).")
+    def seed_command(scale, skew, random_seed, reset, yes, password):
+        """Remplit la base d'un jeu de données synthétique et reproductible."""
+        from app.services.seed_service import seed_database
+        
+        if reset and not yes:
+            click.confirm("Toutes les données de la base seront supprimées. Continuer ?", abort=True)
+        
+        def progress(table, count):
+            click.echo(f"{table} : {count} ligne(s)", err=True)
+        
+        try:
+            counts = seed_database(scale, skew, random_seed, reset, password, progress=progress)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+        
+        password = counts.pop('password')
+        click.echo(f"{sum(counts.values())} lignes générées (échelle {scale}, asymétrie {skew}, graine {random_seed}).")
+        click.echo(f"Utilisateurs : admin, agent1 à agent{counts['users'] - 1} ; mot de passe : {password}")
@@ -35,9 +35,18 @@ from app import db
 from app.models.user1 import User
 from app.models.owner import Owner
 from app.models.property import Property, PropertyImage, PropertyDocument, Amenity
+from app.models.property_search import property_search_vector, properties_fts
+from app.models.property_geo import encode_geo_cell
 from app.models.client import Client, PropertyVisit
+from app.models.fuzzy_search import search_document
 from app.models.transaction import Transaction, RentalAgreement
 from app.models.old1_financial import FinancialTransaction, MaintenanceRequest
+from app.models.dashboard_stat import DashboardStat
+from app.models.activity import Activity
+from app.models.stored_file import StoredFile
+from app.models.upload_session import UploadSession
+from app.models.job import Job
+from app.models import parent_timestamps  # propagation de updated_at aux objets parents
 
 # Définition des modèles disponibles pour l'importation
 __all__ = [
@@ -52,5 +61,10 @@ __all__ = [
     'Transaction',
     'RentalAgreement',
     'FinancialTransaction',
-    'MaintenanceRequest'
+    'MaintenanceRequest',
+    'Activity',
+    'StoredFile',
+    'UploadSession',
+    'Job',
+    'DashboardStat'
 ]
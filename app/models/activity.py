@@ -12,9 +12,12 @@ class Activity(db.Model):
     """Modèle représentant une activité ou un événement dans le système."""
     
     __tablename__ = 'activities'
+    __table_args__ = (
+        db.Index('ix_activities_created_at_id', 'created_at', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='SET NULL'), nullable=True)
     activity_type = db.Column(db.String(50), nullable=False)  # login, property_create, client_update, etc.
     description = db.Column(db.Text, nullable=False)
     entity_type = db.Column(db.String(50), nullable=True)  # property, client, owner, etc.
@@ -25,7 +28,7 @@ class Activity(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Relations
-    user = db.relationship('User', backref=db.backref('activities', lazy='dynamic'))
+    user = db.relationship('User', backref=db.backref('activities', lazy='dynamic', passive_deletes=True))
     
     def __repr__(self):
         """Représentation textuelle de l'objet."""
@@ -51,6 +54,10 @@ class Activity(db.Model):
         """
         Crée une nouvelle entrée d'activité dans le journal.
         
+        L'entrée n'est pas ajoutée à la session : elle est placée dans le tampon du
+        journal et écrite par lots en arrière-plan (voir app.services.activity_log),
+        sans validation de transaction dans la requête.
+        
         Args:
             user_id (int): ID de l'utilisateur qui a effectué l'action
             activity_type (str): Type d'activité (login, property_create, etc.)
@@ -61,8 +68,11 @@ class Activity(db.Model):
             user_agent (str, optional): User-Agent du navigateur
             
         Returns:
-            Activity: L'objet Activity créé
+            Activity: L'objet Activity créé (non rattaché à la session, sans ID)
         """
+        # Import différé : le service importe ce modèle
+        from app.services.activity_log import record_activity
+        
         activity = cls(
             user_id=user_id,
             activity_type=activity_type,
@@ -70,8 +80,11 @@ class Activity(db.Model):
             entity_type=entity_type,
             entity_id=entity_id,
             ip_address=ip_address,
-            user_agent=user_agent
+            user_agent=user_agent[:255] if user_agent else user_agent,
+            created_at=datetime.utcnow()
         )
-        db.session.add(activity)
-        db.session.commit()
+        record_activity({
+            column.name: getattr(activity, column.key)
+            for column in cls.__table__.columns if column.key != 'id'
+        })
         return activity
@@ -45,6 +45,15 @@ class Client(db.Model):
         assigned_agent_id (int): ID de l'agent immobilier assigné au client
     """
     __tablename__ = 'clients'
+    # Index correspondant aux filtres et tris de get_all_clients (voir `flask check-indexes`)
+    __table_args__ = (
+        db.Index('ix_clients_client_type', 'client_type'),
+        db.Index('ix_clients_assigned_agent_id', 'assigned_agent_id',
+                 postgresql_where=db.column('assigned_agent_id').isnot(None),
+                 sqlite_where=db.column('assigned_agent_id').isnot(None)),
+        db.Index('ix_clients_created_at_id', 'created_at', 'id'),
+        db.Index('ix_clients_last_name_id', 'last_name', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     first_name = db.Column(db.String(50), nullable=False)
@@ -148,6 +157,19 @@ class PropertyVisit(db.Model):
         updated_at (datetime): Date de dernière mise à jour de l'enregistrement
     """
     __tablename__ = 'property_visits'
+    # Index correspondant aux filtres et tris des visites (voir `flask check-indexes`)
+    __table_args__ = (
+        db.Index('ix_property_visits_client_id_date', 'client_id', 'visit_date'),
+        db.Index('ix_property_visits_client_id_status_date', 'client_id', 'status', 'visit_date'),
+        db.Index('ix_property_visits_property_id_date', 'property_id', 'visit_date'),
+        db.Index('ix_property_visits_status_date', 'status', 'visit_date'),
+        db.Index('ix_property_visits_date', 'visit_date'),
+        db.Index('ix_property_visits_created_at_id', 'created_at', 'id'),
+        # Prochaines visites planifiées (page d'accueil)
+        db.Index('ix_property_visits_scheduled_date', 'visit_date',
+                 postgresql_where=db.column('status') == 'scheduled',
+                 sqlite_where=db.column('status') == 'scheduled'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     property_id = db.Column(db.Integer, db.ForeignKey('properties.id'), nullable=False)
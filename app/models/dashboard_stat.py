@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Modèle pour les statistiques agrégées du tableau de bord.
+"""
+
+from datetime import datetime
+from app import db
+
+class DashboardStat(db.Model):
+    """
+    Modèle représentant un compteur agrégé du tableau de bord.
+
+    Chaque compteur est identifié par (entity, dimension, bucket), par exemple
+    ('property', 'status', 'for_sale') ou ('transaction', 'sale_month', '2024-03'), et
+    réparti sur plusieurs lignes (shard) dont la somme donne la valeur : les écritures
+    concurrentes ne se disputent pas le verrou d'une seule ligne. La table est maintenue
+    incrémentalement par les écouteurs SQLAlchemy définis dans
+    app.services.dashboard_service et peut être reconstruite avec `flask rebuild-stats`.
+    """
+
+    __tablename__ = 'dashboard_stats'
+    __table_args__ = (
+        db.UniqueConstraint('entity', 'dimension', 'bucket', 'shard', name='uq_dashboard_stats_key'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    entity = db.Column(db.String(30), nullable=False)  # property, transaction, owner, client
+    dimension = db.Column(db.String(30), nullable=False)  # total, status, property_type, sale_month, etc.
+    bucket = db.Column(db.String(50), nullable=False, default='')  # valeur de la dimension
+    shard = db.Column(db.SmallInteger, nullable=False, default=0)  # ligne du compteur (0 à DASHBOARD_STAT_SHARDS - 1)
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        """Représentation textuelle de l'objet."""
+        return f'<DashboardStat {self.entity}.{self.dimension}[{self.bucket}] = {self.value}>'
+
+    def to_dict(self):
+        """Convertit l'objet en dictionnaire."""
+        return {
+            'entity': self.entity,
+            'dimension': self.dimension,
+            'bucket': self.bucket,
+            'shard': self.shard,
+            'value': self.value,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
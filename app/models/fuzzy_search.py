@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Index de recherche approximative des clients et des propriétaires.
+Ce fichier définit, pour chaque modèle, les champs concaténés dans le « document »
+de recherche et, sur PostgreSQL, l'index trigrammes (pg_trgm) créé sur cette
+expression avec la table. Les requêtes passent par app.services.search_service.
+"""
+
+from sqlalchemy import DDL, event
+
+from app import db
+from app.models.client import Client
+from app.models.owner import Owner
+
+# Champs recherchés, dans l'ordre de concaténation
+FUZZY_SEARCH_FIELDS = {
+    Client: ('first_name', 'last_name', 'email', 'phone', 'city'),
+    Owner: ('first_name', 'last_name', 'email', 'phone')
+}
+
+# Expressions SQL des documents : identiques à celles des index pour que PostgreSQL les utilise
+_DOCUMENT_SQL = {
+    Client: "(coalesce(first_name, '') || ' ' || coalesce(last_name, '') || ' ' || coalesce(email, '') "
+            "|| ' ' || coalesce(phone, '') || ' ' || coalesce(city, ''))",
+    Owner: "(coalesce(first_name, '') || ' ' || coalesce(last_name, '') || ' ' || coalesce(email, '') "
+           "|| ' ' || coalesce(phone, ''))"
+}
+
+def search_document(model):
+    """
+    Expression SQL du document de recherche d'un modèle.
+
+    Les constantes sont écrites en littéraux (et non en paramètres) afin que
+    l'expression corresponde exactement à celle de l'index trigrammes.
+
+    Args:
+        model: Client ou Owner
+
+    Returns:
+        ColumnElement: Concaténation des champs recherchés
+    """
+    separator = db.literal_column("' '")
+    parts = [db.func.coalesce(getattr(model, field), db.literal_column("''")) for field in FUZZY_SEARCH_FIELDS[model]]
+    document = parts[0]
+    for part in parts[1:]:
+        document = document.op('||')(separator).op('||')(part)
+    return document
+
+def document_text(target):
+    """
+    Texte du document de recherche d'un objet (index en mémoire).
+
+    Args:
+        target: Instance de Client ou Owner
+
+    Returns:
+        str: Concaténation des champs recherchés
+    """
+    return ' '.join(getattr(target, field) or '' for field in FUZZY_SEARCH_FIELDS[type(target)])
+
+for _model in FUZZY_SEARCH_FIELDS:
+    _table = _model.__tablename__
+    event.listen(
+        _model.__table__, 'after_create',
+        DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm').execute_if(dialect='postgresql')
+    )
+    event.listen(
+        _model.__table__, 'after_create',
+        DDL(f'CREATE INDEX IF NOT EXISTS ix_{_table}_search_trgm ON {_table} '
+            f'USING gin ({_DOCUMENT_SQL[_model]} gin_trgm_ops)').execute_if(dialect='postgresql')
+    )
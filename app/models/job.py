@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Modèle pour les tâches d'arrière-plan (file de tâches en base).
+"""
+
+from datetime import datetime
+from app import db
+
+class Job(db.Model):
+    """
+    Modèle représentant une tâche exécutée en dehors des requêtes par `flask worker`.
+
+    Une tâche est en attente ('queued') jusqu'à run_at, puis réservée par un worker
+    ('running', locked_by et locked_at renseignés). En cas d'erreur elle est remise
+    en attente avec un délai croissant tant que attempts < max_attempts, puis
+    marquée 'failed' ; une tâche terminée est marquée 'succeeded'.
+    """
+
+    __tablename__ = 'jobs'
+    __table_args__ = (
+        # Réservation : tâches en attente d'une file, par date d'exécution
+        db.Index('ix_jobs_queue_status_run_at', 'queue', 'status', 'run_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)  # Nom de la fonction enregistrée (ex: images.process)
+    queue = db.Column(db.String(50), nullable=False, default='default')
+    payload = db.Column(db.JSON, nullable=False, default=dict)  # Arguments nommés de la fonction
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, succeeded, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_by = db.Column(db.String(100))  # Worker ayant réservé la tâche (hôte:pid:thread)
+    locked_at = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        """Représentation textuelle de l'objet."""
+        return f'<Job {self.id}: {self.name} ({self.status})>'
+
+    def to_dict(self):
+        """Convertit l'objet en dictionnaire."""
+        return {
+            'id': self.id,
+            'name': self.name,
+            'queue': self.queue,
+            'status': self.status,
+            'attempts': self.attempts,
+            'max_attempts': self.max_attempts,
+            'run_at': self.run_at.isoformat() if self.run_at else None,
+            'last_error': self.last_error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
@@ -31,6 +31,11 @@ class Owner(db.Model):
         updated_at (datetime): Date de dernière mise à jour de l'enregistrement
     """
     __tablename__ = 'owners'
+    # Index correspondant aux tris de get_all_owners (voir `flask check-indexes`)
+    __table_args__ = (
+        db.Index('ix_owners_created_at_id', 'created_at', 'id'),
+        db.Index('ix_owners_last_name_id', 'last_name', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     first_name = db.Column(db.String(50), nullable=False)
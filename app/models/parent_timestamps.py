@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Propagation des dates de mise à jour.
+Ce fichier met à jour la colonne updated_at d'un objet lorsque seuls ses objets liés
+changent : images, documents et équipements d'un bien, biens d'un propriétaire, contrat
+de location d'une transaction. updated_at couvre ainsi tout ce qu'affiche la fiche
+détaillée de l'objet (validateurs HTTP, instantané en colonnes des biens).
+"""
+
+from collections import defaultdict
+from datetime import datetime
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.models.owner import Owner
+from app.models.property import Property, PropertyImage, PropertyDocument
+from app.models.transaction import Transaction, RentalAgreement
+
+def _parents(target, state):
+    """
+    Objets parents (modèle, identifiant) concernés par l'écriture d'un objet.
+
+    Args:
+        target: Objet créé, modifié ou supprimé
+        state (str): 'new', 'dirty' ou 'deleted'
+
+    Returns:
+        list: Couples (modèle, identifiant)
+    """
+    if isinstance(target, (PropertyImage, PropertyDocument)):
+        return [(Property, target.property_id)]
+    if isinstance(target, RentalAgreement):
+        return [(Transaction, target.transaction_id)]
+    if isinstance(target, Property):
+        if state != 'dirty':
+            return [(Owner, target.owner_id)]
+        # Bien rattaché à un autre propriétaire : les deux changent
+        history = inspect(target).attrs.owner_id.history
+        return [(Owner, owner_id) for owner_id in list(history.added) + list(history.deleted)]
+    return []
+
+def _touch_parents(session, flush_context):
+    """
+    Met à jour updated_at des parents des objets écrits par ce flush : une instruction
+    UPDATE par table parente (clés étrangères des objets écrits), sans charger les parents.
+    """
+    now = datetime.utcnow()
+    parents = defaultdict(set)
+
+    for state, targets in (('new', session.new), ('deleted', session.deleted), ('dirty', session.dirty)):
+        for target in targets:
+            if state == 'dirty' and not session.is_modified(target):
+                continue
+            if state == 'dirty' and isinstance(target, Property) and \
+                    inspect(target).attrs.amenities.history.has_changes():
+                # Équipements modifiés : pas de colonne du bien changée
+                parents[Property].add(target.id)
+            for model, row_id in _parents(target, state):
+                if row_id is not None:
+                    parents[model].add(row_id)
+
+    connection = session.connection()
+    for model, row_ids in parents.items():
+        table = model.__table__
+        connection.execute(table.update().where(table.c.id.in_(sorted(row_ids))).values(updated_at=now))
+        # Parents déjà chargés : même valeur en mémoire, sans les marquer comme modifiés
+        mapper = inspect(model)
+        for row_id in row_ids:
+            parent = session.identity_map.get(mapper.identity_key_from_primary_key((row_id,)))
+            if parent is not None and parent not in session.deleted:
+                set_committed_value(parent, 'updated_at', now)
+
+event.listen(Session, 'after_flush', _touch_parents)
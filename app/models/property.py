@@ -7,6 +7,8 @@ Ce fichier définit la structure de la table des biens immobiliers et ses métho
 """
 
 from datetime import datetime
+from flask import url_for
+from sqlalchemy import DDL, event
 from app import db
 
 # Table de jointure pour la relation many-to-many entre Property et Amenity
@@ -28,6 +30,7 @@ class Property(db.Model):
         status (str): Statut du bien (disponible, vendu, loué, etc.)
         address_* (str): Informations d'adresse
         latitude/longitude (float): Coordonnées géographiques
+        geo_cell (int): Cellule géographique (geohash entier) calculée à partir des coordonnées
         total_area (float): Surface totale en mètres carrés
         living_area (float): Surface habitable en mètres carrés
         land_area (float): Surface du terrain en mètres carrés
@@ -46,6 +49,35 @@ class Property(db.Model):
         owner_id (int): ID du propriétaire du bien
     """
     __tablename__ = 'properties'
+    # Index correspondant aux filtres et tris de get_all_properties (voir `flask check-indexes`)
+    __table_args__ = (
+        db.Index('ix_properties_status_created_at', 'status', 'created_at'),
+        db.Index('ix_properties_type_status', 'property_type', 'status'),
+        db.Index('ix_properties_owner_id', 'owner_id'),
+        # Index trigrammes : sert le filtre city ILIKE '%...%' sur PostgreSQL uniquement
+        # (ailleurs, simple index B-tree qui sert le tri par ville mais pas ce filtre)
+        db.Index('ix_properties_city_trgm', 'city',
+                 postgresql_using='gin', postgresql_ops={'city': 'gin_trgm_ops'}),
+        db.Index('ix_properties_created_at_id', 'created_at', 'id'),
+        db.Index('ix_properties_asking_price_id', 'asking_price', 'id'),
+        db.Index('ix_properties_total_area_id', 'total_area', 'id'),
+        # Index partiels : les filtres « >= » / « <= » n'acceptent jamais NULL
+        db.Index('ix_properties_rental_price', 'rental_price',
+                 postgresql_where=db.column('rental_price').isnot(None),
+                 sqlite_where=db.column('rental_price').isnot(None)),
+        db.Index('ix_properties_num_bedrooms', 'num_bedrooms',
+                 postgresql_where=db.column('num_bedrooms').isnot(None),
+                 sqlite_where=db.column('num_bedrooms').isnot(None)),
+        db.Index('ix_properties_num_bathrooms', 'num_bathrooms',
+                 postgresql_where=db.column('num_bathrooms').isnot(None),
+                 sqlite_where=db.column('num_bathrooms').isnot(None)),
+        # Recherche géographique : intervalles de cellules, puis contrôle exact depuis l'index
+        db.Index('ix_properties_geo_cell', 'geo_cell', 'latitude', 'longitude',
+                 postgresql_where=db.column('geo_cell').isnot(None),
+                 sqlite_where=db.column('geo_cell').isnot(None)),
+        # Rafraîchissement incrémental de l'instantané en colonnes (app.services.property_snapshot)
+        db.Index('ix_properties_updated_at', 'updated_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     reference_code = db.Column(db.String(20), unique=True, nullable=False)
@@ -63,6 +95,7 @@ class Property(db.Model):
     country = db.Column(db.String(50), nullable=False)
     latitude = db.Column(db.Numeric(10, 8))
     longitude = db.Column(db.Numeric(11, 8))
+    geo_cell = db.Column(db.BigInteger)  # geohash entier, calculé (voir property_geo.py)
     
     # Caractéristiques
     total_area = db.Column(db.Numeric(10, 2), nullable=False)
@@ -152,6 +185,12 @@ class Property(db.Model):
         """
         return f'<Property {self.reference_code}: {self.title}>'
 
+# L'index trigrammes de la ville nécessite l'extension pg_trgm
+event.listen(
+    Property.__table__, 'before_create',
+    DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm').execute_if(dialect='postgresql')
+)
+
 
 class PropertyImage(db.Model):
     """
@@ -170,6 +209,13 @@ class PropertyImage(db.Model):
         description (str): Description de l'image
         uploaded_at (datetime): Date d'upload de l'image
         uploaded_by (int): ID de l'utilisateur ayant uploadé l'image
+        storage_key (str): Clé du fichier dans le stockage (None pour les fichiers
+            envoyés avant le stockage par contenu, servis depuis file_path)
+        processing_status (str): État de la génération des déclinaisons (pending, ready, failed)
+        thumbnail_path (str): Chemin ou clé de la vignette JPEG (WebP à côté, extension .webp)
+        card_path (str): Chemin ou clé de l'image de carte JPEG (WebP à côté)
+        full_path (str): Chemin ou clé de l'image pleine taille JPEG (WebP à côté)
+        processed_at (datetime): Date de la génération des déclinaisons
     """
     __tablename__ = 'property_images'
     
@@ -185,6 +231,43 @@ class PropertyImage(db.Model):
     description = db.Column(db.Text)
     uploaded_at = db.Column(db.DateTime, default=datetime.utcnow)
     uploaded_by = db.Column(db.Integer, db.ForeignKey('users.id'))
+    storage_key = db.Column(db.String(100), db.ForeignKey('stored_files.key'), index=True)
+    processing_status = db.Column(db.String(20))
+    thumbnail_path = db.Column(db.String(255))
+    card_path = db.Column(db.String(255))
+    full_path = db.Column(db.String(255))
+    processed_at = db.Column(db.DateTime)
+    
+    @property
+    def has_derivatives(self):
+        """
+        Indique si les déclinaisons de l'image ont été générées.
+        
+        Returns:
+            bool: True si les déclinaisons sont disponibles
+        """
+        return self.processing_status == 'ready'
+    
+    def get_url(self, size=None, image_format='jpeg', external=False):
+        """
+        Retourne l'URL d'une déclinaison de l'image.
+        
+        Tant que les déclinaisons ne sont pas disponibles, l'URL de l'image envoyée est retournée.
+        
+        Args:
+            size (str, optional): 'thumbnail', 'card' ou 'full' (image envoyée si None)
+            image_format (str, optional): 'jpeg' ou 'webp'
+            external (bool, optional): URL absolue
+            
+        Returns:
+            str: URL du fichier
+        """
+        path = getattr(self, f'{size}_path') if size and self.has_derivatives else None
+        if not path:
+            path = self.file_path
+        elif image_format == 'webp':
+            path = path.rsplit('.', 1)[0] + '.webp'
+        return _file_url(path, self.storage_key is not None, external)
     
     def __repr__(self):
         """
@@ -213,6 +296,8 @@ class PropertyDocument(db.Model):
         uploaded_at (datetime): Date d'upload du document
         uploaded_by (int): ID de l'utilisateur ayant uploadé le document
         expiry_date (date): Date d'expiration du document (si applicable)
+        storage_key (str): Clé du fichier dans le stockage (None pour les fichiers
+            envoyés avant le stockage par contenu, servis depuis file_path)
     """
     __tablename__ = 'property_documents'
     
@@ -228,6 +313,19 @@ class PropertyDocument(db.Model):
     uploaded_at = db.Column(db.DateTime, default=datetime.utcnow)
     uploaded_by = db.Column(db.Integer, db.ForeignKey('users.id'))
     expiry_date = db.Column(db.Date)
+    storage_key = db.Column(db.String(100), db.ForeignKey('stored_files.key'), index=True)
+    
+    def get_url(self, external=False):
+        """
+        Retourne l'URL du document.
+        
+        Args:
+            external (bool, optional): URL absolue
+            
+        Returns:
+            str: URL du fichier
+        """
+        return _file_url(self.file_path, self.storage_key is not None, external)
     
     def __repr__(self):
         """
@@ -248,6 +346,7 @@ class Amenity(db.Model):
         name (str): Nom de l'équipement
         category (str): Catégorie de l'équipement
         description (str): Description de l'équipement
+        updated_at (datetime): Date de dernière mise à jour (validateurs de la fiche des biens)
     """
     __tablename__ = 'amenities'
     
@@ -255,6 +354,7 @@ class Amenity(db.Model):
     name = db.Column(db.String(50), nullable=False)
     category = db.Column(db.String(50))
     description = db.Column(db.Text)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     def __repr__(self):
         """
@@ -264,3 +364,10 @@ class Amenity(db.Model):
             str: Représentation de l'équipement
         """
         return f'<Amenity {self.id}: {self.name}>'
+
+def _file_url(path, stored, external):
+    """URL d'un fichier du stockage (clé) ou d'un ancien fichier du dossier static (chemin)."""
+    if stored:
+        from app.services.storage import get_storage
+        return get_storage().url(path, external=external)
+    return url_for('static', filename=path.replace('app/static/', ''), _external=external)
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Cellule géographique des biens immobiliers.
+Ce fichier calcule la colonne Property.geo_cell : un geohash entier (code de Morton
+entrelaçant les bits de longitude et de latitude). Tous les biens d'une même cellule
+de la grille, quelle que soit sa taille, occupent un intervalle contigu de valeurs :
+une recherche par zone se ramène ainsi à quelques intervalles sur un index B-tree,
+sans PostGIS. Ce fichier enregistre aussi la fonction SQL haversine_km sur SQLite.
+"""
+
+import math
+import sqlite3
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.models.property import Property
+
+# Nombre de bits par axe (26 bits : cellules d'environ 0,6 m à l'équateur)
+GEO_CELL_AXIS_BITS = 26
+
+# Rayon terrestre moyen (km)
+EARTH_RADIUS_KM = 6371.0088
+
+def axis_index(value, minimum, span, bits=GEO_CELL_AXIS_BITS):
+    """
+    Position d'une coordonnée sur un axe découpé en 2^bits intervalles.
+
+    Args:
+        value (float): Coordonnée
+        minimum (float): Borne inférieure de l'axe (-90 ou -180)
+        span (float): Étendue de l'axe (180 ou 360)
+        bits (int, optional): Nombre de bits de l'axe
+
+    Returns:
+        int: Index de l'intervalle
+    """
+    size = 1 << bits
+    return min(max(int((value - minimum) / span * size), 0), size - 1)
+
+def interleave(lng_index, lat_index, bits=GEO_CELL_AXIS_BITS):
+    """
+    Entrelace les bits de deux index (longitude en bit de poids fort, comme un geohash).
+
+    Args:
+        lng_index (int): Index sur l'axe des longitudes
+        lat_index (int): Index sur l'axe des latitudes
+        bits (int, optional): Nombre de bits par axe
+
+    Returns:
+        int: Code de Morton sur 2 * bits bits
+    """
+    code = 0
+    for bit in range(bits - 1, -1, -1):
+        code = (code << 2) | (((lng_index >> bit) & 1) << 1) | ((lat_index >> bit) & 1)
+    return code
+
+def encode_geo_cell(latitude, longitude):
+    """
+    Calcule la cellule géographique d'un point.
+
+    Args:
+        latitude (float): Latitude en degrés
+        longitude (float): Longitude en degrés
+
+    Returns:
+        int: Geohash entier, ou None si une coordonnée manque
+    """
+    if latitude is None or longitude is None:
+        return None
+    return interleave(axis_index(float(longitude), -180.0, 360.0), axis_index(float(latitude), -90.0, 180.0))
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """
+    Distance orthodromique entre deux points (formule de haversine).
+
+    Args:
+        lat1, lng1 (float): Premier point, en degrés
+        lat2, lng2 (float): Second point, en degrés
+
+    Returns:
+        float: Distance en kilomètres, ou None si une coordonnée manque
+    """
+    if None in (lat1, lng1, lat2, lng2):
+        return None
+    phi1, phi2 = math.radians(float(lat1)), math.radians(float(lat2))
+    delta_phi = phi2 - phi1
+    delta_lambda = math.radians(float(lng2) - float(lng1))
+    a = math.sin(delta_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(delta_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+def _set_geo_cell(mapper, connection, target):
+    """Recalcule la cellule géographique avant l'écriture d'un bien."""
+    target.geo_cell = encode_geo_cell(target.latitude, target.longitude)
+
+def _register_sqlite_functions(dbapi_connection, connection_record):
+    """Déclare haversine_km sur les connexions SQLite."""
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        dbapi_connection.create_function('haversine_km', 4, haversine_km, deterministic=True)
+
+event.listen(Property, 'before_insert', _set_geo_cell)
+event.listen(Property, 'before_update', _set_geo_cell)
+event.listen(Engine, 'connect', _register_sqlite_functions)
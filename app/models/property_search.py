@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Index plein texte des biens immobiliers.
+Ce fichier définit les structures de recherche plein texte créées avec la table
+des biens immobiliers :
+- PostgreSQL : colonne tsvector générée et pondérée (titre > ville > description,
+  configuration 'french') et son index GIN ;
+- SQLite : table FTS5 « fantôme » synchronisée par triggers.
+Ces structures ne sont pas mappées par l'ORM ; les requêtes passent par
+app.services.search_service.
+"""
+
+from sqlalchemy import DDL, event
+
+from app import db
+from app.models.property import Property
+
+# Nom de la table FTS5 (SQLite)
+PROPERTIES_FTS_TABLE = 'properties_fts'
+
+# Colonne tsvector et table FTS5 utilisables dans les requêtes (sans ajout de FROM)
+property_search_vector = db.literal_column('properties.search_vector')
+properties_fts = db.table(PROPERTIES_FTS_TABLE, db.column('rowid'))
+
+POSTGRESQL_DDL = [
+    """
+    ALTER TABLE properties ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('french', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('french', coalesce(city, '')), 'B') ||
+        setweight(to_tsvector('french', coalesce(description, '')), 'C')
+    ) STORED
+    """,
+    'CREATE INDEX IF NOT EXISTS ix_properties_search_vector ON properties USING gin (search_vector)'
+]
+
+SQLITE_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS properties_fts USING fts5(
+        title, city, description,
+        content='properties', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS properties_fts_ai AFTER INSERT ON properties BEGIN
+        INSERT INTO properties_fts(rowid, title, city, description)
+        VALUES (new.id, new.title, new.city, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS properties_fts_ad AFTER DELETE ON properties BEGIN
+        INSERT INTO properties_fts(properties_fts, rowid, title, city, description)
+        VALUES ('delete', old.id, old.title, old.city, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS properties_fts_au AFTER UPDATE OF title, city, description ON properties BEGIN
+        INSERT INTO properties_fts(properties_fts, rowid, title, city, description)
+        VALUES ('delete', old.id, old.title, old.city, old.description);
+        INSERT INTO properties_fts(rowid, title, city, description)
+        VALUES (new.id, new.title, new.city, new.description);
+    END
+    """
+]
+
+for _statement in POSTGRESQL_DDL:
+    event.listen(Property.__table__, 'after_create', DDL(_statement).execute_if(dialect='postgresql'))
+for _statement in SQLITE_DDL:
+    event.listen(Property.__table__, 'after_create', DDL(_statement).execute_if(dialect='sqlite'))
+event.listen(
+    Property.__table__, 'before_drop',
+    DDL('DROP TABLE IF EXISTS properties_fts').execute_if(dialect='sqlite')
+)
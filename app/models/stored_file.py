@@ -0,0 +1,33 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Modèle pour les fichiers stockés par contenu (images et documents envoyés).
+"""
+
+from datetime import datetime
+from app import db
+
+class StoredFile(db.Model):
+    """
+    Modèle représentant un fichier du stockage, identifié par l'empreinte SHA-256
+    de son contenu : un même fichier envoyé plusieurs fois n'est stocké qu'une fois.
+
+    ref_count est le nombre de PropertyImage et de PropertyDocument qui référencent
+    le fichier. Il est maintenu par les écouteurs SQLAlchemy définis dans
+    app.services.storage et peut être recalculé avec `flask storage-gc`.
+    """
+
+    __tablename__ = 'stored_files'
+
+    key = db.Column(db.String(100), primary_key=True)  # ab/cd/<sha256><extension>
+    size = db.Column(db.BigInteger, nullable=False)  # Taille en octets
+    content_type = db.Column(db.String(100))  # Type MIME
+    ref_count = db.Column(db.Integer, nullable=False, default=0)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_used_at = db.Column(db.DateTime, default=datetime.utcnow)  # Dernier envoi du contenu
+
+    def __repr__(self):
+        """Représentation textuelle de l'objet."""
+        return f'<StoredFile {self.key} ({self.ref_count} références)>'
@@ -30,6 +30,23 @@ class Transaction(db.Model):
         handled_by (int): ID de l'utilisateur ayant géré la transaction
     """
     __tablename__ = 'transactions'
+    # Index correspondant aux filtres et tris de transaction_service (voir `flask check-indexes`)
+    __table_args__ = (
+        db.Index('ix_transactions_property_id_date', 'property_id', 'transaction_date'),
+        db.Index('ix_transactions_client_id_date', 'client_id', 'transaction_date'),
+        db.Index('ix_transactions_status_date', 'status', 'transaction_date'),
+        db.Index('ix_transactions_type_date', 'transaction_type', 'transaction_date'),
+        db.Index('ix_transactions_date_id', 'transaction_date', 'id'),
+        db.Index('ix_transactions_created_at_id', 'created_at', 'id'),
+        db.Index('ix_transactions_amount_id', 'amount', 'id'),
+        db.Index('ix_transactions_handled_by', 'handled_by',
+                 postgresql_where=db.column('handled_by').isnot(None),
+                 sqlite_where=db.column('handled_by').isnot(None)),
+        # Vérification des transactions en attente avant suppression d'un client
+        db.Index('ix_transactions_client_id_pending', 'client_id',
+                 postgresql_where=db.column('status') == 'pending',
+                 sqlite_where=db.column('status') == 'pending'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     transaction_type = db.Column(db.String(20), nullable=False)  # 'sale', 'rental'
@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Modèle pour les envois de documents par morceaux (envois reprenables).
+"""
+
+from datetime import datetime
+from app import db
+
+class UploadSession(db.Model):
+    """
+    Modèle représentant un envoi de document en cours.
+
+    Les morceaux reçus sont écrits directement dans un fichier temporaire
+    (UPLOAD_SESSION_DIR/<id>.part) ; received_size est le nombre d'octets reçus et
+    écrits sur disque, à partir duquel le client reprend l'envoi. L'envoi expire
+    à expires_at, repoussé à chaque morceau reçu.
+    """
+
+    __tablename__ = 'upload_sessions'
+
+    id = db.Column(db.String(32), primary_key=True)  # Jeton aléatoire (hexadécimal)
+    property_id = db.Column(db.Integer, db.ForeignKey('properties.id', ondelete='CASCADE'), nullable=False)
+    document_type = db.Column(db.String(50), nullable=False)
+    file_name = db.Column(db.String(100), nullable=False)
+    content_type = db.Column(db.String(100))
+    title = db.Column(db.String(100))
+    description = db.Column(db.Text)
+    expiry_date = db.Column(db.Date)
+    total_size = db.Column(db.BigInteger, nullable=False)  # Taille annoncée en octets
+    received_size = db.Column(db.BigInteger, nullable=False, default=0)
+    sha256 = db.Column(db.String(64))  # Empreinte annoncée (ou transmise à la finalisation)
+    created_by = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    def __repr__(self):
+        """Représentation textuelle de l'objet."""
+        return f'<UploadSession {self.id}: {self.received_size}/{self.total_size}>'
+
+    def to_dict(self):
+        """Convertit l'objet en dictionnaire."""
+        return {
+            'id': self.id,
+            'property_id': self.property_id,
+            'file_name': self.file_name,
+            'size': self.total_size,
+            'offset': self.received_size,
+            'expires_at': self.expires_at.isoformat() if self.expires_at else None
+        }
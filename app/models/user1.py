@@ -112,6 +112,8 @@ def load_user(user_id):
         user_id (str): ID de l'utilisateur à charger
         
     Returns:
-        User: L'objet utilisateur correspondant à l'ID, ou None si non trouvé
+        User: L'objet utilisateur correspondant à l'ID, ou None si non trouvé ou désactivé
     """
-    return User.query.get(int(user_id))
+    # Import différé : les services importent les modèles
+    from app.services.auth_service import load_active_user
+    return load_active_user(int(user_id))
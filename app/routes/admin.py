@@ -0,0 +1,189 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Routes d'administration.
+Ce fichier définit les endpoints API de diagnostic réservés aux administrateurs
+(statistiques des requêtes SQL, profilage à la demande des workers).
+"""
+
+from flask import Blueprint, request, jsonify, g, current_app
+
+from app.routes.old_auth import token_required
+from app.services.sql_stats import get_statement_stats
+from app.services.profiling import (
+    create_profiling_session, get_profiling_sessions, get_profiling_session, get_profiling_result,
+    delete_profiling_session
+)
+
+admin_bp = Blueprint('admin', __name__, url_prefix='/api/admin')
+
+@admin_bp.route('/sql-stats', methods=['GET'])
+@token_required
+def get_sql_stats():
+    """
+    Endpoint des statistiques des requêtes SQL par empreinte, cumulées par tous les
+    workers depuis la dernière remise à zéro (réservé aux administrateurs).
+
+    Paramètres: sort ('total_ms' par défaut, 'calls', 'mean_ms', 'p95_ms', 'max_ms', 'rows'), limit (50 par défaut).
+
+    Returns:
+        tuple: Réponse JSON et code HTTP
+    """
+    if g.current_user.role != 'admin':
+        return jsonify({'message': 'Accès non autorisé'}), 403
+
+    stats = get_statement_stats()
+    if stats is None:
+        return jsonify({'message': "Les statistiques SQL ne sont pas activées (SQL_STATS_ENABLED)"}), 404
+
+    sort = request.args.get('sort', 'total_ms')
+    limit = request.args.get('limit', 50, type=int)
+    try:
+        return jsonify(stats.read(sort, max(limit, 1))), 200
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
+@admin_bp.route('/sql-stats', methods=['DELETE'])
+@token_required
+def reset_sql_stats():
+    """
+    Endpoint de remise à zéro des statistiques des requêtes SQL de tous les workers
+    (réservé aux administrateurs).
+
+    Returns:
+        tuple: Réponse JSON et code HTTP
+    """
+    if g.current_user.role != 'admin':
+        return jsonify({'message': 'Accès non autorisé'}), 403
+
+    stats = get_statement_stats()
+    if stats is None:
+        return jsonify({'message': "Les statistiques SQL ne sont pas activées (SQL_STATS_ENABLED)"}), 404
+
+    stats.reset()
+    return jsonify({'message': 'Statistiques SQL remises à zéro'}), 200
+
+@admin_bp.route('/profiling', methods=['POST'])
+@token_required
+def create_profiling_session_endpoint():
+    """
+    Endpoint de création d'une session de profilage des workers (réservé aux administrateurs).
+
+    Corps JSON: mode ('requests', 'sampling' ou 'memory'), endpoint et count (mode 'requests'),
+    duration (secondes).
+
+    Returns:
+        tuple: Réponse JSON et code HTTP
+    """
+    if g.current_user.role != 'admin':
+        return jsonify({'message': 'Accès non autorisé'}), 403
+    if not current_app.config.get('PROFILING_ENABLED'):
+        return jsonify({'message': "Le profilage n'est pas activé (PROFILING_ENABLED)"}), 404
+
+    data = request.get_json(silent=True) or {}
+    try:
+        session = create_profiling_session(
+            data.get('mode'),
+            endpoint=data.get('endpoint'),
+            count=data.get('count'),
+            duration=data.get('duration'),
+            created_by=g.current_user.id
+        )
+    except (TypeError, ValueError) as e:
+        return jsonify({'message': str(e)}), 400
+
+    return jsonify(session), 201
+
+@admin_bp.route('/profiling', methods=['GET'])
+@token_required
+def get_profiling_sessions_endpoint():
+    """
+    Endpoint listant les sessions de profilage (réservé aux administrateurs).
+
+    Returns:
+        tuple: Réponse JSON et code HTTP
+    """
+    if g.current_user.role != 'admin':
+        return jsonify({'message': 'Accès non autorisé'}), 403
+    if not current_app.config.get('PROFILING_ENABLED'):
+        return jsonify({'message': "Le profilage n'est pas activé (PROFILING_ENABLED)"}), 404
+
+    return jsonify({'sessions': get_profiling_sessions()}), 200
+
+@admin_bp.route('/profiling/<session_id>', methods=['GET'])
+@token_required
+def get_profiling_session_endpoint(session_id):
+    """
+    Endpoint retournant l'état d'une session de profilage (réservé aux administrateurs).
+
+    Args:
+        session_id (str): ID de la session
+
+    Returns:
+        tuple: Réponse JSON et code HTTP
+    """
+    if g.current_user.role != 'admin':
+        return jsonify({'message': 'Accès non autorisé'}), 403
+    if not current_app.config.get('PROFILING_ENABLED'):
+        return jsonify({'message': "Le profilage n'est pas activé (PROFILING_ENABLED)"}), 404
+
+    session = get_profiling_session(session_id)
+    if not session:
+        return jsonify({'message': 'Session de profilage non trouvée'}), 404
+    return jsonify(session), 200
+
+@admin_bp.route('/profiling/<session_id>/result', methods=['GET'])
+@token_required
+def get_profiling_result_endpoint(session_id):
+    """
+    Endpoint retournant le résultat d'une session de profilage, cumulé sur les workers
+    (réservé aux administrateurs).
+
+    Paramètres: format ('pstats' ou 'raw' en mode 'requests', 'collapsed' en mode
+    'sampling', 'text' en mode 'memory' ; format texte du mode par défaut).
+
+    Args:
+        session_id (str): ID de la session
+
+    Returns:
+        Response: Résultat, ou réponse JSON et code HTTP en cas d'erreur
+    """
+    if g.current_user.role != 'admin':
+        return jsonify({'message': 'Accès non autorisé'}), 403
+    if not current_app.config.get('PROFILING_ENABLED'):
+        return jsonify({'message': "Le profilage n'est pas activé (PROFILING_ENABLED)"}), 404
+
+    session = get_profiling_session(session_id)
+    if not session:
+        return jsonify({'message': 'Session de profilage non trouvée'}), 404
+    try:
+        content, content_type = get_profiling_result(session, request.args.get('format'))
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
+    response = current_app.response_class(content, content_type=content_type)
+    if content_type == 'application/octet-stream':
+        response.headers['Content-Disposition'] = f'attachment; filename="profil-{session_id}.prof"'
+    return response
+
+@admin_bp.route('/profiling/<session_id>', methods=['DELETE'])
+@token_required
+def delete_profiling_session_endpoint(session_id):
+    """
+    Endpoint de suppression d'une session de profilage et de ses résultats (réservé aux administrateurs).
+
+    Args:
+        session_id (str): ID de la session
+
+    Returns:
+        tuple: Réponse JSON et code HTTP
+    """
+    if g.current_user.role != 'admin':
+        return jsonify({'message': 'Accès non autorisé'}), 403
+    if not current_app.config.get('PROFILING_ENABLED'):
+        return jsonify({'message': "Le profilage n'est pas activé (PROFILING_ENABLED)"}), 404
+
+    if not delete_profiling_session(session_id):
+        return jsonify({'message': 'Session de profilage non trouvée'}), 404
+    return jsonify({'message': 'Session de profilage supprimée'}), 200
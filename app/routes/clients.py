@@ -10,12 +10,14 @@ from flask import Blueprint, request, jsonify, current_app, g, url_for
 from datetime import datetime
 
 from app.routes.old_auth import token_required
+from app.routes.conditional import conditional_response
 from app.models.__init__1 import Client, PropertyVisit
 from app.services.client_service import (
-    get_client_by_id, get_all_clients, create_client, update_client, delete_client,
-    add_property_interest, remove_property_interest, get_client_interested_properties,
+    get_client_by_id, get_client_validators, get_all_clients, create_client, update_client, delete_client,
+    add_property_interest, remove_property_interest, get_client_interested_properties, get_client_interest_details,
     schedule_property_visit, update_property_visit, get_client_visits
 )
+from app.services.sql_metrics import query_budget
 
 clients_bp = Blueprint('clients', __name__, url_prefix='/api/clients')
 
@@ -33,19 +35,38 @@ def get_clients():
     search = request.args.get('search')
     client_type = request.args.get('client_type')
     assigned_agent_id = request.args.get('assigned_agent_id', type=int)
+    cursor = request.args.get('cursor')
+    sort = request.args.get('sort')
     
     # Récupération des clients
-    clients, total_pages, total_items = get_all_clients(page, per_page, search, client_type, assigned_agent_id)
+    try:
+        if cursor is not None:
+            # Pagination par curseur (sans OFFSET ni COUNT)
+            clients, next_cursor, prev_cursor = get_all_clients(
+                per_page=per_page, search=search, client_type=client_type,
+                assigned_agent_id=assigned_agent_id, cursor=cursor, sort=sort
+            )
+            pagination = {
+                'per_page': per_page,
+                'sort': sort,
+                'next_cursor': next_cursor,
+                'prev_cursor': prev_cursor
+            }
+        else:
+            clients, total_pages, total_items = get_all_clients(page, per_page, search, client_type, assigned_agent_id, sort=sort)
+            pagination = {
+                'page': page,
+                'per_page': per_page,
+                'total_pages': total_pages,
+                'total_items': total_items
+            }
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
     
     # Construction de la réponse
     result = {
         'clients': [],
-        'pagination': {
-            'page': page,
-            'per_page': per_page,
-            'total_pages': total_pages,
-            'total_items': total_items
-        }
+        'pagination': pagination
     }
     
     # Formatage des clients
@@ -67,6 +88,7 @@ def get_clients():
     return jsonify(result), 200
 
 @clients_bp.route('/<int:client_id>', methods=['GET'])
+@conditional_response(get_client_validators)
 def get_client(client_id):
     """
     Endpoint pour récupérer un client spécifique.
@@ -215,6 +237,7 @@ def delete_client_endpoint(client_id):
         return jsonify({'message': 'Une erreur est survenue lors de la suppression du client'}), 500
 
 @clients_bp.route('/<int:client_id>/interests', methods=['GET'])
+@query_budget(6)
 def get_client_interests(client_id):
     """
     Endpoint pour récupérer les biens immobiliers qui intéressent un client.
@@ -253,22 +276,12 @@ def get_client_interests(client_id):
         }
     }
     
+    # Niveaux d'intérêt de la page, lus en une requête dans la table de jointure
+    interests = get_client_interest_details(client.id, [prop.id for prop in properties])
+    
     # Formatage des biens immobiliers
     for prop in properties:
-        # Récupération du niveau d'intérêt depuis la table de jointure
-        interest_level = None
-        notes = None
-        for interest in client.interested_properties:
-            if interest.id == prop.id:
-                # Accès aux attributs de la table de jointure
-                interest_data = db.session.execute(
-                    db.text("SELECT interest_level, notes FROM client_property_interests WHERE client_id = :client_id AND property_id = :property_id"),
-                    {"client_id": client.id, "property_id": prop.id}
-                ).fetchone()
-                if interest_data:
-                    interest_level = interest_data[0]
-                    notes = interest_data[1]
-                break
+        interest_level, notes = interests.get(prop.id, (None, None))
         
         result['properties'].append({
             'id': prop.id,
@@ -362,19 +375,35 @@ def get_client_visits_endpoint(client_id):
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 10, type=int)
     status = request.args.get('status')
+    cursor = request.args.get('cursor')
+    sort = request.args.get('sort')
     
     # Récupération des visites
-    visits, total_pages, total_items = get_client_visits(client_id, page, per_page, status)
+    try:
+        if cursor is not None:
+            # Pagination par curseur (sans OFFSET ni COUNT)
+            visits, next_cursor, prev_cursor = get_client_visits(client_id, per_page=per_page, status=status, cursor=cursor, sort=sort)
+            pagination = {
+                'per_page': per_page,
+                'sort': sort,
+                'next_cursor': next_cursor,
+                'prev_cursor': prev_cursor
+            }
+        else:
+            visits, total_pages, total_items = get_client_visits(client_id, page, per_page, status, sort=sort)
+            pagination = {
+                'page': page,
+                'per_page': per_page,
+                'total_pages': total_pages,
+                'total_items': total_items
+            }
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
     
     # Construction de la réponse
     result = {
         'visits': [],
-        'pagination': {
-            'page': page,
-            'per_page': per_page,
-            'total_pages': total_pages,
-            'total_items': total_items
-        },
+        'pagination': pagination,
         'client': {
             'id': client.id,
             'first_name': client.first_name,
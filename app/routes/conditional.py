@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Requêtes conditionnelles (ETag / Last-Modified).
+Ce fichier définit le décorateur qui calcule les validateurs d'une fiche détaillée
+par une requête légère et répond 304 Not Modified, sans charger ni sérialiser l'objet,
+lorsque la version détenue par le client est toujours à jour.
+"""
+
+import hashlib
+from datetime import datetime, timezone
+from functools import wraps
+
+from flask import current_app, make_response, request
+
+# Version du format des réponses : à incrémenter quand la sérialisation change
+RESPONSE_FORMAT_VERSION = 3
+
+def conditional_response(get_validators):
+    """
+    Décorateur gérant If-None-Match et If-Modified-Since sur un endpoint de détail.
+
+    L'ETag est une empreinte des valeurs retournées par get_validators (et de l'hôte,
+    les URL des réponses étant absolues) ; Last-Modified est la plus récente des dates.
+    If-None-Match est prioritaire sur If-Modified-Since.
+
+    Args:
+        get_validators: Fonction recevant les arguments de l'endpoint et retournant
+            un tuple de valeurs (dates de mise à jour, nombres d'objets liés), ou None
+            si l'objet n'existe pas (l'endpoint est alors appelé normalement)
+
+    Returns:
+        function: Le décorateur
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            validators = get_validators(*args, **kwargs)
+            if validators is None:
+                return f(*args, **kwargs)
+
+            etag, last_modified = compute_validators(validators)
+            if request.if_none_match:
+                not_modified = request.if_none_match.contains_weak(etag)
+            elif request.if_modified_since and last_modified:
+                not_modified = last_modified <= request.if_modified_since
+            else:
+                not_modified = False
+
+            if not_modified:
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag)
+            response.last_modified = last_modified
+            # Le client peut conserver la réponse mais doit la revalider à chaque usage
+            response.cache_control.no_cache = True
+            return response
+
+        return decorated
+
+    return decorator
+
+def compute_validators(values):
+    """
+    Calcule l'ETag et la date Last-Modified d'une fiche.
+
+    Args:
+        values (tuple): Valeurs dont dépend la fiche
+
+    Returns:
+        tuple: (ETag, date de dernière modification UTC à la seconde près ou None)
+    """
+    fingerprint = '|'.join([str(RESPONSE_FORMAT_VERSION), request.host_url] + [
+        value.isoformat() if isinstance(value, datetime) else str(value) for value in values
+    ])
+    etag = hashlib.sha1(fingerprint.encode('utf-8')).hexdigest()
+
+    dates = [value for value in values if isinstance(value, datetime)]
+    last_modified = None
+    if dates:
+        last_modified = max(dates)
+        if last_modified.tzinfo is None:
+            last_modified = last_modified.replace(tzinfo=timezone.utc)
+        last_modified = last_modified.astimezone(timezone.utc).replace(microsecond=0)
+    return etag, last_modified
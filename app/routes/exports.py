@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Routes d'export en masse.
+Ce fichier définit l'endpoint API retournant, en flux, l'export CSV ou NDJSON des
+biens immobiliers, des transactions ou des visites.
+"""
+
+from flask import Blueprint, request, jsonify, current_app, g, stream_with_context
+
+from app.routes.old_auth import token_required
+from app.services.export_service import (
+    export_records, export_filename, parse_export_filters, EXPORT_ENTITIES, EXPORT_MIMETYPES
+)
+
+exports_bp = Blueprint('exports', __name__, url_prefix='/api/export')
+
+@exports_bp.route('/<entity>', methods=['GET'])
+@token_required
+def export_endpoint(entity):
+    """
+    Endpoint d'export en masse (réservé aux administrateurs).
+
+    La réponse est envoyée au fil de la lecture des lignes, sans être construite en
+    mémoire ; avec gzip=1, elle est compressée à la volée (fichier .gz).
+
+    Args:
+        entity (str): 'properties', 'transactions' ou 'visits'
+
+    Returns:
+        Response: Export en flux, ou réponse JSON et code HTTP en cas d'erreur
+    """
+    user = g.current_user
+    if user.role != 'admin':
+        return jsonify({'message': 'Accès non autorisé'}), 403
+    if entity not in EXPORT_ENTITIES:
+        return jsonify({'message': f"Entité inconnue: '{entity}'"}), 404
+
+    file_format = request.args.get('format', 'csv')
+    compress = request.args.get('gzip', '').lower() in ('1', 'true')
+    filters = parse_export_filters(entity, request.args)
+
+    try:
+        chunks = export_records(entity, filters, file_format, compress)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
+    response = current_app.response_class(
+        stream_with_context(chunks),
+        mimetype='application/gzip' if compress else EXPORT_MIMETYPES[file_format]
+    )
+    response.headers['Content-Disposition'] = \
+        f'attachment; filename="{export_filename(entity, file_format, compress)}"'
+    return response
@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Routes de téléchargement des fichiers envoyés.
+Ce fichier définit l'endpoint servant les images et documents du stockage local.
+Le fichier est confié au proxy (X-Accel-Redirect pour nginx, X-Sendfile pour Apache
+ou lighttpd) lorsque c'est configuré, sinon envoyé par le serveur WSGI (sendfile) ;
+les requêtes conditionnelles et partielles (Range) sont prises en charge dans les deux cas.
+"""
+
+import mimetypes
+import os
+from urllib.parse import quote
+
+from flask import Blueprint, abort, current_app, redirect, send_file
+
+from app.services.storage import LocalStorage, get_storage, is_content_key
+
+files_bp = Blueprint('files', __name__, url_prefix='/files')
+
+@files_bp.route('/<path:key>', methods=['GET'])
+def get_file(key):
+    """
+    Endpoint de téléchargement d'un fichier du stockage.
+
+    Les contenus stockés sous leur empreinte ne changent jamais : ils sont mis en cache
+    un an (immutable). Les fichiers dérivés (déclinaisons des images), qui peuvent être
+    régénérés, sont mis en cache FILES_CACHE_MAX_AGE secondes puis revalidés.
+
+    Args:
+        key (str): Clé du fichier
+
+    Returns:
+        Response: Le fichier (ou une redirection si le stockage n'est pas local)
+    """
+    storage = get_storage()
+    if not isinstance(storage, LocalStorage):
+        # Stockage distant : URL publique ou signée du fichier
+        return redirect(storage.url(key))
+    path = storage.local_path(key)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+
+    immutable = is_content_key(key)
+    max_age = current_app.config.get('FILES_IMMUTABLE_MAX_AGE', 31536000) if immutable \
+        else current_app.config.get('FILES_CACHE_MAX_AGE', 86400)
+
+    accel_prefix = current_app.config.get('FILES_X_ACCEL_REDIRECT')
+    if accel_prefix or current_app.config.get('USE_X_SENDFILE'):
+        # Le proxy envoie le fichier et traite lui-même Range et les validateurs
+        response = current_app.response_class(mimetype=mimetypes.guess_type(key)[0] or 'application/octet-stream')
+        if accel_prefix:
+            response.headers['X-Accel-Redirect'] = f"{accel_prefix.rstrip('/')}/{quote(key)}"
+        else:
+            response.headers['X-Sendfile'] = path
+    else:
+        # Envoi par le serveur WSGI (wsgi.file_wrapper, soit sendfile avec gunicorn)
+        response = send_file(path, conditional=True, max_age=max_age)
+        response.accept_ranges = 'bytes'
+
+    response.cache_control.public = True
+    response.cache_control.max_age = max_age
+    response.cache_control.no_cache = None
+    if immutable:
+        response.cache_control.immutable = True
+    return response
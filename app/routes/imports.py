@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Routes d'import en masse.
+Ce fichier définit l'endpoint API recevant un fichier CSV ou NDJSON de biens
+immobiliers, de propriétaires ou de clients, lu en flux depuis le corps de la requête.
+"""
+
+import io
+
+from flask import Blueprint, request, jsonify, current_app, g
+from werkzeug.wsgi import get_input_stream
+
+from app.routes.old_auth import token_required
+from app.services.import_service import import_records, detect_format, IMPORT_ENTITIES
+
+imports_bp = Blueprint('imports', __name__, url_prefix='/api/import')
+
+@imports_bp.route('/<entity>', methods=['POST'])
+@token_required
+def import_endpoint(entity):
+    """
+    Endpoint d'import en masse (réservé aux administrateurs).
+
+    Le fichier est envoyé brut dans le corps de la requête (Content-Type text/csv ou
+    application/x-ndjson, ou paramètre format) et lu au fil de l'eau, sans être
+    chargé en mémoire.
+
+    Args:
+        entity (str): 'properties', 'owners' ou 'clients'
+
+    Returns:
+        tuple: Réponse JSON (rapport d'import) et code HTTP
+    """
+    user = g.current_user
+    if user.role != 'admin':
+        return jsonify({'message': 'Accès non autorisé'}), 403
+    if entity not in IMPORT_ENTITIES:
+        return jsonify({'message': f"Entité inconnue: '{entity}'"}), 404
+
+    file_format = request.args.get('format') or detect_format(request.mimetype)
+    if file_format is None:
+        return jsonify({'message': 'Format inconnu : utiliser text/csv, application/x-ndjson ou le paramètre format'}), 400
+
+    # Limite propre à l'import (MAX_CONTENT_LENGTH vise les formulaires et les images)
+    body = get_input_stream(request.environ,
+                            max_content_length=current_app.config.get('IMPORT_MAX_CONTENT_LENGTH'))
+    stream = io.TextIOWrapper(body, encoding='utf-8-sig', newline='')
+
+    try:
+        report = import_records(
+            entity, stream, file_format,
+            created_by=user.id,
+            on_duplicate=request.args.get('on_duplicate', 'error'),
+            dry_run=request.args.get('dry_run', '').lower() in ('1', 'true'),
+            chunk_size=current_app.config.get('IMPORT_CHUNK_SIZE', 1000)
+        )
+    except ValueError as e:
+        # Paramètre invalide ou fichier non UTF-8 (les lots déjà importés sont conservés)
+        return jsonify({'message': str(e)}), 400
+
+    return jsonify(report), 200
@@ -8,8 +8,11 @@ from app.models.owner import Owner
 from app.models.client import Client
 from app.models.transaction import Transaction
 
-from app.models.property_visit import PropertyVisit
-
+from app.models.client import PropertyVisit
+from app.services.property_service import get_primary_images
+from app.services.search_service import apply_text_search, apply_fuzzy_search
+from app.services.dashboard_service import get_dashboard_stats
+from app.services.activity_log import get_recent_activities
 
 from app import db
 import datetime
@@ -28,46 +31,23 @@ def index():
         PropertyVisit.status == 'scheduled'
     ).order_by(PropertyVisit.visit_date).limit(5).all()
     
+    # Chargement groupé des images principales
+    primary_images = get_primary_images([prop.id for prop in latest_properties])
+    
     return render_template('index.html', 
                           latest_properties=latest_properties,
+                          primary_images=primary_images,
                           upcoming_visits=upcoming_visits)
 
 @main_bp.route('/dashboard')
 @login_required
 def dashboard():
     """Tableau de bord"""
-    # Statistiques générales
-    stats = {
-        'properties_count': Property.query.count(),
-        'owners_count': Owner.query.count(),
-        'clients_count': Client.query.count(),
-        'transactions_count': Transaction.query.count(),
-        
-        # Statistiques des biens par statut
-        'properties_for_sale': Property.query.filter_by(status='for_sale').count(),
-        'properties_for_rent': Property.query.filter_by(status='for_rent').count(),
-        'properties_sold': Property.query.filter_by(status='sold').count(),
-        'properties_rented': Property.query.filter_by(status='rented').count(),
-        
-        # Statistiques des biens par type
-        'properties_apartment': Property.query.filter_by(property_type='apartment').count(),
-        'properties_house': Property.query.filter_by(property_type='house').count(),
-        'properties_land': Property.query.filter_by(property_type='land').count(),
-        'properties_commercial': Property.query.filter_by(property_type='commercial').count(),
-        'properties_other': Property.query.filter_by(property_type='other').count(),
-        
-        # Statistiques des transactions
-        'sales_count': Transaction.query.filter_by(transaction_type='sale').count(),
-        'rentals_count': Transaction.query.filter_by(transaction_type='rental').count(),
-        
-        # Données pour les graphiques
-        'months': ['Jan', 'Fév', 'Mar', 'Avr', 'Mai', 'Juin', 'Juil', 'Août', 'Sep', 'Oct', 'Nov', 'Déc'],
-        'sales_by_month': [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
-        'rentals_by_month': [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0]
-    }
+    # Statistiques générales (lues depuis la table d'agrégats dashboard_stats)
+    stats = get_dashboard_stats()
     
     # Récupération des activités récentes
-    recent_activities = []  # À implémenter avec un modèle Activity
+    recent_activities = get_recent_activities(10)
     
     return render_template('dashboard.html', stats=stats, recent_activities=recent_activities)
 
@@ -111,15 +91,26 @@ def properties_list():
     elif request.args.get('transaction_type') == 'rental':
         query = query.filter(Property.status.in_(['for_rent', 'rented']))
     
+    # Recherche plein texte, classée par pertinence
+    if request.args.get('q'):
+        query, rank = apply_text_search(query, request.args.get('q'))
+        query = query.order_by(rank.desc(), Property.id.desc())
+    else:
+        query = query.order_by(Property.created_at.desc())
+    
     # Pagination
-    pagination = query.order_by(Property.created_at.desc()).paginate(page=page, per_page=per_page)
+    pagination = query.paginate(page=page, per_page=per_page)
     properties = pagination.items
     
+    # Chargement groupé des images principales de la page
+    primary_images = get_primary_images([prop.id for prop in properties])
+    
     # Liste des propriétaires pour le filtre
     owners = Owner.query.all()
     
     return render_template('properties/list.html', 
                           properties=properties, 
+                          primary_images=primary_images,
                           pagination=pagination,
                           owners=owners)
 
@@ -176,11 +167,6 @@ def owners_list():
     query = Owner.query.filter_by(**filters)
     
     # Filtres supplémentaires
-    if request.args.get('name'):
-        search_term = f"%{request.args.get('name')}%"
-        query = query.filter((Owner.first_name.ilike(search_term)) | 
-                            (Owner.last_name.ilike(search_term)) | 
-                            (Owner.company_name.ilike(search_term)))
     if request.args.get('city'):
         query = query.filter(Owner.city.ilike(f"%{request.args.get('city')}%"))
     
@@ -190,8 +176,17 @@ def owners_list():
     elif request.args.get('has_properties') == 'no':
         query = query.filter(~Owner.properties.any())
     
+    # Recherche approximative par nom, classée par similarité (après les autres filtres)
+    rank = None
+    if request.args.get('name'):
+        query, rank = apply_fuzzy_search(query, Owner, request.args.get('name'))
+    
     # Pagination
-    pagination = query.order_by(Owner.id).paginate(page=page, per_page=per_page)
+    if rank is not None:
+        query = query.order_by(rank.desc(), Owner.id)
+    else:
+        query = query.order_by(Owner.id)
+    pagination = query.paginate(page=page, per_page=per_page)
     owners = pagination.items
     
     return render_template('owners/list.html', 
@@ -207,10 +202,6 @@ def clients_list():
     # Filtres
     query = Client.query
     
-    if request.args.get('name'):
-        search_term = f"%{request.args.get('name')}%"
-        query = query.filter((Client.first_name.ilike(search_term)) | 
-                            (Client.last_name.ilike(search_term)))
     if request.args.get('email'):
         query = query.filter(Client.email.ilike(f"%{request.args.get('email')}%"))
     if request.args.get('phone'):
@@ -218,8 +209,17 @@ def clients_list():
     if request.args.get('client_type'):
         query = query.filter(Client.client_type == request.args.get('client_type'))
     
+    # Recherche approximative par nom, classée par similarité (après les autres filtres)
+    rank = None
+    if request.args.get('name'):
+        query, rank = apply_fuzzy_search(query, Client, request.args.get('name'))
+    
     # Pagination
-    pagination = query.order_by(Client.id).paginate(page=page, per_page=per_page)
+    if rank is not None:
+        query = query.order_by(rank.desc(), Client.id)
+    else:
+        query = query.order_by(Client.id)
+    pagination = query.paginate(page=page, per_page=per_page)
     clients = pagination.items
     
     return render_template('clients/list.html', 
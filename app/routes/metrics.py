@@ -0,0 +1,36 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Route des métriques de supervision.
+Ce fichier définit l'endpoint /metrics lu par Prometheus.
+"""
+
+import hmac
+
+from flask import Blueprint, request, jsonify, current_app
+
+from app.services.metrics import render_metrics
+
+metrics_bp = Blueprint('metrics', __name__)
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """
+    Endpoint des métriques au format texte de Prometheus, cumulées par tous les workers.
+
+    Si METRICS_TOKEN est défini, l'en-tête Authorization: Bearer <METRICS_TOKEN> est requis.
+
+    Returns:
+        Response: Métriques, ou réponse JSON et code HTTP si le token est invalide
+    """
+    token = current_app.config.get('METRICS_TOKEN')
+    if token:
+        auth_header = request.headers.get('Authorization', '')
+        if not hmac.compare_digest(auth_header.encode('utf-8'), f'Bearer {token}'.encode('utf-8')):
+            return jsonify({'message': 'Token invalide'}), 401
+
+    payload, content_type = render_metrics()
+    response = current_app.response_class(payload, content_type=content_type)
+    response.headers['Cache-Control'] = 'no-store'
+    return response
@@ -8,9 +8,10 @@ Ce fichier définit les endpoints API pour la gestion des propriétaires de bien
 
 from flask import Blueprint, request, jsonify, current_app, g
 from app.routes.old_auth import token_required
+from app.routes.conditional import conditional_response
 from app.models.__init__1 import Owner
 from app.services.owner_service import (
-    get_owner_by_id, get_all_owners, create_owner, update_owner, delete_owner, get_owner_properties
+    get_owner_by_id, get_owner_validators, get_all_owners, create_owner, update_owner, delete_owner, get_owner_properties
 )
 
 owners_bp = Blueprint('owners', __name__, url_prefix='/api/owners')
@@ -27,19 +28,35 @@ def get_owners():
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 10, type=int)
     search = request.args.get('search')
+    cursor = request.args.get('cursor')
+    sort = request.args.get('sort')
     
     # Récupération des propriétaires
-    owners, total_pages, total_items = get_all_owners(page, per_page, search)
+    try:
+        if cursor is not None:
+            # Pagination par curseur (sans OFFSET ni COUNT)
+            owners, next_cursor, prev_cursor = get_all_owners(per_page=per_page, search=search, cursor=cursor, sort=sort)
+            pagination = {
+                'per_page': per_page,
+                'sort': sort,
+                'next_cursor': next_cursor,
+                'prev_cursor': prev_cursor
+            }
+        else:
+            owners, total_pages, total_items = get_all_owners(page, per_page, search, sort=sort)
+            pagination = {
+                'page': page,
+                'per_page': per_page,
+                'total_pages': total_pages,
+                'total_items': total_items
+            }
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
     
     # Construction de la réponse
     result = {
         'owners': [],
-        'pagination': {
-            'page': page,
-            'per_page': per_page,
-            'total_pages': total_pages,
-            'total_items': total_items
-        }
+        'pagination': pagination
     }
     
     # Formatage des propriétaires
@@ -61,6 +78,7 @@ def get_owners():
     return jsonify(result), 200
 
 @owners_bp.route('/<int:owner_id>', methods=['GET'])
+@conditional_response(get_owner_validators)
 def get_owner(owner_id):
     """
     Endpoint pour récupérer un propriétaire spécifique.
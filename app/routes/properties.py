@@ -6,23 +6,59 @@ Routes de gestion des biens immobiliers.
 Ce fichier définit les endpoints API pour la gestion des biens immobiliers.
 """
 
-from flask import Blueprint, request, jsonify, current_app, g, url_for
+from flask import Blueprint, request, jsonify, current_app, g
 from werkzeug.utils import secure_filename
 import os
 
 from app.routes.old_auth import token_required
+from app.routes.conditional import conditional_response
 from app.models.__init__1 import Property, PropertyImage, PropertyDocument, Amenity
 from app.services.property_service import (
-    get_property_by_id, get_property_by_reference, get_all_properties,
+    get_property_by_id, get_property_validators, get_property_by_reference, get_all_properties, parse_property_filters,
     create_property, update_property, delete_property,
     add_property_image, add_property_document,
-    get_property_images, get_property_documents,
+    get_property_images, get_property_documents, get_primary_images,
     get_all_amenities, create_amenity
 )
+from app.services.facet_service import get_property_facets
+from app.services.sql_metrics import query_budget
 
 properties_bp = Blueprint('properties', __name__, url_prefix='/api/properties')
 
+def get_property_filters():
+    """
+    Extrait les filtres de recherche des biens immobiliers des paramètres de la requête.
+    
+    Returns:
+        dict: Filtres à appliquer (les valeurs numériques invalides sont ignorées)
+    """
+    return parse_property_filters(request.args)
+
+def get_image_urls(image):
+    """
+    Construit les URL d'une image : image pleine taille, image envoyée et déclinaisons.
+    
+    Args:
+        image (PropertyImage): Image du bien
+        
+    Returns:
+        dict: URL de l'image ('sizes' vaut None tant que les déclinaisons ne sont pas générées)
+    """
+    sizes = None
+    if image.has_derivatives:
+        sizes = {size: {image_format: image.get_url(size, image_format, external=True)
+                        for image_format in ('jpeg', 'webp')}
+                 for size in ('thumbnail', 'card', 'full')}
+    
+    return {
+        'url': image.get_url('full', external=True),
+        'original_url': image.get_url(external=True),
+        'sizes': sizes,
+        'processing_status': image.processing_status
+    }
+
 @properties_bp.route('/', methods=['GET'])
+@query_budget(6)
 def get_properties():
     """
     Endpoint pour récupérer la liste des biens immobiliers avec pagination et filtrage.
@@ -33,46 +69,49 @@ def get_properties():
     # Récupération des paramètres de pagination
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 10, type=int)
+    cursor = request.args.get('cursor')
+    sort = request.args.get('sort')
     
     # Récupération des filtres
-    filters = {}
-    filter_params = [
-        'property_type', 'status', 'city', 'min_price', 'max_price',
-        'min_area', 'max_area', 'bedrooms', 'bathrooms', 'owner_id',
-        'transaction_type'
-    ]
-    
-    for param in filter_params:
-        value = request.args.get(param)
-        if value:
-            # Conversion des valeurs numériques
-            if param in ['min_price', 'max_price', 'min_area', 'max_area', 'bedrooms', 'bathrooms', 'owner_id']:
-                try:
-                    value = float(value) if 'price' in param or 'area' in param else int(value)
-                except ValueError:
-                    continue
-            filters[param] = value
+    filters = get_property_filters()
     
     # Récupération des biens immobiliers
-    properties, total_pages, total_items = get_all_properties(filters, page, per_page)
+    try:
+        if cursor is not None:
+            # Pagination par curseur (sans OFFSET ni COUNT)
+            properties, next_cursor, prev_cursor = get_all_properties(filters, per_page=per_page, cursor=cursor, sort=sort)
+            pagination = {
+                'per_page': per_page,
+                'sort': sort,
+                'next_cursor': next_cursor,
+                'prev_cursor': prev_cursor
+            }
+        else:
+            properties, total_pages, total_items = get_all_properties(filters, page, per_page, sort=sort)
+            pagination = {
+                'page': page,
+                'per_page': per_page,
+                'total_pages': total_pages,
+                'total_items': total_items
+            }
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
     
     # Construction de la réponse
     result = {
         'properties': [],
-        'pagination': {
-            'page': page,
-            'per_page': per_page,
-            'total_pages': total_pages,
-            'total_items': total_items
-        }
+        'pagination': pagination
     }
     
+    # Chargement groupé des images principales de la page
+    primary_images = get_primary_images([prop.id for prop in properties])
+    
     # Formatage des biens immobiliers
     for prop in properties:
         primary_image = None
-        primary_image_obj = prop.images.filter_by(is_primary=True).first() or prop.images.first()
+        primary_image_obj = primary_images.get(prop.id)
         if primary_image_obj:
-            primary_image = url_for('static', filename=primary_image_obj.file_path.replace('app/static/', ''), _external=True)
+            primary_image = primary_image_obj.get_url('card', external=True)
         
         result['properties'].append({
             'id': prop.id,
@@ -83,6 +122,8 @@ def get_properties():
             'city': prop.city,
             'postal_code': prop.postal_code,
             'country': prop.country,
+            'latitude': float(prop.latitude) if prop.latitude is not None else None,
+            'longitude': float(prop.longitude) if prop.longitude is not None else None,
             'total_area': float(prop.total_area) if prop.total_area else None,
             'num_bedrooms': prop.num_bedrooms,
             'num_bathrooms': prop.num_bathrooms,
@@ -94,7 +135,25 @@ def get_properties():
     
     return jsonify(result), 200
 
+@properties_bp.route('/facets', methods=['GET'])
+def get_facets():
+    """
+    Endpoint pour récupérer les facettes (nombre de biens par type, statut, ville,
+    nombre de chambres, tranche de prix et équipement) des biens correspondant aux filtres.
+    
+    Returns:
+        tuple: Réponse JSON et code HTTP
+    """
+    try:
+        facets = get_property_facets(get_property_filters())
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    
+    return jsonify(facets), 200
+
 @properties_bp.route('/<int:property_id>', methods=['GET'])
+@query_budget(8)
+@conditional_response(get_property_validators)
 def get_property(property_id):
     """
     Endpoint pour récupérer un bien immobilier spécifique.
@@ -114,7 +173,7 @@ def get_property(property_id):
     for img in get_property_images(property_id):
         images.append({
             'id': img.id,
-            'url': url_for('static', filename=img.file_path.replace('app/static/', ''), _external=True),
+            **get_image_urls(img),
             'is_primary': img.is_primary,
             'title': img.title,
             'description': img.description
@@ -126,7 +185,7 @@ def get_property(property_id):
         documents.append({
             'id': doc.id,
             'document_type': doc.document_type,
-            'url': url_for('static', filename=doc.file_path.replace('app/static/', ''), _external=True),
+            'url': doc.get_url(external=True),
             'title': doc.title,
             'description': doc.description,
             'expiry_date': doc.expiry_date.isoformat() if doc.expiry_date else None
@@ -325,7 +384,7 @@ def add_property_image_endpoint(property_id):
             'message': 'Image ajoutée avec succès',
             'image': {
                 'id': image.id,
-                'url': url_for('static', filename=image.file_path.replace('app/static/', ''), _external=True),
+                **get_image_urls(image),
                 'is_primary': image.is_primary,
                 'title': image.title
             }
@@ -379,7 +438,7 @@ def add_property_document_endpoint(property_id):
             'message': 'Document ajouté avec succès',
             'document': {
                 'id': document.id,
-                'url': url_for('static', filename=document.file_path.replace('app/static/', ''), _external=True),
+                'url': document.get_url(external=True),
                 'document_type': document.document_type,
                 'title': document.title
             }
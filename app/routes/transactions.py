@@ -10,9 +10,10 @@ from flask import Blueprint, request, jsonify, current_app, g
 from datetime import datetime
 
 from app.routes.old_auth import token_required
+from app.routes.conditional import conditional_response
 from app.models.__init__1 import Transaction, RentalAgreement
 from app.services.transaction_service import (
-    get_transaction_by_id, get_all_transactions, create_transaction, update_transaction, delete_transaction,
+    get_transaction_by_id, get_transaction_validators, get_all_transactions, parse_transaction_filters, create_transaction, update_transaction, delete_transaction,
     get_rental_agreement, create_rental_agreement, update_rental_agreement,
     get_property_transactions, get_client_transactions, change_transaction_status
 )
@@ -30,47 +31,38 @@ def get_transactions():
     # Récupération des paramètres de pagination
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 10, type=int)
+    cursor = request.args.get('cursor')
+    sort = request.args.get('sort')
     
-    # Récupération des filtres
-    filters = {}
-    filter_params = [
-        'transaction_type', 'status', 'property_id', 'client_id', 'handled_by',
-        'min_amount', 'max_amount', 'start_date', 'end_date'
-    ]
-    
-    for param in filter_params:
-        value = request.args.get(param)
-        if value:
-            # Conversion des valeurs numériques
-            if param in ['property_id', 'client_id', 'handled_by']:
-                try:
-                    value = int(value)
-                except ValueError:
-                    continue
-            elif param in ['min_amount', 'max_amount']:
-                try:
-                    value = float(value)
-                except ValueError:
-                    continue
-            elif param in ['start_date', 'end_date']:
-                try:
-                    value = datetime.fromisoformat(value)
-                except ValueError:
-                    continue
-            filters[param] = value
+    # Récupération des filtres (les valeurs invalides sont ignorées)
+    filters = parse_transaction_filters(request.args)
     
     # Récupération des transactions
-    transactions, total_pages, total_items = get_all_transactions(page, per_page, filters)
+    try:
+        if cursor is not None:
+            # Pagination par curseur (sans OFFSET ni COUNT)
+            transactions, next_cursor, prev_cursor = get_all_transactions(per_page=per_page, filters=filters, cursor=cursor, sort=sort)
+            pagination = {
+                'per_page': per_page,
+                'sort': sort,
+                'next_cursor': next_cursor,
+                'prev_cursor': prev_cursor
+            }
+        else:
+            transactions, total_pages, total_items = get_all_transactions(page, per_page, filters, sort=sort)
+            pagination = {
+                'page': page,
+                'per_page': per_page,
+                'total_pages': total_pages,
+                'total_items': total_items
+            }
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
     
     # Construction de la réponse
     result = {
         'transactions': [],
-        'pagination': {
-            'page': page,
-            'per_page': per_page,
-            'total_pages': total_pages,
-            'total_items': total_items
-        }
+        'pagination': pagination
     }
     
     # Formatage des transactions
@@ -91,6 +83,7 @@ def get_transactions():
     return jsonify(result), 200
 
 @transactions_bp.route('/<int:transaction_id>', methods=['GET'])
+@conditional_response(get_transaction_validators)
 def get_transaction(transaction_id):
     """
     Endpoint pour récupérer une transaction spécifique.
@@ -0,0 +1,194 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Routes d'envoi reprenable de documents.
+Ce fichier définit les endpoints API du protocole d'envoi par morceaux : ouverture
+de l'envoi, envoi des morceaux à une position donnée, consultation de la position
+courante (reprise après une coupure), finalisation et annulation.
+"""
+
+from flask import Blueprint, request, jsonify, current_app, g
+from werkzeug.exceptions import ClientDisconnected
+from werkzeug.wsgi import get_input_stream
+
+from app.routes.old_auth import token_required
+from app.services.upload_service import (
+    UploadConflict, create_upload_session, get_upload_session, write_upload_chunk, finalize_upload, cancel_upload
+)
+
+uploads_bp = Blueprint('uploads', __name__, url_prefix='/api/uploads')
+
+def upload_response(upload, status=200):
+    """
+    Réponse décrivant un envoi, avec sa position courante dans l'en-tête Upload-Offset.
+
+    Args:
+        upload (UploadSession): Envoi en cours
+        status (int, optional): Code HTTP
+
+    Returns:
+        Response: Réponse JSON
+    """
+    response = jsonify({'upload': upload.to_dict()})
+    response.status_code = status
+    response.headers['Upload-Offset'] = str(upload.received_size)
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+def conflict_response(error):
+    """
+    Réponse à un morceau envoyé à une mauvaise position : le client reprend à l'offset indiqué.
+
+    Args:
+        error (UploadConflict): Conflit de position
+
+    Returns:
+        tuple: Réponse JSON et code HTTP
+    """
+    response = jsonify({'message': str(error), 'offset': error.offset})
+    response.headers['Upload-Offset'] = str(error.offset)
+    return response, 409
+
+@uploads_bp.route('/', methods=['POST'])
+@token_required
+def create_upload_endpoint():
+    """
+    Endpoint d'ouverture d'un envoi de document.
+
+    Le corps JSON décrit le fichier : property_id, file_name, size (octets),
+    document_type et optionnellement sha256, content_type, title, description, expiry_date.
+
+    Returns:
+        tuple: Réponse JSON et code HTTP
+    """
+    data = request.get_json(silent=True)
+    if not data or not data.get('property_id'):
+        return jsonify({'message': 'Le bien immobilier (property_id) est requis'}), 400
+
+    try:
+        upload = create_upload_session(int(data['property_id']), data, g.current_user.id)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    if upload is None:
+        return jsonify({'message': 'Bien immobilier non trouvé'}), 404
+
+    response = upload_response(upload, 201)
+    response.headers['Location'] = f'{request.path.rstrip("/")}/{upload.id}'
+    return response
+
+@uploads_bp.route('/<upload_id>', methods=['GET', 'HEAD'])
+@token_required
+def get_upload_endpoint(upload_id):
+    """
+    Endpoint de consultation d'un envoi : position à partir de laquelle le reprendre.
+
+    Args:
+        upload_id (str): ID de l'envoi
+
+    Returns:
+        tuple: Réponse JSON et code HTTP
+    """
+    upload = get_upload_session(upload_id, g.current_user)
+    if upload is None:
+        return jsonify({'message': 'Envoi non trouvé ou expiré'}), 404
+    return upload_response(upload)
+
+@uploads_bp.route('/<upload_id>', methods=['PUT'])
+@token_required
+def upload_chunk_endpoint(upload_id):
+    """
+    Endpoint d'envoi d'un morceau.
+
+    Le morceau est envoyé brut dans le corps de la requête (au plus UPLOAD_CHUNK_MAX_SIZE
+    octets) et écrit sur disque au fil de sa réception, à la position donnée par le
+    paramètre offset (ou l'en-tête Upload-Offset), qui doit être celle retournée par
+    la requête précédente.
+
+    Args:
+        upload_id (str): ID de l'envoi
+
+    Returns:
+        tuple: Réponse JSON et code HTTP
+    """
+    upload = get_upload_session(upload_id, g.current_user)
+    if upload is None:
+        return jsonify({'message': 'Envoi non trouvé ou expiré'}), 404
+
+    offset = request.args.get('offset', request.headers.get('Upload-Offset'))
+    try:
+        offset = int(offset)
+    except (TypeError, ValueError):
+        return jsonify({'message': 'Position du morceau (offset) requise'}), 400
+
+    body = get_input_stream(request.environ,
+                            max_content_length=current_app.config.get('UPLOAD_CHUNK_MAX_SIZE'))
+    try:
+        write_upload_chunk(upload, body, offset, request.content_length)
+    except UploadConflict as e:
+        return conflict_response(e)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    except ClientDisconnected:
+        # Octets reçus enregistrés : le client reprend à la position courante
+        current_app.logger.info(f"Envoi {upload_id} interrompu à l'octet {upload.received_size}")
+        raise
+
+    return upload_response(upload)
+
+@uploads_bp.route('/<upload_id>/finalize', methods=['POST'])
+@token_required
+def finalize_upload_endpoint(upload_id):
+    """
+    Endpoint de finalisation d'un envoi complet : vérification de l'empreinte SHA-256
+    (transmise à l'ouverture ou dans le corps JSON) et création du document du bien.
+
+    Args:
+        upload_id (str): ID de l'envoi
+
+    Returns:
+        tuple: Réponse JSON et code HTTP
+    """
+    upload = get_upload_session(upload_id, g.current_user)
+    if upload is None:
+        return jsonify({'message': 'Envoi non trouvé ou expiré'}), 404
+
+    data = request.get_json(silent=True) or {}
+    try:
+        document = finalize_upload(upload, data.get('sha256'))
+    except UploadConflict as e:
+        return conflict_response(e)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    except Exception as e:
+        current_app.logger.error(f"Erreur lors de la finalisation de l'envoi {upload_id}: {str(e)}")
+        return jsonify({'message': 'Une erreur est survenue lors de l\'ajout du document'}), 500
+
+    return jsonify({
+        'message': 'Document ajouté avec succès',
+        'document': {
+            'id': document.id,
+            'url': document.get_url(external=True),
+            'document_type': document.document_type,
+            'title': document.title
+        }
+    }), 201
+
+@uploads_bp.route('/<upload_id>', methods=['DELETE'])
+@token_required
+def cancel_upload_endpoint(upload_id):
+    """
+    Endpoint d'annulation d'un envoi.
+
+    Args:
+        upload_id (str): ID de l'envoi
+
+    Returns:
+        tuple: Réponse JSON et code HTTP
+    """
+    upload = get_upload_session(upload_id, g.current_user)
+    if upload is None:
+        return jsonify({'message': 'Envoi non trouvé ou expiré'}), 404
+
+    cancel_upload(upload)
+    return jsonify({'message': 'Envoi annulé'}), 200
@@ -48,6 +48,7 @@ from app.services.property_service import (
     add_property_document,
     get_property_images,
     get_property_documents,
+    get_primary_images,
     get_all_amenities,
     create_amenity
 )
@@ -76,6 +77,7 @@ __all__ = [
     'add_property_document',
     'get_property_images',
     'get_property_documents',
+    'get_primary_images',
     'get_all_amenities',
     'create_amenity'
 ]
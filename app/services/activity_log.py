@@ -0,0 +1,223 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Écriture différée du journal d'activité.
+Ce fichier définit le tampon qui reçoit les entrées créées par Activity.log et les
+écrit par lots (INSERT multi-lignes) depuis un thread d'arrière-plan, afin que les
+requêtes ne paient pas une validation de transaction par entrée, ainsi que la lecture
+des activités récentes pour le tableau de bord.
+"""
+
+import os
+import queue
+import threading
+import time
+
+from flask import current_app
+from sqlalchemy.orm import joinedload
+
+from app import db
+from app.models.activity import Activity
+from app.utils import discard_process_singleton, process_singleton
+
+# Tentatives d'écriture d'un lot, espacées d'un délai doublé à chaque échec (secondes)
+ACTIVITY_LOG_WRITE_ATTEMPTS = 3
+ACTIVITY_LOG_RETRY_DELAY = 0.5
+
+# Clé de l'écrivain dans app.extensions
+_EXTENSION_KEY = 'activity_writer'
+
+class ActivityWriter:
+    """
+    Tampon d'entrées du journal d'activité, vidé par un thread d'arrière-plan.
+
+    Un lot est écrit dès que batch_size entrées sont en attente ou que la plus ancienne
+    attend depuis flush_interval secondes. Lorsque le tampon est plein, l'appelant est
+    bloqué au plus put_timeout secondes, puis écrit lui-même son entrée : aucune entrée
+    n'est perdue et le débit des requêtes est ramené à celui de la base.
+    """
+
+    def __init__(self, app, max_size=10000, batch_size=500, flush_interval=1.0, put_timeout=0.5):
+        self.app = app
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self.pid = os.getpid()
+        self._queue = queue.Queue(maxsize=max_size)
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='activity-log-writer', daemon=True)
+        self._thread.start()
+
+    def put(self, row):
+        """
+        Ajoute une entrée au tampon.
+
+        Args:
+            row (dict): Valeurs des colonnes de la table activities
+        """
+        if not self._stopping.is_set():
+            try:
+                self._queue.put(row, timeout=self.put_timeout)
+            except queue.Full:
+                # Tampon saturé : écriture immédiate par l'appelant
+                self._write([row])
+                return
+            if self._thread.is_alive():
+                return
+            row = None
+
+        # Écrivain arrêté : l'appelant écrit son entrée et celles restées dans le tampon
+        rows = [row] if row is not None else []
+        while True:
+            try:
+                rows.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if rows:
+            self._write(rows)
+
+    def pending(self):
+        """
+        Nombre d'entrées en attente d'écriture.
+
+        Returns:
+            int: Taille du tampon
+        """
+        return self._queue.qsize()
+
+    def stop(self, timeout=10):
+        """
+        Arrête le thread après avoir écrit toutes les entrées en attente.
+
+        Args:
+            timeout (float, optional): Durée maximale d'attente en secondes
+        """
+        self._stopping.set()
+        self._thread.join(timeout)
+
+    def _run(self):
+        """Boucle du thread : regroupe les entrées et écrit les lots."""
+        while not (self._stopping.is_set() and self._queue.empty()):
+            try:
+                batch = [self._queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                continue
+
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self._stopping.is_set():
+                    # Arrêt en cours : on vide le tampon sans attendre
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                    continue
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            self._write(batch)
+
+    def _write(self, rows):
+        """
+        Écrit des entrées en une seule instruction INSERT multi-lignes.
+
+        Un lot refusé par la base est réessayé ACTIVITY_LOG_WRITE_ATTEMPTS fois (base
+        momentanément indisponible), puis écrit entrée par entrée pour qu'une entrée
+        invalide n'entraîne pas la perte des autres. Les entrées encore refusées sont
+        abandonnées et leurs valeurs journalisées (niveau ERROR) : le journal d'activité
+        ne doit pas interrompre l'application.
+
+        Args:
+            rows (list): Valeurs des colonnes de chaque entrée
+        """
+        with self.app.app_context():
+            delay = ACTIVITY_LOG_RETRY_DELAY
+            for attempt in range(1, ACTIVITY_LOG_WRITE_ATTEMPTS + 1):
+                try:
+                    _insert(rows)
+                    return
+                except Exception:
+                    self.app.logger.warning("Écriture de %d entrées du journal d'activité impossible "
+                                            "(tentative %d)", len(rows), attempt, exc_info=True)
+                if attempt < ACTIVITY_LOG_WRITE_ATTEMPTS:
+                    time.sleep(delay)
+                    delay *= 2
+
+            lost = []
+            for row in rows:
+                try:
+                    _insert(row)
+                except Exception:
+                    lost.append(row)
+            if lost:
+                self.app.logger.error("%d entrées du journal d'activité perdues : %r", len(lost), lost)
+
+def get_activity_writer():
+    """
+    Écrivain du journal de l'application courante, démarré au premier usage dans
+    chaque processus (les workers issus d'un fork démarrent le leur).
+
+    Returns:
+        ActivityWriter: Écrivain de l'application
+    """
+    app = current_app._get_current_object()
+    # Vidage du tampon à l'arrêt du processus
+    return process_singleton(app, _EXTENSION_KEY, lambda: ActivityWriter(
+        app,
+        max_size=app.config.get('ACTIVITY_LOG_BUFFER_SIZE', 10000),
+        batch_size=app.config.get('ACTIVITY_LOG_BATCH_SIZE', 500),
+        flush_interval=app.config.get('ACTIVITY_LOG_FLUSH_INTERVAL', 1.0),
+        put_timeout=app.config.get('ACTIVITY_LOG_PUT_TIMEOUT', 0.5)
+    ), on_exit=lambda writer: writer.stop())
+
+def record_activity(row):
+    """
+    Enregistre une entrée du journal, en différé sauf si ACTIVITY_LOG_SYNC est activé.
+
+    Args:
+        row (dict): Valeurs des colonnes de la table activities
+    """
+    if current_app.config.get('ACTIVITY_LOG_SYNC'):
+        _insert(row)
+    else:
+        get_activity_writer().put(row)
+
+def flush_activity_log(timeout=10):
+    """
+    Écrit immédiatement les entrées en attente et arrête l'écrivain (un nouveau
+    sera démarré à la prochaine entrée).
+
+    Args:
+        timeout (float, optional): Durée maximale d'attente en secondes
+    """
+    writer = discard_process_singleton(current_app._get_current_object(), _EXTENSION_KEY)
+    if writer is not None:
+        writer.stop(timeout)
+
+def get_recent_activities(limit=10):
+    """
+    Récupère les dernières activités, avec leur utilisateur.
+
+    Les entrées encore dans le tampon (au plus ACTIVITY_LOG_FLUSH_INTERVAL secondes)
+    n'apparaissent pas.
+
+    Args:
+        limit (int, optional): Nombre d'activités
+
+    Returns:
+        list: Activités, de la plus récente à la plus ancienne
+    """
+    return Activity.query.options(joinedload(Activity.user)) \
+        .order_by(Activity.created_at.desc(), Activity.id.desc()) \
+        .limit(limit).all()
+
+# Fonctions utilitaires
+
+def _insert(rows):
+    """Insère une ou plusieurs entrées dans une transaction."""
+    with db.engine.begin() as connection:
+        connection.execute(Activity.__table__.insert().values(rows))
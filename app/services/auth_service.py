@@ -6,13 +6,28 @@ Services d'authentification et de gestion des utilisateurs.
 Ce fichier contient les fonctions métier liées à l'authentification et aux utilisateurs.
 """
 
+import pickle
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
 import jwt
 from flask import current_app
+from sqlalchemy.orm import make_transient_to_detached
+from sqlalchemy.orm.util import identity_key
 from werkzeug.security import generate_password_hash
 
 from app import db
 from app.models.__init__1 import User
+from app.services.metrics import record_cache_access
+from app.services.query_cache import get_local_cache
+
+# Colonnes des utilisateurs exclues du cache d'authentification (chargées à la demande)
+AUTH_CACHE_EXCLUDED_COLUMNS = ('password_hash',)
+
+# Tokens JWT déjà décodés : token -> (ID de l'utilisateur, date d'expiration)
+_decoded_tokens = OrderedDict()
+_decoded_tokens_lock = threading.Lock()
 
 def get_user_by_id(user_id):
     """
@@ -191,22 +206,138 @@ def verify_auth_token(token):
     """
     Vérifie un token JWT et retourne l'utilisateur correspondant.
     
+    Les tokens déjà vérifiés sont conservés décodés jusqu'à leur expiration, et
+    l'utilisateur est lu dans le cache d'authentification (voir load_active_user).
+    
     Args:
         token (str): Token JWT à vérifier
         
     Returns:
-        User: L'utilisateur correspondant au token ou None si invalide
+        User: L'utilisateur actif correspondant au token ou None si invalide
+    """
+    user_id = _decode_auth_token(token)
+    if user_id is None:
+        return None
+    return load_active_user(user_id)
+
+def load_active_user(user_id):
+    """
+    Charge un utilisateur actif, en évitant la requête SQL lorsque c'est possible.
+    
+    Les colonnes de l'utilisateur (hors mot de passe) sont conservées dans un cache
+    en mémoire du processus (AUTH_CACHE_SIZE utilisateurs au plus), actif quel que
+    soit CACHE_BACKEND. Une entrée vit au plus AUTH_CACHE_TTL secondes et est
+    invalidée à la validation de toute modification de l'utilisateur faite par ce
+    processus (update_user, delete_user, désactivation). Un utilisateur désactivé
+    autrement (autre worker, SQL direct) cesse donc d'être accepté au plus tard après
+    AUTH_CACHE_TTL secondes.
+    
+    Args:
+        user_id (int): ID de l'utilisateur
+        
+    Returns:
+        User: L'utilisateur, rattaché à la session courante, ou None s'il n'existe pas
+        ou n'est pas actif
+    """
+    session = db.session()
+    user = session.identity_map.get(identity_key(User, user_id))
+    if user is None:
+        values = _cached_user_snapshot(user_id)
+        if values is None:
+            return None
+        user = User()
+        for key, value in values.items():
+            setattr(user, key, value)
+        # Objet considéré comme chargé depuis la base ; le mot de passe sera lu à la demande
+        make_transient_to_detached(user)
+        user = session.merge(user, load=False)
+    
+    if not user.is_active:
+        return None
+    return user
+
+# Fonctions utilitaires
+
+def _decode_auth_token(token):
+    """
+    Décode un token JWT, en réutilisant le résultat d'une vérification précédente.
+    
+    Args:
+        token (str): Token JWT
+        
+    Returns:
+        int: ID de l'utilisateur, ou None si le token est invalide ou expiré
     """
+    now = time.time()
+    with _decoded_tokens_lock:
+        entry = _decoded_tokens.get(token)
+        if entry is not None:
+            if entry[1] > now:
+                _decoded_tokens.move_to_end(token)
+                return entry[0]
+            del _decoded_tokens[token]
+    
     try:
         payload = jwt.decode(
             token,
             current_app.config.get('SECRET_KEY'),
             algorithms=['HS256']
         )
-        return User.query.get(payload['sub'])
     except jwt.ExpiredSignatureError:
         # Token expiré
         return None
     except jwt.InvalidTokenError:
         # Token invalide
         return None
+    
+    max_size = current_app.config.get('AUTH_TOKEN_CACHE_SIZE', 10000)
+    if max_size > 0 and 'exp' in payload:
+        with _decoded_tokens_lock:
+            _decoded_tokens[token] = (payload['sub'], payload['exp'])
+            while len(_decoded_tokens) > max_size:
+                _decoded_tokens.popitem(last=False)
+    return payload['sub']
+
+def _cached_user_snapshot(user_id):
+    """
+    Colonnes d'un utilisateur, lues dans le cache d'authentification ou en base.
+    
+    Args:
+        user_id (int): ID de l'utilisateur
+        
+    Returns:
+        dict: Valeurs des colonnes, ou None si non trouvé
+    """
+    cache = get_local_cache('users.auth', current_app.config.get('AUTH_CACHE_SIZE', 10000))
+    key = str(user_id)
+    payload = cache.get(key)
+    if payload is not None:
+        record_cache_access('users.auth', 'hit')
+        return pickle.loads(payload)
+    
+    record_cache_access('users.auth', 'miss')
+    since = time.time()
+    values = _user_snapshot(user_id)
+    if values is not None:
+        cache.set(key, pickle.dumps(values, pickle.HIGHEST_PROTOCOL), {f'{User.__tablename__}:{user_id}'},
+                  current_app.config.get('AUTH_CACHE_TTL', 30), since)
+    return values
+
+def _user_snapshot(user_id):
+    """
+    Colonnes d'un utilisateur à mettre en cache.
+    
+    Args:
+        user_id (int): ID de l'utilisateur
+        
+    Returns:
+        dict: Valeurs des colonnes (hors AUTH_CACHE_EXCLUDED_COLUMNS), ou None si non trouvé
+    """
+    user = db.session.get(User, user_id)
+    if user is None:
+        return None
+    return {
+        column.key: getattr(user, column.key)
+        for column in User.__mapper__.column_attrs
+        if column.key not in AUTH_CACHE_EXCLUDED_COLUMNS
+    }
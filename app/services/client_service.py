@@ -9,6 +9,31 @@ Ce fichier contient les fonctions métier liées aux clients (acheteurs/locatair
 from datetime import datetime
 from app import db
 from app.models.__init__1 import Client, PropertyVisit
+from app.models.client import client_property_interests
+from app.services.pagination import resolve_sort, apply_sort, paginate_keyset
+from app.services.search_service import apply_fuzzy_search
+from app.services.query_cache import cached, entity_tags
+from app.services.property_service import parse_filters
+
+# Clés de tri autorisées pour la liste des clients
+CLIENT_SORT_COLUMNS = {
+    'created_at': Client.created_at,
+    'last_name': Client.last_name,
+    'id': Client.id
+}
+
+# Clés de tri autorisées pour la liste des visites
+VISIT_SORT_COLUMNS = {
+    'visit_date': PropertyVisit.visit_date,
+    'created_at': PropertyVisit.created_at,
+    'id': PropertyVisit.id
+}
+
+# Paramètres de filtrage des visites et conversion de leurs valeurs
+VISIT_FILTER_PARAMS = {
+    'status': str, 'client_id': int, 'property_id': int, 'accompanied_by': int,
+    'start_date': datetime.fromisoformat, 'end_date': datetime.fromisoformat
+}
 
 def get_client_by_id(client_id):
     """
@@ -22,41 +47,72 @@ def get_client_by_id(client_id):
     """
     return Client.query.get(client_id)
 
-def get_all_clients(page=1, per_page=10, search=None, client_type=None, assigned_agent_id=None):
+def get_client_validators(client_id):
+    """
+    Récupère, sans charger le client, les valeurs dont dépend sa fiche détaillée
+    (validateurs des requêtes conditionnelles).
+    
+    Args:
+        client_id (int): ID du client
+        
+    Returns:
+        tuple: (Date de mise à jour,) ou None si le client n'existe pas
+    """
+    return db.session.query(Client.updated_at).filter(Client.id == client_id).first()
+
+def get_all_clients(page=1, per_page=10, search=None, client_type=None, assigned_agent_id=None,
+                    cursor=None, sort=None):
     """
     Récupère tous les clients avec pagination et filtrage optionnel.
     
+    Si un curseur est fourni (chaîne vide pour la première page), la pagination
+    se fait par curseur : ni OFFSET ni COUNT(*) ne sont exécutés.
+    
     Args:
         page (int, optional): Numéro de page
         per_page (int, optional): Nombre d'éléments par page
         search (str, optional): Terme de recherche pour filtrer les clients
         client_type (str, optional): Type de client ('buyer', 'tenant', 'both')
         assigned_agent_id (int, optional): ID de l'agent assigné
+        cursor (str, optional): Curseur de pagination (active le mode curseur)
+        sort (str, optional): Clé de tri ('created_at', 'last_name', 'id'), préfixée par '-' pour un tri décroissant.
+            Avec une recherche, les résultats sont classés par similarité sauf si un tri est demandé
+            ('relevance' explicite accepté, hors mode curseur)
         
     Returns:
-        tuple: (Liste des clients, nombre total de pages, nombre total d'éléments)
+        tuple: (Liste des clients, nombre total de pages, nombre total d'éléments),
+            ou (Liste des clients, curseur suivant, curseur précédent) en mode curseur
+        
+    Raises:
+        ValueError: Si le tri ou le curseur est invalide
     """
     query = Client.query
+    rank = None
     
     # Application des filtres
-    if search:
-        search_term = f"%{search}%"
-        query = query.filter(
-            db.or_(
-                Client.first_name.ilike(search_term),
-                Client.last_name.ilike(search_term),
-                Client.email.ilike(search_term),
-                Client.phone.ilike(search_term),
-                Client.city.ilike(search_term)
-            )
-        )
-    
     if client_type:
         query = query.filter(Client.client_type == client_type)
     
     if assigned_agent_id:
         query = query.filter(Client.assigned_agent_id == assigned_agent_id)
     
+    # Recherche approximative, tolérante aux fautes de frappe (après les filtres qui limitent ses résultats)
+    if search:
+        query, rank = apply_fuzzy_search(query, Client, search)
+    
+    relevance = sort is not None and sort.lstrip('-') == 'relevance'
+    
+    if cursor is not None:
+        if relevance:
+            raise ValueError("Le tri par pertinence n'est pas disponible en pagination par curseur")
+        sort, spec = resolve_sort(sort, CLIENT_SORT_COLUMNS, '-created_at', Client.id)
+        return paginate_keyset(query, sort, spec, cursor, per_page)
+    
+    if rank is not None and (not sort or relevance):
+        query = query.order_by(rank.desc(), Client.id.desc())
+    elif sort:
+        query = apply_sort(query, resolve_sort(sort, CLIENT_SORT_COLUMNS, '-created_at', Client.id)[1])
+    
     # Pagination
     pagination = query.paginate(page=page, per_page=per_page, error_out=False)
     
@@ -245,6 +301,8 @@ def remove_property_interest(client_id, property_id):
     
     return True
 
+@cached('clients.interested_properties', tags=lambda result, arguments: [
+    f"clients:{arguments['client_id']}", 'amenities'] + entity_tags(result[0]))
 def get_client_interested_properties(client_id, page=1, per_page=10):
     """
     Récupère les biens immobiliers qui intéressent un client.
@@ -266,6 +324,32 @@ def get_client_interested_properties(client_id, page=1, per_page=10):
     
     return pagination.items, pagination.pages, pagination.total
 
+def get_client_interest_details(client_id, property_ids):
+    """
+    Récupère en une requête le niveau d'intérêt et les notes d'un client pour plusieurs biens.
+
+    Args:
+        client_id (int): ID du client
+        property_ids (list): IDs des biens immobiliers
+
+    Returns:
+        dict: Couples (niveau d'intérêt, notes) par ID de bien
+    """
+    if not property_ids:
+        return {}
+
+    rows = db.session.execute(
+        db.select(
+            client_property_interests.c.property_id,
+            client_property_interests.c.interest_level,
+            client_property_interests.c.notes
+        ).where(
+            client_property_interests.c.client_id == client_id,
+            client_property_interests.c.property_id.in_(property_ids)
+        )
+    )
+    return {row.property_id: (row.interest_level, row.notes) for row in rows}
+
 def schedule_property_visit(client_id, property_id, visit_date, duration=60, accompanied_by=None, notes=None):
     """
     Planifie une visite de bien immobilier pour un client.
@@ -337,24 +421,75 @@ def update_property_visit(visit_id, data):
     
     return visit
 
-def get_client_visits(client_id, page=1, per_page=10, status=None):
+def parse_visit_filters(args):
+    """
+    Extrait les filtres des visites de paramètres textuels (paramètres de requête
+    HTTP, options de la ligne de commande).
+    
+    Args:
+        args (dict): Paramètres (valeurs textuelles, dates au format ISO 8601)
+        
+    Returns:
+        dict: Filtres à appliquer (les valeurs invalides sont ignorées)
+    """
+    return parse_filters(args, VISIT_FILTER_PARAMS)
+
+def apply_visit_filters(query, filters):
+    """
+    Applique les filtres à une requête sur les visites.
+    
+    Args:
+        query (Query): Requête SQLAlchemy sur PropertyVisit
+        filters (dict): Filtres à appliquer (status, client_id, property_id,
+            accompanied_by, start_date et end_date sur la date de visite)
+        
+    Returns:
+        Query: Requête filtrée
+    """
+    if filters:
+        for key in ('status', 'client_id', 'property_id', 'accompanied_by'):
+            if key in filters:
+                query = query.filter(getattr(PropertyVisit, key) == filters[key])
+        if 'start_date' in filters:
+            query = query.filter(PropertyVisit.visit_date >= filters['start_date'])
+        if 'end_date' in filters:
+            query = query.filter(PropertyVisit.visit_date <= filters['end_date'])
+    return query
+
+def get_client_visits(client_id, page=1, per_page=10, status=None, cursor=None, sort=None):
     """
     Récupère les visites d'un client.
     
+    Si un curseur est fourni (chaîne vide pour la première page), la pagination
+    se fait par curseur : ni OFFSET ni COUNT(*) ne sont exécutés.
+    
     Args:
         client_id (int): ID du client
         page (int, optional): Numéro de page
         per_page (int, optional): Nombre d'éléments par page
         status (str, optional): Statut des visites à récupérer
+        cursor (str, optional): Curseur de pagination (active le mode curseur)
+        sort (str, optional): Clé de tri ('visit_date', 'created_at', 'id'), préfixée par '-' pour un tri décroissant
         
     Returns:
-        tuple: (Liste des visites, nombre total de pages, nombre total d'éléments)
+        tuple: (Liste des visites, nombre total de pages, nombre total d'éléments),
+            ou (Liste des visites, curseur suivant, curseur précédent) en mode curseur
+        
+    Raises:
+        ValueError: Si le tri ou le curseur est invalide
     """
     query = PropertyVisit.query.filter_by(client_id=client_id)
     
     if status:
         query = query.filter_by(status=status)
     
+    if cursor is not None:
+        sort, spec = resolve_sort(sort, VISIT_SORT_COLUMNS, '-visit_date', PropertyVisit.id)
+        return paginate_keyset(query, sort, spec, cursor, per_page)
+    
+    if sort:
+        query = apply_sort(query, resolve_sort(sort, VISIT_SORT_COLUMNS, '-visit_date', PropertyVisit.id)[1])
+    
     # Pagination
     pagination = query.paginate(page=page, per_page=per_page, error_out=False)
     
@@ -0,0 +1,329 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Services du tableau de bord.
+Ce fichier contient le calcul des statistiques du tableau de bord à partir de la
+table d'agrégats dashboard_stats, ainsi que les écouteurs SQLAlchemy qui la
+maintiennent à jour à chaque insertion, modification ou suppression.
+"""
+
+import random
+from collections import defaultdict
+from datetime import datetime
+
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session, object_session
+
+from app import db
+from app.models.__init__1 import Property, Transaction, Owner, Client, DashboardStat
+
+# Libellés des mois pour les graphiques
+MONTH_LABELS = ['Jan', 'Fév', 'Mar', 'Avr', 'Mai', 'Juin', 'Juil', 'Août', 'Sep', 'Oct', 'Nov', 'Déc']
+
+# Valeurs affichées individuellement sur le tableau de bord
+PROPERTY_STATUSES = ['for_sale', 'for_rent', 'sold', 'rented']
+PROPERTY_TYPES = ['apartment', 'house', 'land', 'commercial', 'other']
+
+# Nombre de lignes par compteur : chaque flush écrit dans l'une d'elles, tirée au hasard
+DASHBOARD_STAT_SHARDS = 16
+
+# Clé de session où sont accumulés les écarts de compteurs avant leur écriture
+_SESSION_DELTAS_KEY = 'dashboard_stat_deltas'
+
+def get_dashboard_stats(year=None):
+    """
+    Récupère les statistiques du tableau de bord depuis la table d'agrégats.
+
+    Une seule requête est exécutée (somme des lignes de chaque compteur). La table
+    est remplie par la migration qui la crée, `flask rebuild-stats` ou `flask seed` :
+    elle n'est jamais reconstruite ici.
+
+    Args:
+        year (int, optional): Année des séries mensuelles (année en cours par défaut)
+
+    Returns:
+        dict: Statistiques au format attendu par le template dashboard.html
+    """
+    year = year or datetime.utcnow().year
+
+    key = (DashboardStat.entity, DashboardStat.dimension, DashboardStat.bucket)
+    counters = {
+        (entity, dimension, bucket): value
+        for entity, dimension, bucket, value in db.session.query(*key, db.func.sum(DashboardStat.value)).group_by(*key)
+    }
+
+    stats = {
+        'properties_count': counters.get(('property', 'total', ''), 0),
+        'owners_count': counters.get(('owner', 'total', ''), 0),
+        'clients_count': counters.get(('client', 'total', ''), 0),
+        'transactions_count': counters.get(('transaction', 'total', ''), 0),
+
+        # Statistiques des transactions
+        'sales_count': counters.get(('transaction', 'transaction_type', 'sale'), 0),
+        'rentals_count': counters.get(('transaction', 'transaction_type', 'rental'), 0),
+
+        # Données pour les graphiques
+        'months': MONTH_LABELS,
+        'sales_by_month': [counters.get(('transaction', 'sale_month', f'{year}-{month:02d}'), 0) for month in range(1, 13)],
+        'rentals_by_month': [counters.get(('transaction', 'rental_month', f'{year}-{month:02d}'), 0) for month in range(1, 13)]
+    }
+
+    # Statistiques des biens par statut et par type
+    for status in PROPERTY_STATUSES:
+        stats[f'properties_{status}'] = counters.get(('property', 'status', status), 0)
+    for property_type in PROPERTY_TYPES:
+        stats[f'properties_{property_type}'] = counters.get(('property', 'property_type', property_type), 0)
+
+    return stats
+
+def rebuild_dashboard_stats():
+    """
+    Reconstruit entièrement la table d'agrégats (une requête GROUP BY par table).
+
+    À utiliser pour réparer la table après des modifications faites en dehors de
+    l'ORM (requêtes SQL directes, mises à jour en masse, imports). Chaque compteur
+    est réécrit sur une seule ligne (shard 0).
+
+    Returns:
+        dict: Compteurs reconstruits {(entity, dimension, bucket): valeur}
+    """
+    # Sur PostgreSQL, le verrou bloque les écritures concurrentes des écouteurs
+    # jusqu'à la fin de la reconstruction, afin qu'aucun écart ne soit perdu
+    if db.session.get_bind().dialect.name == 'postgresql':
+        db.session.execute(db.text('LOCK TABLE dashboard_stats IN EXCLUSIVE MODE'))
+
+    counters = defaultdict(int)
+
+    # Biens immobiliers : total, par statut et par type
+    property_rows = db.session.query(
+        Property.status, Property.property_type, db.func.count(Property.id)
+    ).group_by(Property.status, Property.property_type).all()
+    counters[('property', 'total', '')] += 0
+    for status, property_type, count in property_rows:
+        for key in _property_keys(status, property_type):
+            counters[key] += count
+
+    # Transactions : total, par type et par mois de transaction
+    year = db.func.extract('year', Transaction.transaction_date)
+    month = db.func.extract('month', Transaction.transaction_date)
+    transaction_rows = db.session.query(
+        Transaction.transaction_type, year, month, db.func.count(Transaction.id)
+    ).group_by(Transaction.transaction_type, year, month).all()
+    counters[('transaction', 'total', '')] += 0
+    for transaction_type, row_year, row_month, count in transaction_rows:
+        bucket = f'{int(row_year):04d}-{int(row_month):02d}' if row_year else None
+        for key in _transaction_keys(transaction_type, bucket):
+            counters[key] += count
+
+    # Propriétaires et clients : total uniquement
+    counters[('owner', 'total', '')] = db.session.query(db.func.count(Owner.id)).scalar()
+    counters[('client', 'total', '')] = db.session.query(db.func.count(Client.id)).scalar()
+
+    DashboardStat.query.delete(synchronize_session=False)
+    now = datetime.utcnow()
+    db.session.execute(DashboardStat.__table__.insert(), [
+        {'entity': entity, 'dimension': dimension, 'bucket': bucket, 'shard': 0, 'value': value, 'updated_at': now}
+        for (entity, dimension, bucket), value in counters.items()
+    ])
+    db.session.commit()
+
+    return dict(counters)
+
+def apply_insert_counts(connection, model, rows):
+    """
+    Compte des objets insérés sans passer par l'ORM (import en masse).
+
+    Args:
+        connection (Connection): Connexion de la transaction d'insertion
+        model: Property, Owner ou Client
+        rows (list): Valeurs des colonnes des lignes insérées
+    """
+    deltas = defaultdict(int)
+    for row in rows:
+        if model is Property:
+            keys = _property_keys(row.get('status'), row.get('property_type'))
+        else:
+            keys = [('owner' if model is Owner else 'client', 'total', '')]
+        for key in keys:
+            deltas[key] += 1
+    if deltas:
+        _apply_deltas(connection, deltas)
+
+# Écouteurs de maintenance incrémentale
+
+def _property_keys(status, property_type):
+    """
+    Compteurs concernés par un bien immobilier.
+
+    Args:
+        status (str): Statut du bien
+        property_type (str): Type de bien
+
+    Returns:
+        list: Clés (entity, dimension, bucket)
+    """
+    return [
+        ('property', 'total', ''),
+        ('property', 'status', status or ''),
+        ('property', 'property_type', property_type or '')
+    ]
+
+def _transaction_keys(transaction_type, month_bucket):
+    """
+    Compteurs concernés par une transaction.
+
+    Args:
+        transaction_type (str): Type de transaction ('sale', 'rental')
+        month_bucket (str): Mois de la transaction au format 'YYYY-MM'
+
+    Returns:
+        list: Clés (entity, dimension, bucket)
+    """
+    keys = [
+        ('transaction', 'total', ''),
+        ('transaction', 'transaction_type', transaction_type or '')
+    ]
+    if month_bucket and transaction_type:
+        keys.append(('transaction', f'{transaction_type}_month', month_bucket))
+    return keys
+
+def _attribute_value(target, name, previous):
+    """
+    Valeur d'un attribut avant ou après la modification en cours.
+
+    Args:
+        target: Instance du modèle
+        name (str): Nom de l'attribut
+        previous (bool): True pour la valeur avant modification
+
+    Returns:
+        Valeur de l'attribut
+    """
+    if previous:
+        history = db.inspect(target).attrs[name].history
+        if history.deleted:
+            return history.deleted[0]
+    return getattr(target, name)
+
+def _stat_keys(target, previous=False):
+    """
+    Compteurs concernés par un objet, avant ou après modification.
+
+    Args:
+        target: Instance de Property, Transaction, Owner ou Client
+        previous (bool): True pour calculer les clés à partir des anciennes valeurs
+
+    Returns:
+        list: Clés (entity, dimension, bucket)
+    """
+    if isinstance(target, Property):
+        return _property_keys(
+            _attribute_value(target, 'status', previous),
+            _attribute_value(target, 'property_type', previous)
+        )
+    if isinstance(target, Transaction):
+        transaction_date = _attribute_value(target, 'transaction_date', previous)
+        return _transaction_keys(
+            _attribute_value(target, 'transaction_type', previous),
+            transaction_date.strftime('%Y-%m') if transaction_date else None
+        )
+    if isinstance(target, Owner):
+        return [('owner', 'total', '')]
+    return [('client', 'total', '')]
+
+def _record_deltas(target, keys, delta):
+    """
+    Accumule des écarts de compteurs dans la session de l'objet.
+
+    Args:
+        target: Instance du modèle modifiée
+        keys (list): Clés de compteurs à modifier
+        delta (int): Écart à appliquer (+1 ou -1)
+    """
+    session = object_session(target)
+    if session is None:
+        return
+    deltas = session.info.setdefault(_SESSION_DELTAS_KEY, defaultdict(int))
+    for key in keys:
+        deltas[key] += delta
+
+def _after_insert(mapper, connection, target):
+    """Compte un nouvel objet."""
+    _record_deltas(target, _stat_keys(target), 1)
+
+def _after_update(mapper, connection, target):
+    """Déplace un objet modifié vers ses nouveaux compteurs."""
+    _record_deltas(target, _stat_keys(target, previous=True), -1)
+    _record_deltas(target, _stat_keys(target), 1)
+
+def _after_delete(mapper, connection, target):
+    """Décompte un objet supprimé."""
+    _record_deltas(target, _stat_keys(target, previous=True), -1)
+
+def _after_flush(session, flush_context):
+    """Écrit en une fois les écarts accumulés pendant le flush."""
+    deltas = session.info.pop(_SESSION_DELTAS_KEY, None)
+    if not deltas:
+        return
+    _apply_deltas(session.connection(), {key: delta for key, delta in deltas.items() if delta})
+
+def _discard_deltas(session, previous_transaction):
+    """Abandonne les écarts d'un flush annulé."""
+    session.info.pop(_SESSION_DELTAS_KEY, None)
+
+def _apply_deltas(connection, deltas):
+    """
+    Applique des écarts de compteurs par upsert (INSERT ... ON CONFLICT DO UPDATE).
+
+    Les écarts sont écrits sur une ligne de chaque compteur tirée au hasard : deux
+    transactions concurrentes ne se bloquent que si elles tirent la même. Les clés
+    sont parcourues dans un ordre fixe pour éviter les interblocages.
+
+    Args:
+        connection (Connection): Connexion de la transaction en cours
+        deltas (dict): Écarts {(entity, dimension, bucket): delta}
+    """
+    table = DashboardStat.__table__
+    now = datetime.utcnow()
+    dialect = connection.dialect.name
+    shard = random.randrange(DASHBOARD_STAT_SHARDS)
+
+    for (entity, dimension, bucket), delta in sorted(deltas.items()):
+        values = {'entity': entity, 'dimension': dimension, 'bucket': bucket, 'shard': shard, 'value': delta,
+                  'updated_at': now}
+        if dialect in ('postgresql', 'sqlite'):
+            insert = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+            stmt = insert(table).values(**values)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['entity', 'dimension', 'bucket', 'shard'],
+                set_={'value': table.c.value + stmt.excluded.value, 'updated_at': now}
+            )
+            connection.execute(stmt)
+        else:
+            result = connection.execute(
+                table.update()
+                .where(table.c.entity == entity, table.c.dimension == dimension, table.c.bucket == bucket,
+                       table.c.shard == shard)
+                .values(value=table.c.value + delta, updated_at=now)
+            )
+            if result.rowcount == 0:
+                connection.execute(table.insert().values(**values))
+
+def _track_previous_value(target, value, oldvalue, initiator):
+    """Écouteur vide : active_history force le chargement de l'ancienne valeur."""
+    return value
+
+# Sans active_history, l'ancienne valeur d'un attribut expiré (après un commit)
+# n'est pas chargée lors de sa modification et l'ancien compteur serait inconnu
+for _attribute in (Property.status, Property.property_type, Transaction.transaction_type, Transaction.transaction_date):
+    event.listen(_attribute, 'set', _track_previous_value, active_history=True, retval=True)
+
+for _model in (Property, Transaction, Owner, Client):
+    event.listen(_model, 'after_insert', _after_insert)
+    event.listen(_model, 'after_update', _after_update)
+    event.listen(_model, 'after_delete', _after_delete)
+
+event.listen(Session, 'after_flush', _after_flush)
+event.listen(Session, 'after_soft_rollback', _discard_deltas)
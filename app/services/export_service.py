@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Export en masse des biens immobiliers, des transactions et des visites.
+Ce fichier produit un export CSV ou NDJSON sous forme de flux d'octets, compressé
+en gzip à la volée si demandé. Les lignes sont lues par lots depuis un curseur côté
+serveur (yield_per) sous forme de tuples de colonnes, sans créer d'objets ORM :
+la mémoire utilisée ne dépend pas de la taille de l'export.
+"""
+
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime
+from decimal import Decimal
+
+from app import db
+from app.models.__init__1 import Property, Transaction, PropertyVisit
+from app.services.property_service import apply_property_filters, parse_property_filters
+from app.services.transaction_service import apply_transaction_filters, parse_transaction_filters
+from app.services.client_service import apply_visit_filters, parse_visit_filters
+
+# Formats d'export
+EXPORT_FORMATS = ('csv', 'ndjson')
+
+# Types MIME des formats d'export
+EXPORT_MIMETYPES = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+
+# Nombre de lignes lues par aller-retour avec la base
+EXPORT_BATCH_SIZE = 5000
+
+# Taille (en octets) des morceaux de sortie
+EXPORT_BUFFER_SIZE = 64 * 1024
+
+# Niveau de compression gzip (rapidité plutôt que taux)
+EXPORT_GZIP_LEVEL = 6
+
+# Entités exportables : modèle, extraction et application des filtres, colonnes internes non exportées
+EXPORT_ENTITIES = {
+    'properties': {'model': Property, 'parse': parse_property_filters, 'filter': apply_property_filters,
+                   'excluded': ('geo_cell',)},
+    'transactions': {'model': Transaction, 'parse': parse_transaction_filters, 'filter': apply_transaction_filters,
+                     'excluded': ()},
+    'visits': {'model': PropertyVisit, 'parse': parse_visit_filters, 'filter': apply_visit_filters,
+               'excluded': ()},
+}
+
+def export_records(entity, filters=None, file_format='csv', compress=False):
+    """
+    Prépare l'export d'une entité.
+
+    La requête est construite (et les filtres vérifiés) immédiatement ; les lignes sont
+    lues au fil de l'itération du flux retourné, dans l'ordre des IDs.
+
+    Args:
+        entity (str): 'properties', 'transactions' ou 'visits'
+        filters (dict, optional): Filtres (ceux de get_all_properties, de
+            get_all_transactions ou de apply_visit_filters)
+        file_format (str, optional): 'csv' ou 'ndjson'
+        compress (bool, optional): Compresse le flux en gzip
+
+    Returns:
+        iterator: Morceaux d'octets de l'export
+
+    Raises:
+        ValueError: Si l'entité, le format ou un filtre est invalide
+    """
+    if entity not in EXPORT_ENTITIES:
+        raise ValueError(f"Entité inconnue: '{entity}'. Valeurs possibles: {', '.join(EXPORT_ENTITIES)}")
+    if file_format not in EXPORT_FORMATS:
+        raise ValueError(f"Format inconnu: '{file_format}'. Valeurs possibles: {', '.join(EXPORT_FORMATS)}")
+
+    spec = EXPORT_ENTITIES[entity]
+    model = spec['model']
+    columns = [column for column in model.__table__.columns if column.key not in spec['excluded']]
+
+    query = db.session.query(*columns).select_from(model)
+    query = spec['filter'](query, filters or {})
+    if isinstance(query, tuple):
+        # apply_property_filters retourne aussi les expressions de pertinence et de distance
+        query = query[0]
+    # Curseur côté serveur (PostgreSQL) : les lignes arrivent par lots de EXPORT_BATCH_SIZE
+    query = query.order_by(model.id).yield_per(EXPORT_BATCH_SIZE)
+
+    names = [column.key for column in columns]
+    if file_format == 'csv':
+        chunks = _csv_chunks(query, names)
+    else:
+        chunks = _ndjson_chunks(query, names)
+    return _gzip_chunks(chunks) if compress else chunks
+
+def parse_export_filters(entity, args):
+    """
+    Extrait les filtres d'une entité de paramètres textuels.
+
+    Args:
+        entity (str): Entité exportée
+        args (dict): Paramètres (valeurs textuelles)
+
+    Returns:
+        dict: Filtres à appliquer (les valeurs invalides sont ignorées)
+    """
+    return EXPORT_ENTITIES[entity]['parse'](args)
+
+def export_filename(entity, file_format, compress=False):
+    """
+    Nom de fichier proposé pour un export.
+
+    Args:
+        entity (str): Entité exportée
+        file_format (str): 'csv' ou 'ndjson'
+        compress (bool, optional): Export compressé en gzip
+
+    Returns:
+        str: Nom de fichier (ex: properties-20240610.csv.gz)
+    """
+    return f"{entity}-{datetime.utcnow().strftime('%Y%m%d')}.{file_format}{'.gz' if compress else ''}"
+
+# Fonctions utilitaires
+
+def _csv_chunks(rows, names):
+    """Sérialise des lignes en CSV (ligne d'en-tête comprise), par morceaux."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerow(names)
+    for row in rows:
+        writer.writerow([_csv_value(value) for value in row])
+        if buffer.tell() >= EXPORT_BUFFER_SIZE:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+
+def _ndjson_chunks(rows, names):
+    """Sérialise des lignes en NDJSON (un objet par ligne), par morceaux."""
+    parts = []
+    size = 0
+    for row in rows:
+        line = json.dumps(dict(zip(names, row)), default=_json_value, ensure_ascii=False) + '\n'
+        parts.append(line)
+        size += len(line)
+        if size >= EXPORT_BUFFER_SIZE:
+            yield ''.join(parts).encode('utf-8')
+            parts = []
+            size = 0
+    yield ''.join(parts).encode('utf-8')
+
+def _gzip_chunks(chunks):
+    """Compresse un flux d'octets au format gzip, morceau par morceau."""
+    compressor = zlib.compressobj(EXPORT_GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+def _csv_value(value):
+    """Valeur d'une cellule CSV (dates au format ISO 8601, booléens en minuscules)."""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return value
+
+def _json_value(value):
+    """Conversion des types non sérialisables en JSON."""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f'Type non sérialisable: {type(value).__name__}')
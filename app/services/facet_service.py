@@ -0,0 +1,228 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Services de facettes pour la recherche de biens immobiliers.
+Ce fichier calcule, pour un ensemble de filtres, le nombre de biens par type, statut,
+ville, nombre de chambres, tranche de prix et équipement. Chaque facette est comptée
+avec tous les filtres sauf le sien, afin d'indiquer ce que donnerait chaque choix.
+Les résultats sont mis en cache (app.services.query_cache) par ensemble de filtres normalisé.
+"""
+
+import math
+
+from app import db
+from app.models.__init__1 import Property, Amenity
+from app.models.property import property_amenities
+from app.services.property_service import apply_property_filters
+from app.services.query_cache import cached_query
+
+# Durée de conservation (en secondes) des facettes calculées
+FACET_CACHE_TTL = 30
+
+# Nombre maximal de villes retournées
+FACET_MAX_CITIES = 20
+
+# Nombre de tranches de l'histogramme des prix
+PRICE_HISTOGRAM_BINS = 10
+
+# Nombre de chambres à partir duquel les biens sont regroupés ('5+')
+BEDROOMS_MAX_BUCKET = 5
+
+# Filtres ignorés pour le calcul de chaque facette
+FACET_OWN_FILTERS = {
+    'property_type': ('property_type',),
+    'status': ('status',),
+    'city': ('city',),
+    'bedrooms': ('bedrooms',),
+    'price': ('min_price', 'max_price'),
+    'amenity': ('amenity_id',),
+}
+
+# Filtres textuels (insensibles à la casse)
+_TEXT_FILTERS = ('city', 'q')
+
+def get_property_facets(filters=None):
+    """
+    Calcule les facettes des biens immobiliers correspondant à des filtres.
+
+    Deux requêtes sont exécutées : les bornes de prix, puis une requête UNION ALL
+    regroupant toutes les facettes. Le résultat est mis en cache au plus FACET_CACHE_TTL
+    secondes, et invalidé dès qu'un bien ou un équipement est modifié.
+
+    Args:
+        filters (dict, optional): Filtres de recherche (voir get_all_properties)
+
+    Returns:
+        dict: Nombre total de biens et comptes par facette
+
+    Raises:
+        ValueError: Si un filtre géographique est invalide
+    """
+    filters = normalize_filters(filters)
+    return cached_query('properties.facets', filters, lambda: _compute_facets(filters),
+                        ['properties', 'amenities'], FACET_CACHE_TTL)
+
+def normalize_filters(filters):
+    """
+    Normalise un ensemble de filtres : valeurs vides retirées, espaces superflus
+    supprimés, filtres textuels en minuscules et nombres convertis.
+
+    Args:
+        filters (dict): Filtres de recherche
+
+    Returns:
+        dict: Filtres normalisés
+    """
+    normalized = {}
+    for key, value in (filters or {}).items():
+        if isinstance(value, str):
+            value = ' '.join(value.split())
+            if key in _TEXT_FILTERS:
+                value = value.lower()
+        elif isinstance(value, float) and value.is_integer():
+            value = int(value)
+        if value is None or value == '':
+            continue
+        normalized[key] = value
+    return normalized
+
+# Fonctions utilitaires
+
+def _compute_facets(filters):
+    """
+    Calcule les facettes sans passer par le cache.
+
+    Args:
+        filters (dict): Filtres normalisés
+
+    Returns:
+        dict: Nombre total de biens et comptes par facette
+    """
+    price = Property.rental_price if filters.get('transaction_type') == 'rent' else Property.asking_price
+    edges = _price_edges(_price_bounds(price, filters))
+
+    bedrooms = db.case(
+        (Property.num_bedrooms >= BEDROOMS_MAX_BUCKET, f'{BEDROOMS_MAX_BUCKET}+'),
+        else_=db.cast(Property.num_bedrooms, db.String)
+    )
+
+    branches = [
+        _facet_query('total', filters),
+        _facet_query('property_type', filters, Property.property_type),
+        _facet_query('status', filters, Property.status),
+        _facet_query('city', filters, Property.city),
+        _facet_query('bedrooms', filters, bedrooms).filter(Property.num_bedrooms.isnot(None)),
+    ]
+    if edges:
+        # Le prix maximal appartient à la dernière tranche
+        bins = db.case(
+            *[(price < edge, str(index)) for index, edge in enumerate(edges[1:-1])],
+            else_=str(len(edges) - 2)
+        ) if len(edges) > 2 else db.literal('0')
+        branches.append(_facet_query('price', filters, bins).filter(price.isnot(None)))
+    branches.append(
+        _facet_query('amenity', filters, property_amenities.c.amenity_id, Amenity.name)
+        .join(property_amenities, property_amenities.c.property_id == Property.id)
+        .join(Amenity, Amenity.id == property_amenities.c.amenity_id)
+    )
+
+    rows = branches[0].union_all(*branches[1:]).all()
+
+    facets = {
+        'total': 0,
+        'property_type': [],
+        'status': [],
+        'city': [],
+        'bedrooms': [],
+        'price': {
+            'field': price.key,
+            'bins': [{'min': low, 'max': high, 'count': 0} for low, high in zip(edges, edges[1:])]
+        },
+        'amenity': []
+    }
+    for facet, value, label, count in rows:
+        if facet == 'total':
+            facets['total'] = count
+        elif facet == 'price':
+            facets['price']['bins'][int(value)]['count'] = count
+        elif facet == 'amenity':
+            facets['amenity'].append({'id': int(value), 'name': label, 'count': count})
+        elif value is not None:
+            facets[facet].append({'value': value, 'count': count})
+
+    for facet in ('property_type', 'status', 'city', 'amenity'):
+        facets[facet].sort(key=lambda item: (-item['count'], str(item.get('value', item.get('name')))))
+    del facets['city'][FACET_MAX_CITIES:]
+    facets['bedrooms'].sort(key=lambda item: int(item['value'].rstrip('+')))
+
+    return facets
+
+def _facet_query(facet, filters, value=None, label=None):
+    """
+    Requête de comptage d'une facette, filtrée par tous les filtres sauf les siens.
+
+    Args:
+        facet (str): Nom de la facette
+        filters (dict): Filtres normalisés
+        value (ColumnElement, optional): Expression regroupée (aucun regroupement si None)
+        label (ColumnElement, optional): Libellé associé à la valeur
+
+    Returns:
+        Query: Requête (facette, valeur, libellé, nombre de biens)
+    """
+    own_filters = FACET_OWN_FILTERS.get(facet, ())
+    facet_filters = {key: val for key, val in filters.items() if key not in own_filters}
+
+    value_column = db.cast(value, db.String) if value is not None else db.cast(db.null(), db.String)
+    label_column = label if label is not None else db.cast(db.null(), db.String)
+    query = db.session.query(
+        db.literal(facet, db.String).label('facet'),
+        value_column.label('value'),
+        label_column.label('label'),
+        db.func.count(Property.id).label('count')
+    ).select_from(Property)
+    query = apply_property_filters(query, facet_filters)[0]
+
+    group_by = [column for column in (value, label) if column is not None]
+    return query.group_by(*group_by) if group_by else query
+
+def _price_bounds(price, filters):
+    """
+    Prix minimal et maximal des biens, avec tous les filtres sauf ceux du prix.
+
+    Args:
+        price (Column): Colonne de prix (vente ou location)
+        filters (dict): Filtres normalisés
+
+    Returns:
+        tuple: (Prix minimal, prix maximal), (None, None) si aucun bien n'a de prix
+    """
+    price_filters = {key: val for key, val in filters.items() if key not in FACET_OWN_FILTERS['price']}
+    query = db.session.query(db.func.min(price), db.func.max(price)).select_from(Property)
+    return apply_property_filters(query, price_filters)[0].one()
+
+def _price_edges(bounds):
+    """
+    Bornes des tranches de l'histogramme des prix, arrondies à un pas lisible
+    (1, 2, 2,5 ou 5 fois une puissance de dix).
+
+    Args:
+        bounds (tuple): (Prix minimal, prix maximal)
+
+    Returns:
+        list: Bornes croissantes (une de plus que le nombre de tranches), vide sans prix
+    """
+    low, high = bounds
+    if low is None or high is None:
+        return []
+    low, high = float(low), float(high)
+    if high <= low:
+        return [low, high]
+
+    raw_step = (high - low) / PRICE_HISTOGRAM_BINS
+    magnitude = 10 ** math.floor(math.log10(raw_step))
+    step = next(factor * magnitude for factor in (1, 2, 2.5, 5, 10) if factor * magnitude >= raw_step)
+    start = math.floor(low / step) * step
+    count = max(1, math.ceil((high - start) / step))
+    return [round(start + index * step, 2) for index in range(count + 1)]
@@ -0,0 +1,258 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Services de recherche géographique.
+Ce fichier contient les filtres par rayon et par rectangle (bbox) sur les biens
+immobiliers. Chaque zone est d'abord couverte par quelques intervalles de cellules
+(colonne indexée Property.geo_cell), puis les candidats sont vérifiés exactement
+(coordonnées et distance de haversine). Fonctionne sur PostgreSQL sans PostGIS et sur SQLite.
+"""
+
+import math
+
+from app import db
+from app.models.__init__1 import Property
+from app.models.property_geo import GEO_CELL_AXIS_BITS, EARTH_RADIUS_KM, axis_index, interleave
+
+# Nombre maximal de cellules utilisées pour couvrir une zone
+MAX_COVERING_CELLS = 16
+
+# Rayon de recherche maximal (km)
+MAX_RADIUS_KM = 20000
+
+def apply_radius_filter(query, lat, lng, radius_km=None):
+    """
+    Restreint une requête aux biens situés à moins de radius_km d'un point.
+
+    Args:
+        query (Query): Requête SQLAlchemy sur Property
+        lat (float): Latitude du centre
+        lng (float): Longitude du centre
+        radius_km (float, optional): Rayon en kilomètres ; sans rayon, la requête n'est
+            pas filtrée mais la distance reste disponible pour le tri
+
+    Returns:
+        tuple: (Requête filtrée, expression SQL de la distance au centre en km)
+
+    Raises:
+        ValueError: Si les coordonnées ou le rayon sont invalides
+    """
+    lat, lng = parse_point(lat, lng)
+    distance = distance_expression(lat, lng)
+    if radius_km is None:
+        return query, distance
+
+    radius_km = parse_radius(radius_km)
+    boxes = bbox_around(lat, lng, radius_km)
+    min_lat = min(box[0] for box in boxes)
+    max_lat = max(box[2] for box in boxes)
+    query = query.filter(
+        _cells_condition(boxes),
+        Property.latitude.between(min_lat, max_lat),
+        distance <= radius_km
+    )
+    return query, distance
+
+def apply_bbox_filter(query, bbox):
+    """
+    Restreint une requête aux biens situés dans un rectangle.
+
+    Args:
+        query (Query): Requête SQLAlchemy sur Property
+        bbox (str): Rectangle 'min_lng,min_lat,max_lng,max_lat' (ordre GeoJSON) ;
+            min_lng > max_lng désigne un rectangle traversant l'antiméridien
+
+    Returns:
+        Query: Requête filtrée
+
+    Raises:
+        ValueError: Si le rectangle est invalide
+    """
+    min_lng, min_lat, max_lng, max_lat = parse_bbox(bbox)
+
+    if min_lng <= max_lng:
+        boxes = [(min_lat, min_lng, max_lat, max_lng)]
+        longitude_condition = Property.longitude.between(min_lng, max_lng)
+    else:
+        boxes = [(min_lat, min_lng, max_lat, 180.0), (min_lat, -180.0, max_lat, max_lng)]
+        longitude_condition = db.or_(Property.longitude >= min_lng, Property.longitude <= max_lng)
+
+    return query.filter(
+        _cells_condition(boxes),
+        Property.latitude.between(min_lat, max_lat),
+        longitude_condition
+    )
+
+def parse_point(lat, lng):
+    """
+    Valide les coordonnées d'un point.
+
+    Args:
+        lat (float): Latitude
+        lng (float): Longitude
+
+    Returns:
+        tuple: (lat, lng) en nombres flottants
+
+    Raises:
+        ValueError: Si une coordonnée manque ou est invalide
+    """
+    if lat is None or lng is None:
+        raise ValueError("Les paramètres lat et lng doivent être fournis ensemble")
+    lat, lng = float(lat), float(lng)
+    if not -90 <= lat <= 90 or not -180 <= lng <= 180:
+        raise ValueError("Coordonnées invalides: lat doit être entre -90 et 90, lng entre -180 et 180")
+    return lat, lng
+
+def parse_radius(radius_km):
+    """
+    Valide un rayon de recherche.
+
+    Args:
+        radius_km (float): Rayon en kilomètres
+
+    Returns:
+        float: Rayon en kilomètres
+
+    Raises:
+        ValueError: Si le rayon est hors limites
+    """
+    radius_km = float(radius_km)
+    if not 0 < radius_km <= MAX_RADIUS_KM:
+        raise ValueError(f"radius_km doit être compris entre 0 et {MAX_RADIUS_KM}")
+    return radius_km
+
+def parse_bbox(bbox):
+    """
+    Décode un rectangle 'min_lng,min_lat,max_lng,max_lat'.
+
+    Args:
+        bbox (str): Rectangle sous forme de texte
+
+    Returns:
+        tuple: (min_lng, min_lat, max_lng, max_lat)
+
+    Raises:
+        ValueError: Si le rectangle est invalide
+    """
+    try:
+        min_lng, min_lat, max_lng, max_lat = (float(value) for value in str(bbox).split(','))
+    except ValueError:
+        raise ValueError("bbox doit être de la forme 'min_lng,min_lat,max_lng,max_lat'")
+
+    if not all(-180 <= value <= 180 for value in (min_lng, max_lng)) or \
+            not all(-90 <= value <= 90 for value in (min_lat, max_lat)):
+        raise ValueError("bbox contient des coordonnées invalides")
+    if min_lat > max_lat:
+        raise ValueError("bbox: min_lat doit être inférieur ou égal à max_lat")
+
+    return min_lng, min_lat, max_lng, max_lat
+
+def bbox_around(lat, lng, radius_km):
+    """
+    Rectangles englobant le cercle de rayon radius_km autour d'un point
+    (deux rectangles si le cercle traverse l'antiméridien).
+
+    Args:
+        lat (float): Latitude du centre
+        lng (float): Longitude du centre
+        radius_km (float): Rayon en kilomètres
+
+    Returns:
+        list: Tuples (min_lat, min_lng, max_lat, max_lng)
+    """
+    delta_lat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    min_lat, max_lat = lat - delta_lat, lat + delta_lat
+    if min_lat <= -90 or max_lat >= 90:
+        # Le cercle contient un pôle : toutes les longitudes sont concernées
+        return [(max(min_lat, -90.0), -180.0, min(max_lat, 90.0), 180.0)]
+
+    # Écart de longitude mesuré à la latitude la plus proche du pôle (le plus large)
+    delta_lng = delta_lat / math.cos(math.radians(max(abs(min_lat), abs(max_lat))))
+    if delta_lng >= 180:
+        return [(min_lat, -180.0, max_lat, 180.0)]
+
+    min_lng, max_lng = lng - delta_lng, lng + delta_lng
+    if min_lng < -180:
+        return [(min_lat, min_lng + 360, max_lat, 180.0), (min_lat, -180.0, max_lat, max_lng)]
+    if max_lng > 180:
+        return [(min_lat, min_lng, max_lat, 180.0), (min_lat, -180.0, max_lat, max_lng - 360)]
+    return [(min_lat, min_lng, max_lat, max_lng)]
+
+def cell_ranges(boxes, max_cells=MAX_COVERING_CELLS):
+    """
+    Intervalles de geo_cell couvrant des rectangles.
+
+    Pour chaque rectangle, la grille la plus fine le couvrant en au plus max_cells
+    cellules est retenue ; les intervalles contigus sont fusionnés.
+
+    Args:
+        boxes (list): Tuples (min_lat, min_lng, max_lat, max_lng)
+        max_cells (int, optional): Nombre maximal de cellules par rectangle
+
+    Returns:
+        list: Intervalles (début inclus, fin exclue) triés
+    """
+    ranges = []
+    for min_lat, min_lng, max_lat, max_lng in boxes:
+        for bits in range(GEO_CELL_AXIS_BITS, -1, -1):
+            lat_first = axis_index(min_lat, -90.0, 180.0, bits)
+            lat_last = axis_index(max_lat, -90.0, 180.0, bits)
+            lng_first = axis_index(min_lng, -180.0, 360.0, bits)
+            lng_last = axis_index(max_lng, -180.0, 360.0, bits)
+            if (lat_last - lat_first + 1) * (lng_last - lng_first + 1) <= max_cells:
+                break
+
+        shift = 2 * (GEO_CELL_AXIS_BITS - bits)
+        for lng_index in range(lng_first, lng_last + 1):
+            for lat_index in range(lat_first, lat_last + 1):
+                prefix = interleave(lng_index, lat_index, bits)
+                ranges.append((prefix << shift, (prefix + 1) << shift))
+
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+def distance_expression(lat, lng):
+    """
+    Expression SQL de la distance de haversine (km) entre un bien et un point.
+
+    Args:
+        lat (float): Latitude du point
+        lng (float): Longitude du point
+
+    Returns:
+        ColumnElement: Distance en kilomètres (NULL si le bien n'a pas de coordonnées)
+    """
+    if db.session.get_bind().dialect.name == 'sqlite':
+        # Fonction enregistrée sur chaque connexion (voir app.models.property_geo)
+        return db.func.haversine_km(Property.latitude, Property.longitude, lat, lng)
+
+    latitude = db.cast(Property.latitude, db.Float)
+    longitude = db.cast(Property.longitude, db.Float)
+    a = (db.func.power(db.func.sin(db.func.radians(latitude - lat) / 2), 2) +
+         math.cos(math.radians(lat)) * db.func.cos(db.func.radians(latitude)) *
+         db.func.power(db.func.sin(db.func.radians(longitude - lng) / 2), 2))
+    return 2 * EARTH_RADIUS_KM * db.func.asin(db.func.least(1.0, db.func.sqrt(a)))
+
+# Fonctions utilitaires
+
+def _cells_condition(boxes):
+    """
+    Prédicat SQL « geo_cell appartient à l'un des intervalles couvrant les rectangles ».
+
+    Args:
+        boxes (list): Tuples (min_lat, min_lng, max_lat, max_lng)
+
+    Returns:
+        ClauseElement: Prédicat SQL
+    """
+    return db.or_(*[
+        db.and_(Property.geo_cell >= start, Property.geo_cell < end)
+        for start, end in cell_ranges(boxes)
+    ])
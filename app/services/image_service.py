@@ -0,0 +1,318 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Déclinaisons des images des biens immobiliers.
+Ce fichier génère, à partir de l'image envoyée, une vignette, une image de carte et
+une image pleine taille aux formats WebP et JPEG (orientation EXIF appliquée,
+métadonnées supprimées). Le traitement est fait par un pool de processus borné,
+en dehors des requêtes (ou, avec IMAGE_PROCESSING_QUEUE, par la file de tâches et
+`flask worker`), et son résultat est enregistré sur la PropertyImage.
+Les déclinaisons sont des fichiers dérivés de l'image dans le stockage : une image
+envoyée plusieurs fois n'est traitée qu'une fois.
+"""
+
+import io
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+
+from flask import current_app
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from app import db
+from app.models.__init__1 import PropertyImage
+from app.services.job_queue import enqueue, job_handler
+from app.services.query_cache import invalidate_tags
+from app.services.storage import get_storage, derived_key
+from app.utils import discard_process_singleton, process_singleton
+
+# Déclinaisons générées (du plus grand au plus petit) : nom et plus grand côté en pixels
+IMAGE_SIZES = (('full', 2048), ('card', 800), ('thumbnail', 320))
+
+# Formats générés pour chaque déclinaison : format Pillow et extension
+IMAGE_FORMATS = {'jpeg': ('JPEG', '.jpg'), 'webp': ('WEBP', '.webp')}
+
+# États du traitement d'une image
+IMAGE_STATUSES = ('pending', 'ready', 'failed')
+
+# Clé du pool dans app.extensions
+_EXTENSION_KEY = 'image_processor'
+
+class ImageProcessor:
+    """
+    Pool de processus générant les déclinaisons des images.
+
+    Au plus max_pending images sont en attente ou en cours de traitement. Au-delà,
+    l'appelant est bloqué au plus submit_timeout secondes, puis traite lui-même
+    l'image : aucune image n'est laissée sans déclinaisons et le débit des envois
+    est ramené à celui du pool.
+    """
+
+    def __init__(self, app, storage, workers=2, max_pending=64, submit_timeout=5.0):
+        self.app = app
+        self.storage = storage
+        self.submit_timeout = submit_timeout
+        self.pid = os.getpid()
+        self._slots = threading.BoundedSemaphore(max_pending)
+        # Les processus du pool n'accèdent pas à la base : seul le parent enregistre les résultats
+        self._executor = ProcessPoolExecutor(max_workers=workers)
+
+    def submit(self, image_id, storage_key):
+        """
+        Demande la génération des déclinaisons d'une image.
+
+        Args:
+            image_id (int): ID de la PropertyImage
+            storage_key (str): Clé de l'image envoyée dans le stockage
+        """
+        if not self._slots.acquire(timeout=self.submit_timeout):
+            # Pool saturé : traitement immédiat par l'appelant
+            _process_and_store(self.app, self.storage, image_id, storage_key)
+            return
+
+        try:
+            future = self._executor.submit(generate_derivatives, self.storage, storage_key,
+                                           **_generation_options(self.app))
+        except (BrokenProcessPool, RuntimeError):
+            # Pool arrêté ou processus tué : un nouveau pool sera démarré au prochain envoi
+            self._slots.release()
+            discard_process_singleton(self.app, _EXTENSION_KEY, self)
+            _process_and_store(self.app, self.storage, image_id, storage_key)
+            return
+        future.add_done_callback(lambda done: self._done(done, image_id))
+
+    def shutdown(self, wait=True):
+        """
+        Arrête le pool.
+
+        Args:
+            wait (bool, optional): Attend la fin des traitements en cours
+        """
+        self._executor.shutdown(wait=wait)
+
+    def _done(self, future, image_id):
+        """Enregistre le résultat d'un traitement (appelé par le thread du pool)."""
+        self._slots.release()
+        try:
+            paths = future.result()
+        except Exception:
+            self.app.logger.exception("Génération des déclinaisons de l'image %s impossible", image_id)
+            paths = None
+        _store_derivatives(self.app, image_id, paths)
+
+def get_image_processor():
+    """
+    Pool de traitement des images de l'application courante, démarré au premier
+    usage dans chaque processus (les workers issus d'un fork démarrent le leur).
+
+    Returns:
+        ImageProcessor: Pool de l'application
+    """
+    app = current_app._get_current_object()
+    # Fin des traitements en cours à l'arrêt du processus
+    return process_singleton(app, _EXTENSION_KEY, lambda: ImageProcessor(
+        app,
+        get_storage(),
+        workers=app.config.get('IMAGE_PROCESS_WORKERS', 2),
+        max_pending=app.config.get('IMAGE_MAX_PENDING', 64),
+        submit_timeout=app.config.get('IMAGE_SUBMIT_TIMEOUT', 5.0)
+    ), on_exit=lambda processor: processor.shutdown())
+
+def check_image(stream):
+    """
+    Vérifie qu'un fichier est une image lisible, en ne lisant que son en-tête.
+
+    Args:
+        stream (file): Fichier image (repositionné au début après lecture)
+
+    Raises:
+        ValueError: Si le fichier n'est pas une image valide ou est trop grand
+    """
+    try:
+        with Image.open(stream) as image:
+            width, height = image.size
+    except (UnidentifiedImageError, Image.DecompressionBombError):
+        raise ValueError("Le fichier n'est pas une image valide.")
+    finally:
+        stream.seek(0)
+
+    if Image.MAX_IMAGE_PIXELS and width * height > Image.MAX_IMAGE_PIXELS:
+        raise ValueError(f"Image trop grande ({width}x{height} pixels).")
+
+def schedule_image_processing(image):
+    """
+    Lance la génération des déclinaisons d'une image enregistrée, en arrière-plan
+    sauf si IMAGE_PROCESSING_SYNC est activé : par le pool du processus, ou par une
+    tâche de la file (`flask worker`) si IMAGE_PROCESSING_QUEUE est activé.
+
+    Args:
+        image (PropertyImage): Image (déjà validée en base)
+    """
+    if current_app.config.get('IMAGE_PROCESSING_SYNC'):
+        _process_and_store(current_app._get_current_object(), get_storage(), image.id, image.storage_key)
+        db.session.refresh(image)
+    elif current_app.config.get('IMAGE_PROCESSING_QUEUE'):
+        enqueue('images.process', {'image_id': image.id, 'storage_key': image.storage_key})
+    else:
+        get_image_processor().submit(image.id, image.storage_key)
+
+@job_handler('images.process', queue='images')
+def process_image_job(image_id, storage_key):
+    """
+    Tâche générant les déclinaisons d'une image (une erreur provoque une nouvelle tentative).
+
+    Args:
+        image_id (int): ID de la PropertyImage
+        storage_key (str): Clé de l'image envoyée dans le stockage
+    """
+    app = current_app._get_current_object()
+    paths = generate_derivatives(get_storage(), storage_key, **_generation_options(app))
+    _store_derivatives(app, image_id, paths)
+
+def process_images(property_id=None, reprocess=False, workers=None, progress=None):
+    """
+    Génère les déclinaisons des images qui n'en ont pas (images antérieures au
+    traitement, traitements échoués ou interrompus), dans l'ordre des IDs. Les images
+    envoyées avant le stockage par contenu doivent d'abord y être transférées
+    (`flask storage-migrate`).
+
+    Args:
+        property_id (int, optional): Limite le traitement aux images d'un bien
+        reprocess (bool, optional): Traite aussi les images qui ont déjà leurs déclinaisons
+        workers (int, optional): Nombre de processus (IMAGE_PROCESS_WORKERS par défaut)
+        progress (callable, optional): Fonction appelée après chaque image avec (image_id, succès)
+
+    Returns:
+        tuple: (Nombre d'images traitées, nombre d'échecs)
+    """
+    app = current_app._get_current_object()
+    query = db.session.query(PropertyImage.id, PropertyImage.storage_key) \
+        .filter(PropertyImage.storage_key.isnot(None)).order_by(PropertyImage.id)
+    if property_id is not None:
+        query = query.filter(PropertyImage.property_id == property_id)
+    if not reprocess:
+        query = query.filter(db.or_(PropertyImage.processing_status.is_(None),
+                                    PropertyImage.processing_status != 'ready'))
+    images = query.all()
+    db.session.rollback()
+
+    processed = failed = 0
+    options = _generation_options(app)
+    storage = get_storage()
+    with ProcessPoolExecutor(max_workers=workers or app.config.get('IMAGE_PROCESS_WORKERS', 2)) as executor:
+        futures = [(image_id, executor.submit(generate_derivatives, storage, storage_key, force=reprocess, **options))
+                   for image_id, storage_key in images]
+        for image_id, future in futures:
+            try:
+                paths = future.result()
+            except Exception:
+                app.logger.exception("Génération des déclinaisons de l'image %s impossible", image_id)
+                paths = None
+            _store_derivatives(app, image_id, paths)
+            processed += 1
+            failed += paths is None
+            if progress:
+                progress(image_id, paths is not None)
+    return processed, failed
+
+def generate_derivatives(storage, storage_key, force=False, jpeg_quality=82, webp_quality=80):
+    """
+    Génère les déclinaisons d'une image (exécuté dans un processus du pool).
+
+    L'orientation EXIF est appliquée aux pixels et aucune métadonnée n'est recopiée
+    (seul le profil de couleurs est conservé). Chaque déclinaison est calculée à
+    partir de la précédente. Les déclinaisons déjà présentes dans le stockage (même
+    image envoyée plusieurs fois) ne sont pas régénérées, sauf si force est vrai.
+
+    Args:
+        storage (Storage): Stockage des fichiers
+        storage_key (str): Clé de l'image envoyée
+        force (bool, optional): Régénère les déclinaisons existantes
+        jpeg_quality (int, optional): Qualité des déclinaisons JPEG
+        webp_quality (int, optional): Qualité des déclinaisons WebP
+
+    Returns:
+        dict: Clés des déclinaisons JPEG par nom ({'full': ..., 'card': ..., 'thumbnail': ...})
+    """
+    keys = {size: derived_key(storage_key, size, IMAGE_FORMATS['jpeg'][1]) for size, max_side in IMAGE_SIZES}
+    # Les déclinaisons sont écrites de la plus grande à la plus petite, la vignette WebP en dernier
+    if not force and storage.exists(derived_key(storage_key, IMAGE_SIZES[-1][0], IMAGE_FORMATS['webp'][1])):
+        return keys
+
+    largest = IMAGE_SIZES[0][1]
+    with storage.open(storage_key) as stream, Image.open(stream) as source:
+        # JPEG : réduction pendant le décodage (la taille obtenue reste supérieure à la plus grande déclinaison)
+        source.draft('RGB', (largest, largest))
+        icc_profile = source.info.get('icc_profile')
+        image = ImageOps.exif_transpose(source)
+        has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+
+    for size, max_side in IMAGE_SIZES:
+        image.thumbnail((max_side, max_side), Image.LANCZOS)
+        for image_format, quality in (('jpeg', jpeg_quality), ('webp', webp_quality)):
+            output = image
+            if image_format == 'jpeg' and has_alpha:
+                # Le JPEG n'a pas de transparence : fond blanc
+                output = Image.new('RGB', image.size, (255, 255, 255))
+                output.paste(image, mask=image.getchannel('A'))
+            options = {'quality': quality}
+            if icc_profile:
+                options['icc_profile'] = icc_profile
+            if image_format == 'jpeg':
+                options.update(optimize=True, progressive=True)
+            buffer = io.BytesIO()
+            output.save(buffer, IMAGE_FORMATS[image_format][0], **options)
+            buffer.seek(0)
+            storage.put_at(derived_key(storage_key, size, IMAGE_FORMATS[image_format][1]), buffer)
+    return keys
+
+# Fonctions utilitaires
+
+def _generation_options(app):
+    """Paramètres de generate_derivatives issus de la configuration."""
+    return {
+        'jpeg_quality': app.config.get('IMAGE_JPEG_QUALITY', 82),
+        'webp_quality': app.config.get('IMAGE_WEBP_QUALITY', 80)
+    }
+
+def _process_and_store(app, storage, image_id, storage_key):
+    """Génère les déclinaisons d'une image dans le processus courant et les enregistre."""
+    try:
+        paths = generate_derivatives(storage, storage_key, **_generation_options(app))
+    except Exception:
+        app.logger.exception("Génération des déclinaisons de l'image %s impossible", image_id)
+        paths = None
+    _store_derivatives(app, image_id, paths)
+
+def _store_derivatives(app, image_id, paths):
+    """
+    Enregistre les clés des déclinaisons d'une image, ou l'échec du traitement
+    si paths est None (sans effet si l'image a été supprimée entre-temps).
+    """
+    if paths is None:
+        values = {'processing_status': 'failed'}
+    else:
+        values = {
+            'processing_status': 'ready',
+            'thumbnail_path': paths['thumbnail'],
+            'card_path': paths['card'],
+            'full_path': paths['full']
+        }
+    values['processed_at'] = datetime.utcnow()
+
+    table = PropertyImage.__table__
+    with app.app_context():
+        try:
+            with db.engine.begin() as connection:
+                property_id = connection.execute(
+                    db.select(table.c.property_id).where(table.c.id == image_id)
+                ).scalar()
+                connection.execute(table.update().where(table.c.id == image_id).values(values))
+            # Mêmes étiquettes qu'une modification de l'image par l'ORM (image et bien parent)
+            invalidate_tags({table.name, f'{table.name}:{image_id}', f'properties:{property_id}'})
+        except Exception:
+            app.logger.exception("Enregistrement des déclinaisons de l'image %s impossible", image_id)
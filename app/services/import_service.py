@@ -0,0 +1,508 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Import en masse des biens immobiliers, des propriétaires et des clients.
+Ce fichier lit un flux CSV ou NDJSON ligne à ligne, valide les enregistrements par
+lots (types, champs requis, doublons et clés étrangères vérifiés par une requête par
+lot) et les insère par INSERT multi-lignes, sans passer par l'ORM. Les structures
+maintenues d'ordinaire par les écouteurs de l'ORM (statistiques du tableau de bord,
+cellule géographique, index en mémoire, cache des requêtes, instantané des biens)
+sont mises à jour après chaque lot. Une ligne invalide est signalée dans le rapport
+sans interrompre l'import.
+"""
+
+import csv
+import json
+import uuid
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from sqlalchemy.exc import DBAPIError
+
+from app import db
+from app.models.__init__1 import Property, Amenity, Owner, Client, encode_geo_cell
+from app.models.fuzzy_search import FUZZY_SEARCH_FIELDS
+from app.models.property import property_amenities
+from app.services.dashboard_service import apply_insert_counts
+from app.services.ngram_index import apply_ngram_changes
+from app.services.property_snapshot import mark_property_snapshot_stale
+from app.services.query_cache import invalidate_tags
+
+# Formats de fichier acceptés
+IMPORT_FORMATS = ('csv', 'ndjson')
+
+# Nombre d'enregistrements validés et insérés ensemble
+IMPORT_CHUNK_SIZE = 1000
+
+# Nombre maximal d'erreurs détaillées dans le rapport (les suivantes sont seulement comptées)
+IMPORT_MAX_ERRORS = 1000
+
+# Séparateur des équipements d'un bien dans une cellule CSV
+AMENITIES_SEPARATOR = '|'
+
+# Valeurs booléennes acceptées
+_TRUE_VALUES = ('1', 'true', 'yes', 'oui', 'o', 'y')
+_FALSE_VALUES = ('0', 'false', 'no', 'non', 'n')
+
+# Colonnes gérées par l'import (jamais lues dans le fichier)
+_MANAGED_COLUMNS = ('id', 'geo_cell', 'created_by', 'created_at', 'updated_at')
+
+# Entités importables : modèle, colonne unique et champs requis en plus des colonnes NOT NULL
+IMPORT_ENTITIES = {
+    'properties': {'model': Property, 'unique': 'reference_code', 'required': ('owner_id',)},
+    'owners': {'model': Owner, 'unique': 'email', 'required': ()},
+    'clients': {'model': Client, 'unique': 'email', 'required': ()},
+}
+
+def import_records(entity, stream, file_format, created_by=None, on_duplicate='error',
+                   dry_run=False, chunk_size=IMPORT_CHUNK_SIZE, progress=None):
+    """
+    Importe des enregistrements depuis un flux CSV (ligne d'en-tête) ou NDJSON (un
+    objet JSON par ligne).
+
+    Chaque lot est inséré dans sa propre transaction : les lots déjà importés sont
+    conservés si un lot suivant échoue. Si l'insertion d'un lot est refusée par la base
+    (contrainte, valeur hors limites), ses lignes sont réinsérées une à une et seules
+    les lignes fautives sont signalées.
+
+    Args:
+        entity (str): 'properties', 'owners' ou 'clients'
+        stream: Flux texte (ouvert avec newline='' pour le CSV)
+        file_format (str): 'csv' ou 'ndjson'
+        created_by (int, optional): ID de l'utilisateur à l'origine de l'import
+        on_duplicate (str, optional): 'error' pour signaler les doublons (code de
+            référence, email), 'skip' pour les ignorer
+        dry_run (bool, optional): Valide le fichier sans rien insérer
+        chunk_size (int, optional): Nombre d'enregistrements par lot
+        progress (callable, optional): Fonction appelée avec le rapport après chaque lot
+
+    Returns:
+        dict: Rapport (lignes lues, insérées, ignorées, erreurs par ligne)
+
+    Raises:
+        ValueError: Si l'entité, le format ou la politique de doublons est inconnu
+    """
+    if entity not in IMPORT_ENTITIES:
+        raise ValueError(f"Entité inconnue: '{entity}'. Valeurs possibles: {', '.join(IMPORT_ENTITIES)}")
+    if file_format not in IMPORT_FORMATS:
+        raise ValueError(f"Format inconnu: '{file_format}'. Valeurs possibles: {', '.join(IMPORT_FORMATS)}")
+    if on_duplicate not in ('error', 'skip'):
+        raise ValueError("on_duplicate doit valoir 'error' ou 'skip'")
+
+    importer = _Importer(entity, created_by, on_duplicate, dry_run)
+    chunk = []
+    for record in importer.read(stream, file_format):
+        chunk.append(record)
+        if len(chunk) >= chunk_size:
+            importer.process(chunk)
+            chunk = []
+            if progress:
+                progress(importer.report)
+    if chunk:
+        importer.process(chunk)
+        if progress:
+            progress(importer.report)
+    importer.report['errors'].sort(key=lambda error: error['line'])
+    return importer.report
+
+def detect_format(name):
+    """
+    Format d'un fichier d'après son extension ou son type MIME.
+
+    Args:
+        name (str): Nom de fichier ou type MIME
+
+    Returns:
+        str: 'csv', 'ndjson' ou None si inconnu
+    """
+    name = (name or '').lower()
+    if name.endswith('.csv') or name.endswith('/csv'):
+        return 'csv'
+    if name.endswith(('.ndjson', '.jsonl', '/x-ndjson', '/ndjson', '/jsonl', '/x-jsonlines')):
+        return 'ndjson'
+    return None
+
+def generate_reference_codes(count):
+    """
+    Génère des codes de référence uniques en vérifiant leur unicité par une seule requête.
+
+    Le format est celui de generate_reference_code, avec six caractères aléatoires
+    au lieu de quatre afin qu'un import de plusieurs milliers de biens le même jour
+    ne provoque pas de collisions en série.
+
+    Args:
+        count (int): Nombre de codes
+
+    Returns:
+        list: Codes de référence
+    """
+    today = datetime.now().strftime('%Y%m%d')
+    codes = set()
+    while len(codes) < count:
+        candidates = {f"PROP-{today}-{uuid.uuid4().hex[:6].upper()}" for _ in range(count - len(codes))}
+        existing = {code for code, in db.session.query(Property.reference_code)
+                    .filter(Property.reference_code.in_(candidates))}
+        codes.update(candidates - existing)
+    return list(codes)
+
+# Fonctions utilitaires
+
+class _Importer:
+    """État d'un import : schéma de l'entité, clés déjà vues et rapport."""
+
+    def __init__(self, entity, created_by, on_duplicate, dry_run):
+        spec = IMPORT_ENTITIES[entity]
+        self.entity = entity
+        self.model = spec['model']
+        self.table = self.model.__table__
+        self.unique = spec['unique']
+        self.created_by = created_by
+        self.on_duplicate = on_duplicate
+        self.dry_run = dry_run
+
+        self.columns = {column.key: column for column in self.table.columns if column.key not in _MANAGED_COLUMNS}
+        self.required = {
+            key for key, column in self.columns.items()
+            if not column.nullable and column.default is None and key != 'reference_code'
+        } | set(spec['required'])
+        self.defaults = {
+            key: column.default.arg for key, column in self.columns.items()
+            if column.default is not None and column.default.is_scalar
+        }
+        self.amenities = None
+        if self.model is Property:
+            self.amenities = {}
+            for amenity_id, name in db.session.query(Amenity.id, Amenity.name):
+                self.amenities[str(amenity_id)] = amenity_id
+                self.amenities[name.strip().lower()] = amenity_id
+        self.seen = set()
+
+        self.report = {
+            'entity': entity,
+            'dry_run': dry_run,
+            'processed': 0,
+            'inserted': 0,
+            'skipped': 0,
+            'error_count': 0,
+            'errors': [],
+            'ignored_columns': [],
+        }
+
+    # Lecture
+
+    def read(self, stream, file_format):
+        """
+        Lit les enregistrements d'un flux.
+
+        Yields:
+            tuple: (numéro de ligne, dictionnaire) ; les lignes illisibles sont signalées
+        """
+        if file_format == 'csv':
+            reader = csv.DictReader(stream)
+            self._check_columns(reader.fieldnames or [])
+            while True:
+                try:
+                    row = next(reader)
+                except StopIteration:
+                    return
+                except csv.Error as e:
+                    self.report['processed'] += 1
+                    self._error(reader.line_num, {'_': f'Ligne CSV invalide: {e}'})
+                    continue
+                if None in row:
+                    self.report['processed'] += 1
+                    self._error(reader.line_num, {'_': 'Nombre de colonnes supérieur à celui de l\'en-tête'})
+                    continue
+                yield reader.line_num, row
+        else:
+            checked = set()
+            for line_number, line in enumerate(stream, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError as e:
+                    self.report['processed'] += 1
+                    self._error(line_number, {'_': f'JSON invalide: {e}'})
+                    continue
+                if not isinstance(record, dict):
+                    self.report['processed'] += 1
+                    self._error(line_number, {'_': 'Chaque ligne doit être un objet JSON'})
+                    continue
+                unknown = set(record) - checked
+                if unknown:
+                    self._check_columns(unknown)
+                    checked |= unknown
+                yield line_number, record
+
+    def _check_columns(self, names):
+        """Relève les colonnes du fichier qui ne sont pas importées."""
+        accepted = set(self.columns) | ({'amenities'} if self.amenities is not None else set())
+        for name in names:
+            if name not in accepted and name not in self.report['ignored_columns']:
+                self.report['ignored_columns'].append(name)
+
+    # Validation et insertion
+
+    def process(self, chunk):
+        """
+        Valide et insère un lot d'enregistrements.
+
+        Args:
+            chunk (list): Couples (numéro de ligne, dictionnaire)
+        """
+        self.report['processed'] += len(chunk)
+        rows = []
+        for line_number, record in chunk:
+            values, errors = self._coerce(record)
+            if errors:
+                self._error(line_number, errors)
+            else:
+                rows.append((line_number, values))
+
+        rows = self._check_duplicates(rows)
+        rows = self._check_foreign_keys(rows)
+        if not rows:
+            return
+
+        if self.model is Property:
+            missing = [values for _, values in rows if not values.get('reference_code')]
+            for values, code in zip(missing, generate_reference_codes(len(missing))):
+                values['reference_code'] = code
+        # Lecture seule jusqu'ici : la transaction de validation est terminée avant l'insertion
+        db.session.rollback()
+
+        if self.dry_run:
+            self.report['inserted'] += len(rows)
+            return
+
+        try:
+            inserted = self._insert(rows)
+        except DBAPIError:
+            # Lot refusé : insertion ligne à ligne pour isoler les lignes fautives
+            inserted = []
+            for row in rows:
+                try:
+                    inserted.extend(self._insert([row]))
+                except DBAPIError as e:
+                    self._error(row[0], {'_': str(e.orig).strip().splitlines()[0]})
+        self.report['inserted'] += len(inserted)
+        self._after_insert(inserted)
+
+    def _coerce(self, record):
+        """
+        Convertit les valeurs d'un enregistrement selon les types des colonnes.
+
+        Returns:
+            tuple: (valeurs converties, erreurs par champ)
+        """
+        values = {}
+        errors = {}
+        for key, column in self.columns.items():
+            raw = record.get(key)
+            if isinstance(raw, str):
+                raw = raw.strip()
+            if raw is None or raw == '':
+                if key in self.required:
+                    errors[key] = 'Champ requis'
+                values[key] = self.defaults.get(key)
+                continue
+            try:
+                values[key] = _coerce_value(column, raw)
+            except ValueError as e:
+                errors[key] = str(e)
+
+        if self.amenities is not None:
+            values['amenities'], error = self._amenity_ids(record.get('amenities'))
+            if error:
+                errors['amenities'] = error
+
+        if self.model is Property:
+            for key, bound in (('latitude', 90), ('longitude', 180)):
+                if values.get(key) is not None and abs(values[key]) > bound:
+                    errors[key] = f'Valeur comprise entre -{bound} et {bound} attendue'
+            if 'latitude' not in errors and 'longitude' not in errors:
+                values['geo_cell'] = encode_geo_cell(values.get('latitude'), values.get('longitude'))
+        if 'created_by' in self.table.columns:
+            values['created_by'] = self.created_by
+        return values, errors
+
+    def _amenity_ids(self, raw):
+        """Identifiants des équipements d'un bien (liste JSON ou IDs/noms séparés par '|')."""
+        if raw is None or raw == '':
+            return [], None
+        items = raw.split(AMENITIES_SEPARATOR) if isinstance(raw, str) else raw
+        if not isinstance(items, list):
+            return [], 'Liste d\'équipements attendue'
+        ids, unknown = [], []
+        for item in items:
+            key = str(item).strip().lower()
+            if not key:
+                continue
+            if key in self.amenities:
+                if self.amenities[key] not in ids:
+                    ids.append(self.amenities[key])
+            else:
+                unknown.append(str(item).strip())
+        if unknown:
+            return ids, f"Équipement(s) inconnu(s): {', '.join(unknown)}"
+        return ids, None
+
+    def _check_duplicates(self, rows):
+        """Écarte les lignes dont la valeur unique existe déjà (base ou lignes précédentes)."""
+        column = self.table.c[self.unique]
+        keys = {values[self.unique] for _, values in rows if values.get(self.unique)}
+        existing = set()
+        if keys:
+            existing = {key for key, in db.session.query(column).filter(column.in_(keys))}
+
+        kept = []
+        for line_number, values in rows:
+            key = values.get(self.unique)
+            if key and (key in existing or key in self.seen):
+                if self.on_duplicate == 'skip':
+                    self.report['skipped'] += 1
+                else:
+                    where = 'existe déjà' if key in existing else 'apparaît plusieurs fois dans le fichier'
+                    self._error(line_number, {self.unique: f"'{key}' {where}"})
+                continue
+            if key:
+                self.seen.add(key)
+            kept.append((line_number, values))
+        return kept
+
+    def _check_foreign_keys(self, rows):
+        """Écarte les lignes référençant un objet inexistant (une requête par clé étrangère)."""
+        for key, column in self.columns.items():
+            for foreign_key in column.foreign_keys:
+                target = foreign_key.column
+                ids = {values[key] for _, values in rows if values.get(key) is not None}
+                if not ids:
+                    continue
+                found = {row_id for row_id, in db.session.query(target).filter(target.in_(ids))}
+                kept = []
+                for line_number, values in rows:
+                    if values.get(key) is not None and values[key] not in found:
+                        self._error(line_number, {key: f"{target.table.name} {values[key]} introuvable"})
+                    else:
+                        kept.append((line_number, values))
+                rows = kept
+        return rows
+
+    def _insert(self, rows):
+        """
+        Insère des lignes dans une transaction (INSERT multi-lignes avec RETURNING),
+        avec leurs équipements et les compteurs du tableau de bord.
+
+        Returns:
+            list: Valeurs des lignes insérées, complétées de leur ID
+        """
+        now = datetime.utcnow()
+        records = []
+        for _, values in rows:
+            record = {key: value for key, value in values.items() if key != 'amenities'}
+            record['created_at'] = record['updated_at'] = now
+            records.append(record)
+
+        with db.engine.begin() as connection:
+            result = connection.execute(
+                self.table.insert().returning(self.table.c.id, sort_by_parameter_order=True), records
+            )
+            for record, (row_id,) in zip(records, result):
+                record['id'] = row_id
+
+            links = [
+                {'property_id': record['id'], 'amenity_id': amenity_id}
+                for record, (_, values) in zip(records, rows) for amenity_id in values.get('amenities', ())
+            ]
+            if links:
+                connection.execute(property_amenities.insert(), links)
+
+            owner_ids = {record['owner_id'] for record in records if record.get('owner_id')}
+            if self.model is Property and owner_ids:
+                # Même effet que parent_timestamps : la fiche du propriétaire change
+                connection.execute(Owner.__table__.update()
+                                   .where(Owner.__table__.c.id.in_(owner_ids)).values(updated_at=now))
+
+            apply_insert_counts(connection, self.model, records)
+        return records
+
+    def _after_insert(self, records):
+        """Met à jour les structures maintenues d'ordinaire par les écouteurs de l'ORM."""
+        if not records:
+            return
+        table = self.table.name
+        tags = {table}
+        if self.model is Property:
+            tags.add('amenities')
+            tags.update(f"owners:{record['owner_id']}" for record in records if record.get('owner_id'))
+            mark_property_snapshot_stale()
+        invalidate_tags(tags)
+
+        if self.model in FUZZY_SEARCH_FIELDS:
+            apply_ngram_changes([
+                (self.model, record['id'], ' '.join(record.get(field) or '' for field in FUZZY_SEARCH_FIELDS[self.model]))
+                for record in records
+            ])
+
+    def _error(self, line_number, errors):
+        """Ajoute les erreurs d'une ligne au rapport."""
+        self.report['error_count'] += 1
+        if len(self.report['errors']) < IMPORT_MAX_ERRORS:
+            self.report['errors'].append({'line': line_number, 'errors': errors})
+
+def _coerce_value(column, raw):
+    """
+    Convertit une valeur lue dans le fichier selon le type d'une colonne.
+
+    Args:
+        column (Column): Colonne de destination
+        raw: Valeur lue (chaîne en CSV, type JSON en NDJSON)
+
+    Returns:
+        Valeur convertie
+
+    Raises:
+        ValueError: Si la valeur n'est pas valide pour la colonne
+    """
+    column_type = column.type
+    if isinstance(column_type, db.Boolean):
+        if isinstance(raw, bool):
+            return raw
+        if str(raw).lower() in _TRUE_VALUES:
+            return True
+        if str(raw).lower() in _FALSE_VALUES:
+            return False
+        raise ValueError('Booléen attendu')
+
+    if isinstance(column_type, db.Integer):
+        if isinstance(raw, bool) or (isinstance(raw, float) and not raw.is_integer()):
+            raise ValueError('Nombre entier attendu')
+        try:
+            return int(raw)
+        except (TypeError, ValueError):
+            raise ValueError('Nombre entier attendu')
+
+    if isinstance(column_type, db.Numeric):
+        if isinstance(raw, bool):
+            raise ValueError('Nombre attendu')
+        try:
+            value = Decimal(str(raw).replace(',', '.'))
+        except InvalidOperation:
+            raise ValueError('Nombre attendu')
+        if not value.is_finite():
+            raise ValueError('Nombre attendu')
+        if column_type.precision is not None:
+            limit = Decimal(10) ** (column_type.precision - (column_type.scale or 0))
+            if abs(value) >= limit:
+                raise ValueError(f'Valeur hors limites (inférieure à {limit} attendue)')
+        return value
+
+    if isinstance(raw, (dict, list)):
+        raise ValueError('Texte attendu')
+    value = str(raw)
+    length = getattr(column_type, 'length', None)
+    if length is not None and len(value) > length:
+        raise ValueError(f'{length} caractères au maximum')
+    return value
@@ -0,0 +1,269 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Vérification de la couverture des filtres par les index.
+Ce fichier exécute chaque forme de requête des services de liste (un filtre ou un tri
+à la fois), relève les colonnes filtrées et triées dans le SQL généré, et signale
+celles qu'aucun index déclaré ne peut servir. Utilisé par `flask check-indexes`.
+"""
+
+from sqlalchemy import Column, event, inspect
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import operators, visitors
+from sqlalchemy.sql.expression import BinaryExpression, ColumnClause
+from sqlalchemy.sql.schema import PrimaryKeyConstraint, UniqueConstraint
+
+from app import db
+from app.services.property_service import get_all_properties, PROPERTY_SORT_COLUMNS
+from app.services.transaction_service import (
+    get_all_transactions, get_property_transactions, get_client_transactions, TRANSACTION_SORT_COLUMNS
+)
+from app.services.client_service import get_all_clients, get_client_visits, CLIENT_SORT_COLUMNS, VISIT_SORT_COLUMNS
+from app.services.owner_service import get_all_owners, OWNER_SORT_COLUMNS
+
+# Valeurs d'exemple pour chaque filtre des services de liste
+# (la recherche `search` des clients et propriétaires est servie par les index trigrammes
+# d'expression de app.models.fuzzy_search, hors du périmètre de cette vérification)
+PROPERTY_FILTER_SAMPLES = [
+    {'property_type': 'apartment'},
+    {'status': 'for_sale'},
+    {'city': 'Paris'},
+    {'min_price': 1},
+    {'max_price': 1},
+    {'transaction_type': 'rent', 'min_price': 1},
+    {'transaction_type': 'rent', 'max_price': 1},
+    {'min_area': 1},
+    {'max_area': 1},
+    {'bedrooms': 1},
+    {'bathrooms': 1},
+    {'owner_id': 1},
+    {'lat': 48.85, 'lng': 2.35, 'radius_km': 5},
+    {'bbox': '2.2,48.8,2.5,48.9'}
+]
+
+TRANSACTION_FILTER_SAMPLES = [
+    {'transaction_type': 'sale'},
+    {'status': 'pending'},
+    {'property_id': 1},
+    {'client_id': 1},
+    {'handled_by': 1},
+    {'min_amount': 1},
+    {'max_amount': 1},
+    {'start_date': '2000-01-01'},
+    {'end_date': '2000-01-01'}
+]
+
+def service_probes():
+    """
+    Formes de requête à vérifier : un appel de service par filtre et par clé de tri.
+
+    Returns:
+        list: Tuples (libellé, fonction sans argument exécutant la requête)
+    """
+    probes = []
+
+    for filters in PROPERTY_FILTER_SAMPLES:
+        probes.append((f'get_all_properties {filters}', lambda f=filters: get_all_properties(filters=f, per_page=1)))
+    for sort in PROPERTY_SORT_COLUMNS:
+        probes.append((f'get_all_properties sort={sort}', lambda s=sort: get_all_properties(sort=s, per_page=1)))
+
+    for filters in TRANSACTION_FILTER_SAMPLES:
+        probes.append((f'get_all_transactions {filters}', lambda f=filters: get_all_transactions(filters=f, per_page=1)))
+    for sort in TRANSACTION_SORT_COLUMNS:
+        probes.append((f'get_all_transactions sort={sort}', lambda s=sort: get_all_transactions(sort=s, per_page=1)))
+    probes.append(('get_property_transactions', lambda: get_property_transactions(1, per_page=1, transaction_type='sale')))
+    probes.append(('get_client_transactions', lambda: get_client_transactions(1, per_page=1, transaction_type='sale')))
+
+    probes.append(('get_all_clients client_type', lambda: get_all_clients(per_page=1, client_type='buyer')))
+    probes.append(('get_all_clients assigned_agent_id', lambda: get_all_clients(per_page=1, assigned_agent_id=1)))
+    for sort in CLIENT_SORT_COLUMNS:
+        probes.append((f'get_all_clients sort={sort}', lambda s=sort: get_all_clients(per_page=1, sort=s)))
+
+    probes.append(('get_client_visits status', lambda: get_client_visits(1, per_page=1, status='scheduled')))
+    for sort in VISIT_SORT_COLUMNS:
+        probes.append((f'get_client_visits sort={sort}', lambda s=sort: get_client_visits(1, per_page=1, sort=s)))
+
+    for sort in OWNER_SORT_COLUMNS:
+        probes.append((f'get_all_owners sort={sort}', lambda s=sort: get_all_owners(per_page=1, sort=s)))
+
+    return probes
+
+def find_unsupported_filters(probes=None):
+    """
+    Exécute les formes de requête et relève les colonnes qu'aucun index ne sert.
+
+    Une colonne est considérée comme servie par un index si elle y figure et que
+    toutes les colonnes qui la précèdent dans l'index sont filtrées par la même
+    requête (ou triées avant elle). Un index partiel n'est retenu que si les
+    colonnes de son prédicat sont filtrées par la requête. Un filtre LIKE/ILIKE
+    ('%...%') n'est servi que par un index trigrammes, donc uniquement sur PostgreSQL.
+
+    Args:
+        probes (list, optional): Formes de requête (service_probes() par défaut)
+
+    Returns:
+        list: Tuples (libellé, 'table.colonne', 'filtre' ou 'tri') des colonnes non couvertes
+    """
+    trigram = db.engine.dialect.name == 'postgresql'
+    unsupported = []
+    for label, probe in probes or service_probes():
+        for statement in _capture_statements(probe):
+            filtered = _columns(statement.whereclause)
+            matched = _pattern_columns(statement.whereclause)
+            ordered = []
+            for clause in statement._order_by_clauses:
+                ordered.extend(column for column in _columns(clause) if column not in ordered)
+
+            for column in filtered:
+                if column in matched:
+                    if not (trigram and _has_trigram_index(column)):
+                        unsupported.append((label, f'{column.table.name}.{column.name}', 'filtre ILIKE'))
+                elif not _is_supported(column, filtered):
+                    unsupported.append((label, f'{column.table.name}.{column.name}', 'filtre'))
+            for position, column in enumerate(ordered):
+                if not _is_supported(column, filtered + ordered[:position]):
+                    unsupported.append((label, f'{column.table.name}.{column.name}', 'tri'))
+
+    return unsupported
+
+def find_missing_indexes():
+    """
+    Relève les index déclarés sur les modèles mais absents de la base de données
+    (migrations non appliquées).
+
+    Returns:
+        list: Noms des index manquants ('table.index')
+    """
+    inspector = inspect(db.engine)
+    missing = []
+    for table in db.metadata.sorted_tables:
+        if not table.indexes or not inspector.has_table(table.name):
+            continue
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        missing.extend(f'{table.name}.{index.name}' for index in table.indexes if index.name not in existing)
+    return sorted(missing)
+
+# Fonctions utilitaires
+
+def _capture_statements(probe):
+    """
+    Exécute une forme de requête et retourne les SELECT filtrés ou triés émis par l'ORM.
+
+    Args:
+        probe (callable): Fonction exécutant la requête
+
+    Returns:
+        list: Instructions SELECT
+    """
+    statements = []
+
+    def capture(orm_execute_state):
+        statement = orm_execute_state.statement
+        if orm_execute_state.is_select and (statement.whereclause is not None or statement._order_by_clauses):
+            statements.append(statement)
+
+    event.listen(Session, 'do_orm_execute', capture)
+    try:
+        probe()
+    finally:
+        event.remove(Session, 'do_orm_execute', capture)
+        db.session.rollback()
+
+    return statements
+
+def _columns(clause):
+    """
+    Colonnes de table référencées par une expression SQL.
+
+    Args:
+        clause (ClauseElement): Expression (clause WHERE ou ORDER BY)
+
+    Returns:
+        list: Colonnes, sans doublon
+    """
+    if clause is None:
+        return []
+    columns = []
+    for element in visitors.iterate(clause):
+        if isinstance(element, Column) and element.table is not None and element not in columns:
+            columns.append(element)
+    return columns
+
+def _pattern_columns(clause):
+    """
+    Colonnes filtrées par un motif (LIKE, ILIKE) dans une expression SQL.
+
+    Args:
+        clause (ClauseElement): Clause WHERE
+
+    Returns:
+        list: Colonnes comparées à un motif
+    """
+    if clause is None:
+        return []
+    columns = []
+    for element in visitors.iterate(clause):
+        if isinstance(element, BinaryExpression) and element.operator in (operators.like_op, operators.ilike_op):
+            columns.extend(column for column in _columns(element.left) if column not in columns)
+    return columns
+
+def _has_trigram_index(column):
+    """
+    Indique si une colonne est la première d'un index trigrammes (GIN gin_trgm_ops, PostgreSQL).
+
+    Args:
+        column (Column): Colonne filtrée par un motif
+
+    Returns:
+        bool: True si un index trigrammes couvre la colonne
+    """
+    for index in column.table.indexes:
+        options = index.dialect_options['postgresql']
+        if (options['using'] == 'gin' and index.columns and list(index.columns)[0] is column
+                and (options['ops'] or {}).get(column.name) == 'gin_trgm_ops'):
+            return True
+    return False
+
+def _is_supported(column, usable):
+    """
+    Indique si une colonne est servie par un index de sa table.
+
+    Args:
+        column (Column): Colonne filtrée ou triée
+        usable (list): Colonnes pouvant précéder la colonne dans l'index
+
+    Returns:
+        bool: True si un index couvre la colonne
+    """
+    usable_names = {col.name for col in usable if col.table is column.table}
+    for names, predicate_names in _table_indexes(column.table):
+        if column.name not in names:
+            continue
+        if set(names[:names.index(column.name)]) <= usable_names and predicate_names <= usable_names:
+            return True
+    return False
+
+def _table_indexes(table):
+    """
+    Index d'une table (clé primaire et contraintes d'unicité comprises).
+
+    Args:
+        table (Table): Table SQLAlchemy
+
+    Returns:
+        list: Tuples (noms de colonnes ordonnés, noms des colonnes du prédicat partiel)
+    """
+    indexes = []
+    for index in table.indexes:
+        predicate_names = set()
+        for dialect in ('postgresql', 'sqlite'):
+            predicate = index.dialect_options[dialect]['where']
+            if predicate is not None:
+                predicate_names.update(element.name for element in visitors.iterate(predicate)
+                                       if isinstance(element, ColumnClause))
+        indexes.append(([col.name for col in index.columns], predicate_names))
+    for constraint in table.constraints:
+        if isinstance(constraint, (PrimaryKeyConstraint, UniqueConstraint)):
+            indexes.append(([col.name for col in constraint.columns], set()))
+    return indexes
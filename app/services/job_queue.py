@@ -0,0 +1,485 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+File de tâches d'arrière-plan en base de données.
+Ce fichier définit l'enregistrement des tâches (décorateur job_handler), leur mise en
+file (enqueue), leur réservation par les workers (SELECT ... FOR UPDATE SKIP LOCKED
+sur PostgreSQL, mise à jour conditionnelle sur SQLite), les nouvelles tentatives
+avec délai exponentiel et le worker lancé par `flask worker` (N threads, dans un ou
+plusieurs processus). La table jobs suffit : aucun courtier externe n'est nécessaire.
+"""
+
+import importlib
+import multiprocessing
+import os
+import random
+import signal
+import socket
+import threading
+import time
+import traceback
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models.__init__1 import Job
+
+# Modules définissant des tâches, importés au démarrage du worker
+JOB_MODULES = ('app.services.image_service', 'app.services.mail_service')
+
+# États d'une tâche
+JOB_STATUSES = ('queued', 'running', 'succeeded', 'failed')
+
+# Longueur maximale de l'erreur enregistrée (fin de la trace)
+JOB_ERROR_MAX_LENGTH = 4000
+
+# Nombre de tentatives de réservation lorsqu'un autre worker prend la même tâche (sans SKIP LOCKED)
+_CLAIM_RETRIES = 5
+
+# Clés de session : tâches exécutées immédiatement (JOB_QUEUE_SYNC) après la validation de l'appelant
+_SESSION_SYNC_JOBS_KEY = 'job_queue_sync_jobs'
+_SESSION_COMMITTED_JOBS_KEY = 'job_queue_committed_jobs'
+
+JobHandler = namedtuple('JobHandler', ['function', 'queue', 'max_attempts'])
+
+_handlers = {}
+
+def job_handler(name, queue='default', max_attempts=None):
+    """
+    Décorateur enregistrant une fonction comme tâche d'arrière-plan.
+
+    La fonction reçoit les arguments nommés de la tâche (valeurs JSON) et s'exécute
+    dans un contexte d'application ; une exception provoque une nouvelle tentative.
+
+    Args:
+        name (str): Nom de la tâche (ex: 'images.process')
+        queue (str, optional): File par défaut des tâches
+        max_attempts (int, optional): Nombre maximal d'exécutions (JOB_MAX_ATTEMPTS par défaut)
+
+    Returns:
+        function: Le décorateur
+    """
+    def decorator(f):
+        _handlers[name] = JobHandler(f, queue, max_attempts)
+        return f
+    return decorator
+
+def enqueue(name, payload=None, queue=None, delay=None, max_attempts=None, commit=True):
+    """
+    Met une tâche en file.
+
+    La tâche est ajoutée à la session courante : avec commit=False, elle n'est visible
+    des workers qu'à la validation de la transaction de l'appelant (et abandonnée avec
+    elle). Si JOB_QUEUE_SYNC est activé, elle est exécutée immédiatement, ou avec
+    commit=False juste après la validation de la transaction de l'appelant (et jamais
+    si celle-ci est annulée).
+
+    Args:
+        name (str): Nom de la tâche
+        payload (dict, optional): Arguments nommés de la tâche (sérialisables en JSON)
+        queue (str, optional): File (celle de la tâche par défaut)
+        delay (float, optional): Délai en secondes avant exécution
+        max_attempts (int, optional): Nombre maximal d'exécutions
+        commit (bool, optional): Valide la session
+
+    Returns:
+        Job: La tâche (None si elle a été exécutée immédiatement)
+    """
+    handler = _handlers.get(name)
+    if current_app.config.get('JOB_QUEUE_SYNC'):
+        if handler is None:
+            raise LookupError(f"Tâche inconnue : '{name}'")
+        if commit:
+            db.session.commit()
+            handler.function(**(payload or {}))
+        else:
+            db.session.info.setdefault(_SESSION_SYNC_JOBS_KEY, []).append((handler, payload or {}))
+        return None
+
+    now = datetime.utcnow()
+    job = Job(
+        name=name,
+        queue=queue or (handler.queue if handler else 'default'),
+        payload=payload or {},
+        status='queued',
+        attempts=0,
+        max_attempts=max_attempts or (handler and handler.max_attempts) or current_app.config.get('JOB_MAX_ATTEMPTS', 5),
+        run_at=now + timedelta(seconds=delay or 0),
+        created_at=now
+    )
+    db.session.add(job)
+    if commit:
+        db.session.commit()
+    return job
+
+def claim_job(worker_id, queues=None):
+    """
+    Réserve la prochaine tâche à exécuter.
+
+    Sur PostgreSQL, la ligne est verrouillée avec SKIP LOCKED : les workers concurrents
+    passent aux tâches suivantes au lieu de s'attendre. Ailleurs, la réservation est
+    une mise à jour conditionnelle (status = 'queued') et une tâche prise par un autre
+    worker entre-temps est ignorée.
+
+    Args:
+        worker_id (str): Identifiant du worker
+        queues (list, optional): Files traitées (toutes par défaut)
+
+    Returns:
+        dict: Colonnes de la tâche réservée, ou None s'il n'y a pas de tâche à exécuter
+    """
+    table = Job.__table__
+    for attempt in range(_CLAIM_RETRIES):
+        now = datetime.utcnow()
+        with db.engine.begin() as connection:
+            query = db.select(table.c.id).where(table.c.status == 'queued', table.c.run_at <= now)
+            if queues:
+                query = query.where(table.c.queue.in_(queues))
+            query = query.order_by(table.c.run_at, table.c.id).limit(1)
+            if connection.dialect.name == 'postgresql':
+                query = query.with_for_update(skip_locked=True)
+
+            job_id = connection.execute(query).scalar()
+            if job_id is None:
+                return None
+            claimed = connection.execute(
+                table.update()
+                .where(table.c.id == job_id, table.c.status == 'queued')
+                .values(status='running', locked_by=worker_id, locked_at=now, attempts=table.c.attempts + 1)
+            ).rowcount
+            if claimed:
+                return dict(connection.execute(db.select(table).where(table.c.id == job_id)).mappings().one())
+    return None
+
+def run_job(app, job):
+    """
+    Exécute une tâche réservée et enregistre son résultat : succès, nouvelle tentative
+    après un délai exponentiel, ou échec définitif après max_attempts exécutions.
+
+    Args:
+        app (Flask): Application
+        job (dict): Colonnes de la tâche (retournées par claim_job)
+
+    Returns:
+        bool: True si la tâche a réussi
+    """
+    handler = _handlers.get(job['name'])
+    try:
+        if handler is None:
+            raise LookupError(f"Tâche inconnue : '{job['name']}' (module absent de JOB_MODULES ?)")
+        with app.app_context():
+            handler.function(**job['payload'])
+    except Exception:
+        error = traceback.format_exc()
+        app.logger.warning("Échec de la tâche %s (%s), tentative %d/%d",
+                           job['id'], job['name'], job['attempts'], job['max_attempts'])
+        _record_failure(app, job, error[-JOB_ERROR_MAX_LENGTH:])
+        return False
+
+    _record_result(app, job, {'status': 'succeeded', 'finished_at': datetime.utcnow(), 'locked_at': None})
+    return True
+
+def retry_delay(attempts, base_delay=None, max_delay=None):
+    """
+    Délai avant une nouvelle tentative : exponentiel, plafonné, avec une part aléatoire
+    pour que les tâches échouées ensemble ne soient pas relancées ensemble.
+
+    Args:
+        attempts (int): Nombre d'exécutions déjà faites
+        base_delay (float, optional): Délai après la première exécution (JOB_RETRY_BASE_DELAY)
+        max_delay (float, optional): Délai maximal (JOB_RETRY_MAX_DELAY)
+
+    Returns:
+        float: Délai en secondes
+    """
+    if base_delay is None:
+        base_delay = current_app.config.get('JOB_RETRY_BASE_DELAY', 10)
+    if max_delay is None:
+        max_delay = current_app.config.get('JOB_RETRY_MAX_DELAY', 3600)
+    delay = min(base_delay * 2 ** (max(attempts, 1) - 1), max_delay)
+    return delay * random.uniform(0.75, 1.25)
+
+def requeue_stale_jobs(timeout=None):
+    """
+    Remet en file les tâches réservées par un worker arrêté brutalement (dont la date
+    de réservation n'est plus rafraîchie), ou les marque en échec si elles ont atteint
+    leur nombre maximal d'exécutions.
+
+    Args:
+        timeout (float, optional): Délai sans signe de vie en secondes (JOB_STALE_TIMEOUT par défaut)
+
+    Returns:
+        int: Nombre de tâches reprises
+    """
+    if timeout is None:
+        timeout = current_app.config.get('JOB_STALE_TIMEOUT', 300)
+    now = datetime.utcnow()
+    table = Job.__table__
+    stale = db.and_(table.c.status == 'running', table.c.locked_at < now - timedelta(seconds=timeout))
+    with db.engine.begin() as connection:
+        failed = connection.execute(
+            table.update().where(stale, table.c.attempts >= table.c.max_attempts)
+            .values(status='failed', finished_at=now, locked_at=None, last_error='Worker arrêté pendant la tâche')
+        ).rowcount
+        requeued = connection.execute(
+            table.update().where(stale)
+            .values(status='queued', run_at=now, locked_by=None, locked_at=None)
+        ).rowcount
+    return failed + requeued
+
+def purge_jobs(retention=None):
+    """
+    Supprime les tâches réussies terminées depuis plus de retention secondes.
+
+    Args:
+        retention (float, optional): Durée de conservation en secondes (JOB_RETENTION par défaut)
+
+    Returns:
+        int: Nombre de tâches supprimées
+    """
+    if retention is None:
+        retention = current_app.config.get('JOB_RETENTION', 7 * 86400)
+    table = Job.__table__
+    with db.engine.begin() as connection:
+        return connection.execute(
+            table.delete().where(table.c.status == 'succeeded',
+                                 table.c.finished_at < datetime.utcnow() - timedelta(seconds=retention))
+        ).rowcount
+
+def retry_failed_jobs(name=None):
+    """
+    Remet en file les tâches en échec définitif, avec un nouveau nombre d'exécutions.
+
+    Args:
+        name (str, optional): Limite aux tâches de ce nom
+
+    Returns:
+        int: Nombre de tâches remises en file
+    """
+    query = Job.query.filter(Job.status == 'failed')
+    if name:
+        query = query.filter(Job.name == name)
+    count = query.update({'status': 'queued', 'attempts': 0, 'run_at': datetime.utcnow(),
+                          'locked_by': None, 'finished_at': None}, synchronize_session=False)
+    db.session.commit()
+    return count
+
+def get_job_counts():
+    """
+    Nombre de tâches par nom et par état.
+
+    Returns:
+        list: Tuples (nom, état, nombre), triés par nom puis état
+    """
+    return db.session.query(Job.name, Job.status, db.func.count()) \
+        .group_by(Job.name, Job.status).order_by(Job.name, Job.status).all()
+
+def get_queue_depths():
+    """
+    Nombre de tâches en attente et en cours par file, avec la plus ancienne date
+    d'exécution prévue (supervision).
+
+    Returns:
+        list: Tuples (file, état, nombre, date d'exécution prévue la plus ancienne)
+    """
+    return db.session.query(Job.queue, Job.status, db.func.count(), db.func.min(Job.run_at)) \
+        .filter(Job.status.in_(('queued', 'running'))).group_by(Job.queue, Job.status).all()
+
+def load_job_handlers():
+    """Importe les modules définissant des tâches (JOB_MODULES)."""
+    for module in JOB_MODULES:
+        importlib.import_module(module)
+
+class Worker:
+    """
+    Worker exécutant les tâches avec threads threads.
+
+    Chaque thread réserve et exécute une tâche à la fois ; sans tâche à exécuter, il
+    attend poll_interval secondes. Le thread principal rafraîchit la réservation des
+    tâches en cours, reprend celles des workers arrêtés brutalement et supprime les
+    anciennes tâches réussies. À l'arrêt (SIGTERM, SIGINT), les tâches en cours sont
+    terminées.
+    """
+
+    def __init__(self, app, threads=4, queues=None, poll_interval=1.0, burst=False):
+        self.app = app
+        self.threads = threads
+        self.queues = list(queues) if queues else None
+        self.poll_interval = poll_interval
+        self.burst = burst
+        self.worker_prefix = f'{socket.gethostname()}:{os.getpid()}'
+        self._stopping = threading.Event()
+
+    def run(self):
+        """Démarre les threads et assure la maintenance jusqu'à l'arrêt du worker."""
+        threads = [threading.Thread(target=self._work, args=(index,), name=f'job-worker-{index}')
+                   for index in range(self.threads)]
+        for thread in threads:
+            thread.start()
+
+        maintenance_interval = max(self.app.config.get('JOB_STALE_TIMEOUT', 300) / 4, 1)
+        next_maintenance = 0
+        while any(thread.is_alive() for thread in threads):
+            if time.monotonic() >= next_maintenance:
+                self._maintenance()
+                next_maintenance = time.monotonic() + maintenance_interval
+            alive = [thread for thread in threads if thread.is_alive()]
+            if alive:
+                alive[0].join(min(self.poll_interval, maintenance_interval))
+
+    def stop(self, *args):
+        """Demande l'arrêt du worker après les tâches en cours (utilisable comme gestionnaire de signal)."""
+        self._stopping.set()
+
+    def _work(self, index):
+        """Boucle d'un thread : réserve et exécute les tâches."""
+        worker_id = f'{self.worker_prefix}:{index}'
+        while not self._stopping.is_set():
+            try:
+                with self.app.app_context():
+                    job = claim_job(worker_id, self.queues)
+            except Exception:
+                self.app.logger.exception("Réservation d'une tâche impossible")
+                self._stopping.wait(self.poll_interval)
+                continue
+
+            if job is None:
+                if self.burst:
+                    break
+                self._stopping.wait(self.poll_interval)
+                continue
+            run_job(self.app, job)
+
+    def _maintenance(self):
+        """Signe de vie des tâches en cours, reprise des tâches abandonnées, purge."""
+        table = Job.__table__
+        try:
+            with self.app.app_context():
+                with db.engine.begin() as connection:
+                    connection.execute(
+                        table.update()
+                        .where(table.c.status == 'running', table.c.locked_by.like(f'{self.worker_prefix}:%'))
+                        .values(locked_at=datetime.utcnow())
+                    )
+                requeue_stale_jobs()
+                purge_jobs()
+        except Exception:
+            self.app.logger.exception("Maintenance de la file de tâches impossible")
+
+def run_workers(app, processes=1, threads=None, queues=None, burst=False):
+    """
+    Exécute les tâches jusqu'à SIGTERM ou SIGINT (ou jusqu'à épuisement de la file avec burst).
+
+    Avec plusieurs processus, chacun est issu d'un fork et exécute ses propres threads ;
+    un processus arrêté anormalement est relancé.
+
+    Args:
+        app (Flask): Application
+        processes (int, optional): Nombre de processus
+        threads (int, optional): Threads par processus (JOB_WORKER_THREADS par défaut)
+        queues (list, optional): Files traitées (toutes par défaut)
+        burst (bool, optional): S'arrête dès qu'il n'y a plus de tâche à exécuter
+    """
+    load_job_handlers()
+    options = {
+        'threads': threads or app.config.get('JOB_WORKER_THREADS', 4),
+        'queues': queues,
+        'poll_interval': app.config.get('JOB_POLL_INTERVAL', 1.0),
+        'burst': burst
+    }
+    if processes <= 1:
+        _run_worker_process(app, options)
+        return
+
+    with app.app_context():
+        # Les connexions ouvertes par le parent ne doivent pas être partagées avec les processus
+        db.engine.dispose()
+    context = multiprocessing.get_context('fork')
+    stopping = threading.Event()
+
+    def stop(signum, frame):
+        stopping.set()
+        for child in children:
+            if child.is_alive():
+                child.terminate()
+
+    def start():
+        child = context.Process(target=_run_worker_process, args=(app, options, True), name='job-worker')
+        child.start()
+        return child
+
+    children = [start() for index in range(processes)]
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    while children:
+        for child in list(children):
+            child.join(0.5)
+            if child.is_alive():
+                continue
+            if stopping.is_set() or burst or child.exitcode == 0:
+                children.remove(child)
+            else:
+                app.logger.error("Processus worker %s arrêté (code %s) : relancé", child.pid, child.exitcode)
+                children[children.index(child)] = start()
+
+def _run_worker_process(app, options, forked=False):
+    """Exécute un worker dans le processus courant, arrêté par SIGTERM ou SIGINT."""
+    if forked:
+        with app.app_context():
+            # Processus issu d'un fork : nouvelles connexions, sans fermer celles du parent
+            db.engine.dispose(close=False)
+    worker = Worker(app, **options)
+    signal.signal(signal.SIGTERM, worker.stop)
+    signal.signal(signal.SIGINT, worker.stop)
+    worker.run()
+
+def _record_result(app, job, values):
+    """Enregistre le résultat d'une tâche, si elle est toujours réservée par ce worker."""
+    table = Job.__table__
+    try:
+        with app.app_context():
+            with db.engine.begin() as connection:
+                connection.execute(
+                    table.update()
+                    .where(table.c.id == job['id'], table.c.status == 'running', table.c.locked_by == job['locked_by'])
+                    .values(values)
+                )
+    except Exception:
+        app.logger.exception("Enregistrement du résultat de la tâche %s impossible", job['id'])
+
+def _record_failure(app, job, error):
+    """Remet une tâche en file après un délai, ou la marque en échec définitif."""
+    if job['attempts'] >= job['max_attempts']:
+        values = {'status': 'failed', 'finished_at': datetime.utcnow()}
+    else:
+        with app.app_context():
+            delay = retry_delay(job['attempts'])
+        values = {'status': 'queued', 'run_at': datetime.utcnow() + timedelta(seconds=delay), 'locked_by': None}
+    values.update(locked_at=None, last_error=error)
+    _record_result(app, job, values)
+
+def _after_commit(session):
+    """Retient les tâches immédiates de la transaction validée."""
+    jobs = session.info.pop(_SESSION_SYNC_JOBS_KEY, None)
+    if jobs:
+        session.info.setdefault(_SESSION_COMMITTED_JOBS_KEY, []).extend(jobs)
+
+def _run_committed_jobs(session, transaction):
+    """Exécute les tâches immédiates une fois la transaction terminée (la session est de nouveau utilisable)."""
+    if transaction.parent is not None:
+        return
+    for handler, payload in session.info.pop(_SESSION_COMMITTED_JOBS_KEY, ()):
+        handler.function(**payload)
+
+def _discard_jobs(session, previous_transaction):
+    """Abandonne les tâches immédiates d'une transaction annulée."""
+    session.info.pop(_SESSION_SYNC_JOBS_KEY, None)
+
+event.listen(Session, 'after_commit', _after_commit)
+event.listen(Session, 'after_transaction_end', _run_committed_jobs)
+event.listen(Session, 'after_soft_rollback', _discard_jobs)
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Envoi des emails (notifications).
+Ce fichier met les emails en file (tâche 'mail.send') et les envoie depuis
+`flask worker` par le serveur SMTP configuré par MAIL_* : une requête ne dépend
+jamais de la disponibilité du serveur de messagerie, et un envoi échoué est retenté.
+"""
+
+import smtplib
+from email.message import EmailMessage
+
+from flask import current_app
+
+from app.services.job_queue import enqueue, job_handler
+
+def send_email(recipients, subject, body, html=None, commit=True):
+    """
+    Met un email en file d'envoi.
+
+    Args:
+        recipients (list): Adresses des destinataires
+        subject (str): Objet
+        body (str): Texte du message
+        html (str, optional): Version HTML du message
+        commit (bool, optional): Valide la session (False pour envoyer l'email
+            seulement si la transaction de l'appelant est validée)
+
+    Returns:
+        Job: La tâche d'envoi
+
+    Raises:
+        ValueError: Si aucun destinataire n'est indiqué
+    """
+    if isinstance(recipients, str):
+        recipients = [recipients]
+    if not recipients:
+        raise ValueError("Au moins un destinataire est requis")
+
+    return enqueue('mail.send', {'recipients': list(recipients), 'subject': subject, 'body': body, 'html': html},
+                   commit=commit)
+
+@job_handler('mail.send', queue='mail', max_attempts=8)
+def deliver_email(recipients, subject, body, html=None):
+    """
+    Tâche envoyant un email par le serveur SMTP (MAIL_SERVER, MAIL_PORT, MAIL_USE_TLS,
+    MAIL_USERNAME, MAIL_PASSWORD, MAIL_DEFAULT_SENDER).
+
+    Args:
+        recipients (list): Adresses des destinataires
+        subject (str): Objet
+        body (str): Texte du message
+        html (str, optional): Version HTML du message
+
+    Raises:
+        RuntimeError: Si MAIL_SERVER n'est pas configuré
+    """
+    config = current_app.config
+    if not config.get('MAIL_SERVER'):
+        raise RuntimeError("MAIL_SERVER n'est pas configuré : email non envoyé")
+
+    message = EmailMessage()
+    message['Subject'] = subject
+    message['From'] = config.get('MAIL_DEFAULT_SENDER') or config.get('MAIL_USERNAME')
+    message['To'] = ', '.join(recipients)
+    message.set_content(body)
+    if html:
+        message.add_alternative(html, subtype='html')
+
+    with smtplib.SMTP(config['MAIL_SERVER'], config.get('MAIL_PORT', 25), timeout=30) as smtp:
+        if config.get('MAIL_USE_TLS'):
+            smtp.starttls()
+        if config.get('MAIL_USERNAME'):
+            smtp.login(config['MAIL_USERNAME'], config.get('MAIL_PASSWORD') or '')
+        smtp.send_message(message)
@@ -0,0 +1,185 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Métriques de supervision au format Prometheus.
+Ce fichier définit les métriques de l'application (requêtes HTTP par blueprint,
+endpoint et code de statut, connexions du pool de la base, accès au cache des
+requêtes, profondeur de la file de tâches) et leur export pour /metrics.
+
+Sous gunicorn, chaque worker écrit ses valeurs dans des fichiers du dossier
+PROMETHEUS_MULTIPROC_DIR (prometheus_client en mode multiprocessus), cumulés à chaque
+lecture de /metrics : la variable doit être définie avant le démarrage de gunicorn, et
+le dossier vidé à chaque démarrage (voir gunicorn.conf.py).
+"""
+
+import os
+import time
+from datetime import datetime
+
+from flask import g, got_request_exception, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+)
+from prometheus_client.core import GaugeMetricFamily
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+
+from app import db
+
+# Bornes (secondes) des classes de durée des requêtes HTTP
+REQUEST_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+HTTP_REQUESTS = Counter(
+    'http_requests_total', 'Requêtes HTTP traitées',
+    ['method', 'blueprint', 'endpoint', 'status']
+)
+HTTP_REQUEST_DURATION = Histogram(
+    'http_request_duration_seconds', 'Durée de traitement des requêtes HTTP',
+    ['method', 'blueprint', 'endpoint', 'status'], buckets=REQUEST_LATENCY_BUCKETS
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    'http_requests_in_progress', 'Requêtes HTTP en cours de traitement',
+    multiprocess_mode='livesum'
+)
+HTTP_EXCEPTIONS = Counter(
+    'http_exceptions_total', 'Exceptions non gérées pendant le traitement des requêtes HTTP',
+    ['blueprint', 'endpoint', 'exception']
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    'db_pool_checked_out', 'Connexions du pool de la base en cours d\'utilisation',
+    ['bind'], multiprocess_mode='livesum'
+)
+DB_POOL_OVERFLOW = Gauge(
+    'db_pool_overflow', 'Connexions ouvertes au-delà de la taille du pool (max_overflow)',
+    ['bind'], multiprocess_mode='livesum'
+)
+DB_POOL_SIZE = Gauge(
+    'db_pool_size', 'Taille du pool de connexions de la base',
+    ['bind'], multiprocess_mode='livesum'
+)
+CACHE_REQUESTS = Counter(
+    'query_cache_requests_total', 'Lectures du cache des requêtes (hit, miss, ou bypass si la transaction a des écritures)',
+    ['namespace', 'result']
+)
+
+def init_metrics(app):
+    """
+    Active la mesure des requêtes HTTP et des connexions du pool de la base.
+
+    Args:
+        app (Flask): Application
+    """
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    app.teardown_request(_teardown_request)
+    got_request_exception.connect(_count_exception, app)
+
+    with app.app_context():
+        for bind, engine in db.engines.items():
+            bind = bind or 'default'
+            event.listen(engine, 'checkout', lambda *args, bind=bind, engine=engine: _update_pool(bind, engine.pool))
+            event.listen(engine, 'checkin', lambda *args, bind=bind, engine=engine: _update_pool(bind, engine.pool, 1))
+
+def record_cache_access(namespace, result):
+    """
+    Compte une lecture du cache des requêtes.
+
+    Args:
+        namespace (str): Espace de noms de l'entrée
+        result (str): 'hit', 'miss' ou 'bypass'
+    """
+    CACHE_REQUESTS.labels(namespace, result).inc()
+
+def render_metrics():
+    """
+    Métriques de l'application au format texte de Prometheus (valeurs de tous les
+    workers en mode multiprocessus).
+
+    Returns:
+        tuple: (Contenu, type MIME)
+    """
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+
+    # Profondeur de la file de tâches, lue en base à chaque collecte
+    queue_registry = CollectorRegistry()
+    queue_registry.register(JobQueueCollector())
+
+    return generate_latest(registry) + generate_latest(queue_registry), CONTENT_TYPE_LATEST
+
+class JobQueueCollector:
+    """Collecteur des tâches en attente et en cours par file (table jobs)."""
+
+    def collect(self):
+        """
+        Lit la profondeur de la file de tâches.
+
+        Yields:
+            GaugeMetricFamily: Tâches par file et par état, âge de la plus ancienne tâche à exécuter
+        """
+        from app.services.job_queue import get_queue_depths
+
+        jobs = GaugeMetricFamily('jobs', 'Tâches en attente ou en cours', labels=['queue', 'status'])
+        oldest = GaugeMetricFamily(
+            'jobs_oldest_queued_age_seconds', 'Attente de la plus ancienne tâche à exécuter', labels=['queue']
+        )
+        now = datetime.utcnow()
+        for queue, status, count, run_at in get_queue_depths():
+            jobs.add_metric([queue, status], count)
+            if status == 'queued':
+                oldest.add_metric([queue], max((now - run_at).total_seconds(), 0))
+        yield jobs
+        yield oldest
+
+# Fonctions utilitaires
+
+def _start_request():
+    """Début de la mesure de la requête HTTP."""
+    g.metrics_started = time.perf_counter()
+    HTTP_REQUESTS_IN_PROGRESS.inc()
+
+def _finish_request(response):
+    """Compte la requête HTTP et sa durée."""
+    labels = (request.method, request.blueprint or '', _endpoint_label(), str(response.status_code))
+    HTTP_REQUESTS.labels(*labels).inc()
+    started = g.get('metrics_started')
+    if started is not None:
+        HTTP_REQUEST_DURATION.labels(*labels).observe(time.perf_counter() - started)
+    return response
+
+def _teardown_request(exception):
+    """Fin de la mesure de la requête HTTP (même en cas d'erreur)."""
+    if g.pop('metrics_started', None) is not None:
+        HTTP_REQUESTS_IN_PROGRESS.dec()
+
+def _count_exception(sender, exception, **extra):
+    """Compte une exception non gérée (réponse 500)."""
+    HTTP_EXCEPTIONS.labels(request.blueprint or '', _endpoint_label(), type(exception).__name__).inc()
+
+def _endpoint_label():
+    """Endpoint de la requête ; 'none' pour une URL inconnue (404, 405), pour borner les valeurs."""
+    return request.url_rule.endpoint if request.url_rule is not None else 'none'
+
+def _update_pool(bind, pool, returning=0):
+    """
+    Met à jour les connexions du pool du processus (à la sortie ou au retour d'une connexion).
+
+    Args:
+        bind (str): Base de données
+        pool (Pool): Pool de connexions
+        returning (int, optional): 1 au retour d'une connexion, encore comptée par le pool
+    """
+    if not isinstance(pool, QueuePool):
+        return
+    checked_out = pool.checkedout() - returning
+    overflow = pool.overflow()
+    if returning and pool.checkedin() >= pool.size():
+        # Pool plein : la connexion rendue est fermée (connexion en dépassement)
+        overflow -= 1
+    DB_POOL_CHECKED_OUT.labels(bind).set(checked_out)
+    DB_POOL_OVERFLOW.labels(bind).set(max(overflow, 0))
+    DB_POOL_SIZE.labels(bind).set(pool.size())
@@ -0,0 +1,339 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Index n-grammes en mémoire.
+Ce fichier contient l'index trigrammes utilisé pour la recherche approximative des
+clients et des propriétaires lorsque la base de données n'offre pas pg_trgm (SQLite).
+L'index est construit en arrière-plan à la première recherche et tenu à jour par les
+écouteurs SQLAlchemy du processus ; les écritures des autres processus sont relues
+chaque seconde d'après la colonne updated_at, et l'index est reconstruit après
+NGRAM_INDEX_TTL secondes (suppressions faites par les autres processus).
+"""
+
+import re
+import threading
+import time
+import unicodedata
+from array import array
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from app import db
+from app.models.fuzzy_search import FUZZY_SEARCH_FIELDS, document_text
+
+# Durée (en secondes) après laquelle un index est reconstruit en arrière-plan
+NGRAM_INDEX_TTL = 300
+
+# Nombre de documents modifiés au-delà duquel l'index est reconstruit
+NGRAM_OVERLAY_LIMIT = 5000
+
+# Intervalle (en secondes) entre deux lectures des écritures des autres processus
+NGRAM_CHECK_INTERVAL = 1.0
+
+# Recouvrement (en secondes) de ces lectures : transactions validées après leur date de mise à jour
+NGRAM_UPDATE_OVERLAP = 60
+
+# Clé de session où sont accumulées les modifications avant le commit
+_SESSION_CHANGES_KEY = 'ngram_index_changes'
+
+_WORD_RE = re.compile(r'[a-z0-9]+')
+
+_indexes = {}
+_building = {}
+_indexes_lock = threading.Lock()
+
+def trigrams(text):
+    """
+    Trigrammes d'un texte, à la manière de pg_trgm : minuscules, accents retirés,
+    chaque mot complété de deux espaces au début et d'un espace à la fin.
+
+    Args:
+        text (str): Texte à découper
+
+    Returns:
+        set: Trigrammes du texte
+    """
+    text = (text or '').lower()
+    if not text.isascii():
+        text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('ascii')
+    result = set()
+    for word in _WORD_RE.findall(text):
+        padded = f'  {word} '
+        result.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return result
+
+class NgramIndex:
+    """
+    Index inversé trigramme -> identifiants pour un modèle.
+
+    Les listes de postings sont compactes (array) et reconstruites en bloc ; les
+    modifications intervenues depuis la construction sont conservées à part
+    (identifiants retirés et trigrammes des documents modifiés).
+    """
+
+    def __init__(self, model, rows, watermark=None):
+        """
+        Construit l'index.
+
+        Args:
+            model: Client ou Owner
+            rows (iterable): Couples (identifiant, texte du document)
+            watermark (datetime, optional): Date de mise à jour la plus récente des documents lus
+        """
+        self.model = model
+        self.built_at = time.monotonic()
+        self.checked_at = self.built_at
+        self.watermark = watermark or datetime.utcnow()
+        self.catching_up = False
+        self._lock = threading.Lock()
+        self._removed = set()
+        self._overlay = {}
+
+        postings = defaultdict(lambda: array('l'))
+        for row_id, text in rows:
+            for gram in trigrams(text):
+                postings[gram].append(row_id)
+        self._postings = dict(postings)
+
+    def update(self, row_id, text):
+        """
+        Met à jour (ou supprime si text vaut None) un document.
+
+        Args:
+            row_id (int): Identifiant de l'objet
+            text (str): Nouveau texte du document, None pour une suppression
+        """
+        with self._lock:
+            self._removed.add(row_id)
+            if text is None:
+                self._overlay.pop(row_id, None)
+            else:
+                self._overlay[row_id] = trigrams(text)
+
+    @property
+    def overlay_size(self):
+        """Nombre de documents modifiés depuis la construction."""
+        return len(self._removed)
+
+    def search(self, text, threshold, limit):
+        """
+        Recherche les documents proches d'un texte.
+
+        Le score est la part des trigrammes de la recherche présents dans le document
+        (équivalent simplifié de word_similarity de pg_trgm), ce qui tolère les fautes
+        de frappe et les saisies partielles.
+
+        Args:
+            text (str): Texte recherché
+            threshold (float): Score minimal (entre 0 et 1)
+            limit (int): Nombre maximal de résultats (None : tous)
+
+        Returns:
+            list: Couples (identifiant, score) triés par score décroissant
+        """
+        query_grams = trigrams(text)
+        if not query_grams:
+            return []
+
+        counts = Counter()
+        for gram in query_grams:
+            posting = self._postings.get(gram)
+            if posting is not None:
+                counts.update(posting)
+
+        with self._lock:
+            for row_id in self._removed:
+                counts.pop(row_id, None)
+            for row_id, grams in self._overlay.items():
+                shared = len(query_grams & grams)
+                if shared:
+                    counts[row_id] = shared
+
+        size = len(query_grams)
+        minimum = threshold * size
+        matches = [(row_id, count / size) for row_id, count in counts.items() if count >= minimum]
+        matches.sort(key=lambda match: (-match[1], match[0]))
+        return matches[:limit]
+
+def search_ngram_index(model, text, threshold, limit):
+    """
+    Recherche approximative dans l'index en mémoire d'un modèle.
+
+    À la première recherche, l'index est construit en arrière-plan et la fonction
+    retourne None : l'appelant doit alors se rabattre sur une recherche simple.
+
+    Args:
+        model: Client ou Owner
+        text (str): Texte recherché
+        threshold (float): Score minimal (entre 0 et 1)
+        limit (int): Nombre maximal de résultats (None : tous)
+
+    Returns:
+        list: Couples (identifiant, score) triés par score décroissant, ou None si l'index n'est pas prêt
+    """
+    index = _indexes.get(model)
+    if index is None:
+        _build_in_background(model)
+        return None
+    now = time.monotonic()
+    if now - index.built_at > NGRAM_INDEX_TTL or index.overlay_size > NGRAM_OVERLAY_LIMIT:
+        _build_in_background(model)
+    elif now - index.checked_at >= NGRAM_CHECK_INTERVAL:
+        _catch_up_in_background(index)
+
+    return index.search(text, threshold, limit)
+
+def build_ngram_index(model):
+    """
+    Construit l'index en mémoire d'un modèle à partir de la base de données.
+
+    Args:
+        model: Client ou Owner
+
+    Returns:
+        NgramIndex: Index construit
+    """
+    # Lue avant les documents : les écritures concurrentes seront relues par _catch_up_in_background
+    watermark = db.session.query(db.func.max(model.updated_at)).scalar()
+    columns = [getattr(model, field) for field in FUZZY_SEARCH_FIELDS[model]]
+    rows = db.session.query(model.id, *columns).yield_per(10000)
+    return NgramIndex(model, ((row[0], ' '.join(value or '' for value in row[1:])) for row in rows), watermark)
+
+def apply_ngram_changes(changes):
+    """
+    Applique aux index en mémoire des modifications validées.
+
+    Args:
+        changes (list): Triplets (modèle, identifiant, texte du document ou None si supprimé)
+    """
+    with _indexes_lock:
+        for model, row_id, text in changes:
+            if model in _building:
+                _building[model].append((row_id, text))
+            index = _indexes.get(model)
+            if index is not None:
+                index.update(row_id, text)
+
+def reset_ngram_indexes():
+    """Supprime les index en mémoire (ils seront reconstruits à la prochaine recherche)."""
+    with _indexes_lock:
+        _indexes.clear()
+
+# Fonctions utilitaires
+
+def _build_in_background(model):
+    """
+    Construit (ou reconstruit) l'index d'un modèle dans un thread, l'index courant
+    restant utilisé en attendant. Les modifications validées pendant la construction
+    sont appliquées au nouvel index avant son installation.
+
+    Args:
+        model: Client ou Owner
+    """
+    with _indexes_lock:
+        if model in _building:
+            return
+        _building[model] = []
+
+    app = current_app._get_current_object()
+
+    def build():
+        index = None
+        with app.app_context():
+            try:
+                index = build_ngram_index(model)
+            finally:
+                db.session.remove()
+                with _indexes_lock:
+                    pending = _building.pop(model)
+                    if index is not None:
+                        for row_id, text in pending:
+                            index.update(row_id, text)
+                        _indexes[model] = index
+
+    threading.Thread(target=build, name='ngram-index-build', daemon=True).start()
+
+def _catch_up_in_background(index):
+    """
+    Relit dans un thread les documents modifiés depuis la dernière lecture (écritures
+    des autres processus, validées après la construction de l'index) et les applique
+    à l'index.
+
+    Args:
+        index (NgramIndex): Index courant du modèle
+    """
+    model = index.model
+    with _indexes_lock:
+        if model in _building or index.catching_up:
+            return
+        index.catching_up = True
+        index.checked_at = time.monotonic()
+
+    app = current_app._get_current_object()
+
+    def catch_up():
+        with app.app_context():
+            try:
+                columns = [getattr(model, field) for field in FUZZY_SEARCH_FIELDS[model]]
+                rows = db.session.query(model.id, model.updated_at, *columns).filter(
+                    model.updated_at >= index.watermark - timedelta(seconds=NGRAM_UPDATE_OVERLAP)
+                )
+                for row in rows.yield_per(10000):
+                    index.update(row[0], ' '.join(value or '' for value in row[2:]))
+                    if row[1] is not None and row[1] > index.watermark:
+                        index.watermark = row[1]
+            except Exception:
+                app.logger.exception("Échec de la mise à jour de l'index n-grammes de %s", model.__name__)
+            finally:
+                db.session.remove()
+                index.catching_up = False
+
+    threading.Thread(target=catch_up, name='ngram-index-catch-up', daemon=True).start()
+
+def _record_change(target, text):
+    """
+    Mémorise la modification d'un document jusqu'au commit de la session.
+
+    Args:
+        target: Instance de Client ou Owner
+        text (str): Nouveau texte du document, None pour une suppression
+    """
+    session = object_session(target)
+    if session is None or (type(target) not in _indexes and type(target) not in _building):
+        return
+    session.info.setdefault(_SESSION_CHANGES_KEY, []).append((type(target), target.id, text))
+
+def _after_insert(mapper, connection, target):
+    """Indexe un nouvel objet."""
+    _record_change(target, document_text(target))
+
+def _after_update(mapper, connection, target):
+    """Réindexe un objet modifié."""
+    _record_change(target, document_text(target))
+
+def _after_delete(mapper, connection, target):
+    """Retire un objet supprimé de l'index."""
+    _record_change(target, None)
+
+def _after_commit(session):
+    """Applique aux index les modifications validées."""
+    changes = session.info.pop(_SESSION_CHANGES_KEY, None)
+    if changes:
+        apply_ngram_changes(changes)
+
+def _discard_changes(session, previous_transaction):
+    """Abandonne les modifications d'une transaction annulée."""
+    session.info.pop(_SESSION_CHANGES_KEY, None)
+
+for _model in FUZZY_SEARCH_FIELDS:
+    event.listen(_model, 'after_insert', _after_insert)
+    event.listen(_model, 'after_update', _after_update)
+    event.listen(_model, 'after_delete', _after_delete)
+
+event.listen(Session, 'after_commit', _after_commit)
+event.listen(Session, 'after_soft_rollback', _discard_changes)
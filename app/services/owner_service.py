@@ -8,7 +8,17 @@ Ce fichier contient les fonctions métier liées aux propriétaires de biens imm
 
 from datetime import datetime
 from app import db
-from app.models.__init__1 import Owner
+from app.models.__init__1 import Owner, Property
+from app.services.pagination import resolve_sort, apply_sort, paginate_keyset
+from app.services.search_service import apply_fuzzy_search
+from app.services.query_cache import cached, entity_tags
+
+# Clés de tri autorisées pour la liste des propriétaires
+OWNER_SORT_COLUMNS = {
+    'created_at': Owner.created_at,
+    'last_name': Owner.last_name,
+    'id': Owner.id
+}
 
 def get_owner_by_id(owner_id):
     """
@@ -22,31 +32,62 @@ def get_owner_by_id(owner_id):
     """
     return Owner.query.get(owner_id)
 
-def get_all_owners(page=1, per_page=10, search=None):
+def get_owner_validators(owner_id):
+    """
+    Récupère, sans charger le propriétaire, les valeurs dont dépend sa fiche détaillée
+    (validateurs des requêtes conditionnelles).
+    
+    Args:
+        owner_id (int): ID du propriétaire
+        
+    Returns:
+        tuple: (Date de mise à jour, nombre de biens) ou None si le propriétaire n'existe pas
+    """
+    properties_count = db.select(db.func.count(Property.id)).where(Property.owner_id == Owner.id).scalar_subquery()
+    return db.session.query(Owner.updated_at, properties_count).filter(Owner.id == owner_id).first()
+
+def get_all_owners(page=1, per_page=10, search=None, cursor=None, sort=None):
     """
     Récupère tous les propriétaires avec pagination et recherche optionnelle.
     
+    Si un curseur est fourni (chaîne vide pour la première page), la pagination
+    se fait par curseur : ni OFFSET ni COUNT(*) ne sont exécutés.
+    
     Args:
         page (int, optional): Numéro de page
         per_page (int, optional): Nombre d'éléments par page
         search (str, optional): Terme de recherche pour filtrer les propriétaires
+        cursor (str, optional): Curseur de pagination (active le mode curseur)
+        sort (str, optional): Clé de tri ('created_at', 'last_name', 'id'), préfixée par '-' pour un tri décroissant.
+            Avec une recherche, les résultats sont classés par similarité sauf si un tri est demandé
+            ('relevance' explicite accepté, hors mode curseur)
         
     Returns:
-        tuple: (Liste des propriétaires, nombre total de pages, nombre total d'éléments)
+        tuple: (Liste des propriétaires, nombre total de pages, nombre total d'éléments),
+            ou (Liste des propriétaires, curseur suivant, curseur précédent) en mode curseur
+        
+    Raises:
+        ValueError: Si le tri ou le curseur est invalide
     """
     query = Owner.query
+    rank = None
     
-    # Application du filtre de recherche si fourni
+    # Application du filtre de recherche si fourni (recherche approximative, tolérante aux fautes de frappe)
     if search:
-        search_term = f"%{search}%"
-        query = query.filter(
-            db.or_(
-                Owner.first_name.ilike(search_term),
-                Owner.last_name.ilike(search_term),
-                Owner.email.ilike(search_term),
-                Owner.company_name.ilike(search_term)
-            )
-        )
+        query, rank = apply_fuzzy_search(query, Owner, search)
+    
+    relevance = sort is not None and sort.lstrip('-') == 'relevance'
+    
+    if cursor is not None:
+        if relevance:
+            raise ValueError("Le tri par pertinence n'est pas disponible en pagination par curseur")
+        sort, spec = resolve_sort(sort, OWNER_SORT_COLUMNS, '-created_at', Owner.id)
+        return paginate_keyset(query, sort, spec, cursor, per_page)
+    
+    if rank is not None and (not sort or relevance):
+        query = query.order_by(rank.desc(), Owner.id.desc())
+    elif sort:
+        query = apply_sort(query, resolve_sort(sort, OWNER_SORT_COLUMNS, '-created_at', Owner.id)[1])
     
     # Pagination
     pagination = query.paginate(page=page, per_page=per_page, error_out=False)
@@ -159,6 +200,8 @@ def delete_owner(owner_id):
     
     return True
 
+@cached('owners.properties', tags=lambda result, arguments: [
+    f"owners:{arguments['owner_id']}", 'amenities'] + entity_tags(result[0]))
 def get_owner_properties(owner_id, page=1, per_page=10):
     """
     Récupère les biens immobiliers d'un propriétaire.
@@ -0,0 +1,295 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Pagination par curseur (keyset pagination).
+Ce fichier contient les fonctions utilitaires permettant de paginer une requête
+sans OFFSET ni COUNT(*), en reprenant la lecture après la dernière ligne vue.
+"""
+
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from app import db
+
+def resolve_sort(sort, columns, default, tiebreaker):
+    """
+    Convertit un paramètre de tri en spécification de tri exploitable.
+
+    Args:
+        sort (str): Clé de tri demandée, préfixée par '-' pour un tri décroissant (ex: '-price')
+        columns (dict): Clés de tri autorisées et colonnes correspondantes
+        default (str): Clé de tri utilisée si aucune n'est fournie
+        tiebreaker: Colonne unique servant à départager les égalités (généralement l'ID)
+
+    Returns:
+        tuple: (Clé de tri normalisée, liste de tuples (colonne, décroissant))
+
+    Raises:
+        ValueError: Si la clé de tri n'est pas autorisée
+    """
+    sort = sort or default
+    descending = sort.startswith('-')
+    key = sort.lstrip('-')
+    if key not in columns:
+        raise ValueError(f"Tri non supporté: '{key}'. Valeurs possibles: {', '.join(sorted(columns))}")
+
+    spec = [(columns[key], descending)]
+    # Le départage par ID garantit un ordre total et donc des pages stables
+    if columns[key] is not tiebreaker:
+        spec.append((tiebreaker, descending))
+
+    return sort, spec
+
+def apply_sort(query, spec):
+    """
+    Applique une spécification de tri à une requête (NULL toujours en dernier).
+
+    Args:
+        query (Query): Requête SQLAlchemy
+        spec (list): Spécification retournée par resolve_sort
+
+    Returns:
+        Query: La requête triée
+    """
+    return query.order_by(*_order_clauses(spec, reverse=False))
+
+def paginate_keyset(query, sort, spec, cursor=None, per_page=10):
+    """
+    Pagine une requête par curseur.
+
+    Args:
+        query (Query): Requête SQLAlchemy filtrée mais non triée
+        sort (str): Clé de tri normalisée (stockée dans le curseur)
+        spec (list): Spécification retournée par resolve_sort
+        cursor (str, optional): Curseur opaque reçu du client ; vide ou None pour la première page
+        per_page (int, optional): Nombre d'éléments par page
+
+    Returns:
+        tuple: (Liste des éléments, curseur suivant ou None, curseur précédent ou None)
+
+    Raises:
+        ValueError: Si le curseur est invalide ou ne correspond pas au tri demandé
+    """
+    direction = 'next'
+    values = None
+    if cursor:
+        direction, values = decode_cursor(cursor, sort, spec)
+
+    reverse = direction == 'prev'
+    if values is not None:
+        query = query.filter(_seek_condition(spec, values, reverse))
+
+    # Une ligne de plus que nécessaire pour savoir s'il existe une page suivante
+    items = query.order_by(*_order_clauses(spec, reverse)).limit(per_page + 1).all()
+    has_more = len(items) > per_page
+    items = items[:per_page]
+    if reverse:
+        items.reverse()
+
+    if not items:
+        return [], None, None
+
+    if reverse:
+        next_cursor = encode_cursor(sort, 'next', _row_values(items[-1], spec))
+        prev_cursor = encode_cursor(sort, 'prev', _row_values(items[0], spec)) if has_more else None
+    else:
+        next_cursor = encode_cursor(sort, 'next', _row_values(items[-1], spec)) if has_more else None
+        prev_cursor = encode_cursor(sort, 'prev', _row_values(items[0], spec)) if values is not None else None
+
+    return items, next_cursor, prev_cursor
+
+def encode_cursor(sort, direction, values):
+    """
+    Encode la position d'une ligne dans un curseur opaque.
+
+    Args:
+        sort (str): Clé de tri normalisée
+        direction (str): Sens de lecture ('next' ou 'prev')
+        values (list): Valeurs des colonnes de tri pour la ligne de référence
+
+    Returns:
+        str: Curseur encodé en base64 (URL-safe, sans remplissage)
+    """
+    payload = {
+        's': sort,
+        'd': direction,
+        'v': [_serialize_value(value) for value in values]
+    }
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor, sort, spec):
+    """
+    Décode un curseur opaque.
+
+    Args:
+        cursor (str): Curseur reçu du client
+        sort (str): Clé de tri normalisée attendue
+        spec (list): Spécification de tri (pour typer les valeurs)
+
+    Returns:
+        tuple: (Sens de lecture, liste des valeurs des colonnes de tri)
+
+    Raises:
+        ValueError: Si le curseur est invalide ou ne correspond pas au tri demandé
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        payload = json.loads(raw.decode('utf-8'))
+        direction = payload['d']
+        raw_values = payload['v']
+        cursor_sort = payload['s']
+    except (binascii.Error, UnicodeDecodeError, ValueError, KeyError, TypeError):
+        raise ValueError("Curseur de pagination invalide")
+
+    if cursor_sort != sort:
+        raise ValueError("Le curseur de pagination ne correspond pas au tri demandé")
+    if direction not in ('next', 'prev') or not isinstance(raw_values, list) or len(raw_values) != len(spec):
+        raise ValueError("Curseur de pagination invalide")
+
+    try:
+        values = [_deserialize_value(value, column) for value, (column, _) in zip(raw_values, spec)]
+    except (ValueError, ArithmeticError, TypeError):
+        raise ValueError("Curseur de pagination invalide")
+
+    return direction, values
+
+# Fonctions utilitaires
+
+def _order_clauses(spec, reverse):
+    """
+    Construit les clauses ORDER BY d'une spécification de tri.
+
+    Args:
+        spec (list): Spécification de tri
+        reverse (bool): Inverse l'ordre (lecture vers la page précédente)
+
+    Returns:
+        list: Clauses ORDER BY
+    """
+    clauses = []
+    for column, descending in spec:
+        if descending != reverse:
+            clause = column.desc()
+        else:
+            clause = column.asc()
+        # NULL en dernier dans l'ordre normal, donc en premier dans l'ordre inversé
+        clauses.append(clause.nullsfirst() if reverse else clause.nullslast())
+    return clauses
+
+def _seek_condition(spec, values, reverse):
+    """
+    Construit le prédicat « strictement après » (ou « avant ») une ligne de référence.
+
+    Pour un tri (a, id), le prédicat vaut : a > :a OR (a = :a AND id > :id),
+    en tenant compte du sens de tri de chaque colonne et des valeurs NULL.
+
+    Args:
+        spec (list): Spécification de tri
+        values (list): Valeurs des colonnes de tri de la ligne de référence
+        reverse (bool): Construit le prédicat « strictement avant »
+
+    Returns:
+        ClauseElement: Prédicat SQL
+    """
+    branches = []
+    equalities = []
+    for (column, descending), value in zip(spec, values):
+        beyond = _beyond(column, descending, value, reverse)
+        if beyond is not None:
+            branches.append(db.and_(*equalities, beyond))
+        equalities.append(column.is_(None) if value is None else column == value)
+
+    if not branches:
+        return db.false()
+    return db.or_(*branches)
+
+def _beyond(column, descending, value, reverse):
+    """
+    Prédicat « strictement au-delà de value » pour une seule colonne.
+
+    Args:
+        column: Colonne triée
+        descending (bool): Sens de tri de la colonne
+        value: Valeur de référence
+        reverse (bool): Lecture vers la page précédente
+
+    Returns:
+        ClauseElement: Prédicat SQL ou None si aucune ligne ne peut suivre
+    """
+    nullable = _is_nullable(column)
+    if value is None:
+        # Les NULL sont en fin de tri : rien ne les suit, tout le non-NULL les précède
+        return column.isnot(None) if reverse else None
+
+    comparison = column < value if descending != reverse else column > value
+    if nullable and not reverse:
+        return db.or_(comparison, column.is_(None))
+    return comparison
+
+def _is_nullable(column):
+    """
+    Indique si une colonne mappée accepte les valeurs NULL.
+
+    Args:
+        column: Attribut instrumenté du modèle
+
+    Returns:
+        bool: True si la colonne accepte NULL
+    """
+    return any(col.nullable for col in column.property.columns)
+
+def _row_values(item, spec):
+    """
+    Extrait les valeurs des colonnes de tri d'un objet.
+
+    Args:
+        item: Instance du modèle
+        spec (list): Spécification de tri
+
+    Returns:
+        list: Valeurs des colonnes de tri
+    """
+    return [getattr(item, column.key) for column, _ in spec]
+
+def _serialize_value(value):
+    """
+    Convertit une valeur de colonne en valeur JSON.
+
+    Args:
+        value: Valeur de la colonne
+
+    Returns:
+        Valeur sérialisable en JSON
+    """
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+def _deserialize_value(value, column):
+    """
+    Reconvertit une valeur JSON dans le type Python de la colonne.
+
+    Args:
+        value: Valeur issue du curseur
+        column: Colonne de tri correspondante
+
+    Returns:
+        Valeur typée
+    """
+    if value is None:
+        return None
+    python_type = column.type.python_type
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type is date:
+        return date.fromisoformat(value)
+    if python_type is Decimal:
+        return Decimal(str(value))
+    return python_type(value)
@@ -0,0 +1,489 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Profilage à la demande des workers.
+Ce fichier permet à un administrateur de profiler, dans tous les workers de la machine :
+les N prochaines requêtes d'un endpoint (cProfile, résultat pstats), l'activité pendant
+T secondes (échantillonnage des piles des threads, résultat au format « collapsed » des
+flamegraphs) ou l'évolution de la mémoire pendant T secondes (différence de deux
+instantanés tracemalloc). Les sessions et leurs résultats sont partagés par les workers
+dans PROFILING_DIR. Rien n'est installé si PROFILING_ENABLED n'est pas activé.
+"""
+
+import contextlib
+import cProfile
+import io
+import logging
+import marshal
+import os
+import pstats
+import shutil
+import sqlite3
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter
+from datetime import datetime
+
+from flask import current_app, g, request
+
+from app.utils import process_singleton
+
+logger = logging.getLogger(__name__)
+
+# Clé de l'agent dans app.extensions
+_EXTENSION_KEY = 'profiling_agent'
+
+# Modes de profilage et formats de leurs résultats (le premier est le format par défaut)
+PROFILING_FORMATS = {
+    'requests': ('pstats', 'raw'),
+    'sampling': ('collapsed',),
+    'memory': ('text',)
+}
+
+# Nombre de lignes des résultats textuels (fonctions pstats, lignes de code tracemalloc)
+PROFILING_RESULT_LINES = 100
+
+# Conservation des sessions terminées et de leurs résultats (secondes)
+PROFILING_RETENTION = 86400
+
+_SESSION_COLUMNS = ('id', 'mode', 'endpoint', 'count', 'claimed', 'completed', 'created_at', 'expires_at', 'created_by')
+
+class ProfilingAgent:
+    """
+    Agent de profilage d'un processus.
+
+    Un thread lit toutes les poll_interval secondes les sessions en cours : il publie les
+    endpoints dont les requêtes sont à profiler (consultés par les requêtes sans accès au
+    disque) et démarre un thread pour chaque session d'échantillonnage ou de mémoire.
+    """
+
+    def __init__(self, directory, poll_interval=1.0, sample_interval=0.01):
+        """
+        Démarre l'agent.
+
+        Args:
+            directory (str): Dossier des sessions et des résultats
+            poll_interval (float, optional): Délai (secondes) entre deux lectures des sessions
+            sample_interval (float, optional): Délai (secondes) entre deux échantillons des piles
+        """
+        self.directory = directory
+        self.poll_interval = poll_interval
+        self.sample_interval = sample_interval
+        self.pid = os.getpid()
+        self.request_sessions = {}  # endpoint -> ID de session
+        self._started_sessions = set()
+        self._local = threading.local()
+        self._thread = threading.Thread(target=self._run, name='profiling-agent', daemon=True)
+        self._thread.start()
+
+    def claim(self, session_id):
+        """
+        Réserve le profilage d'une requête dans une session (au plus count requêtes,
+        tous workers confondus).
+
+        Args:
+            session_id (str): ID de la session
+
+        Returns:
+            bool: True si la requête doit être profilée
+        """
+        connection = self._connection()
+        with connection:
+            claimed = connection.execute(
+                'UPDATE profiling_sessions SET claimed = claimed + 1 '
+                'WHERE id = ? AND claimed < count AND expires_at > ?', (session_id, time.time())
+            ).rowcount
+        return bool(claimed)
+
+    def save_request_profile(self, session_id, profile):
+        """
+        Enregistre le profil d'une requête.
+
+        Args:
+            session_id (str): ID de la session
+            profile (cProfile.Profile): Profil arrêté
+        """
+        profile.create_stats()
+        self._save_result(session_id, 'prof', marshal.dumps(profile.stats))
+
+    def _run(self):
+        """Boucle du thread : lecture des sessions en cours."""
+        while True:
+            try:
+                self._poll()
+            except Exception:
+                logger.warning("Lecture des sessions de profilage impossible", exc_info=True)
+            time.sleep(self.poll_interval)
+
+    def _poll(self):
+        """Publie les sessions de requêtes et démarre les sessions d'échantillonnage ou de mémoire."""
+        rows = self._connection().execute(
+            'SELECT id, mode, endpoint, count, claimed, expires_at FROM profiling_sessions WHERE expires_at > ?',
+            (time.time(),)
+        ).fetchall()
+
+        self.request_sessions = {
+            endpoint: session_id for session_id, mode, endpoint, count, claimed, expires_at in rows
+            if mode == 'requests' and claimed < count
+        }
+        for session_id, mode, endpoint, count, claimed, expires_at in rows:
+            if mode != 'requests' and session_id not in self._started_sessions:
+                self._started_sessions.add(session_id)
+                target = self._sample if mode == 'sampling' else self._trace_memory
+                threading.Thread(target=target, args=(session_id, expires_at),
+                                 name=f'profiling-{mode}', daemon=True).start()
+
+    def _sample(self, session_id, expires_at):
+        """
+        Échantillonne les piles des threads du processus jusqu'à expires_at.
+
+        Args:
+            session_id (str): ID de la session
+            expires_at (float): Fin de la session (time.time())
+        """
+        excluded = {threading.get_ident(), self._thread.ident}
+        stacks = Counter()
+        names = {}
+        names_refreshed = 0
+        while time.time() < expires_at:
+            if time.monotonic() - names_refreshed >= 1:
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+                names_refreshed = time.monotonic()
+            frames = sys._current_frames()
+            for ident, frame in frames.items():
+                if ident not in excluded:
+                    stacks[_collapse_stack(frame, names.get(ident, 'thread'))] += 1
+            # Pas de référence conservée vers les frames jusqu'à l'échantillon suivant
+            del frames
+            time.sleep(self.sample_interval)
+
+        lines = ''.join(f'{stack} {count}\n' for stack, count in stacks.items())
+        self._save_result(session_id, 'collapsed', lines.encode('utf-8'))
+
+    def _trace_memory(self, session_id, expires_at):
+        """
+        Compare deux instantanés tracemalloc pris au début de la session et à expires_at.
+
+        Args:
+            session_id (str): ID de la session
+            expires_at (float): Fin de la session (time.time())
+        """
+        started = not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start()
+        try:
+            before = tracemalloc.take_snapshot()
+            time.sleep(max(expires_at - time.time(), 0))
+            after = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+        finally:
+            if started:
+                tracemalloc.stop()
+
+        filters = [tracemalloc.Filter(False, tracemalloc.__file__)]
+        differences = after.filter_traces(filters).compare_to(before.filter_traces(filters), 'lineno')
+        lines = [f'# worker {self.pid} : {current} octets suivis à la fin de la session, pic {peak}']
+        lines += [str(difference) for difference in differences[:PROFILING_RESULT_LINES]]
+        self._save_result(session_id, 'txt', ('\n'.join(lines) + '\n').encode('utf-8'))
+
+    def _save_result(self, session_id, extension, content):
+        """Écrit un résultat du processus (sauf si la session a été supprimée entre-temps)."""
+        connection = self._connection()
+        with connection:
+            if not connection.execute(
+                'UPDATE profiling_sessions SET completed = completed + 1 WHERE id = ?', (session_id,)
+            ).rowcount:
+                return
+        directory = os.path.join(self.directory, session_id)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'{self.pid}-{threading.get_ident()}-{time.time_ns()}.{extension}')
+        with open(path + '.tmp', 'wb') as result_file:
+            result_file.write(content)
+        os.replace(path + '.tmp', path)
+
+    def _connection(self):
+        """Connexion SQLite du thread courant (créée au premier usage)."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = _connect(self.directory)
+            self._local.connection = connection
+        return connection
+
+def init_profiling(app):
+    """
+    Active le profilage à la demande si PROFILING_ENABLED est activé (sinon, rien n'est installé).
+
+    Args:
+        app (Flask): Application
+    """
+    if not app.config.get('PROFILING_ENABLED'):
+        return
+    app.before_request(_start_request)
+    app.teardown_request(_teardown_request)
+
+def get_profiling_agent():
+    """
+    Agent de profilage de l'application courante, démarré au premier usage dans
+    chaque processus (les workers issus d'un fork démarrent le leur).
+
+    Returns:
+        ProfilingAgent: Agent du processus
+    """
+    app = current_app._get_current_object()
+    return process_singleton(app, _EXTENSION_KEY, lambda: ProfilingAgent(
+        app.config['PROFILING_DIR'],
+        sample_interval=app.config.get('PROFILING_SAMPLE_INTERVAL', 0.01)
+    ))
+
+def create_profiling_session(mode, endpoint=None, count=None, duration=None, created_by=None):
+    """
+    Crée une session de profilage, prise en compte par chaque worker dans la seconde.
+
+    Args:
+        mode (str): 'requests' (cProfile des count prochaines requêtes de endpoint),
+            'sampling' (échantillonnage des piles) ou 'memory' (différence tracemalloc)
+        endpoint (str, optional): Endpoint Flask à profiler (mode 'requests', ex: transactions.get_transactions)
+        count (int, optional): Nombre de requêtes à profiler (mode 'requests', 10 par défaut)
+        duration (float, optional): Durée en secondes (durée maximale d'attente des requêtes en mode 'requests')
+        created_by (int, optional): ID de l'administrateur
+
+    Returns:
+        dict: La session créée
+
+    Raises:
+        ValueError: Si le mode, l'endpoint, le nombre de requêtes ou la durée est invalide
+    """
+    config = current_app.config
+    max_duration = config.get('PROFILING_MAX_DURATION', 300)
+    if mode not in PROFILING_FORMATS:
+        raise ValueError(f"Mode de profilage inconnu : '{mode}' (valeurs possibles : {', '.join(PROFILING_FORMATS)})")
+
+    if mode == 'requests':
+        if endpoint not in current_app.view_functions:
+            raise ValueError(f"Endpoint inconnu : '{endpoint}'")
+        count = int(count or 10)
+        if not 1 <= count <= config.get('PROFILING_MAX_REQUESTS', 100):
+            raise ValueError(f"Le nombre de requêtes doit être compris entre 1 et {config.get('PROFILING_MAX_REQUESTS', 100)}")
+        duration = float(duration or max_duration)
+    else:
+        endpoint, count = None, 0
+        duration = float(duration or 10)
+    if not 0 < duration <= max_duration:
+        raise ValueError(f"La durée doit être comprise entre 0 et {max_duration} secondes")
+
+    now = time.time()
+    session = {
+        'id': uuid.uuid4().hex, 'mode': mode, 'endpoint': endpoint, 'count': count, 'claimed': 0, 'completed': 0,
+        'created_at': now, 'expires_at': now + duration, 'created_by': created_by
+    }
+    directory = config['PROFILING_DIR']
+    with contextlib.closing(_connect(directory)) as connection:
+        with connection:
+            _purge_sessions(connection, directory, now)
+            connection.execute(
+                f"INSERT INTO profiling_sessions ({', '.join(_SESSION_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(_SESSION_COLUMNS))})",
+                [session[column] for column in _SESSION_COLUMNS]
+            )
+    return _session_dict(session)
+
+def get_profiling_sessions():
+    """
+    Liste les sessions de profilage conservées.
+
+    Returns:
+        list: Sessions, de la plus récente à la plus ancienne
+    """
+    with contextlib.closing(_connect(current_app.config['PROFILING_DIR'])) as connection:
+        rows = connection.execute(
+            f"SELECT {', '.join(_SESSION_COLUMNS)} FROM profiling_sessions ORDER BY created_at DESC"
+        ).fetchall()
+    return [_session_dict(dict(zip(_SESSION_COLUMNS, row))) for row in rows]
+
+def get_profiling_session(session_id):
+    """
+    Récupère une session de profilage.
+
+    Args:
+        session_id (str): ID de la session
+
+    Returns:
+        dict: La session, ou None si elle n'existe pas
+    """
+    with contextlib.closing(_connect(current_app.config['PROFILING_DIR'])) as connection:
+        row = connection.execute(
+            f"SELECT {', '.join(_SESSION_COLUMNS)} FROM profiling_sessions WHERE id = ?", (session_id,)
+        ).fetchone()
+    return _session_dict(dict(zip(_SESSION_COLUMNS, row))) if row else None
+
+def get_profiling_result(session, result_format=None):
+    """
+    Cumule les résultats des workers d'une session.
+
+    Args:
+        session (dict): Session (get_profiling_session)
+        result_format (str, optional): 'pstats' (texte, trié par temps cumulé) ou 'raw'
+            (fichier pstats, pour snakeviz ou gprof2dot) en mode 'requests', 'collapsed'
+            (flamegraph.pl, speedscope) en mode 'sampling', 'text' en mode 'memory'
+
+    Returns:
+        tuple: (Contenu, type MIME)
+
+    Raises:
+        ValueError: Si le format ne correspond pas au mode de la session
+    """
+    formats = PROFILING_FORMATS[session['mode']]
+    result_format = result_format or formats[0]
+    if result_format not in formats:
+        raise ValueError(f"Format '{result_format}' indisponible en mode '{session['mode']}' "
+                         f"(valeurs possibles : {', '.join(formats)})")
+
+    directory = os.path.join(current_app.config['PROFILING_DIR'], session['id'])
+    paths = sorted(
+        os.path.join(directory, name) for name in (os.listdir(directory) if os.path.isdir(directory) else [])
+        if not name.endswith('.tmp')
+    )
+
+    if session['mode'] == 'requests':
+        if not paths:
+            return b'', 'text/plain; charset=utf-8'
+        stream = io.StringIO()
+        stats = pstats.Stats(paths[0], stream=stream)
+        for path in paths[1:]:
+            stats.add(path)
+        if result_format == 'raw':
+            return marshal.dumps(stats.stats), 'application/octet-stream'
+        stats.sort_stats('cumulative').print_stats(PROFILING_RESULT_LINES)
+        return stream.getvalue().encode('utf-8'), 'text/plain; charset=utf-8'
+
+    if session['mode'] == 'sampling':
+        # Piles identiques des différents workers additionnées
+        stacks = Counter()
+        for path in paths:
+            with open(path, encoding='utf-8') as result_file:
+                for line in result_file:
+                    stack, _, count = line.rstrip('\n').rpartition(' ')
+                    stacks[stack] += int(count)
+        content = ''.join(f'{stack} {count}\n' for stack, count in stacks.most_common())
+        return content.encode('utf-8'), 'text/plain; charset=utf-8'
+
+    content = b''
+    for path in paths:
+        with open(path, 'rb') as result_file:
+            content += result_file.read() + b'\n'
+    return content, 'text/plain; charset=utf-8'
+
+def delete_profiling_session(session_id):
+    """
+    Supprime une session de profilage (elle s'arrête dans chaque worker) et ses résultats.
+
+    Args:
+        session_id (str): ID de la session
+
+    Returns:
+        bool: True si la session a été supprimée, False si elle n'existe pas
+    """
+    directory = current_app.config['PROFILING_DIR']
+    with contextlib.closing(_connect(directory)) as connection:
+        with connection:
+            deleted = connection.execute('DELETE FROM profiling_sessions WHERE id = ?', (session_id,)).rowcount
+    if not deleted:
+        return False
+    shutil.rmtree(os.path.join(directory, session_id), ignore_errors=True)
+    return True
+
+# Fonctions utilitaires
+
+def _start_request():
+    """Démarre cProfile si la requête appartient à une session de profilage en cours."""
+    agent = get_profiling_agent()
+    session_id = agent.request_sessions.get(request.endpoint)
+    if session_id is None:
+        return
+    try:
+        claimed = agent.claim(session_id)
+    except Exception:
+        # Le profilage ne doit pas faire échouer la requête (base des sessions verrouillée, disque plein)
+        logger.warning("Réservation d'une requête de la session de profilage %s impossible", session_id,
+                       exc_info=True)
+        return
+    if not claimed:
+        return
+    profile = cProfile.Profile()
+    try:
+        profile.enable()
+    except ValueError:
+        # Un autre profileur est actif dans ce thread
+        return
+    g.profiling = (session_id, profile)
+
+def _teardown_request(exception):
+    """Arrête cProfile et enregistre le profil de la requête."""
+    profiling = g.pop('profiling', None)
+    if profiling is None:
+        return
+    session_id, profile = profiling
+    profile.disable()
+    try:
+        get_profiling_agent().save_request_profile(session_id, profile)
+    except Exception:
+        logger.warning("Enregistrement du profil de la requête impossible", exc_info=True)
+
+def _collapse_stack(frame, thread_name):
+    """Pile d'un thread au format « collapsed » (fonctions de la racine au sommet, séparées par ;)."""
+    functions = []
+    while frame is not None:
+        code = frame.f_code
+        functions.append(f'{code.co_name} ({code.co_filename}:{code.co_firstlineno})'.replace(';', ':'))
+        frame = frame.f_back
+    functions.append(thread_name.replace(';', ':'))
+    return ';'.join(reversed(functions))
+
+def _connect(directory):
+    """Ouvre la base SQLite des sessions de profilage (créée au premier usage)."""
+    os.makedirs(directory, exist_ok=True)
+    connection = sqlite3.connect(os.path.join(directory, 'sessions.db'), timeout=5)
+    connection.execute('PRAGMA journal_mode=WAL')
+    with connection:
+        connection.execute(
+            'CREATE TABLE IF NOT EXISTS profiling_sessions '
+            '(id TEXT PRIMARY KEY, mode TEXT NOT NULL, endpoint TEXT, count INTEGER NOT NULL, '
+            'claimed INTEGER NOT NULL, completed INTEGER NOT NULL, created_at REAL NOT NULL, '
+            'expires_at REAL NOT NULL, created_by INTEGER)'
+        )
+    return connection
+
+def _purge_sessions(connection, directory, now):
+    """Supprime les sessions terminées depuis plus de PROFILING_RETENTION secondes et leurs résultats."""
+    expired = [row[0] for row in connection.execute(
+        'SELECT id FROM profiling_sessions WHERE expires_at < ?', (now - PROFILING_RETENTION,)
+    )]
+    for session_id in expired:
+        connection.execute('DELETE FROM profiling_sessions WHERE id = ?', (session_id,))
+        shutil.rmtree(os.path.join(directory, session_id), ignore_errors=True)
+
+def _session_dict(session):
+    """Session au format de l'API, avec son état."""
+    now = time.time()
+    if session['mode'] == 'requests' and session['completed'] >= session['count']:
+        status = 'done'
+    elif now < session['expires_at']:
+        status = 'running'
+    else:
+        status = 'done' if session['mode'] != 'requests' else 'expired'
+    return {
+        'id': session['id'],
+        'mode': session['mode'],
+        'endpoint': session['endpoint'],
+        'count': session['count'] if session['mode'] == 'requests' else None,
+        'profiled_requests': session['completed'] if session['mode'] == 'requests' else None,
+        'worker_results': session['completed'] if session['mode'] != 'requests' else None,
+        'status': status,
+        'created_at': datetime.utcfromtimestamp(session['created_at']).isoformat(),
+        'expires_at': datetime.utcfromtimestamp(session['expires_at']).isoformat(),
+        'created_by': session['created_by']
+    }
@@ -7,12 +7,39 @@ Ce fichier contient les fonctions métier liées aux biens immobiliers.
 """
 
 from datetime import datetime
-import os
+import math
 import uuid
 from werkzeug.utils import secure_filename
 
 from app import db
 from app.models.__init__1 import Property, PropertyImage, PropertyDocument, Amenity
+from app.models.property import property_amenities
+from app.services.pagination import resolve_sort, apply_sort, paginate_keyset
+from app.services.search_service import apply_text_search
+from app.services.geo_service import apply_radius_filter, apply_bbox_filter
+from app.services.property_snapshot import search_property_snapshot
+from app.services.query_cache import cached, entity_tags, register_collection_attributes
+from app.services.image_service import check_image, schedule_image_processing
+from app.services.storage import store_file
+
+# Clés de tri autorisées pour la liste des biens immobiliers
+PROPERTY_SORT_COLUMNS = {
+    'created_at': Property.created_at,
+    'price': Property.asking_price,
+    'area': Property.total_area,
+    'id': Property.id
+}
+
+# Extensions autorisées pour les documents des biens
+DOCUMENT_EXTENSIONS = ['pdf', 'doc', 'docx', 'xls', 'xlsx', 'txt']
+
+# Attributs des biens dont la modification change les listes (filtres, tris, équipements)
+PROPERTY_LIST_ATTRIBUTES = (
+    'property_type', 'status', 'city', 'asking_price', 'rental_price', 'total_area',
+    'num_bedrooms', 'num_bathrooms', 'owner_id', 'latitude', 'longitude', 'geo_cell',
+    'title', 'description', 'created_at', 'amenities'
+)
+register_collection_attributes(Property.__tablename__, PROPERTY_LIST_ATTRIBUTES)
 
 def get_property_by_id(property_id):
     """
@@ -26,6 +53,34 @@ def get_property_by_id(property_id):
     """
     return Property.query.get(property_id)
 
+def get_property_validators(property_id):
+    """
+    Récupère, sans charger le bien, les valeurs dont dépend sa fiche détaillée
+    (validateurs des requêtes conditionnelles) : le bien, ses images (et leurs déclinaisons), ses documents
+    et ses équipements (liens et contenu).
+    
+    Args:
+        property_id (int): ID du bien immobilier
+        
+    Returns:
+        tuple: Dates de mise à jour et nombres d'objets liés, ou None si le bien n'existe pas
+    """
+    def aggregate(function, column, foreign_key):
+        return db.select(function(column)).where(foreign_key == Property.id).scalar_subquery()
+    
+    return db.session.query(
+        Property.updated_at,
+        aggregate(db.func.count, PropertyImage.id, PropertyImage.property_id),
+        aggregate(db.func.max, PropertyImage.uploaded_at, PropertyImage.property_id),
+        aggregate(db.func.max, PropertyImage.processed_at, PropertyImage.property_id),
+        aggregate(db.func.count, PropertyDocument.id, PropertyDocument.property_id),
+        aggregate(db.func.max, PropertyDocument.uploaded_at, PropertyDocument.property_id),
+        aggregate(db.func.count, property_amenities.c.amenity_id, property_amenities.c.property_id),
+        db.select(db.func.max(Amenity.updated_at)).join(
+            property_amenities, property_amenities.c.amenity_id == Amenity.id
+        ).where(property_amenities.c.property_id == Property.id).scalar_subquery()
+    ).filter(Property.id == property_id).first()
+
 def get_property_by_reference(reference_code):
     """
     Récupère un bien immobilier par son code de référence.
@@ -38,22 +93,137 @@ def get_property_by_reference(reference_code):
     """
     return Property.query.filter_by(reference_code=reference_code).first()
 
-def get_all_properties(filters=None, page=1, per_page=10):
+@cached('properties.list', tags=lambda result, arguments: ['properties', 'amenities'] + entity_tags(result[0]))
+def get_all_properties(filters=None, page=1, per_page=10, cursor=None, sort=None):
     """
     Récupère tous les biens immobiliers avec pagination et filtrage optionnel.
     
+    Si un curseur est fourni (chaîne vide pour la première page), la pagination
+    se fait par curseur : ni OFFSET ni COUNT(*) ne sont exécutés.
+    
     Args:
         filters (dict, optional): Filtres à appliquer
         page (int, optional): Numéro de page
         per_page (int, optional): Nombre d'éléments par page
+        cursor (str, optional): Curseur de pagination (active le mode curseur)
+        sort (str, optional): Clé de tri ('created_at', 'price', 'area', 'id'), préfixée par '-' pour un tri décroissant
+            ('-created_at' par défaut).
+            Avec une recherche textuelle (filtre 'q'), les résultats sont classés par pertinence
+            sauf si un tri est demandé ('relevance' explicite accepté, hors mode curseur).
+            Avec un point (filtres 'lat' et 'lng'), les résultats peuvent être triés par
+            'distance' (tri par défaut sans recherche textuelle, hors mode curseur)
+        
+    Returns:
+        tuple: (Liste des biens immobiliers, nombre total de pages, nombre total d'éléments),
+            ou (Liste des biens immobiliers, curseur suivant, curseur précédent) en mode curseur
+        
+    Raises:
+        ValueError: Si le tri, le curseur ou un filtre géographique est invalide
+    """
+    if cursor is None:
+        # Instantané en colonnes (optionnel) : seuls les biens de la page sont lus en base
+        snapshot_page = search_property_snapshot(filters, page, per_page, sort)
+        if snapshot_page is not None:
+            ids, total = snapshot_page
+            properties = {prop.id: prop for prop in Property.query.filter(Property.id.in_(ids))} if ids else {}
+            return [properties[prop_id] for prop_id in ids if prop_id in properties], math.ceil(total / per_page), total
+    
+    query, rank, distance = apply_property_filters(Property.query, filters)
+    
+    # Tri (le prix de référence dépend du type de transaction)
+    sort_columns = dict(PROPERTY_SORT_COLUMNS)
+    if filters and filters.get('transaction_type') == 'rent':
+        sort_columns['price'] = Property.rental_price
+    
+    relevance = sort is not None and sort.lstrip('-') == 'relevance'
+    by_distance = sort is not None and sort.lstrip('-') == 'distance'
+    
+    if cursor is not None:
+        if relevance or by_distance:
+            raise ValueError("Les tris par pertinence et par distance ne sont pas disponibles en pagination par curseur")
+        sort, spec = resolve_sort(sort, sort_columns, '-created_at', Property.id)
+        return paginate_keyset(query, sort, spec, cursor, per_page)
+    
+    if by_distance:
+        if distance is None:
+            raise ValueError("Le tri par distance nécessite les paramètres lat et lng")
+        query = query.order_by(distance.desc() if sort.startswith('-') else distance.asc(), Property.id)
+    elif rank is not None and (not sort or relevance):
+        query = query.order_by(rank.desc(), Property.id.desc())
+    elif distance is not None and not sort:
+        query = query.order_by(distance.asc(), Property.id)
+    else:
+        # Tri par défaut identique à celui de l'instantané et du mode curseur
+        query = apply_sort(query, resolve_sort(sort, sort_columns, '-created_at', Property.id)[1])
+    
+    # Pagination
+    pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+    
+    return pagination.items, pagination.pages, pagination.total
+
+# Paramètres de filtrage des biens immobiliers et conversion de leurs valeurs
+PROPERTY_FILTER_PARAMS = {
+    'property_type': str, 'status': str, 'city': str, 'transaction_type': str, 'q': str, 'bbox': str,
+    'min_price': float, 'max_price': float, 'min_area': float, 'max_area': float,
+    'lat': float, 'lng': float, 'radius_km': float,
+    'bedrooms': int, 'bathrooms': int, 'owner_id': int, 'amenity_id': int
+}
+
+def parse_property_filters(args):
+    """
+    Extrait les filtres de recherche des biens immobiliers de paramètres textuels
+    (paramètres de requête HTTP, options de la ligne de commande).
+    
+    Args:
+        args (dict): Paramètres (valeurs textuelles)
+        
+    Returns:
+        dict: Filtres à appliquer (les valeurs numériques invalides sont ignorées)
+    """
+    return parse_filters(args, PROPERTY_FILTER_PARAMS)
+
+def parse_filters(args, params):
+    """
+    Convertit des paramètres textuels selon les types attendus.
+    
+    Args:
+        args (dict): Paramètres (valeurs textuelles)
+        params (dict): Types de conversion par nom de paramètre (str, int, float ou fonction)
         
     Returns:
-        tuple: (Liste des biens immobiliers, nombre total de pages, nombre total d'éléments)
+        dict: Paramètres convertis (les valeurs vides ou invalides sont ignorées)
+    """
+    filters = {}
+    for param, convert in params.items():
+        value = args.get(param)
+        if value:
+            try:
+                filters[param] = convert(value)
+            except ValueError:
+                continue
+    return filters
+
+def apply_property_filters(query, filters):
     """
-    query = Property.query
+    Applique les filtres de recherche à une requête sur les biens immobiliers.
+    
+    Args:
+        query (Query): Requête SQLAlchemy sur Property
+        filters (dict): Filtres à appliquer (voir get_all_properties)
+        
+    Returns:
+        tuple: (Requête filtrée, expression de pertinence ou None, expression de distance ou None)
+        
+    Raises:
+        ValueError: Si un filtre géographique est invalide
+    """
+    rank = None
+    distance = None
     
     # Application des filtres
     if filters:
+        if filters.get('q'):
+            query, rank = apply_text_search(query, filters['q'])
         if 'property_type' in filters:
             query = query.filter(Property.property_type == filters['property_type'])
         if 'status' in filters:
@@ -80,11 +250,16 @@ def get_all_properties(filters=None, page=1, per_page=10):
             query = query.filter(Property.num_bathrooms >= filters['bathrooms'])
         if 'owner_id' in filters:
             query = query.filter(Property.owner_id == filters['owner_id'])
+        if 'amenity_id' in filters:
+            query = query.filter(Property.amenities.any(Amenity.id == filters['amenity_id']))
+        
+        # Filtres géographiques (rayon autour d'un point, rectangle)
+        if any(key in filters for key in ('lat', 'lng', 'radius_km')):
+            query, distance = apply_radius_filter(query, filters.get('lat'), filters.get('lng'), filters.get('radius_km'))
+        if 'bbox' in filters:
+            query = apply_bbox_filter(query, filters['bbox'])
     
-    # Pagination
-    pagination = query.paginate(page=page, per_page=per_page, error_out=False)
-    
-    return pagination.items, pagination.pages, pagination.total
+    return query, rank, distance
 
 def create_property(data, created_by):
     """
@@ -247,19 +422,10 @@ def add_property_image(property_id, image_file, is_primary=False, title=None, de
     filename = secure_filename(image_file.filename)
     if not allowed_file(filename, ['jpg', 'jpeg', 'png', 'gif']):
         raise ValueError("Type de fichier non autorisé. Seuls les formats JPG, JPEG, PNG et GIF sont acceptés.")
+    check_image(image_file.stream)
     
-    # Génération d'un nom de fichier unique
-    unique_filename = f"{uuid.uuid4().hex}_{filename}"
-    
-    # Création du dossier de destination s'il n'existe pas
-    upload_folder = os.path.join('app', 'static', 'uploads', 'properties', str(property_id))
-    os.makedirs(upload_folder, exist_ok=True)
-    
-    # Chemin complet du fichier
-    file_path = os.path.join(upload_folder, unique_filename)
-    
-    # Sauvegarde du fichier
-    image_file.save(file_path)
+    # Stockage du fichier sous l'empreinte de son contenu (une seule copie par contenu)
+    storage_key, file_size = store_file(image_file.stream, filename, image_file.content_type)
     
     # Si c'est l'image principale, mettre à jour les autres images
     if is_primary:
@@ -269,20 +435,25 @@ def add_property_image(property_id, image_file, is_primary=False, title=None, de
     # Création de l'enregistrement dans la base de données
     image = PropertyImage(
         property_id=property_id,
-        file_path=file_path,
-        file_name=unique_filename,
-        file_size=os.path.getsize(file_path),
+        file_path=storage_key,
+        file_name=filename[-100:],
+        file_size=file_size,
         file_type=image_file.content_type,
         is_primary=is_primary,
         display_order=get_next_display_order(property_id),
         title=title,
         description=description,
-        uploaded_by=uploaded_by
+        uploaded_by=uploaded_by,
+        storage_key=storage_key,
+        processing_status='pending'
     )
     
     db.session.add(image)
     db.session.commit()
     
+    # Vignette, image de carte et image pleine taille générées hors de la requête
+    schedule_image_processing(image)
+    
     return image
 
 def add_property_document(property_id, document_file, document_type, title=None, description=None, expiry_date=None, uploaded_by=None):
@@ -309,35 +480,64 @@ def add_property_document(property_id, document_file, document_type, title=None,
         return None
     
     # Vérification du type de fichier
-    filename = secure_filename(document_file.filename)
-    if not allowed_file(filename, ['pdf', 'doc', 'docx', 'xls', 'xlsx', 'txt']):
-        raise ValueError("Type de fichier non autorisé. Seuls les formats PDF, DOC, DOCX, XLS, XLSX et TXT sont acceptés.")
+    filename = check_document_filename(document_file.filename)
     
-    # Génération d'un nom de fichier unique
-    unique_filename = f"{uuid.uuid4().hex}_{filename}"
+    # Stockage du fichier sous l'empreinte de son contenu (une seule copie par contenu)
+    storage_key, file_size = store_file(document_file.stream, filename, document_file.content_type)
     
-    # Création du dossier de destination s'il n'existe pas
-    upload_folder = os.path.join('app', 'static', 'uploads', 'documents', str(property_id))
-    os.makedirs(upload_folder, exist_ok=True)
-    
-    # Chemin complet du fichier
-    file_path = os.path.join(upload_folder, unique_filename)
+    return register_property_document(property_id, storage_key, filename, file_size, document_file.content_type,
+                                      document_type, title, description, expiry_date, uploaded_by)
+
+def check_document_filename(filename):
+    """
+    Vérifie le type d'un fichier document d'après son nom.
     
-    # Sauvegarde du fichier
-    document_file.save(file_path)
+    Args:
+        filename (str): Nom du fichier envoyé
+        
+    Returns:
+        str: Nom de fichier sécurisé
+        
+    Raises:
+        ValueError: Si le type de fichier n'est pas autorisé
+    """
+    filename = secure_filename(filename)
+    if not allowed_file(filename, DOCUMENT_EXTENSIONS):
+        raise ValueError("Type de fichier non autorisé. Seuls les formats PDF, DOC, DOCX, XLS, XLSX et TXT sont acceptés.")
+    return filename
+
+def register_property_document(property_id, storage_key, filename, file_size, file_type, document_type,
+                               title=None, description=None, expiry_date=None, uploaded_by=None):
+    """
+    Enregistre un document dont le fichier est déjà dans le stockage.
     
-    # Création de l'enregistrement dans la base de données
+    Args:
+        property_id (int): ID du bien immobilier
+        storage_key (str): Clé du fichier dans le stockage
+        filename (str): Nom du fichier (sécurisé)
+        file_size (int): Taille du fichier en octets
+        file_type (str): Type MIME du fichier
+        document_type (str): Type de document
+        title (str, optional): Titre du document
+        description (str, optional): Description du document
+        expiry_date (date, optional): Date d'expiration du document
+        uploaded_by (int, optional): ID de l'utilisateur ayant uploadé le document
+        
+    Returns:
+        PropertyDocument: Le document ajouté
+    """
     document = PropertyDocument(
         property_id=property_id,
         document_type=document_type,
-        file_path=file_path,
-        file_name=unique_filename,
-        file_size=os.path.getsize(file_path),
-        file_type=document_file.content_type,
+        file_path=storage_key,
+        file_name=filename[-100:],
+        file_size=file_size,
+        file_type=file_type,
         title=title,
         description=description,
         expiry_date=expiry_date,
-        uploaded_by=uploaded_by
+        uploaded_by=uploaded_by,
+        storage_key=storage_key
     )
     
     db.session.add(document)
@@ -361,6 +561,43 @@ def get_property_images(property_id):
     
     return property.images.order_by(PropertyImage.display_order).all()
 
+def get_primary_images(property_ids):
+    """
+    Récupère l'image principale de plusieurs biens immobiliers en une seule requête.
+
+    Pour chaque bien, l'image marquée comme principale est retenue ; à défaut,
+    celle qui a le plus petit ordre d'affichage. Le classement est fait par une
+    fonction de fenêtrage (ROW_NUMBER) partitionnée par bien.
+
+    Args:
+        property_ids (list): IDs des biens immobiliers (typiquement une page de résultats)
+
+    Returns:
+        dict: Dictionnaire {property_id: PropertyImage}, sans entrée pour les biens sans image
+    """
+    property_ids = list(set(property_ids))
+    if not property_ids:
+        return {}
+
+    # Classement des images de chaque bien : principale d'abord, puis par ordre d'affichage
+    ranked_images = db.session.query(
+        PropertyImage.id.label('image_id'),
+        db.func.row_number().over(
+            partition_by=PropertyImage.property_id,
+            order_by=(
+                db.case((PropertyImage.is_primary == db.true(), 0), else_=1),
+                PropertyImage.display_order.asc().nullslast(),
+                PropertyImage.id
+            )
+        ).label('rank')
+    ).filter(PropertyImage.property_id.in_(property_ids)).subquery()
+
+    images = PropertyImage.query.join(
+        ranked_images, PropertyImage.id == ranked_images.c.image_id
+    ).filter(ranked_images.c.rank == 1).all()
+
+    return {image.property_id: image for image in images}
+
 def get_property_documents(property_id):
     """
     Récupère tous les documents d'un bien immobilier.
@@ -377,6 +614,7 @@ def get_property_documents(property_id):
     
     return property.documents.all()
 
+@cached('amenities.all', tags=lambda result, arguments: ['amenities'])
 def get_all_amenities():
     """
     Récupère tous les équipements disponibles.
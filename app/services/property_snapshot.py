@@ -0,0 +1,592 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Instantané en colonnes des biens immobiliers.
+Ce fichier contient un moteur de recherche optionnel pour les listes de biens : les
+champs filtrés et triés par get_all_properties sont copiés dans des tableaux NumPy
+enregistrés sur disque et ouverts en mémoire partagée (mmap) par tous les workers.
+Les filtres sont évalués par masques vectorisés, le tri partiel par argpartition ;
+seuls les biens de la page demandée sont ensuite chargés depuis la base de données.
+L'instantané est rafraîchi en arrière-plan à partir de la colonne updated_at.
+"""
+
+import json
+import os
+import shutil
+import threading
+import time
+from datetime import datetime, timedelta
+
+try:
+    import fcntl
+except ImportError:  # Windows : pas de verrou entre processus
+    fcntl = None
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models.__init__1 import Property
+from app.models.property import property_amenities
+from app.models.property_geo import EARTH_RADIUS_KM
+from app.services.geo_service import parse_point, parse_radius, parse_bbox
+from app.services.pagination import resolve_sort
+
+# Durée (en secondes) relue avant la dernière date de mise à jour vue, pour les
+# transactions validées après le rafraîchissement précédent
+SNAPSHOT_UPDATE_OVERLAP = 300
+
+# Intervalle (en secondes) entre deux reconstructions complètes
+SNAPSHOT_FULL_REBUILD_INTERVAL = 3600
+
+# Intervalle minimal (en secondes) entre deux rafraîchissements déclenchés par une écriture
+SNAPSHOT_MIN_REFRESH_INTERVAL = 5
+
+# Intervalle (en secondes) entre deux vérifications de la génération courante sur disque
+SNAPSHOT_CHECK_INTERVAL = 1.0
+
+# Filtres pris en charge (les autres, dont la recherche textuelle, passent par SQL)
+SNAPSHOT_FILTERS = frozenset((
+    'property_type', 'status', 'city', 'min_price', 'max_price', 'min_area', 'max_area',
+    'bedrooms', 'bathrooms', 'owner_id', 'amenity_id', 'transaction_type',
+    'lat', 'lng', 'radius_km', 'bbox'
+))
+
+# Colonnes texte codées par dictionnaire
+_CODED_COLUMNS = ('property_type', 'status', 'city')
+
+# Colonnes de l'instantané (hors bitmap des équipements) et valeur des NULL
+_COLUMNS = (
+    ('id', 'int64', None),
+    ('asking_price', 'float64', float('nan')),
+    ('rental_price', 'float64', float('nan')),
+    ('total_area', 'float64', float('nan')),
+    ('num_bedrooms', 'int32', -1),
+    ('num_bathrooms', 'int32', -1),
+    ('property_type', 'int32', -1),
+    ('status', 'int32', -1),
+    ('city', 'int32', -1),
+    ('owner_id', 'int64', -1),
+    ('latitude', 'float64', float('nan')),
+    ('longitude', 'float64', float('nan')),
+    ('created_at', 'float64', float('nan')),
+)
+
+_EPOCH = datetime(1970, 1, 1)
+_POINTER_FILE = 'current'
+_LOCK_FILE = 'lock'
+
+_state = {
+    'directory': None,
+    'generation': None,
+    'snapshot': None,
+    'checked_at': 0.0,
+    'stale': False,
+    'refreshing': False,
+    'attempted_at': 0.0,
+}
+_state_lock = threading.Lock()
+
+class PropertySnapshot:
+    """
+    Génération de l'instantané ouverte en lecture seule.
+
+    Les colonnes sont des tableaux NumPy projetés en mémoire : les pages sont partagées
+    par tous les processus qui ouvrent la même génération.
+    """
+
+    def __init__(self, path):
+        """
+        Ouvre une génération.
+
+        Args:
+            path (str): Répertoire de la génération
+        """
+        self.path = path
+        with open(os.path.join(path, 'meta.json'), encoding='utf-8') as meta_file:
+            self.meta = json.load(meta_file)
+        self.columns = {
+            name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r')
+            for name in [column[0] for column in _COLUMNS] + ['amenities']
+        }
+        self._codes = {name: {value: code for code, value in enumerate(self.meta[name])} for name in _CODED_COLUMNS}
+
+    @property
+    def size(self):
+        """Nombre de biens de l'instantané."""
+        return len(self.columns['id'])
+
+    def search(self, filters, page, per_page, sort):
+        """
+        Recherche une page de biens, avec la même sémantique que get_all_properties.
+
+        Args:
+            filters (dict): Filtres (clés de SNAPSHOT_FILTERS)
+            page (int): Numéro de page
+            per_page (int): Nombre d'éléments par page
+            sort (str): Clé de tri, préfixée par '-' pour un tri décroissant
+
+        Returns:
+            tuple: (Identifiants de la page dans l'ordre, nombre total de biens), ou None
+                si la recherche doit être faite en SQL
+
+        Raises:
+            ValueError: Si le tri ou un filtre géographique est invalide
+        """
+        columns = self.columns
+        price_column = 'rental_price' if filters.get('transaction_type') == 'rent' else 'asking_price'
+        mask = np.ones(self.size, dtype=bool)
+
+        for name in ('property_type', 'status'):
+            if name in filters:
+                mask &= columns[name] == self._codes[name].get(filters[name], -2)
+        if 'city' in filters:
+            needle = str(filters['city'])
+            if '%' in needle or '_' in needle or not needle.isascii():
+                # Jokers LIKE et casse hors ASCII (propre à chaque moteur) : laissés au moteur SQL
+                return None
+            needle = needle.lower()
+            codes = [code for code, city in enumerate(self.meta['city']) if needle in city.lower()]
+            mask &= np.isin(columns['city'], codes)
+        if 'min_price' in filters:
+            mask &= columns[price_column] >= float(filters['min_price'])
+        if 'max_price' in filters:
+            mask &= columns[price_column] <= float(filters['max_price'])
+        if 'min_area' in filters:
+            mask &= columns['total_area'] >= float(filters['min_area'])
+        if 'max_area' in filters:
+            mask &= columns['total_area'] <= float(filters['max_area'])
+        for name, column in (('bedrooms', 'num_bedrooms'), ('bathrooms', 'num_bathrooms')):
+            if name in filters:
+                mask &= (columns[column] >= int(filters[name])) & (columns[column] >= 0)
+        if 'owner_id' in filters:
+            mask &= columns['owner_id'] == int(filters['owner_id'])
+        if 'amenity_id' in filters:
+            amenity_id = int(filters['amenity_id'])
+            word, bit = divmod(amenity_id, 64)
+            if amenity_id < 0 or word >= columns['amenities'].shape[1]:
+                mask[:] = False
+            else:
+                mask &= (columns['amenities'][:, word] >> np.uint64(bit)) & np.uint64(1) == 1
+
+        rows = np.flatnonzero(mask)
+
+        # Filtres géographiques, évalués sur les seuls candidats
+        if 'bbox' in filters:
+            min_lng, min_lat, max_lng, max_lat = parse_bbox(filters['bbox'])
+            latitude, longitude = columns['latitude'][rows], columns['longitude'][rows]
+            keep = (latitude >= min_lat) & (latitude <= max_lat)
+            if min_lng <= max_lng:
+                keep &= (longitude >= min_lng) & (longitude <= max_lng)
+            else:
+                keep &= (longitude >= min_lng) | (longitude <= max_lng)
+            rows = rows[keep]
+
+        distance = None
+        if any(key in filters for key in ('lat', 'lng', 'radius_km')):
+            lat, lng = parse_point(filters.get('lat'), filters.get('lng'))
+            distance = distances_km(columns['latitude'][rows], columns['longitude'][rows], lat, lng)
+            if filters.get('radius_km') is not None:
+                keep = distance <= parse_radius(filters['radius_km'])
+                rows, distance = rows[keep], distance[keep]
+
+        # Tri : même ordre que le moteur SQL (NULL en dernier, départage par ID)
+        key_name = sort.lstrip('-') if sort else None
+        if key_name == 'distance' or (not sort and distance is not None):
+            if distance is None:
+                raise ValueError("Le tri par distance nécessite les paramètres lat et lng")
+            key, descending, id_descending = distance, bool(sort) and sort.startswith('-'), False
+        else:
+            sort_columns = {'created_at': 'created_at', 'price': price_column, 'area': 'total_area', 'id': 'id'}
+            spec = resolve_sort(sort, sort_columns, '-created_at', 'id')[1]
+            key = columns[spec[0][0]][rows].astype(np.float64)
+            descending = id_descending = spec[0][1]
+
+        page = max(page, 1)
+        start = (page - 1) * per_page
+        order = _top_k(key, columns['id'][rows], descending, id_descending, start + per_page)[start:]
+        return [int(row_id) for row_id in columns['id'][rows[order]]], len(rows)
+
+def search_property_snapshot(filters, page, per_page, sort=None):
+    """
+    Recherche une page de biens dans l'instantané, s'il est activé et prêt.
+
+    Retourne None (l'appelant se rabat alors sur SQL) si le moteur est désactivé,
+    si NumPy n'est pas installé, si l'instantané est en cours de construction ou si
+    la recherche utilise un filtre ou un tri non pris en charge (recherche textuelle).
+
+    Args:
+        filters (dict): Filtres de recherche (voir get_all_properties)
+        page (int): Numéro de page
+        per_page (int): Nombre d'éléments par page
+        sort (str, optional): Clé de tri
+
+    Returns:
+        tuple: (Identifiants de la page dans l'ordre, nombre total de biens), ou None
+
+    Raises:
+        ValueError: Si le tri ou un filtre géographique est invalide
+    """
+    if np is None or not current_app.config.get('PROPERTY_SNAPSHOT_ENABLED'):
+        return None
+    filters = filters or {}
+    if per_page < 1 or (sort and sort.lstrip('-') == 'relevance') or not SNAPSHOT_FILTERS.issuperset(filters):
+        return None
+
+    snapshot = _current_snapshot()
+    if snapshot is None:
+        return None
+    return snapshot.search(filters, page, per_page, sort)
+
+def refresh_property_snapshot(full=False, wait=True):
+    """
+    Rafraîchit l'instantané sur disque et publie une nouvelle génération.
+
+    Le rafraîchissement est incrémental : seuls les biens dont updated_at est postérieur
+    à la dernière date vue (moins SNAPSHOT_UPDATE_OVERLAP) sont relus ; les suppressions
+    sont détectées en comparant le nombre de biens. Une reconstruction complète a lieu
+    sans instantané, toutes les SNAPSHOT_FULL_REBUILD_INTERVAL secondes ou sur demande.
+
+    Args:
+        full (bool, optional): Force une reconstruction complète
+        wait (bool, optional): Attend le verrou si un autre processus rafraîchit l'instantané
+
+    Returns:
+        int: Nombre de biens de la nouvelle génération, ou None si le verrou n'a pas été obtenu
+    """
+    directory = _snapshot_directory()
+    os.makedirs(directory, exist_ok=True)
+
+    with open(os.path.join(directory, _LOCK_FILE), 'a') as lock_file:
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | (0 if wait else fcntl.LOCK_NB))
+            except BlockingIOError:
+                return None
+
+        current = _read_generation(directory)
+        base = None
+        if current is not None and not full:
+            base = PropertySnapshot(os.path.join(directory, current))
+            if time.time() - base.meta['full_built_at'] > SNAPSHOT_FULL_REBUILD_INTERVAL:
+                base = None
+
+        columns, meta = _refresh(base)
+        _publish(directory, columns, meta)
+        return len(columns['id'])
+
+def distances_km(latitude, longitude, lat, lng):
+    """
+    Distance de haversine (km) entre des tableaux de coordonnées et un point.
+
+    Args:
+        latitude (ndarray): Latitudes en degrés (NaN si inconnues)
+        longitude (ndarray): Longitudes en degrés (NaN si inconnues)
+        lat (float): Latitude du point
+        lng (float): Longitude du point
+
+    Returns:
+        ndarray: Distances en kilomètres (NaN si une coordonnée manque)
+    """
+    phi = np.radians(latitude)
+    phi0 = np.radians(lat)
+    a = (np.sin((phi - phi0) / 2) ** 2 +
+         np.cos(phi0) * np.cos(phi) * np.sin(np.radians(longitude - lng) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(1.0, np.sqrt(a)))
+
+def mark_property_snapshot_stale():
+    """Demande un rafraîchissement de l'instantané (écritures faites hors de l'ORM)."""
+    _state['stale'] = True
+
+# Fonctions utilitaires
+
+def _top_k(key, ids, descending, id_descending, limit):
+    """
+    Positions des limit premiers éléments selon une clé (NaN en dernier), départagés par ID.
+
+    Args:
+        key (ndarray): Valeurs de tri
+        ids (ndarray): Identifiants (départage)
+        descending (bool): Tri décroissant de la clé
+        id_descending (bool): Départage par ID décroissant
+        limit (int): Nombre d'éléments
+
+    Returns:
+        ndarray: Positions triées
+    """
+    key = -key if descending else key
+    key = np.where(np.isnan(key), np.inf, key)
+    tiebreak = -ids if id_descending else ids
+
+    if limit < len(key):
+        # Sélection partielle, en gardant toutes les égalités sur la dernière valeur retenue
+        threshold = key[np.argpartition(key, limit - 1)[:limit]].max()
+        candidates = np.flatnonzero(key <= threshold)
+    else:
+        candidates = np.arange(len(key))
+
+    order = np.lexsort((tiebreak[candidates], key[candidates]))
+    return candidates[order][:limit]
+
+def _snapshot_directory():
+    """Répertoire de l'instantané."""
+    return current_app.config.get('PROPERTY_SNAPSHOT_DIR') or \
+        os.path.join(current_app.instance_path, 'property_snapshot')
+
+def _read_generation(directory):
+    """Nom de la génération courante, ou None s'il n'y en a pas."""
+    try:
+        with open(os.path.join(directory, _POINTER_FILE), encoding='utf-8') as pointer:
+            return pointer.read().strip() or None
+    except OSError:
+        return None
+
+def _current_snapshot():
+    """
+    Génération courante de l'instantané, rechargée si un autre processus en a publié
+    une nouvelle ; déclenche un rafraîchissement en arrière-plan si nécessaire.
+
+    Returns:
+        PropertySnapshot: Instantané, ou None s'il n'est pas encore construit
+    """
+    directory = _snapshot_directory()
+    now = time.monotonic()
+
+    with _state_lock:
+        if _state['directory'] != directory or now - _state['checked_at'] >= SNAPSHOT_CHECK_INTERVAL:
+            if _state['directory'] != directory:
+                _state.update(directory=directory, generation=None, snapshot=None)
+            _state['checked_at'] = now
+            generation = _read_generation(directory)
+            if generation is not None and generation != _state['generation']:
+                try:
+                    _state['snapshot'] = PropertySnapshot(os.path.join(directory, generation))
+                    _state['generation'] = generation
+                except (OSError, ValueError, KeyError):
+                    # Génération supprimée entre-temps : nouvel essai à la prochaine vérification
+                    pass
+        snapshot = _state['snapshot']
+
+        age = time.time() - snapshot.meta['built_at'] if snapshot is not None else None
+        max_age = current_app.config.get('PROPERTY_SNAPSHOT_MAX_AGE', 60)
+        refresh = (snapshot is None or age > max_age or
+                   (_state['stale'] and age > SNAPSHOT_MIN_REFRESH_INTERVAL))
+        if refresh and not _state['refreshing'] and now - _state['attempted_at'] >= SNAPSHOT_MIN_REFRESH_INTERVAL:
+            _state.update(refreshing=True, stale=False, attempted_at=now)
+        else:
+            refresh = False
+
+    if refresh:
+        _refresh_in_background()
+    return snapshot
+
+def _refresh_in_background():
+    """Rafraîchit l'instantané dans un thread (sans attendre un autre processus)."""
+    app = current_app._get_current_object()
+
+    def refresh():
+        with app.app_context():
+            try:
+                refresh_property_snapshot(wait=False)
+                with _state_lock:
+                    # Recharge immédiate de la génération publiée
+                    _state['checked_at'] = 0.0
+            except Exception:
+                app.logger.exception("Échec du rafraîchissement de l'instantané des biens")
+            finally:
+                db.session.remove()
+                with _state_lock:
+                    _state['refreshing'] = False
+
+    threading.Thread(target=refresh, name='property-snapshot-refresh', daemon=True).start()
+
+def _refresh(base):
+    """
+    Calcule les colonnes d'une nouvelle génération.
+
+    Args:
+        base (PropertySnapshot): Génération courante (None pour une reconstruction complète)
+
+    Returns:
+        tuple: (Colonnes, métadonnées)
+    """
+    started_at = time.time()
+    if base is None:
+        meta = {name: [] for name in _CODED_COLUMNS}
+        meta.update(watermark=None, full_built_at=started_at)
+        since = None
+    else:
+        meta = {name: list(base.meta[name]) for name in _CODED_COLUMNS}
+        meta.update(watermark=base.meta['watermark'], full_built_at=base.meta['full_built_at'])
+        since = None
+        if meta['watermark'] is not None:
+            since = datetime.fromisoformat(meta['watermark']) - timedelta(seconds=SNAPSHOT_UPDATE_OVERLAP)
+
+    delta, watermark = _fetch_rows(since, meta)
+    if watermark is not None and (meta['watermark'] is None or watermark > datetime.fromisoformat(meta['watermark'])):
+        meta['watermark'] = watermark.isoformat()
+
+    if base is None:
+        columns = delta
+    else:
+        columns = _merge(base.columns, delta)
+
+        # Suppressions : absentes de updated_at, détectées par le nombre de biens
+        if len(columns['id']) != db.session.query(db.func.count(Property.id)).scalar():
+            existing = np.fromiter(db.session.scalars(db.select(Property.id)), dtype=np.int64)
+            keep = np.isin(columns['id'], existing)
+            columns = {name: values[keep] for name, values in columns.items()}
+
+    meta['built_at'] = started_at
+    return columns, meta
+
+def _fetch_rows(since, meta):
+    """
+    Lit en colonnes les biens modifiés depuis une date (tous si since vaut None).
+
+    Args:
+        since (datetime): Date de mise à jour minimale
+        meta (dict): Métadonnées (dictionnaires des colonnes codées, complétés au besoin)
+
+    Returns:
+        tuple: (Colonnes triées par ID, plus grande date de mise à jour lue)
+    """
+    query = db.session.query(
+        Property.id, Property.asking_price, Property.rental_price, Property.total_area,
+        Property.num_bedrooms, Property.num_bathrooms, Property.property_type, Property.status,
+        Property.city, Property.owner_id, Property.latitude, Property.longitude,
+        Property.created_at, Property.updated_at
+    )
+    amenities = db.session.query(property_amenities.c.property_id, property_amenities.c.amenity_id)
+    if since is not None:
+        query = query.filter(Property.updated_at >= since)
+        amenities = amenities.join(Property, Property.id == property_amenities.c.property_id) \
+            .filter(Property.updated_at >= since)
+
+    codes = {name: {value: code for code, value in enumerate(meta[name])} for name in _CODED_COLUMNS}
+    values = {name: [] for name, _, _ in _COLUMNS}
+    watermark = None
+    for row in query.order_by(Property.id).yield_per(10000):
+        row = row._mapping
+        for name, _, null in _COLUMNS:
+            value = row[name]
+            if value is None:
+                value = null
+            elif name in codes:
+                code = codes[name].get(value)
+                if code is None:
+                    code = codes[name][value] = len(meta[name])
+                    meta[name].append(value)
+                value = code
+            elif name == 'created_at':
+                value = (value - _EPOCH).total_seconds()
+            values[name].append(value)
+        if row['updated_at'] is not None and (watermark is None or row['updated_at'] > watermark):
+            watermark = row['updated_at']
+
+    columns = {name: np.array(values[name], dtype=dtype) for name, dtype, _ in _COLUMNS}
+
+    pairs = np.array(amenities.all(), dtype=np.int64).reshape(-1, 2)
+    width = int(pairs[:, 1].max()) // 64 + 1 if len(pairs) else 1
+    columns['amenities'] = np.zeros((len(columns['id']), width), dtype=np.uint64)
+    positions = np.searchsorted(columns['id'], pairs[:, 0])
+    found = positions < len(columns['id'])
+    found[found] = columns['id'][positions[found]] == pairs[found, 0]
+    words, bits = np.divmod(pairs[found, 1], 64)
+    np.bitwise_or.at(columns['amenities'], (positions[found], words),
+                     np.left_shift(np.uint64(1), bits.astype(np.uint64)))
+
+    return columns, watermark
+
+def _merge(base, delta):
+    """
+    Applique des biens relus à une génération (remplacement ou ajout, par ID).
+
+    Args:
+        base (dict): Colonnes de la génération courante
+        delta (dict): Colonnes des biens relus, triées par ID
+
+    Returns:
+        dict: Colonnes fusionnées, triées par ID
+    """
+    width = max(base['amenities'].shape[1], delta['amenities'].shape[1])
+    base = dict(base, amenities=_widen(base['amenities'], width))
+    delta = dict(delta, amenities=_widen(delta['amenities'], width))
+
+    positions = np.searchsorted(base['id'], delta['id'])
+    found = positions < len(base['id'])
+    found[found] = base['id'][positions[found]] == delta['id'][found]
+
+    columns = {}
+    for name, values in base.items():
+        values = np.array(values)
+        values[positions[found]] = delta[name][found]
+        columns[name] = np.concatenate([values, delta[name][~found]])
+
+    if (~found).any():
+        order = np.argsort(columns['id'], kind='stable')
+        columns = {name: values[order] for name, values in columns.items()}
+    return columns
+
+def _widen(bitmap, width):
+    """Complète un bitmap d'équipements jusqu'à width mots de 64 bits."""
+    if bitmap.shape[1] == width:
+        return bitmap
+    return np.concatenate([bitmap, np.zeros((len(bitmap), width - bitmap.shape[1]), dtype=np.uint64)], axis=1)
+
+def _publish(directory, columns, meta):
+    """
+    Écrit une nouvelle génération puis la désigne comme courante (remplacement atomique
+    du pointeur). Les générations antérieures à la précédente sont supprimées : les
+    processus qui les ont ouvertes conservent leur projection en mémoire.
+
+    Args:
+        directory (str): Répertoire de l'instantané
+        columns (dict): Colonnes
+        meta (dict): Métadonnées
+    """
+    generation = f'gen-{time.time_ns():020d}'
+    temporary = os.path.join(directory, f'.{generation}.tmp')
+    os.makedirs(temporary)
+    for name, values in columns.items():
+        np.save(os.path.join(temporary, f'{name}.npy'), values)
+    with open(os.path.join(temporary, 'meta.json'), 'w', encoding='utf-8') as meta_file:
+        json.dump(meta, meta_file)
+    os.rename(temporary, os.path.join(directory, generation))
+
+    pointer = os.path.join(directory, f'.{_POINTER_FILE}.tmp')
+    with open(pointer, 'w', encoding='utf-8') as pointer_file:
+        pointer_file.write(generation)
+    os.replace(pointer, os.path.join(directory, _POINTER_FILE))
+
+    generations = sorted(entry for entry in os.listdir(directory) if entry.startswith('gen-'))
+    for entry in generations[:-2]:
+        shutil.rmtree(os.path.join(directory, entry), ignore_errors=True)
+
+def _record_change(mapper, connection, target):
+    """Mémorise l'écriture d'un bien jusqu'au commit de la session."""
+    session = Session.object_session(target)
+    if session is not None:
+        session.info['property_snapshot_stale'] = True
+
+def _after_commit(session):
+    """Marque l'instantané comme périmé après le commit d'écritures sur les biens."""
+    if session.info.pop('property_snapshot_stale', False):
+        mark_property_snapshot_stale()
+
+def _discard_changes(session, previous_transaction):
+    """Oublie les écritures d'une transaction annulée."""
+    session.info.pop('property_snapshot_stale', None)
+
+event.listen(Property, 'after_insert', _record_change)
+event.listen(Property, 'after_update', _record_change)
+event.listen(Property, 'after_delete', _record_change)
+event.listen(Session, 'after_commit', _after_commit)
+event.listen(Session, 'after_soft_rollback', _discard_changes)
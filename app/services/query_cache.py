@@ -0,0 +1,577 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Cache des résultats de requêtes.
+Ce fichier contient un cache à étiquettes pour les fonctions de service en lecture.
+Chaque entrée porte des étiquettes de type d'entité ('properties') et d'entité
+('properties:42') ; les écouteurs SQLAlchemy relèvent à chaque flush les étiquettes
+des objets écrits et les invalident au commit. Deux stockages sont disponibles :
+une LRU en mémoire du processus et un fichier SQLite partagé par les workers d'une machine.
+"""
+
+import hashlib
+import inspect as pyinspect
+import json
+import os
+import pickle
+import random
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app import db
+from app.services.metrics import record_cache_access
+
+# Durée (en secondes) pendant laquelle une invalidation empêche d'enregistrer un
+# résultat calculé avant elle (et donc peut-être périmé)
+CACHE_INVALIDATION_WINDOW = 300
+
+# Clé de session où sont accumulées les étiquettes à invalider avant le commit
+_SESSION_TAGS_KEY = 'query_cache_tags'
+
+# Attributs dont la modification change les listes d'un type d'entité (par table)
+_collection_attributes = {}
+
+_backend_lock = threading.Lock()
+
+class MemoryCache:
+    """
+    Cache LRU en mémoire du processus, borné en nombre d'entrées et en octets.
+
+    Les invalidations ne concernent que le processus courant : à réserver à un
+    serveur à un seul processus, ou à des durées de vie courtes.
+    """
+
+    def __init__(self, max_entries=2048, max_bytes=64 * 1024 * 1024):
+        """
+        Initialise le cache.
+
+        Args:
+            max_entries (int, optional): Nombre maximal d'entrées
+            max_bytes (int, optional): Taille maximale cumulée des valeurs (octets)
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._tags = {}
+        self._invalidated = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Lit une entrée.
+
+        Args:
+            key (str): Clé de l'entrée
+
+        Returns:
+            bytes: Valeur sérialisée, ou None si absente ou expirée
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.time():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[2]
+
+    def set(self, key, payload, tags, ttl, since):
+        """
+        Enregistre une entrée, sauf si l'une de ses étiquettes a été invalidée depuis since.
+
+        Args:
+            key (str): Clé de l'entrée
+            payload (bytes): Valeur sérialisée
+            tags (set): Étiquettes de l'entrée
+            ttl (int): Durée de vie en secondes
+            since (float): Date (time.time()) du début du calcul de la valeur
+
+        Returns:
+            bool: True si l'entrée a été enregistrée
+        """
+        if len(payload) > self.max_bytes:
+            return False
+        with self._lock:
+            if any(self._invalidated.get(tag, 0) >= since for tag in tags):
+                return False
+            self._remove(key)
+            self._entries[key] = (time.time() + ttl, tags, payload)
+            self._size += len(payload)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+        return True
+
+    def invalidate(self, tags):
+        """
+        Supprime les entrées portant l'une des étiquettes.
+
+        Args:
+            tags (iterable): Étiquettes à invalider
+        """
+        now = time.time()
+        with self._lock:
+            for tag in tags:
+                for key in list(self._tags.get(tag, ())):
+                    self._remove(key)
+                self._invalidated[tag] = now
+                self._invalidated.move_to_end(tag)
+            while self._invalidated and next(iter(self._invalidated.values())) < now - CACHE_INVALIDATION_WINDOW:
+                self._invalidated.popitem(last=False)
+
+    def clear(self):
+        """Vide le cache."""
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+            self._size = 0
+
+    def _remove(self, key):
+        """Retire une entrée et ses étiquettes (verrou déjà pris)."""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._size -= len(entry[2])
+        for tag in entry[1]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+class FileCache:
+    """
+    Cache partagé par les processus d'une machine, stocké dans une base SQLite (mode WAL).
+
+    Les invalidations faites par un worker sont immédiatement visibles des autres.
+    """
+
+    def __init__(self, path, max_entries=20000):
+        """
+        Initialise le cache.
+
+        Args:
+            path (str): Chemin du fichier SQLite
+            max_entries (int, optional): Nombre maximal d'entrées
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+
+    def get(self, key):
+        """
+        Lit une entrée.
+
+        Args:
+            key (str): Clé de l'entrée
+
+        Returns:
+            bytes: Valeur sérialisée, ou None si absente ou expirée
+        """
+        row = self._connection().execute(
+            'SELECT value FROM cache_entries WHERE key = ? AND expires_at > ?', (key, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key, payload, tags, ttl, since):
+        """
+        Enregistre une entrée, sauf si l'une de ses étiquettes a été invalidée depuis since.
+
+        Args:
+            key (str): Clé de l'entrée
+            payload (bytes): Valeur sérialisée
+            tags (set): Étiquettes de l'entrée
+            ttl (int): Durée de vie en secondes
+            since (float): Date (time.time()) du début du calcul de la valeur
+
+        Returns:
+            bool: True si l'entrée a été enregistrée
+        """
+        tags = sorted(tags)
+        connection = self._connection()
+        with connection:
+            # Vérification et écriture dans la même transaction que les invalidations concurrentes
+            connection.execute('BEGIN IMMEDIATE')
+            placeholders = ','.join('?' * len(tags))
+            if tags and connection.execute(
+                f'SELECT 1 FROM cache_invalidations WHERE tag IN ({placeholders}) AND invalidated_at >= ? LIMIT 1',
+                (*tags, since)
+            ).fetchone():
+                return False
+            connection.execute('DELETE FROM cache_tags WHERE key = ?', (key,))
+            connection.execute(
+                'INSERT OR REPLACE INTO cache_entries (key, value, expires_at) VALUES (?, ?, ?)',
+                (key, sqlite3.Binary(payload), time.time() + ttl)
+            )
+            connection.executemany('INSERT INTO cache_tags (tag, key) VALUES (?, ?)', [(tag, key) for tag in tags])
+        self._prune(connection)
+        return True
+
+    def invalidate(self, tags):
+        """
+        Supprime les entrées portant l'une des étiquettes.
+
+        Args:
+            tags (iterable): Étiquettes à invalider
+        """
+        tags = sorted(tags)
+        if not tags:
+            return
+        now = time.time()
+        connection = self._connection()
+        with connection:
+            for start in range(0, len(tags), 500):
+                chunk = tags[start:start + 500]
+                placeholders = ','.join('?' * len(chunk))
+                keys = f'SELECT key FROM cache_tags WHERE tag IN ({placeholders})'
+                connection.execute(f'DELETE FROM cache_entries WHERE key IN ({keys})', chunk)
+                connection.execute(f'DELETE FROM cache_tags WHERE key IN ({keys})', chunk)
+                connection.executemany(
+                    'INSERT OR REPLACE INTO cache_invalidations (tag, invalidated_at) VALUES (?, ?)',
+                    [(tag, now) for tag in chunk]
+                )
+
+    def clear(self):
+        """Vide le cache."""
+        connection = self._connection()
+        with connection:
+            connection.execute('DELETE FROM cache_entries')
+            connection.execute('DELETE FROM cache_tags')
+
+    def _connection(self):
+        """Connexion SQLite du thread courant (créée au premier usage)."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=5)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            with connection:
+                connection.execute(
+                    'CREATE TABLE IF NOT EXISTS cache_entries '
+                    '(key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL)'
+                )
+                connection.execute(
+                    'CREATE TABLE IF NOT EXISTS cache_tags '
+                    '(tag TEXT NOT NULL, key TEXT NOT NULL, PRIMARY KEY (tag, key)) WITHOUT ROWID'
+                )
+                connection.execute('CREATE INDEX IF NOT EXISTS ix_cache_tags_key ON cache_tags (key)')
+                connection.execute(
+                    'CREATE TABLE IF NOT EXISTS cache_invalidations '
+                    '(tag TEXT PRIMARY KEY, invalidated_at REAL NOT NULL)'
+                )
+            self._local.connection = connection
+        return connection
+
+    def _prune(self, connection):
+        """Supprime les entrées expirées et les plus anciennes au-delà de max_entries."""
+        # Une écriture sur cent suffit à borner la taille du fichier
+        if random.random() >= 0.01:
+            return
+        now = time.time()
+        with connection:
+            connection.execute('DELETE FROM cache_entries WHERE expires_at <= ?', (now,))
+            connection.execute(
+                'DELETE FROM cache_entries WHERE key IN (SELECT key FROM cache_entries '
+                'ORDER BY expires_at DESC LIMIT -1 OFFSET ?)', (self.max_entries,)
+            )
+            connection.execute('DELETE FROM cache_tags WHERE key NOT IN (SELECT key FROM cache_entries)')
+            connection.execute('DELETE FROM cache_invalidations WHERE invalidated_at < ?',
+                               (now - CACHE_INVALIDATION_WINDOW,))
+
+class NullCache:
+    """Cache désactivé : aucune entrée n'est conservée."""
+
+    def get(self, key):
+        """Aucune entrée : retourne toujours None."""
+        return None
+
+    def set(self, key, payload, tags, ttl, since):
+        """N'enregistre rien."""
+        return False
+
+    def invalidate(self, tags):
+        """Rien à invalider."""
+
+    def clear(self):
+        """Rien à vider."""
+
+def get_cache():
+    """
+    Cache de l'application courante, créé au premier usage selon CACHE_BACKEND
+    ('null' par défaut : cache désactivé, 'file' ou 'memory').
+
+    Returns:
+        MemoryCache | FileCache | NullCache: Cache de l'application
+
+    Raises:
+        ValueError: Si CACHE_BACKEND est inconnu
+    """
+    app = current_app._get_current_object()
+    cache = app.extensions.get('query_cache')
+    if cache is not None:
+        return cache
+
+    with _backend_lock:
+        cache = app.extensions.get('query_cache')
+        if cache is None:
+            backend = app.config.get('CACHE_BACKEND', 'null')
+            if backend == 'memory':
+                cache = MemoryCache(app.config.get('CACHE_MAX_ENTRIES', 2048),
+                                    app.config.get('CACHE_MAX_BYTES', 64 * 1024 * 1024))
+            elif backend == 'file':
+                directory = app.config.get('CACHE_DIR') or os.path.join(app.instance_path, 'cache')
+                cache = FileCache(os.path.join(directory, 'query_cache.sqlite3'),
+                                  app.config.get('CACHE_MAX_ENTRIES', 20000))
+            elif backend == 'null':
+                cache = NullCache()
+            else:
+                raise ValueError(f"CACHE_BACKEND inconnu: '{backend}'. Valeurs possibles: file, memory, null")
+            app.extensions['query_cache'] = cache
+    return cache
+
+def get_local_cache(name, max_entries=2048):
+    """
+    Cache en mémoire du processus propre à un service, créé au premier usage.
+
+    Indépendant de CACHE_BACKEND : il reste actif lorsque le cache des requêtes est
+    désactivé. Ses entrées sont invalidées par les mêmes étiquettes que celles du
+    cache de l'application (commit des écritures, invalidate_tags).
+
+    Args:
+        name (str): Nom du cache
+        max_entries (int, optional): Nombre maximal d'entrées
+
+    Returns:
+        MemoryCache: Cache du service
+    """
+    app = current_app._get_current_object()
+    caches = app.extensions.setdefault('query_cache_local', {})
+    cache = caches.get(name)
+    if cache is not None:
+        return cache
+
+    with _backend_lock:
+        cache = caches.get(name)
+        if cache is None:
+            cache = caches[name] = MemoryCache(max_entries)
+    return cache
+
+def cached_query(namespace, key, compute, tags, ttl=None):
+    """
+    Retourne le résultat mis en cache d'un calcul, ou l'exécute et le met en cache.
+
+    Les objets SQLAlchemy du résultat sont rattachés à la session courante sans
+    requête (merge(load=False)). Le cache est ignoré tant que la transaction en cours
+    contient des écritures, pour que la session voie ses propres modifications.
+
+    Args:
+        namespace (str): Espace de noms (fonction de service)
+        key: Paramètres du calcul (sérialisables en JSON)
+        compute: Fonction sans argument calculant le résultat
+        tags: Étiquettes de l'entrée, ou fonction recevant le résultat et retournant les étiquettes
+        ttl (int, optional): Durée de vie en secondes (CACHE_DEFAULT_TTL par défaut)
+
+    Returns:
+        Le résultat du calcul
+    """
+    session = db.session()
+    if session.new or session.dirty or session.deleted or session.info.get(_SESSION_TAGS_KEY):
+        record_cache_access(namespace, 'bypass')
+        return compute()
+
+    cache = get_cache()
+    digest = hashlib.sha1(json.dumps(key, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+    cache_key = f'{namespace}:{digest}'
+
+    payload = cache.get(cache_key)
+    if payload is not None:
+        try:
+            result = _attach(session, pickle.loads(payload))
+        except Exception:
+            # Entrée illisible (modèle modifié depuis son enregistrement) : recalcul
+            pass
+        else:
+            record_cache_access(namespace, 'hit')
+            return result
+
+    record_cache_access(namespace, 'miss')
+    since = time.time()
+    result = compute()
+    entry_tags = set(tags(result) if callable(tags) else tags)
+    if ttl is None:
+        ttl = current_app.config.get('CACHE_DEFAULT_TTL', 300)
+    cache.set(cache_key, pickle.dumps(result, pickle.HIGHEST_PROTOCOL), entry_tags, ttl, since)
+    return result
+
+def cached(namespace, tags, ttl=None):
+    """
+    Décorateur mettant en cache le résultat d'une fonction de service selon ses arguments.
+
+    Args:
+        namespace (str): Espace de noms
+        tags: Fonction recevant le résultat et les arguments (dict) et retournant les étiquettes
+        ttl (int, optional): Durée de vie en secondes
+
+    Returns:
+        function: Le décorateur
+    """
+    def decorator(f):
+        signature = pyinspect.signature(f)
+
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = dict(bound.arguments)
+            return cached_query(namespace, arguments, lambda: f(*args, **kwargs),
+                                lambda result: tags(result, arguments), ttl)
+
+        return decorated
+
+    return decorator
+
+def entity_tags(objects):
+    """
+    Étiquettes d'entité ('table:id') d'objets SQLAlchemy.
+
+    Args:
+        objects (iterable): Objets SQLAlchemy
+
+    Returns:
+        list: Étiquettes
+    """
+    return [_entity_tag(target) for target in objects]
+
+def register_collection_attributes(table, attributes):
+    """
+    Déclare les attributs dont la modification change les listes d'un type d'entité.
+
+    Par défaut, toute modification d'un objet invalide l'étiquette de son type ; après
+    cette déclaration, les autres modifications n'invalident que l'étiquette de l'objet.
+
+    Args:
+        table (str): Nom de la table
+        attributes (iterable): Noms des attributs (colonnes ou relations)
+    """
+    _collection_attributes[table] = frozenset(attributes)
+
+def record_tags(session, tags):
+    """
+    Ajoute des étiquettes à invalider au commit de la session (écritures faites
+    hors de l'ORM dans la transaction de la session).
+
+    Args:
+        session (Session): Session dont la transaction contient les écritures
+        tags (iterable): Étiquettes à invalider
+    """
+    session.info.setdefault(_SESSION_TAGS_KEY, set()).update(tags)
+
+def invalidate_tags(tags):
+    """
+    Invalide immédiatement des étiquettes (écritures faites hors de l'ORM).
+
+    Args:
+        tags (iterable): Étiquettes à invalider
+    """
+    _invalidate(set(tags))
+
+# Fonctions utilitaires
+
+def _entity_tag(target):
+    """Étiquette d'entité d'un objet SQLAlchemy."""
+    mapper = inspect(target).mapper
+    identity = ','.join(str(value) for value in mapper.primary_key_from_instance(target))
+    return f'{mapper.local_table.name}:{identity}'
+
+def _invalidate(tags):
+    """Invalide des étiquettes dans le cache de l'application et dans les caches des services."""
+    get_cache().invalidate(tags)
+    for cache in list(current_app.extensions.get('query_cache_local', {}).values()):
+        cache.invalidate(tags)
+
+def _attach(session, value):
+    """Rattache à la session les objets SQLAlchemy d'un résultat désérialisé."""
+    if isinstance(value, list):
+        return [_attach(session, item) for item in value]
+    if isinstance(value, tuple):
+        return tuple(_attach(session, item) for item in value)
+    if inspect(value, raiseerr=False) is not None and hasattr(value, '__table__'):
+        return session.merge(value, load=False)
+    return value
+
+def _object_tags(target, state):
+    """
+    Étiquettes invalidées par l'écriture d'un objet.
+
+    Args:
+        target: Objet créé, modifié ou supprimé
+        state (str): 'new', 'dirty' ou 'deleted'
+
+    Returns:
+        set: Étiquettes
+    """
+    instance_state = inspect(target)
+    mapper = instance_state.mapper
+    table = mapper.local_table.name
+    tags = {_entity_tag(target)}
+
+    changed = set()
+    if state == 'dirty':
+        changed = {attr.key for attr in instance_state.attrs if attr.history.has_changes()}
+    if state != 'dirty' or table not in _collection_attributes or changed & _collection_attributes[table]:
+        tags.add(table)
+
+    # Objets parents (clés étrangères) : leurs listes d'enfants changent
+    for column in mapper.local_table.columns:
+        for foreign_key in column.foreign_keys:
+            attribute = mapper.get_property_by_column(column).key
+            if state == 'dirty':
+                history = instance_state.attrs[attribute].history
+                values = list(history.added) + list(history.deleted)
+            else:
+                values = [getattr(target, attribute)]
+            tags.update(f'{foreign_key.column.table.name}:{value}' for value in values if value is not None)
+
+    # Relations modifiées (associations plusieurs-à-plusieurs comprises)
+    if state == 'dirty':
+        for relationship in mapper.relationships:
+            if relationship.key in changed:
+                history = instance_state.attrs[relationship.key].history
+                tags.update(_entity_tag(related) for related in list(history.added) + list(history.deleted)
+                            if related is not None)
+    return tags
+
+def _after_flush(session, flush_context):
+    """Relève les étiquettes des objets écrits par ce flush."""
+    tags = session.info.setdefault(_SESSION_TAGS_KEY, set())
+    for state, targets in (('new', session.new), ('deleted', session.deleted), ('dirty', session.dirty)):
+        for target in targets:
+            if state == 'dirty' and not session.is_modified(target):
+                continue
+            tags.update(_object_tags(target, state))
+
+def _after_commit(session):
+    """Invalide les étiquettes des écritures validées."""
+    tags = session.info.pop(_SESSION_TAGS_KEY, None)
+    if tags and has_app_context():
+        _invalidate(tags)
+
+def _discard_tags(session, previous_transaction):
+    """Oublie les étiquettes d'une transaction annulée."""
+    session.info.pop(_SESSION_TAGS_KEY, None)
+
+event.listen(Session, 'after_flush', _after_flush)
+event.listen(Session, 'after_commit', _after_commit)
+event.listen(Session, 'after_soft_rollback', _discard_tags)
@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Services de recherche plein texte et approximative.
+Ce fichier contient les fonctions appliquant une recherche textuelle classée par
+pertinence aux requêtes sur les biens immobiliers, ainsi que la recherche tolérante
+aux fautes de frappe sur les clients et les propriétaires, selon le moteur de base de données.
+"""
+
+import re
+
+from app import db
+from app.models.__init__1 import Property
+from app.models.property_search import property_search_vector, properties_fts, PROPERTIES_FTS_TABLE
+from app.models.fuzzy_search import search_document, FUZZY_SEARCH_FIELDS
+from app.services.ngram_index import search_ngram_index
+
+# Configuration linguistique PostgreSQL (racinisation française)
+SEARCH_CONFIG = 'french'
+
+# Poids BM25 des colonnes FTS5 (titre > ville > description)
+FTS5_WEIGHTS = (10.0, 5.0, 1.0)
+
+# Similarité minimale (entre 0 et 1) d'un résultat de recherche approximative
+FUZZY_THRESHOLD = 0.3
+
+# Nombre maximal de résultats d'une recherche approximative hors PostgreSQL
+FUZZY_MAX_RESULTS = 200
+
+# Nombre d'identifiants candidats vérifiés par requête contre les filtres de l'appelant
+FUZZY_FILTER_CHUNK_SIZE = 500
+
+def apply_text_search(query, q):
+    """
+    Restreint une requête sur les biens immobiliers aux résultats d'une recherche textuelle.
+
+    - PostgreSQL : colonne tsvector pondérée et websearch_to_tsquery('french', q)
+    - SQLite : table FTS5 avec correspondance par préfixe de chaque mot
+    - Autres moteurs : ILIKE sur le titre, la ville et la description (sans classement)
+
+    Args:
+        query (Query): Requête SQLAlchemy sur Property
+        q (str): Texte recherché
+
+    Returns:
+        tuple: (Requête filtrée, expression de pertinence — plus elle est grande, plus le résultat est pertinent)
+    """
+    dialect = db.session.get_bind().dialect.name
+
+    if dialect == 'postgresql':
+        tsquery = db.func.websearch_to_tsquery(SEARCH_CONFIG, q)
+        rank = db.func.ts_rank(property_search_vector, tsquery)
+        return query.filter(property_search_vector.op('@@')(tsquery)), rank
+
+    if dialect == 'sqlite':
+        match = build_fts5_query(q)
+        if not match:
+            return query.filter(db.false()), db.literal(0)
+        # bm25() est négatif : plus il est petit, plus le résultat est pertinent
+        rank = -db.func.bm25(db.literal_column(PROPERTIES_FTS_TABLE), *FTS5_WEIGHTS)
+        query = query.join(properties_fts, properties_fts.c.rowid == Property.id).filter(
+            db.literal_column(PROPERTIES_FTS_TABLE).op('MATCH')(match)
+        )
+        return query, rank
+
+    search_term = f"%{q}%"
+    query = query.filter(
+        db.or_(
+            Property.title.ilike(search_term),
+            Property.city.ilike(search_term),
+            Property.description.ilike(search_term)
+        )
+    )
+    return query, db.literal(0)
+
+def build_fts5_query(q):
+    """
+    Convertit un texte libre en expression MATCH FTS5 sûre.
+
+    Chaque mot est placé entre guillemets (la syntaxe FTS5 de l'utilisateur n'est pas
+    interprétée) et recherché par préfixe, ce qui compense en partie l'absence de
+    racinisation française dans FTS5. Tous les mots doivent être présents.
+
+    Args:
+        q (str): Texte recherché
+
+    Returns:
+        str: Expression MATCH, vide si le texte ne contient aucun mot
+    """
+    words = re.findall(r'\w+', q or '')
+    return ' '.join(f'"{word}"*' for word in words)
+
+def apply_fuzzy_search(query, model, q):
+    """
+    Restreint une requête sur les clients ou les propriétaires aux résultats
+    proches d'un texte, avec tolérance aux fautes de frappe.
+
+    - PostgreSQL : opérateur <% de pg_trgm (servi par l'index trigrammes du document)
+      et classement par word_similarity
+    - Autres moteurs : index trigrammes en mémoire (app.services.ngram_index), limité
+      aux FUZZY_MAX_RESULTS meilleurs résultats qui satisfont les filtres de la requête ;
+      ILIKE non classé tant que l'index est en cours de construction
+
+    À appeler après les autres filtres de la requête, pour que la limite des résultats
+    s'applique aux objets qui les satisfont.
+
+    Args:
+        query (Query): Requête SQLAlchemy sur le modèle, déjà filtrée
+        model: Client ou Owner
+        q (str): Texte recherché
+
+    Returns:
+        tuple: (Requête filtrée, expression de pertinence — plus elle est grande, plus le résultat est pertinent)
+    """
+    if db.session.get_bind().dialect.name == 'postgresql':
+        document = search_document(model)
+        # Seuil de l'opérateur <%, limité à la transaction en cours
+        db.session.execute(
+            db.select(db.func.set_config('pg_trgm.word_similarity_threshold', str(FUZZY_THRESHOLD), True))
+        )
+        rank = db.func.word_similarity(q, document)
+        return query.filter(db.literal(q).op('<%')(document)), rank
+
+    matches = search_ngram_index(model, q, FUZZY_THRESHOLD, None)
+    if matches is None:
+        # Index en cours de construction : recherche simple, non classée
+        search_term = f"%{q}%"
+        fields = [getattr(model, field) for field in FUZZY_SEARCH_FIELDS[model]]
+        return query.filter(db.or_(*[field.ilike(search_term) for field in fields])), db.literal(0)
+    if len(matches) > FUZZY_MAX_RESULTS and query.whereclause is not None:
+        matches = _filter_matches(query, model, matches)
+    matches = matches[:FUZZY_MAX_RESULTS]
+    if not matches:
+        return query.filter(db.false()), db.literal(0)
+    scores = dict(matches)
+    rank = db.case(scores, value=model.id, else_=0)
+    return query.filter(model.id.in_(scores)), rank
+
+# Fonctions utilitaires
+
+def _filter_matches(query, model, matches):
+    """
+    Meilleurs résultats de l'index n-grammes qui satisfont les filtres d'une requête,
+    vérifiés par lots dans l'ordre de pertinence jusqu'à FUZZY_MAX_RESULTS résultats.
+
+    Args:
+        query (Query): Requête filtrée
+        model: Client ou Owner
+        matches (list): Couples (identifiant, score) triés par score décroissant
+
+    Returns:
+        list: Couples (identifiant, score) retenus, dans le même ordre
+    """
+    ids = query.with_entities(model.id).order_by(None)
+    result = []
+    for start in range(0, len(matches), FUZZY_FILTER_CHUNK_SIZE):
+        chunk = matches[start:start + FUZZY_FILTER_CHUNK_SIZE]
+        allowed = {row[0] for row in ids.filter(model.id.in_([row_id for row_id, _ in chunk]))}
+        result.extend(match for match in chunk if match[0] in allowed)
+        if len(result) >= FUZZY_MAX_RESULTS:
+            break
+    return result
@@ -0,0 +1,558 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Génération d'un jeu de données synthétique et reproductible.
+Ce fichier remplit la base (SQLite ou PostgreSQL) d'utilisateurs, de propriétaires,
+de biens avec images et équipements, de clients, d'intérêts, de visites, de
+transactions et de contrats de location, dans des proportions réalistes. Les mêmes
+paramètres (échelle, asymétrie, graine) produisent toujours les mêmes données, ce qui
+permet de comparer les mesures de performance d'une exécution à l'autre.
+
+L'asymétrie suit une loi de Zipf : avec skew=0 les choix sont uniformes ; plus elle
+est élevée, plus quelques villes, propriétaires, biens et agents concentrent les
+enregistrements (biens d'une grande ville, biens très demandés, agent principal).
+
+Les lignes sont insérées par INSERT multi-lignes, sans passer par l'ORM ; les
+structures maintenues d'ordinaire par ses écouteurs (statistiques du tableau de bord,
+index en mémoire, cache des requêtes, instantané des biens) sont mises à jour à la fin.
+"""
+
+import itertools
+import math
+import random
+import secrets
+import unicodedata
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+from werkzeug.security import generate_password_hash
+
+from app import db
+from app.models.__init__1 import (
+    User, Owner, Property, PropertyImage, Amenity, Client, PropertyVisit, Transaction, RentalAgreement,
+    encode_geo_cell
+)
+from app.models.client import client_property_interests
+from app.models.property import property_amenities
+from app.services.dashboard_service import rebuild_dashboard_stats
+from app.services.ngram_index import reset_ngram_indexes
+from app.services.property_snapshot import mark_property_snapshot_stale
+from app.services.query_cache import get_cache
+
+# Nombre d'enregistrements par unité d'échelle
+SEED_SCALE_UNIT = {
+    'agents': 2,
+    'owners': 100,
+    'properties': 500,
+    'clients': 300
+}
+
+# Date de référence des données générées (fixe, pour que les données soient reproductibles)
+SEED_REFERENCE_DATE = date(2025, 6, 30)
+
+# Nombre d'années d'historique des transactions et des visites
+SEED_HISTORY_YEARS = 3
+
+# Nombre d'enregistrements insérés ensemble
+SEED_CHUNK_SIZE = 1000
+
+# Villes : nom, code postal, région, latitude, longitude, prix moyen au m² (par ordre de popularité)
+SEED_CITIES = [
+    ('Paris', '75011', 'Île-de-France', 48.8566, 2.3522, 10500),
+    ('Lyon', '69003', 'Auvergne-Rhône-Alpes', 45.7640, 4.8357, 5200),
+    ('Marseille', '13006', "Provence-Alpes-Côte d'Azur", 43.2965, 5.3698, 3800),
+    ('Toulouse', '31000', 'Occitanie', 43.6047, 1.4442, 3900),
+    ('Bordeaux', '33000', 'Nouvelle-Aquitaine', 44.8378, -0.5792, 4800),
+    ('Nantes', '44000', 'Pays de la Loire', 47.2184, -1.5536, 4100),
+    ('Lille', '59000', 'Hauts-de-France', 50.6292, 3.0573, 3700),
+    ('Nice', '06000', "Provence-Alpes-Côte d'Azur", 43.7102, 7.2620, 5100),
+    ('Strasbourg', '67000', 'Grand Est', 48.5734, 7.7521, 3600),
+    ('Montpellier', '34000', 'Occitanie', 43.6108, 3.8767, 4000),
+    ('Rennes', '35000', 'Bretagne', 48.1173, -1.6778, 4200),
+    ('Grenoble', '38000', 'Auvergne-Rhône-Alpes', 45.1885, 5.7245, 2900),
+    ('Dijon', '21000', 'Bourgogne-Franche-Comté', 47.3220, 5.0415, 2700),
+    ('Angers', '49000', 'Pays de la Loire', 47.4784, -0.5632, 3000),
+    ('Reims', '51100', 'Grand Est', 49.2583, 4.0317, 2500),
+    ('Tours', '37000', 'Centre-Val de Loire', 47.3941, 0.6848, 2800),
+    ('Clermont-Ferrand', '63000', 'Auvergne-Rhône-Alpes', 45.7772, 3.0870, 2400),
+    ('Limoges', '87000', 'Nouvelle-Aquitaine', 45.8336, 1.2611, 1800),
+    ('Brest', '29200', 'Bretagne', 48.3904, -4.4861, 2200),
+    ('Annecy', '74000', 'Auvergne-Rhône-Alpes', 45.8992, 6.1294, 5600)
+]
+
+# Équipements : nom, catégorie
+SEED_AMENITIES = [
+    ('Ascenseur', 'interior'), ('Cave', 'interior'), ('Cheminée', 'interior'), ('Parquet', 'interior'),
+    ('Cuisine équipée', 'interior'), ('Climatisation', 'interior'), ('Dressing', 'interior'),
+    ('Double vitrage', 'interior'), ('Balcon', 'exterior'), ('Jardin privatif', 'exterior'),
+    ('Terrasse', 'exterior'), ('Piscine', 'exterior'), ('Parking', 'exterior'), ('Box fermé', 'exterior'),
+    ('Vue dégagée', 'exterior'), ('Digicode', 'security'), ('Interphone', 'security'),
+    ('Gardien', 'security'), ('Alarme', 'security'), ('Porte blindée', 'security'),
+    ('Fibre optique', 'services'), ('Local vélos', 'services'), ('Accès PMR', 'services'),
+    ('Proche transports', 'services')
+]
+
+# Noms des personnes générées
+SEED_FIRST_NAMES = [
+    'Jean', 'Marie', 'Pierre', 'Sophie', 'Nicolas', 'Camille', 'Julien', 'Claire', 'Thomas', 'Julie',
+    'Antoine', 'Emma', 'Louis', 'Léa', 'Hugo', 'Chloé', 'Lucas', 'Manon', 'Paul', 'Inès',
+    'Mathieu', 'Sarah', 'Alexandre', 'Laura', 'Maxime', 'Anaïs', 'Olivier', 'Pauline', 'Éric', 'Céline'
+]
+SEED_LAST_NAMES = [
+    'Martin', 'Bernard', 'Dubois', 'Thomas', 'Robert', 'Richard', 'Petit', 'Durand', 'Leroy', 'Moreau',
+    'Simon', 'Laurent', 'Lefebvre', 'Michel', 'Garcia', 'David', 'Bertrand', 'Roux', 'Vincent', 'Fournier',
+    'Morel', 'Girard', 'André', 'Lefèvre', 'Mercier', 'Dupont', 'Lambert', 'Bonnet', 'François', 'Martinez'
+]
+SEED_STREETS = [
+    'rue de la République', 'avenue Jean Jaurès', 'boulevard Victor Hugo', 'rue Pasteur', 'rue Nationale',
+    'place de la Mairie', 'rue du Moulin', 'avenue de la Gare', 'rue des Écoles', 'quai des Brumes',
+    'rue Voltaire', 'allée des Tilleuls', 'rue Émile Zola', 'impasse des Lilas', 'chemin des Vignes'
+]
+
+# Types de biens : poids, surface (min, max), pièces (min, max)
+SEED_PROPERTY_TYPES = {
+    'apartment': (55, (18, 140), (1, 5)),
+    'house': (30, (60, 320), (2, 7)),
+    'land': (5, (300, 5000), (0, 0)),
+    'commercial': (7, (40, 900), (0, 0)),
+    'other': (3, (10, 60), (0, 1))
+}
+
+# Statuts des biens : poids pour un bien à vendre, pour un bien à louer
+SEED_SALE_STATUSES = (('for_sale', 70), ('sold', 30))
+SEED_RENTAL_STATUSES = (('for_rent', 55), ('rented', 45))
+
+# Niveaux d'intérêt des clients et statuts des visites
+SEED_INTEREST_LEVELS = (('low', 35), ('medium', 40), ('high', 25))
+SEED_VISIT_STATUSES = (('completed', 60), ('cancelled', 10))
+
+def seed_database(scale=1, skew=1.0, seed=42, reset=False, password=None,
+                  chunk_size=SEED_CHUNK_SIZE, progress=None):
+    """
+    Remplit la base d'un jeu de données synthétique.
+
+    La base doit être vide (aucun bien, propriétaire, client ni utilisateur) sauf si
+    reset est vrai : toutes les tables sont alors vidées au préalable.
+
+    Args:
+        scale (int): Échelle (une unité : 500 biens, 300 clients, 100 propriétaires, 2 agents)
+        skew (float): Asymétrie des choix (0 pour des choix uniformes)
+        seed (int): Graine du générateur pseudo-aléatoire
+        reset (bool): Vide toutes les tables avant la génération
+        password (str, optional): Mot de passe des utilisateurs générés (aléatoire par défaut)
+        chunk_size (int): Nombre d'enregistrements insérés ensemble
+        progress (callable, optional): Appelée avec (table, nombre de lignes) après chaque table
+
+    Returns:
+        dict: Nombre de lignes par table et mot de passe des utilisateurs ('password')
+
+    Raises:
+        ValueError: Si un paramètre est invalide ou si la base n'est pas vide
+    """
+    if scale < 1:
+        raise ValueError("L'échelle doit être au moins 1")
+    if skew < 0:
+        raise ValueError("L'asymétrie doit être positive ou nulle")
+
+    if reset:
+        _reset_tables()
+    elif any(db.session.query(model.id).first() for model in (Property, Owner, Client, User)):
+        raise ValueError("La base contient déjà des données (utiliser reset pour la vider)")
+    db.session.rollback()
+
+    password = password or secrets.token_urlsafe(12)
+    generator = SeedGenerator(scale, skew, seed, password, chunk_size, progress)
+    with db.engine.begin() as connection:
+        generator.run(connection)
+
+    _after_seed()
+    return dict(generator.counts, password=password)
+
+class SeedGenerator:
+    """Génère et insère les enregistrements, table par table."""
+
+    def __init__(self, scale, skew, seed, password, chunk_size, progress):
+        self.scale = scale
+        self.skew = skew
+        self.random = random.Random(seed)
+        self.password_hash = generate_password_hash(password)
+        self.chunk_size = chunk_size
+        self.progress = progress
+        self.counts = {}
+        self.created_at = datetime.combine(SEED_REFERENCE_DATE, time(12, 0))
+        # Les grandes villes sont les plus fréquentes
+        self.pick_city = self._skewed_picker(SEED_CITIES, shuffle=False)
+
+    def run(self, connection):
+        """
+        Génère toutes les tables dans l'ordre des clés étrangères.
+
+        Args:
+            connection (Connection): Connexion dans une transaction
+        """
+        self.connection = connection
+        self.insert_users()
+        self.insert_amenities()
+        self.insert_owners()
+        self.insert_properties()
+        self.insert_images()
+        self.insert_clients()
+        self.insert_interests()
+        self.insert_visits()
+        self.insert_transactions()
+
+    # Tables
+
+    def insert_users(self):
+        """Un administrateur et des agents (l'asymétrie désigne des agents principaux)."""
+        rows = [{
+            'username': 'admin', 'email': 'admin@example.com', 'first_name': 'Admin',
+            'last_name': 'Système', 'role': 'admin'
+        }]
+        for number in range(1, SEED_SCALE_UNIT['agents'] * self.scale + 1):
+            first_name, last_name = self._person_name()
+            rows.append({
+                'username': f'agent{number}', 'email': f'agent{number}@example.com',
+                'first_name': first_name, 'last_name': last_name, 'role': 'agent'
+            })
+        for row in rows:
+            row.update(password_hash=self.password_hash, is_active=True,
+                       created_at=self.created_at, updated_at=self.created_at)
+        ids = self._insert(User.__table__, rows, returning=True)
+        self.admin_id = ids[0]
+        self.agent_ids = ids[1:]
+        self.pick_agent = self._skewed_picker(self.agent_ids)
+
+    def insert_amenities(self):
+        """Équipements du catalogue (l'asymétrie rend certains équipements courants)."""
+        rows = [{'name': name, 'category': category} for name, category in SEED_AMENITIES]
+        self.amenity_ids = self._insert(Amenity.__table__, rows, returning=True)
+        self.pick_amenity = self._skewed_picker(self.amenity_ids)
+
+    def insert_owners(self):
+        """Propriétaires (l'asymétrie donne de nombreux biens à quelques propriétaires)."""
+        rows = []
+        for number in range(1, SEED_SCALE_UNIT['owners'] * self.scale + 1):
+            first_name, last_name = self._person_name()
+            city = self.pick_city()
+            rows.append(dict(self._contact(first_name, last_name, 'proprietaire', number, city),
+                             created_at=self.created_at, updated_at=self.created_at))
+        owner_ids = self._insert(Owner.__table__, rows, returning=True)
+        self.pick_owner = self._skewed_picker(owner_ids)
+
+    def insert_properties(self):
+        """Biens immobiliers et leurs équipements."""
+        types = list(SEED_PROPERTY_TYPES)
+        type_weights = [SEED_PROPERTY_TYPES[name][0] for name in types]
+        rows = []
+        amenities = []
+        for number in range(1, SEED_SCALE_UNIT['properties'] * self.scale + 1):
+            property_type = self.random.choices(types, type_weights)[0]
+            rows.append(self._property(number, property_type))
+            count = 0 if property_type == 'land' else self.random.randint(0, 8)
+            amenities.append({self.pick_amenity() for _ in range(count)})
+
+        ids = self._insert(Property.__table__, rows, returning=True)
+        self._insert(property_amenities, [
+            {'property_id': property_id, 'amenity_id': amenity_id}
+            for property_id, amenity_ids in zip(ids, amenities) for amenity_id in sorted(amenity_ids)
+        ])
+
+        self.properties = [dict(row, id=property_id) for row, property_id in zip(rows, ids)]
+        # Les biens les plus demandés reçoivent le plus d'intérêts, de visites et d'offres
+        self.pick_property = self._skewed_picker(self.properties)
+
+    def insert_images(self):
+        """Images des biens (0 à 6 par bien, la première est l'image principale)."""
+        rows = []
+        for row in self.properties:
+            for order in range(self.random.choice((0, 1, 2, 3, 3, 4, 4, 5, 6))):
+                file_name = f"{row['reference_code'].lower()}-{order + 1}.jpg"
+                rows.append({
+                    'property_id': row['id'],
+                    'file_path': f'uploads/properties/{row["id"]}/{file_name}',
+                    'file_name': file_name,
+                    'file_size': self.random.randint(150, 4000) * 1024,
+                    'file_type': 'image/jpeg',
+                    'is_primary': order == 0,
+                    'display_order': order,
+                    'title': f"{row['title']} ({order + 1})",
+                    'uploaded_at': row['created_at'],
+                    'uploaded_by': row['created_by']
+                })
+        self._insert(PropertyImage.__table__, rows)
+
+    def insert_clients(self):
+        """Clients acheteurs, locataires ou les deux, avec leur budget et leur agent."""
+        rows = []
+        for number in range(1, SEED_SCALE_UNIT['clients'] * self.scale + 1):
+            first_name, last_name = self._person_name()
+            city = self.pick_city()
+            client_type = self.random.choices(('buyer', 'tenant', 'both'), (50, 40, 10))[0]
+            if client_type == 'tenant':
+                budget = self.random.randint(4, 30) * 100
+                budget_min, budget_max = Decimal(budget), Decimal(budget + self.random.randint(2, 10) * 100)
+            else:
+                budget = self.random.randint(8, 120) * 10000
+                budget_min, budget_max = Decimal(budget), Decimal(budget + self.random.randint(2, 20) * 10000)
+            rows.append(dict(
+                self._contact(first_name, last_name, 'client', number, city),
+                client_type=client_type, budget_min=budget_min, budget_max=budget_max,
+                requirements=f"Recherche à {city[0]}", assigned_agent_id=self.pick_agent(),
+                created_at=self.created_at, updated_at=self.created_at
+            ))
+        ids = self._insert(Client.__table__, rows, returning=True)
+        self.clients = [dict(row, id=client_id) for row, client_id in zip(rows, ids)]
+
+    def insert_interests(self):
+        """Intérêts des clients (0 à 6 biens par client, surtout les biens les plus demandés)."""
+        levels, weights = zip(*SEED_INTEREST_LEVELS)
+        rows = []
+        for client in self.clients:
+            property_ids = {self.pick_property()['id'] for _ in range(self.random.randint(0, 6))}
+            for property_id in sorted(property_ids):
+                rows.append({
+                    'client_id': client['id'], 'property_id': property_id,
+                    'interest_level': self.random.choices(levels, weights)[0],
+                    'created_at': self.created_at, 'updated_at': self.created_at
+                })
+        self._insert(client_property_interests, rows)
+
+    def insert_visits(self):
+        """Visites passées (effectuées ou annulées) et à venir (planifiées)."""
+        statuses, weights = zip(*SEED_VISIT_STATUSES)
+        levels = [level for level, _ in SEED_INTEREST_LEVELS]
+        rows = []
+        for client in self.clients:
+            for _ in range(self.random.choice((0, 0, 1, 1, 2, 3, 4))):
+                offset = self.random.randint(-365 * SEED_HISTORY_YEARS, 60)
+                visit_date = datetime.combine(SEED_REFERENCE_DATE + timedelta(days=offset),
+                                              time(self.random.randint(9, 18), self.random.choice((0, 30))))
+                status = 'scheduled' if offset > 0 else self.random.choices(statuses, weights)[0]
+                rows.append({
+                    'property_id': self.pick_property()['id'], 'client_id': client['id'],
+                    'visit_date': visit_date, 'duration': self.random.choice((30, 45, 60, 90)),
+                    'status': status,
+                    'interest_level': self.random.choice(levels) if status == 'completed' else None,
+                    'accompanied_by': client['assigned_agent_id'],
+                    'created_at': self.created_at, 'updated_at': self.created_at
+                })
+        self._insert(PropertyVisit.__table__, rows)
+
+    def insert_transactions(self):
+        """
+        Transactions des biens vendus ou loués (terminées), offres en cours sur les biens
+        disponibles (en attente ou annulées), et contrats des locations terminées.
+        """
+        rows = []
+        for row in self.properties:
+            if row['status'] in ('sold', 'rented'):
+                rows.append(self._transaction(row, 'completed'))
+        for _ in range(len(self.properties) // 10):
+            row = self.pick_property()
+            if row['status'] in ('for_sale', 'for_rent'):
+                rows.append(self._transaction(row, self.random.choices(('pending', 'cancelled'), (80, 20))[0]))
+        ids = self._insert(Transaction.__table__, rows, returning=True)
+
+        agreements = []
+        for row, transaction_id in zip(rows, ids):
+            if row['transaction_type'] != 'rental' or row['status'] != 'completed':
+                continue
+            start_date = row['transaction_date'] + timedelta(days=self.random.randint(1, 30))
+            agreements.append({
+                'transaction_id': transaction_id,
+                'start_date': start_date,
+                'end_date': start_date + timedelta(days=365 * self.random.choice((1, 1, 3))),
+                'is_renewable': True,
+                'rent_amount': row['amount'],
+                'rent_frequency': 'monthly',
+                'deposit_amount': row['amount'] * self.random.choice((1, 2)),
+                'payment_day': self.random.choice((1, 5, 10)),
+                'created_at': self.created_at, 'updated_at': self.created_at
+            })
+        self._insert(RentalAgreement.__table__, agreements)
+
+    # Enregistrements
+
+    def _property(self, number, property_type):
+        """Valeurs d'un bien immobilier."""
+        city, postal_code, region, latitude, longitude, price_per_m2 = self.pick_city()
+        _, (min_area, max_area), (min_rooms, max_rooms) = SEED_PROPERTY_TYPES[property_type]
+        # Surfaces log-uniformes : beaucoup de petits biens, quelques très grands
+        total_area = round(math.exp(self.random.uniform(math.log(min_area), math.log(max_area))), 2)
+        living_area = None if property_type == 'land' else round(total_area * self.random.uniform(0.8, 1.0), 2)
+        bedrooms = self.random.randint(min_rooms, max_rooms) if max_rooms else None
+
+        rental = property_type in ('apartment', 'commercial', 'other') and self.random.random() < 0.45
+        statuses, weights = zip(*(SEED_RENTAL_STATUSES if rental else SEED_SALE_STATUSES))
+        status = self.random.choices(statuses, weights)[0]
+        factor = 0.15 if property_type == 'land' else self.random.uniform(0.75, 1.3)
+        asking_price = None if rental else Decimal(round(total_area * price_per_m2 * factor, -3))
+        rental_price = Decimal(round(total_area * price_per_m2 * factor / 250)) if rental else None
+
+        # Position dans un rayon d'environ 8 km autour du centre de la ville
+        latitude = round(latitude + self.random.gauss(0, 0.03), 6)
+        longitude = round(longitude + self.random.gauss(0, 0.04), 6)
+        created_at = self.created_at - timedelta(days=self.random.randint(0, 365 * SEED_HISTORY_YEARS),
+                                                 minutes=self.random.randint(0, 1439))
+        label = {'apartment': 'Appartement', 'house': 'Maison', 'land': 'Terrain',
+                 'commercial': 'Local commercial', 'other': 'Parking'}[property_type]
+        title = f'{label} {total_area:.0f} m² à {city}'
+        return {
+            'reference_code': f'SEED-{number:08d}',
+            'title': title,
+            'description': f"{title}. " + ' '.join(self.random.sample((
+                'Lumineux et calme.', 'Proche des commerces et des écoles.', 'Rénové récemment.',
+                'Belle hauteur sous plafond.', 'Exposition sud.', 'Travaux à prévoir.',
+                'Quartier recherché.', 'Idéal investisseur.', 'Vue dégagée.', 'Aucun vis-à-vis.'
+            ), 3)),
+            'property_type': property_type,
+            'status': status,
+            'address_line1': f'{self.random.randint(1, 180)} {self.random.choice(SEED_STREETS)}',
+            'city': city,
+            'state_province': region,
+            'postal_code': postal_code,
+            'country': 'France',
+            'latitude': Decimal(str(latitude)),
+            'longitude': Decimal(str(longitude)),
+            'geo_cell': encode_geo_cell(latitude, longitude),
+            'total_area': Decimal(str(total_area)),
+            'living_area': Decimal(str(living_area)) if living_area is not None else None,
+            'land_area': Decimal(str(total_area)) if property_type in ('house', 'land') else None,
+            'num_bedrooms': bedrooms,
+            'num_bathrooms': max(1, (bedrooms or 0) // 2) if bedrooms else None,
+            'num_floors': self.random.randint(1, 3) if property_type == 'house' else None,
+            'year_built': self.random.randint(1850, 2024) if property_type != 'land' else None,
+            'energy_rating': self.random.choice('ABCDDEEFG') if property_type != 'land' else None,
+            'has_garage': property_type == 'house' and self.random.random() < 0.5,
+            'has_garden': property_type == 'house' and self.random.random() < 0.7,
+            'has_terrace': property_type in ('apartment', 'house') and self.random.random() < 0.3,
+            'has_pool': property_type == 'house' and self.random.random() < 0.1,
+            'is_furnished': rental and self.random.random() < 0.4,
+            'asking_price': asking_price,
+            'rental_price': rental_price,
+            'created_at': created_at,
+            'updated_at': created_at,
+            'created_by': self.pick_agent(),
+            'owner_id': self.pick_owner()
+        }
+
+    def _transaction(self, row, status):
+        """Valeurs d'une transaction sur un bien."""
+        client = self.random.choice(self.clients)
+        rental = row['rental_price'] is not None
+        amount = row['rental_price'] if rental else row['asking_price'] * Decimal(self.random.choice(('0.92', '0.95', '0.97', '1')))
+        percentage = Decimal('8.00') if rental else Decimal(self.random.choice(('3.00', '4.00', '5.00')))
+        # Transactions plus nombreuses sur la période récente
+        day = self.random.triangular(-365 * SEED_HISTORY_YEARS, 0, 0)
+        transaction_date = SEED_REFERENCE_DATE + timedelta(days=int(day))
+        return {
+            'transaction_type': 'rental' if rental else 'sale',
+            'property_id': row['id'],
+            'client_id': client['id'],
+            'transaction_date': transaction_date,
+            'amount': amount.quantize(Decimal('0.01')),
+            'commission_amount': (amount * percentage / 100).quantize(Decimal('0.01')),
+            'commission_percentage': percentage,
+            'status': status,
+            'payment_method': self.random.choice(('bank_transfer', 'bank_transfer', 'check', 'loan')),
+            'created_at': self.created_at,
+            'updated_at': self.created_at,
+            'handled_by': client['assigned_agent_id']
+        }
+
+    def _contact(self, first_name, last_name, kind, number, city):
+        """Coordonnées d'un propriétaire ou d'un client."""
+        return {
+            'first_name': first_name,
+            'last_name': last_name,
+            'email': f'{_ascii(first_name)}.{_ascii(last_name)}.{kind}{number}@example.com',
+            'phone': f'0{self.random.randint(1, 7)}{self.random.randint(0, 99999999):08d}',
+            'address_line1': f'{self.random.randint(1, 180)} {self.random.choice(SEED_STREETS)}',
+            'city': city[0],
+            'state_province': city[2],
+            'postal_code': city[1],
+            'country': 'France'
+        }
+
+    def _person_name(self):
+        """Prénom et nom."""
+        return self.random.choice(SEED_FIRST_NAMES), self.random.choice(SEED_LAST_NAMES)
+
+    def _skewed_picker(self, items, shuffle=True):
+        """
+        Tirage selon une loi de Zipf d'exposant skew sur des éléments (rangs tirés au
+        hasard, pour que la popularité ne suive pas l'ordre des IDs).
+
+        Args:
+            items (list): Éléments
+            shuffle (bool): Attribue les rangs au hasard plutôt que dans l'ordre de la liste
+
+        Returns:
+            callable: Fonction sans argument retournant un élément
+        """
+        items = list(items)
+        if shuffle:
+            self.random.shuffle(items)
+        cum_weights = list(itertools.accumulate(1.0 / rank ** self.skew for rank in range(1, len(items) + 1)))
+        choices = self.random.choices
+        return lambda: choices(items, cum_weights=cum_weights)[0]
+
+    # Insertion
+
+    def _insert(self, table, rows, returning=False):
+        """
+        Insère des lignes par lots.
+
+        Args:
+            table (Table): Table de destination
+            rows (list): Valeurs des lignes
+            returning (bool): Retourne les IDs des lignes insérées
+
+        Returns:
+            list: IDs des lignes dans l'ordre de rows (si returning)
+        """
+        ids = []
+        for start in range(0, len(rows), self.chunk_size):
+            chunk = rows[start:start + self.chunk_size]
+            if returning:
+                result = self.connection.execute(
+                    table.insert().returning(table.c.id, sort_by_parameter_order=True), chunk
+                )
+                ids.extend(row_id for row_id, in result)
+            else:
+                self.connection.execute(table.insert(), chunk)
+        self.counts[table.name] = len(rows)
+        if self.progress:
+            self.progress(table.name, len(rows))
+        return ids
+
+# Fonctions utilitaires
+
+def _ascii(text):
+    """Version ASCII en minuscules d'un nom (adresses email)."""
+    normalized = unicodedata.normalize('NFKD', text)
+    return ''.join(char for char in normalized if char.isalnum() and char.isascii()).lower()
+
+def _reset_tables():
+    """Vide toutes les tables (enfants d'abord) et remet à zéro les séquences des IDs sur PostgreSQL."""
+    db.session.rollback()
+    with db.engine.begin() as connection:
+        if connection.dialect.name == 'postgresql':
+            names = ', '.join(table.name for table in db.metadata.sorted_tables)
+            connection.execute(db.text(f'TRUNCATE {names} RESTART IDENTITY CASCADE'))
+        else:
+            for table in reversed(db.metadata.sorted_tables):
+                connection.execute(table.delete())
+
+def _after_seed():
+    """Met à jour les structures maintenues d'ordinaire par les écouteurs de l'ORM et les statistiques du planificateur."""
+    rebuild_dashboard_stats()
+    db.session.commit()
+    reset_ngram_indexes()
+    mark_property_snapshot_stale()
+    get_cache().clear()
+
+    with db.engine.begin() as connection:
+        connection.execute(db.text('ANALYZE'))
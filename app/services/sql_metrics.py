@@ -0,0 +1,220 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Mesure des requêtes SQL par requête HTTP.
+Ce fichier compte les requêtes SQL exécutées et leur durée totale (écouteurs
+before_cursor_execute / after_cursor_execute du moteur), les publie pour chaque
+requête HTTP dans l'en-tête Server-Timing et dans une ligne de journal JSON, et
+vérifie les budgets de requêtes déclarés sur les endpoints (décorateur query_budget).
+Le gestionnaire de contexte assert_max_queries permet de vérifier un budget dans un test.
+Les mêmes écouteurs alimentent les statistiques par empreinte de requête (sql_stats).
+"""
+
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import current_app, g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.services.sql_stats import get_statement_stats
+
+logger = logging.getLogger(__name__)
+
+# Clé des dates de début des requêtes en cours dans Connection.info
+_START_KEY = 'sql_metrics_start'
+
+_local = threading.local()
+_listeners_lock = threading.Lock()
+_listeners_installed = False
+
+class QueryBudgetExceeded(AssertionError):
+    """Un endpoint ou un bloc de code a exécuté plus de requêtes SQL que son budget."""
+
+class QueryStats:
+    """
+    Requêtes SQL exécutées par le thread courant pendant une mesure.
+
+    Attributs:
+        count (int): Nombre de requêtes
+        duration (float): Durée totale en secondes
+        statements (list): Requêtes exécutées (si record est vrai, sinon None)
+    """
+
+    def __init__(self, record=False):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = [] if record else None
+
+    def add(self, statement, duration):
+        """Enregistre une requête exécutée."""
+        self.count += 1
+        self.duration += duration
+        if self.statements is not None:
+            self.statements.append(statement)
+
+def init_sql_metrics(app):
+    """
+    Active la mesure des requêtes SQL de chaque requête HTTP de l'application.
+
+    Les requêtes exécutées après la fin de la vue (réponses envoyées en flux) ne sont
+    pas comptées.
+
+    Args:
+        app (Flask): Application
+    """
+    _install_listeners()
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    app.teardown_request(_teardown_request)
+
+@contextmanager
+def collect_queries(record=False):
+    """
+    Mesure les requêtes SQL exécutées par le thread courant dans le bloc.
+
+    Args:
+        record (bool, optional): Conserve le texte des requêtes
+
+    Yields:
+        QueryStats: Mesure, complétée à la sortie du bloc
+    """
+    _install_listeners()
+    stats = QueryStats(record)
+    _push(stats)
+    try:
+        yield stats
+    finally:
+        _pop(stats)
+
+@contextmanager
+def assert_max_queries(budget):
+    """
+    Vérifie qu'un bloc de code (par exemple un appel du client de test) n'exécute pas
+    plus de budget requêtes SQL.
+
+    Args:
+        budget (int): Nombre maximal de requêtes
+
+    Yields:
+        QueryStats: Mesure des requêtes du bloc
+
+    Raises:
+        QueryBudgetExceeded: Si le budget est dépassé (la liste des requêtes est dans le message)
+    """
+    with collect_queries(record=True) as stats:
+        yield stats
+    if stats.count > budget:
+        raise QueryBudgetExceeded(
+            f"{stats.count} requêtes SQL exécutées pour un budget de {budget} :\n" +
+            '\n'.join(f'  {index}. {statement}' for index, statement in enumerate(stats.statements, 1))
+        )
+
+def query_budget(budget):
+    """
+    Décorateur déclarant le nombre maximal de requêtes SQL d'un endpoint.
+
+    Un dépassement est journalisé ; si SQL_QUERY_BUDGET_STRICT est activé (tests), il
+    lève QueryBudgetExceeded, ce qui fait échouer la requête.
+
+    Args:
+        budget (int): Nombre maximal de requêtes SQL par appel
+
+    Returns:
+        function: Le décorateur
+    """
+    def decorator(f):
+        # Attribut recopié par les décorateurs utilisant functools.wraps (token_required, ...)
+        f.query_budget = budget
+        return f
+    return decorator
+
+# Fonctions utilitaires
+
+def _install_listeners():
+    """Installe (une fois) les écouteurs sur tous les moteurs SQLAlchemy."""
+    global _listeners_installed
+    with _listeners_lock:
+        if not _listeners_installed:
+            event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+            _listeners_installed = True
+
+def _before_cursor_execute(connection, cursor, statement, parameters, context, executemany):
+    """Date de début de la requête (si une mesure est en cours dans ce thread ou si les statistiques sont activées)."""
+    if getattr(_local, 'collectors', None) or get_statement_stats() is not None:
+        connection.info.setdefault(_START_KEY, []).append(time.perf_counter())
+
+def _after_cursor_execute(connection, cursor, statement, parameters, context, executemany):
+    """Ajoute la requête aux mesures en cours dans ce thread et aux statistiques par empreinte."""
+    starts = connection.info.get(_START_KEY)
+    if not starts:
+        return
+    duration = time.perf_counter() - starts.pop()
+    for stats in getattr(_local, 'collectors', ()):
+        stats.add(statement, duration)
+    statement_stats = get_statement_stats()
+    if statement_stats is not None:
+        statement_stats.record(statement, duration, cursor.rowcount)
+
+def _push(stats):
+    """Démarre une mesure dans le thread courant."""
+    if not hasattr(_local, 'collectors'):
+        _local.collectors = []
+    _local.collectors.append(stats)
+
+def _pop(stats):
+    """Termine une mesure du thread courant."""
+    collectors = getattr(_local, 'collectors', [])
+    if stats in collectors:
+        collectors.remove(stats)
+
+def _start_request():
+    """Démarre la mesure de la requête HTTP."""
+    g.sql_stats = QueryStats()
+    g.sql_request_started = time.perf_counter()
+    _push(g.sql_stats)
+
+def _finish_request(response):
+    """Publie la mesure de la requête HTTP et vérifie le budget de l'endpoint."""
+    stats = g.pop('sql_stats', None)
+    if stats is None:
+        return response
+    _pop(stats)
+    total_ms = (time.perf_counter() - g.pop('sql_request_started')) * 1000
+    db_ms = stats.duration * 1000
+
+    if current_app.config.get('SQL_SERVER_TIMING'):
+        response.headers.add('Server-Timing', f'db;desc="{stats.count} queries";dur={db_ms:.2f}')
+        response.headers.add('Server-Timing', f'app;dur={total_ms:.2f}')
+
+    view = current_app.view_functions.get(request.endpoint)
+    budget = getattr(view, 'query_budget', None)
+    exceeded = budget is not None and stats.count > budget
+    logger.log(logging.WARNING if exceeded else logging.INFO, json.dumps({
+        'event': 'request_sql',
+        'method': request.method,
+        'path': request.path,
+        'endpoint': request.endpoint,
+        'status': response.status_code,
+        'queries': stats.count,
+        'db_ms': round(db_ms, 2),
+        'total_ms': round(total_ms, 2),
+        'query_budget': budget
+    }))
+
+    if exceeded and current_app.config.get('SQL_QUERY_BUDGET_STRICT'):
+        raise QueryBudgetExceeded(
+            f"{request.endpoint} a exécuté {stats.count} requêtes SQL pour un budget de {budget}"
+        )
+    return response
+
+def _teardown_request(exception):
+    """Termine la mesure si la requête a échoué avant after_request."""
+    stats = g.pop('sql_stats', None)
+    if stats is not None:
+        _pop(stats)
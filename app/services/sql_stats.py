@@ -0,0 +1,309 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Statistiques des requêtes SQL par forme de requête.
+Ce fichier regroupe les requêtes exécutées par empreinte (texte normalisé, sans valeurs
+littérales ni paramètres) et compte pour chacune les appels, la durée totale, moyenne,
+maximale et au 95e centile et les lignes retournées. Chaque processus accumule ses
+mesures en mémoire et les ajoute périodiquement à une base SQLite partagée
+(SQL_STATS_PATH) : les statistiques lues couvrent tous les workers de la machine.
+"""
+
+import bisect
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from functools import lru_cache
+
+from flask import current_app, has_app_context
+
+from app.utils import process_singleton
+
+logger = logging.getLogger(__name__)
+
+# Clé des statistiques dans app.extensions
+_EXTENSION_KEY = 'sql_statement_stats'
+
+# Bornes supérieures (ms) des classes de durée : de 0,05 ms à environ 100 s, facteur √2
+LATENCY_BUCKETS = [0.05 * 2 ** (index / 2) for index in range(42)]
+
+# Empreinte des requêtes mesurées au-delà du nombre maximal d'empreintes
+OVERFLOW_FINGERPRINT = '(autres requêtes)'
+
+# Clés de tri des statistiques
+STATS_SORT_KEYS = ('total_ms', 'calls', 'mean_ms', 'p95_ms', 'max_ms', 'rows')
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+# Paramètres : %(nom)s, %s (psycopg2), :nom, ? (sqlite), $1 ; les conversions ::type sont conservées
+_PLACEHOLDER = re.compile(r'%\(\w+\)s|%s|(?<![:\w]):\w+|\$\d+|\?')
+_NUMBER_LITERAL = re.compile(r'(?<![\w.$])-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?\b')
+_IN_LIST = re.compile(r'\bIN \(\?(?:, \?)*\)', re.IGNORECASE)
+_VALUES_ROWS = re.compile(r'(\(\?(?:, \?)*\))(?:, \(\?(?:, \?)*\))+')
+_WHITESPACE = re.compile(r'\s+')
+_COMMA = re.compile(r'\s*,\s*')
+
+@lru_cache(maxsize=4096)
+def fingerprint(statement):
+    """
+    Normalise une requête SQL : valeurs littérales et paramètres remplacés par ?,
+    listes IN et lignes VALUES multiples réduites, espaces normalisés.
+
+    Args:
+        statement (str): Texte de la requête
+
+    Returns:
+        str: Empreinte de la requête
+    """
+    text = _STRING_LITERAL.sub('?', statement)
+    text = _PLACEHOLDER.sub('?', text)
+    text = _NUMBER_LITERAL.sub('?', text)
+    text = _WHITESPACE.sub(' ', text).strip()
+    text = _COMMA.sub(', ', text).replace('( ', '(').replace(' )', ')')
+    text = _IN_LIST.sub('IN (...)', text)
+    return _VALUES_ROWS.sub(r'\1, ...', text)
+
+class StatementStats:
+    """
+    Mesures des requêtes SQL du processus, regroupées par empreinte et ajoutées
+    toutes les flush_interval secondes à la base SQLite partagée.
+
+    Au plus max_statements empreintes sont conservées, en mémoire comme dans la base
+    (les moins coûteuses sont supprimées) ; les requêtes au-delà sont comptées sous
+    OVERFLOW_FINGERPRINT.
+    """
+
+    def __init__(self, path, max_statements=500, flush_interval=10.0):
+        """
+        Initialise les statistiques.
+
+        Args:
+            path (str): Chemin de la base SQLite partagée
+            max_statements (int, optional): Nombre maximal d'empreintes
+            flush_interval (float, optional): Délai (secondes) entre deux écritures dans la base
+        """
+        self.path = path
+        self.max_statements = max_statements
+        self.flush_interval = flush_interval
+        self.pid = os.getpid()
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._pending_since = time.time()
+        self._next_flush = time.monotonic() + flush_interval
+        self._flushing = False
+        self._local = threading.local()
+
+    def record(self, statement, duration, rows=-1):
+        """
+        Enregistre une requête exécutée.
+
+        Args:
+            statement (str): Texte de la requête
+            duration (float): Durée en secondes
+            rows (int, optional): Lignes retournées ou modifiées (-1 si inconnu)
+        """
+        key = fingerprint(statement)
+        elapsed_ms = duration * 1000
+        with self._lock:
+            entry = self._pending.get(key)
+            if entry is None:
+                if len(self._pending) >= self.max_statements:
+                    key = OVERFLOW_FINGERPRINT
+                    entry = self._pending.get(key)
+                if entry is None:
+                    entry = self._pending[key] = _new_entry()
+            entry['calls'] += 1
+            entry['total_ms'] += elapsed_ms
+            entry['max_ms'] = max(entry['max_ms'], elapsed_ms)
+            if rows is not None and rows >= 0:
+                entry['rows'] += rows
+                entry['row_calls'] += 1
+            entry['histogram'][bisect.bisect_left(LATENCY_BUCKETS, elapsed_ms)] += 1
+
+            due = not self._flushing and time.monotonic() >= self._next_flush
+            if due:
+                self._flushing = True
+
+        if due:
+            try:
+                self.flush()
+            except Exception:
+                logger.warning("Écriture des statistiques SQL impossible", exc_info=True)
+            finally:
+                self._flushing = False
+
+    def flush(self):
+        """Ajoute les mesures en attente du processus à la base partagée."""
+        with self._lock:
+            pending, since = self._pending, self._pending_since
+            self._pending, self._pending_since = {}, time.time()
+            self._next_flush = time.monotonic() + self.flush_interval
+        if not pending:
+            return
+
+        connection = self._connection()
+        with connection:
+            connection.execute('BEGIN IMMEDIATE')
+            # Mesures antérieures à une remise à zéro faite par un autre processus : ignorées
+            if since < self._reset_at(connection):
+                return
+            for key, entry in pending.items():
+                row = connection.execute(
+                    'SELECT calls, total_ms, max_ms, rows, row_calls, histogram '
+                    'FROM sql_statement_stats WHERE fingerprint = ?', (key,)
+                ).fetchone()
+                if row:
+                    entry = _merge(entry, row)
+                connection.execute(
+                    'INSERT OR REPLACE INTO sql_statement_stats '
+                    '(fingerprint, calls, total_ms, max_ms, rows, row_calls, histogram) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    (key, entry['calls'], entry['total_ms'], entry['max_ms'], entry['rows'], entry['row_calls'],
+                     json.dumps(entry['histogram']))
+                )
+            connection.execute(
+                'DELETE FROM sql_statement_stats WHERE fingerprint IN (SELECT fingerprint FROM sql_statement_stats '
+                'ORDER BY total_ms DESC LIMIT -1 OFFSET ?)', (self.max_statements,)
+            )
+
+    def read(self, sort='total_ms', limit=50):
+        """
+        Lit les statistiques de tous les processus (après écriture de celles du processus courant).
+
+        Args:
+            sort (str, optional): Clé de tri décroissant (voir STATS_SORT_KEYS)
+            limit (int, optional): Nombre maximal d'empreintes retournées
+
+        Returns:
+            dict: Date de début des mesures, totaux et statistiques par empreinte
+
+        Raises:
+            ValueError: Si la clé de tri est inconnue
+        """
+        if sort not in STATS_SORT_KEYS:
+            raise ValueError(f"Tri inconnu : '{sort}' (valeurs possibles : {', '.join(STATS_SORT_KEYS)})")
+        self.flush()
+
+        connection = self._connection()
+        rows = connection.execute(
+            'SELECT fingerprint, calls, total_ms, max_ms, rows, row_calls, histogram FROM sql_statement_stats'
+        ).fetchall()
+        reset_at = self._reset_at(connection)
+
+        statements = [_statement_dict(row) for row in rows]
+        statements.sort(key=lambda statement: statement[sort] or 0, reverse=True)
+        return {
+            'since': datetime.utcfromtimestamp(reset_at).isoformat() if reset_at else None,
+            'calls': sum(statement['calls'] for statement in statements),
+            'total_ms': round(sum(statement['total_ms'] for statement in statements), 3),
+            'fingerprints': len(statements),
+            'statements': statements[:limit]
+        }
+
+    def reset(self):
+        """Remet à zéro les statistiques de tous les processus."""
+        reset_at = time.time()
+        connection = self._connection()
+        with connection:
+            connection.execute('BEGIN IMMEDIATE')
+            connection.execute('DELETE FROM sql_statement_stats')
+            connection.execute(
+                "INSERT OR REPLACE INTO sql_stats_meta (key, value) VALUES ('reset_at', ?)", (reset_at,)
+            )
+        with self._lock:
+            self._pending, self._pending_since = {}, reset_at
+
+    def _reset_at(self, connection):
+        """Date (time.time()) de la dernière remise à zéro, 0 si aucune."""
+        row = connection.execute("SELECT value FROM sql_stats_meta WHERE key = 'reset_at'").fetchone()
+        return row[0] if row else 0
+
+    def _connection(self):
+        """Connexion SQLite du thread courant (créée au premier usage)."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS sql_statement_stats '
+                '(fingerprint TEXT PRIMARY KEY, calls INTEGER NOT NULL, total_ms REAL NOT NULL, '
+                'max_ms REAL NOT NULL, rows INTEGER NOT NULL, row_calls INTEGER NOT NULL, histogram TEXT NOT NULL)'
+            )
+            connection.execute('CREATE TABLE IF NOT EXISTS sql_stats_meta (key TEXT PRIMARY KEY, value REAL NOT NULL)')
+            self._local.connection = connection
+        return connection
+
+def get_statement_stats(app=None):
+    """
+    Statistiques des requêtes SQL de l'application, créées au premier usage dans
+    chaque processus (les workers issus d'un fork repartent de zéro).
+
+    Args:
+        app (Flask, optional): Application (application courante par défaut)
+
+    Returns:
+        StatementStats: Statistiques du processus, ou None si SQL_STATS_ENABLED n'est pas activé
+    """
+    if app is None:
+        if not has_app_context():
+            return None
+        app = current_app._get_current_object()
+    if not app.config.get('SQL_STATS_ENABLED'):
+        return None
+
+    # Écriture des dernières mesures à l'arrêt du processus
+    return process_singleton(app, _EXTENSION_KEY, lambda: StatementStats(
+        app.config['SQL_STATS_PATH'],
+        max_statements=app.config.get('SQL_STATS_MAX_STATEMENTS', 500),
+        flush_interval=app.config.get('SQL_STATS_FLUSH_INTERVAL', 10.0)
+    ), on_exit=lambda stats: stats.flush())
+
+# Fonctions utilitaires
+
+def _new_entry():
+    """Mesures vides d'une empreinte."""
+    return {'calls': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'rows': 0, 'row_calls': 0,
+            'histogram': [0] * (len(LATENCY_BUCKETS) + 1)}
+
+def _merge(entry, row):
+    """Ajoute les mesures en attente d'une empreinte à celles lues dans la base."""
+    calls, total_ms, max_ms, rows, row_calls, histogram = row
+    return {
+        'calls': calls + entry['calls'],
+        'total_ms': total_ms + entry['total_ms'],
+        'max_ms': max(max_ms, entry['max_ms']),
+        'rows': rows + entry['rows'],
+        'row_calls': row_calls + entry['row_calls'],
+        'histogram': [stored + pending for stored, pending in zip(json.loads(histogram), entry['histogram'])]
+    }
+
+def _percentile(histogram, calls, max_ms, fraction):
+    """Durée (ms) sous laquelle se trouve la fraction des appels (borne de la classe, au plus max_ms)."""
+    threshold = fraction * calls
+    cumulated = 0
+    for index, count in enumerate(histogram):
+        cumulated += count
+        if cumulated >= threshold:
+            return min(LATENCY_BUCKETS[index], max_ms) if index < len(LATENCY_BUCKETS) else max_ms
+    return max_ms
+
+def _statement_dict(row):
+    """Statistiques d'une empreinte lues dans la base."""
+    key, calls, total_ms, max_ms, rows, row_calls, histogram = row
+    return {
+        'fingerprint': key,
+        'calls': calls,
+        'total_ms': round(total_ms, 3),
+        'mean_ms': round(total_ms / calls, 3) if calls else None,
+        'p95_ms': round(_percentile(json.loads(histogram), calls, max_ms, 0.95), 3),
+        'max_ms': round(max_ms, 3),
+        'rows': rows,
+        'mean_rows': round(rows / row_calls, 1) if row_calls else None
+    }
@@ -0,0 +1,687 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Stockage des fichiers envoyés, adressé par contenu.
+Ce fichier définit l'interface de stockage et ses deux implémentations (système de
+fichiers local et stockage compatible S3). Un fichier est stocké sous l'empreinte
+SHA-256 de son contenu, calculée pendant l'écriture : un contenu déjà présent n'est
+pas stocké une seconde fois. La table stored_files compte les PropertyImage et
+PropertyDocument qui référencent chaque fichier ; un fichier qui n'est plus
+référencé est supprimé (immédiatement ou par `flask storage-gc`).
+"""
+
+import hashlib
+import mimetypes
+import os
+import re
+import shutil
+import tempfile
+import threading
+from datetime import datetime, timedelta
+
+try:
+    import boto3
+    from botocore.exceptions import ClientError
+except ImportError:  # boto3 n'est nécessaire que pour le stockage S3
+    boto3 = None
+
+from flask import current_app, url_for
+from sqlalchemy import event, inspect
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session, object_session
+from werkzeug.security import safe_join
+
+from app import db
+from app.models.__init__1 import PropertyImage, PropertyDocument, StoredFile
+from app.services.query_cache import invalidate_tags, record_tags
+
+# Taille des blocs lus pendant l'écriture d'un fichier
+STORAGE_CHUNK_SIZE = 1024 * 1024
+
+# Taille au-delà de laquelle un envoi vers S3 est tamponné sur disque plutôt qu'en mémoire
+STORAGE_SPOOL_SIZE = 8 * 1024 * 1024
+
+# Nombre d'écritures d'un fichier supprimé par le ramasse-miettes pendant son envoi
+STORAGE_PUT_ATTEMPTS = 3
+
+# Clés des contenus stockés sous leur empreinte (ab/cd/<sha256><extension>), dont le contenu ne change jamais
+CONTENT_KEY_PATTERN = re.compile(r'^[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}(\.[^./]+)?$')
+
+# Modèles référençant les fichiers du stockage (colonne storage_key)
+STORAGE_REFERENCES = (PropertyImage, PropertyDocument)
+
+# Clé du stockage dans app.extensions
+_EXTENSION_KEY = 'storage'
+
+# Clés de session : écarts de références avant leur écriture, fichiers libérés avant le commit
+_SESSION_DELTAS_KEY = 'storage_ref_deltas'
+_SESSION_RELEASED_KEY = 'storage_released_keys'
+
+_storage_lock = threading.Lock()
+
+class Storage:
+    """
+    Interface des stockages de fichiers.
+
+    Les clés sont des chemins relatifs ('ab/cd/<sha256>.pdf'). put stocke un contenu
+    sous son empreinte ; put_at écrit à une clé choisie (fichiers dérivés, comme les
+    déclinaisons des images, dont la clé est calculée à partir de celle du fichier source).
+    """
+
+    def put(self, stream, extension=''):
+        """
+        Stocke un contenu sous son empreinte, sauf s'il est déjà présent.
+
+        Args:
+            stream (file): Contenu à stocker (lu jusqu'au bout)
+            extension (str, optional): Extension du fichier (ex: '.pdf')
+
+        Returns:
+            tuple: (Clé du fichier, taille en octets)
+        """
+        raise NotImplementedError
+
+    def put_at(self, key, stream):
+        """
+        Écrit un contenu à une clé donnée (en remplaçant le fichier existant).
+
+        Args:
+            key (str): Clé du fichier
+            stream (file): Contenu à écrire
+        """
+        raise NotImplementedError
+
+    def open(self, key):
+        """
+        Ouvre un fichier en lecture.
+
+        Args:
+            key (str): Clé du fichier
+
+        Returns:
+            file: Fichier binaire positionnable (à fermer par l'appelant)
+        """
+        raise NotImplementedError
+
+    def exists(self, key):
+        """
+        Indique si un fichier existe.
+
+        Args:
+            key (str): Clé du fichier
+
+        Returns:
+            bool: True si le fichier existe
+        """
+        raise NotImplementedError
+
+    def delete(self, key):
+        """
+        Supprime un fichier (sans erreur s'il n'existe pas).
+
+        Args:
+            key (str): Clé du fichier
+        """
+        raise NotImplementedError
+
+    def list(self, prefix=''):
+        """
+        Parcourt les fichiers du stockage.
+
+        Args:
+            prefix (str, optional): Préfixe des clés
+
+        Returns:
+            iterator: Tuples (clé, date de dernière modification UTC)
+        """
+        raise NotImplementedError
+
+    def url(self, key, external=False):
+        """
+        URL de téléchargement d'un fichier.
+
+        Args:
+            key (str): Clé du fichier
+            external (bool, optional): URL absolue
+
+        Returns:
+            str: URL du fichier
+        """
+        raise NotImplementedError
+
+class LocalStorage(Storage):
+    """
+    Stockage dans un dossier local, servi par l'endpoint /files (ou par le proxy,
+    voir FILES_X_ACCEL_REDIRECT et USE_X_SENDFILE).
+
+    Les fichiers sont écrits dans un fichier temporaire du même dossier, puis renommés :
+    un fichier n'est jamais visible partiellement écrit.
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+    def put(self, stream, extension=''):
+        os.makedirs(os.path.join(self.root, '.tmp'), exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+        with tempfile.NamedTemporaryFile(dir=os.path.join(self.root, '.tmp'), delete=False) as temporary:
+            for chunk in iter(lambda: stream.read(STORAGE_CHUNK_SIZE), b''):
+                digest.update(chunk)
+                temporary.write(chunk)
+                size += len(chunk)
+
+        key = content_key(digest.hexdigest(), extension)
+        path = self._path(key)
+        if os.path.exists(path):
+            # Contenu déjà stocké
+            os.remove(temporary.name)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(temporary.name, path)
+        return key, size
+
+    def put_at(self, key, stream):
+        os.makedirs(os.path.join(self.root, '.tmp'), exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=os.path.join(self.root, '.tmp'), delete=False) as temporary:
+            shutil.copyfileobj(stream, temporary, STORAGE_CHUNK_SIZE)
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(temporary.name, path)
+
+    def open(self, key):
+        return open(self._path(key), 'rb')
+
+    def exists(self, key):
+        return os.path.exists(self._path(key))
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def list(self, prefix=''):
+        for folder, folders, files in os.walk(self.root):
+            folders[:] = [name for name in folders if name != '.tmp']
+            for name in files:
+                path = os.path.join(folder, name)
+                key = os.path.relpath(path, self.root).replace(os.sep, '/')
+                if key.startswith(prefix):
+                    yield key, datetime.utcfromtimestamp(os.path.getmtime(path))
+
+    def url(self, key, external=False):
+        return url_for('files.get_file', key=key, _external=external)
+
+    def local_path(self, key):
+        """
+        Chemin local d'un fichier (servi par l'endpoint /files).
+
+        Args:
+            key (str): Clé du fichier
+
+        Returns:
+            str: Chemin du fichier, ou None si la clé sort du stockage
+        """
+        if key.startswith('.tmp/'):
+            return None
+        return safe_join(self.root, key)
+
+    def _path(self, key):
+        """Chemin local d'une clé."""
+        return os.path.join(self.root, *key.split('/'))
+
+class S3Storage(Storage):
+    """
+    Stockage dans un bucket compatible S3 (AWS S3, MinIO, Ceph, ...).
+
+    Le contenu envoyé est tamponné (en mémoire puis sur disque) pendant le calcul de son
+    empreinte, puis transmis seulement s'il est absent du bucket. Les fichiers sont servis
+    par URL signée, ou par public_url si le bucket (ou un CDN) est public.
+    """
+
+    def __init__(self, bucket, prefix='', endpoint_url=None, region=None, access_key=None, secret_key=None,
+                 public_url=None, url_expires=3600):
+        if boto3 is None:
+            raise RuntimeError("boto3 n'est pas installé : le stockage S3 n'est pas disponible.")
+        self.bucket = bucket
+        self.prefix = prefix.strip('/') + '/' if prefix.strip('/') else ''
+        self.endpoint_url = endpoint_url
+        self.region = region
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.public_url = public_url.rstrip('/') if public_url else None
+        self.url_expires = url_expires
+        self._client = None
+        self._client_pid = None
+
+    def __getstate__(self):
+        # Le client n'est pas transmis aux processus du pool d'images : chacun crée le sien
+        state = self.__dict__.copy()
+        state['_client'] = None
+        return state
+
+    @property
+    def client(self):
+        """Client S3 du processus courant."""
+        if self._client is None or self._client_pid != os.getpid():
+            self._client = boto3.client(
+                's3', endpoint_url=self.endpoint_url, region_name=self.region,
+                aws_access_key_id=self.access_key, aws_secret_access_key=self.secret_key
+            )
+            self._client_pid = os.getpid()
+        return self._client
+
+    def put(self, stream, extension=''):
+        digest = hashlib.sha256()
+        size = 0
+        with tempfile.SpooledTemporaryFile(max_size=STORAGE_SPOOL_SIZE) as buffer:
+            for chunk in iter(lambda: stream.read(STORAGE_CHUNK_SIZE), b''):
+                digest.update(chunk)
+                buffer.write(chunk)
+                size += len(chunk)
+
+            key = content_key(digest.hexdigest(), extension)
+            if not self.exists(key):
+                buffer.seek(0)
+                self._upload(key, buffer)
+        return key, size
+
+    def put_at(self, key, stream):
+        self._upload(key, stream)
+
+    def open(self, key):
+        buffer = tempfile.SpooledTemporaryFile(max_size=STORAGE_SPOOL_SIZE)
+        self.client.download_fileobj(self.bucket, self.prefix + key, buffer)
+        buffer.seek(0)
+        return buffer
+
+    def exists(self, key):
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self.prefix + key)
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return False
+            raise
+        return True
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=self.prefix + key)
+
+    def list(self, prefix=''):
+        paginator = self.client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self.prefix + prefix):
+            for item in page.get('Contents', []):
+                yield item['Key'][len(self.prefix):], item['LastModified'].replace(tzinfo=None)
+
+    def url(self, key, external=False):
+        if self.public_url:
+            return f'{self.public_url}/{self.prefix}{key}'
+        return self.client.generate_presigned_url(
+            'get_object', Params={'Bucket': self.bucket, 'Key': self.prefix + key}, ExpiresIn=self.url_expires
+        )
+
+    def _upload(self, key, stream):
+        """Transmet un contenu au bucket, avec le type MIME déduit de l'extension."""
+        extra_args = {'ContentType': mimetypes.guess_type(key)[0] or 'application/octet-stream'}
+        if is_content_key(key):
+            # Contenu stocké sous son empreinte : mis en cache sans revalidation (bucket public ou CDN)
+            extra_args['CacheControl'] = 'public, max-age=31536000, immutable'
+        self.client.upload_fileobj(stream, self.bucket, self.prefix + key, ExtraArgs=extra_args)
+
+def get_storage():
+    """
+    Stockage de l'application courante (STORAGE_BACKEND : 'local' ou 's3').
+
+    Returns:
+        Storage: Stockage des fichiers envoyés
+    """
+    app = current_app._get_current_object()
+    storage = app.extensions.get(_EXTENSION_KEY)
+    if storage is not None:
+        return storage
+
+    with _storage_lock:
+        storage = app.extensions.get(_EXTENSION_KEY)
+        if storage is None:
+            backend = app.config.get('STORAGE_BACKEND', 'local')
+            if backend == 'local':
+                storage = LocalStorage(app.config['STORAGE_LOCAL_ROOT'])
+            elif backend == 's3':
+                storage = S3Storage(
+                    app.config['STORAGE_S3_BUCKET'],
+                    prefix=app.config.get('STORAGE_S3_PREFIX') or '',
+                    endpoint_url=app.config.get('STORAGE_S3_ENDPOINT_URL'),
+                    region=app.config.get('STORAGE_S3_REGION'),
+                    access_key=app.config.get('STORAGE_S3_ACCESS_KEY'),
+                    secret_key=app.config.get('STORAGE_S3_SECRET_KEY'),
+                    public_url=app.config.get('STORAGE_S3_PUBLIC_URL'),
+                    url_expires=app.config.get('STORAGE_S3_URL_EXPIRES', 3600)
+                )
+            else:
+                raise RuntimeError(f"Stockage inconnu: '{backend}' (STORAGE_BACKEND : 'local' ou 's3')")
+            app.extensions[_EXTENSION_KEY] = storage
+    return storage
+
+def content_key(digest, extension=''):
+    """
+    Clé d'un contenu dans le stockage.
+
+    Args:
+        digest (str): Empreinte SHA-256 (hexadécimale)
+        extension (str, optional): Extension du fichier
+
+    Returns:
+        str: Clé ('ab/cd/<empreinte><extension>')
+    """
+    return f'{digest[:2]}/{digest[2:4]}/{digest}{extension.lower()}'
+
+def is_content_key(key):
+    """
+    Indique si une clé désigne un contenu stocké sous son empreinte (et donc immuable).
+
+    Args:
+        key (str): Clé du fichier
+
+    Returns:
+        bool: True pour les clés produites par content_key
+    """
+    return CONTENT_KEY_PATTERN.match(key) is not None
+
+def store_file(stream, filename, content_type=None):
+    """
+    Stocke un fichier envoyé et enregistre son contenu dans stored_files.
+
+    Le contenu est enregistré (ou sa date de dernier envoi mise à jour) dans une
+    transaction distincte et validée immédiatement ; il reste non référencé jusqu'à
+    la validation de l'objet qui l'utilise (storage_key). Si le ramasse-miettes a
+    supprimé le fichier entre son écriture et cet enregistrement, il est écrit à nouveau :
+    une fois l'enregistrement validé, le ramasse-miettes ne le supprime plus avant
+    STORAGE_ORPHAN_GRACE.
+
+    Args:
+        stream (file): Contenu du fichier
+        filename (str): Nom du fichier (son extension est conservée)
+        content_type (str, optional): Type MIME
+
+    Returns:
+        tuple: (Clé du fichier, taille en octets)
+    """
+    extension = os.path.splitext(filename)[1]
+    storage = get_storage()
+    if not stream.seekable():
+        buffer = tempfile.SpooledTemporaryFile(max_size=STORAGE_SPOOL_SIZE)
+        shutil.copyfileobj(stream, buffer, STORAGE_CHUNK_SIZE)
+        stream = buffer
+    start = stream.tell()
+
+    for _ in range(STORAGE_PUT_ATTEMPTS):
+        stream.seek(start)
+        key, size = storage.put(stream, extension)
+        _touch_stored_file(key, size, content_type)
+        if storage.exists(key):
+            return key, size
+    raise RuntimeError(f"Fichier {key} supprimé pendant son envoi ({STORAGE_PUT_ATTEMPTS} tentatives)")
+
+def collect_garbage(grace=None):
+    """
+    Recalcule le nombre de références de chaque fichier, puis supprime les fichiers non
+    référencés et ceux du stockage absents de stored_files (envois interrompus, fichiers
+    dérivés d'un fichier supprimé).
+
+    Args:
+        grace (int, optional): Âge minimal en secondes d'un fichier supprimé
+            (STORAGE_ORPHAN_GRACE par défaut), pour ne pas supprimer un fichier en cours d'envoi
+
+    Returns:
+        tuple: (Nombre de compteurs corrigés, nombre de fichiers supprimés)
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=_grace(grace))
+    table = StoredFile.__table__
+
+    # Nombre réel de références (les suppressions en cascade par la base échappent aux écouteurs)
+    references = db.union_all(*[
+        db.select(model.storage_key.label('key')).where(model.storage_key.isnot(None))
+        for model in STORAGE_REFERENCES
+    ]).subquery()
+    counts = db.select(references.c.key, db.func.count().label('count')).group_by(references.c.key).subquery()
+    actual = db.func.coalesce(
+        db.select(counts.c.count).where(counts.c.key == table.c.key).scalar_subquery(), 0
+    )
+    fixed = db.session.execute(table.update().where(table.c.ref_count != actual).values(ref_count=actual)).rowcount
+    db.session.commit()
+    if fixed:
+        invalidate_tags({table.name})
+
+    keys = db.session.execute(
+        db.select(table.c.key).where(table.c.ref_count == 0, table.c.last_used_at < cutoff)
+    ).scalars().all()
+    deleted = len(_delete_unreferenced(keys, cutoff))
+
+    # Fichiers du stockage sans ligne dans stored_files, vérifiés par lots
+    storage = get_storage()
+    candidates = []
+    for key, modified_at in storage.list():
+        if modified_at < cutoff:
+            candidates.append(key)
+        if len(candidates) == 1000:
+            deleted += _delete_orphans(storage, candidates)
+            candidates = []
+    deleted += _delete_orphans(storage, candidates)
+
+    return fixed, deleted
+
+def migrate_legacy_files(batch_size=100, progress=None):
+    """
+    Transfère dans le stockage les images et documents envoyés avant le stockage par
+    contenu (storage_key vide, fichier sous app/static/uploads), puis supprime les
+    anciens fichiers. Les déclinaisons des images sont à régénérer (`flask process-images`).
+
+    Args:
+        batch_size (int, optional): Nombre d'objets par transaction
+        progress (callable, optional): Fonction appelée après chaque lot avec le nombre d'objets transférés
+
+    Returns:
+        tuple: (Nombre d'objets transférés, liste des fichiers introuvables)
+    """
+    migrated = 0
+    missing = []
+    for model in STORAGE_REFERENCES:
+        last_id = 0
+        while True:
+            objects = model.query.filter(model.storage_key.is_(None), model.id > last_id) \
+                .order_by(model.id).limit(batch_size).all()
+            if not objects:
+                break
+            last_id = objects[-1].id
+
+            legacy_paths = []
+            for target in objects:
+                if not os.path.isfile(target.file_path):
+                    missing.append(target.file_path)
+                    continue
+                with open(target.file_path, 'rb') as stream:
+                    key, size = store_file(stream, target.file_path, target.file_type)
+                legacy_paths.append(target.file_path)
+                target.storage_key = key
+                target.file_path = key
+                target.file_size = size
+                if model is PropertyImage:
+                    # Anciennes déclinaisons (JPEG et WebP) à côté de l'image
+                    for path in (target.thumbnail_path, target.card_path, target.full_path):
+                        if path:
+                            legacy_paths += [path, path.rsplit('.', 1)[0] + '.webp']
+                    target.processing_status = None
+                    target.thumbnail_path = target.card_path = target.full_path = None
+                    target.processed_at = None
+                migrated += 1
+            db.session.commit()
+
+            for path in legacy_paths:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            if progress:
+                progress(migrated)
+    return migrated, missing
+
+def derived_key(key, name, extension):
+    """
+    Clé d'un fichier dérivé d'un fichier du stockage (supprimé avec lui).
+
+    Args:
+        key (str): Clé du fichier source
+        name (str): Nom du fichier dérivé (ex: 'thumbnail')
+        extension (str): Extension du fichier dérivé
+
+    Returns:
+        str: Clé ('derived/<clé du fichier source>/<nom><extension>')
+    """
+    return f'derived/{key}/{name}{extension}'
+
+# Fonctions utilitaires
+
+def _grace(grace):
+    """Âge minimal en secondes d'un fichier non référencé avant sa suppression."""
+    return current_app.config.get('STORAGE_ORPHAN_GRACE', 3600) if grace is None else grace
+
+def _source_key(key):
+    """Clé du fichier source d'un fichier dérivé (la clé elle-même pour un fichier source)."""
+    if key.startswith('derived/'):
+        return key[len('derived/'):].rsplit('/', 1)[0]
+    return key
+
+def _touch_stored_file(key, size, content_type):
+    """Enregistre un contenu dans stored_files, ou met à jour sa date de dernier envoi."""
+    table = StoredFile.__table__
+    now = datetime.utcnow()
+    values = {'key': key, 'size': size, 'content_type': content_type, 'ref_count': 0,
+              'created_at': now, 'last_used_at': now}
+    with db.engine.begin() as connection:
+        dialect = connection.dialect.name
+        if dialect in ('postgresql', 'sqlite'):
+            insert = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+            stmt = insert(table).values(**values)
+            connection.execute(stmt.on_conflict_do_update(index_elements=['key'], set_={'last_used_at': now}))
+        else:
+            result = connection.execute(table.update().where(table.c.key == key).values(last_used_at=now))
+            if result.rowcount == 0:
+                connection.execute(table.insert().values(**values))
+
+def _delete_orphans(storage, keys):
+    """Supprime les fichiers de keys dont le fichier source est absent de stored_files."""
+    if not keys:
+        return 0
+    sources = {key: _source_key(key) for key in keys}
+    table = StoredFile.__table__
+    known = set(db.session.execute(
+        db.select(table.c.key).where(table.c.key.in_(set(sources.values())))
+    ).scalars())
+    db.session.rollback()
+    orphans = [key for key, source in sources.items() if source not in known]
+    for key in orphans:
+        storage.delete(key)
+    return len(orphans)
+
+def _delete_unreferenced(keys, cutoff):
+    """
+    Supprime les fichiers de keys qui ne sont plus référencés et n'ont pas été envoyés
+    depuis cutoff, ainsi que leurs fichiers dérivés.
+
+    Returns:
+        list: Clés supprimées
+    """
+    if not keys:
+        return []
+    table = StoredFile.__table__
+    storage = get_storage()
+    deleted = []
+    for key in keys:
+        # La condition est vérifiée par la suppression elle-même : un nouvel envoi ou une
+        # nouvelle référence entre-temps conserve le fichier. Les fichiers sont supprimés
+        # avant la validation : la ligne reste verrouillée jusque-là et un envoi concurrent
+        # du même contenu (store_file) attend, puis constate l'absence du fichier et le réécrit
+        with db.engine.begin() as connection:
+            result = connection.execute(
+                table.delete().where(table.c.key == key, table.c.ref_count == 0, table.c.last_used_at < cutoff)
+            )
+            if result.rowcount:
+                for derived, modified_at in storage.list(derived_key(key, '', '')):
+                    storage.delete(derived)
+                storage.delete(key)
+                deleted.append(key)
+    if deleted:
+        invalidate_tags({f'{table.name}:{key}' for key in deleted})
+    return deleted
+
+def _record_delta(target, key, delta):
+    """Accumule un écart de références dans la session de l'objet."""
+    session = object_session(target)
+    if session is None or key is None:
+        return
+    deltas = session.info.setdefault(_SESSION_DELTAS_KEY, {})
+    deltas[key] = deltas.get(key, 0) + delta
+
+def _after_insert(mapper, connection, target):
+    """Compte la référence d'un nouvel objet."""
+    _record_delta(target, target.storage_key, 1)
+
+def _after_update(mapper, connection, target):
+    """Déplace la référence d'un objet dont le fichier a changé."""
+    history = inspect(target).attrs.storage_key.history
+    if history.has_changes():
+        for key in history.deleted:
+            _record_delta(target, key, -1)
+        for key in history.added:
+            _record_delta(target, key, 1)
+
+def _after_delete(mapper, connection, target):
+    """Décompte la référence d'un objet supprimé."""
+    _record_delta(target, target.storage_key, -1)
+
+def _after_flush(session, flush_context):
+    """Écrit les écarts de références accumulés pendant le flush."""
+    deltas = session.info.pop(_SESSION_DELTAS_KEY, None)
+    if not deltas:
+        return
+    table = StoredFile.__table__
+    connection = session.connection()
+    # Écritures hors de l'ORM : leurs étiquettes sont invalidées au commit de la session
+    record_tags(session, {f'{table.name}:{key}' for key, delta in deltas.items() if delta})
+    for key, delta in deltas.items():
+        if delta:
+            connection.execute(table.update().where(table.c.key == key).values(ref_count=table.c.ref_count + delta))
+        if delta < 0:
+            session.info.setdefault(_SESSION_RELEASED_KEY, set()).add(key)
+
+def _after_commit(session):
+    """Supprime les fichiers libérés par la transaction validée qui ne sont plus référencés."""
+    keys = session.info.pop(_SESSION_RELEASED_KEY, None)
+    if not keys:
+        return
+    try:
+        _delete_unreferenced(sorted(keys), datetime.utcnow() - timedelta(seconds=_grace(None)))
+    except Exception:
+        # Les fichiers restants seront supprimés par `flask storage-gc`
+        current_app.logger.exception("Suppression de fichiers non référencés impossible")
+
+def _discard_changes(session, previous_transaction):
+    """Abandonne les écarts et les fichiers libérés d'une transaction annulée."""
+    session.info.pop(_SESSION_DELTAS_KEY, None)
+    session.info.pop(_SESSION_RELEASED_KEY, None)
+
+def _track_previous_value(target, value, oldvalue, initiator):
+    """Écouteur vide : active_history force le chargement de l'ancienne valeur."""
+    return value
+
+for _model in STORAGE_REFERENCES:
+    event.listen(_model.storage_key, 'set', _track_previous_value, active_history=True, retval=True)
+    event.listen(_model, 'after_insert', _after_insert)
+    event.listen(_model, 'after_update', _after_update)
+    event.listen(_model, 'after_delete', _after_delete)
+
+event.listen(Session, 'after_flush', _after_flush)
+event.listen(Session, 'after_commit', _after_commit)
+event.listen(Session, 'after_soft_rollback', _discard_changes)
@@ -8,7 +8,25 @@ Ce fichier contient les fonctions métier liées aux transactions (ventes et loc
 
 from datetime import datetime
 from app import db
-from app.models.__init__1 import Transaction, RentalAgreement
+from app.models.__init__1 import Transaction, RentalAgreement, Property, Client
+from app.services.pagination import resolve_sort, apply_sort, paginate_keyset
+from app.services.property_service import parse_filters
+
+# Clés de tri autorisées pour la liste des transactions
+TRANSACTION_SORT_COLUMNS = {
+    'transaction_date': Transaction.transaction_date,
+    'created_at': Transaction.created_at,
+    'amount': Transaction.amount,
+    'id': Transaction.id
+}
+
+# Paramètres de filtrage des transactions et conversion de leurs valeurs
+TRANSACTION_FILTER_PARAMS = {
+    'transaction_type': str, 'status': str,
+    'property_id': int, 'client_id': int, 'handled_by': int,
+    'min_amount': float, 'max_amount': float,
+    'start_date': datetime.fromisoformat, 'end_date': datetime.fromisoformat
+}
 
 def get_transaction_by_id(transaction_id):
     """
@@ -22,21 +40,87 @@ def get_transaction_by_id(transaction_id):
     """
     return Transaction.query.get(transaction_id)
 
-def get_all_transactions(page=1, per_page=10, filters=None):
+def get_transaction_validators(transaction_id):
+    """
+    Récupère, sans charger la transaction, les valeurs dont dépend sa fiche détaillée
+    (validateurs des requêtes conditionnelles) : la transaction, son contrat de
+    location, le bien et le client affichés.
+    
+    Args:
+        transaction_id (int): ID de la transaction
+        
+    Returns:
+        tuple: Dates de mise à jour et nombre de contrats, ou None si la transaction n'existe pas
+    """
+    agreement_updated_at = db.select(db.func.max(RentalAgreement.updated_at)) \
+        .where(RentalAgreement.transaction_id == Transaction.id).scalar_subquery()
+    agreements_count = db.select(db.func.count(RentalAgreement.id)) \
+        .where(RentalAgreement.transaction_id == Transaction.id).scalar_subquery()
+    return db.session.query(
+        Transaction.updated_at, agreement_updated_at, agreements_count, Property.updated_at, Client.updated_at
+    ).outerjoin(Property, Property.id == Transaction.property_id) \
+        .outerjoin(Client, Client.id == Transaction.client_id) \
+        .filter(Transaction.id == transaction_id).first()
+
+def get_all_transactions(page=1, per_page=10, filters=None, cursor=None, sort=None):
     """
     Récupère toutes les transactions avec pagination et filtrage optionnel.
     
+    Si un curseur est fourni (chaîne vide pour la première page), la pagination
+    se fait par curseur : ni OFFSET ni COUNT(*) ne sont exécutés.
+    
     Args:
         page (int, optional): Numéro de page
         per_page (int, optional): Nombre d'éléments par page
         filters (dict, optional): Filtres à appliquer
+        cursor (str, optional): Curseur de pagination (active le mode curseur)
+        sort (str, optional): Clé de tri ('transaction_date', 'created_at', 'amount', 'id'), préfixée par '-' pour un tri décroissant
         
     Returns:
-        tuple: (Liste des transactions, nombre total de pages, nombre total d'éléments)
+        tuple: (Liste des transactions, nombre total de pages, nombre total d'éléments),
+            ou (Liste des transactions, curseur suivant, curseur précédent) en mode curseur
+        
+    Raises:
+        ValueError: Si le tri ou le curseur est invalide
+    """
+    query = apply_transaction_filters(Transaction.query, filters)
+    
+    if cursor is not None:
+        sort, spec = resolve_sort(sort, TRANSACTION_SORT_COLUMNS, '-transaction_date', Transaction.id)
+        return paginate_keyset(query, sort, spec, cursor, per_page)
+    
+    if sort:
+        query = apply_sort(query, resolve_sort(sort, TRANSACTION_SORT_COLUMNS, '-transaction_date', Transaction.id)[1])
+    
+    # Pagination
+    pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+    
+    return pagination.items, pagination.pages, pagination.total
+
+def parse_transaction_filters(args):
     """
-    query = Transaction.query
+    Extrait les filtres des transactions de paramètres textuels (paramètres de
+    requête HTTP, options de la ligne de commande).
     
-    # Application des filtres
+    Args:
+        args (dict): Paramètres (valeurs textuelles, dates au format ISO 8601)
+        
+    Returns:
+        dict: Filtres à appliquer (les valeurs invalides sont ignorées)
+    """
+    return parse_filters(args, TRANSACTION_FILTER_PARAMS)
+
+def apply_transaction_filters(query, filters):
+    """
+    Applique les filtres à une requête sur les transactions.
+    
+    Args:
+        query (Query): Requête SQLAlchemy sur Transaction
+        filters (dict): Filtres à appliquer (voir get_all_transactions)
+        
+    Returns:
+        Query: Requête filtrée
+    """
     if filters:
         if 'transaction_type' in filters:
             query = query.filter(Transaction.transaction_type == filters['transaction_type'])
@@ -57,10 +141,7 @@ def get_all_transactions(page=1, per_page=10, filters=None):
         if 'end_date' in filters:
             query = query.filter(Transaction.transaction_date <= filters['end_date'])
     
-    # Pagination
-    pagination = query.paginate(page=page, per_page=per_page, error_out=False)
-    
-    return pagination.items, pagination.pages, pagination.total
+    return query
 
 def create_transaction(data, handled_by):
     """
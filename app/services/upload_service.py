@@ -0,0 +1,330 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Envois de documents par morceaux, reprenables.
+Ce fichier contient les fonctions du protocole d'envoi : ouverture d'un envoi,
+écriture d'un morceau à une position donnée (directement sur disque), finalisation
+(vérification de l'empreinte SHA-256, stockage du fichier et création du
+PropertyDocument), annulation et suppression des envois expirés.
+"""
+
+import hashlib
+import os
+import re
+import secrets
+import time
+from datetime import date, datetime, timedelta
+
+from flask import current_app
+from werkzeug.exceptions import ClientDisconnected
+
+from app import db
+from app.models.__init__1 import Property, UploadSession
+from app.services.property_service import check_document_filename, register_property_document
+from app.services.storage import store_file
+
+# Taille des blocs lus dans le corps des requêtes et écrits sur disque
+UPLOAD_BLOCK_SIZE = 1024 * 1024
+
+# Format d'une empreinte SHA-256 (hexadécimale)
+SHA256_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+
+class UploadConflict(Exception):
+    """
+    Morceau envoyé à une position différente du nombre d'octets déjà reçus.
+
+    Attributs:
+        offset (int): Position à partir de laquelle reprendre l'envoi
+    """
+
+    def __init__(self, message, offset):
+        super().__init__(message)
+        self.offset = offset
+
+def create_upload_session(property_id, data, created_by):
+    """
+    Ouvre un envoi de document par morceaux.
+
+    Args:
+        property_id (int): ID du bien immobilier
+        data (dict): Description du fichier : file_name, size (octets), document_type,
+            et optionnellement sha256, content_type, title, description, expiry_date (ISO 8601)
+        created_by (int): ID de l'utilisateur qui envoie le fichier
+
+    Returns:
+        UploadSession: L'envoi ouvert ou None si le bien n'existe pas
+
+    Raises:
+        ValueError: Si la description du fichier est invalide
+    """
+    if db.session.get(Property, property_id) is None:
+        return None
+
+    file_name = check_document_filename(data.get('file_name') or '')
+    if not data.get('document_type'):
+        raise ValueError("Le type de document est requis")
+
+    try:
+        total_size = int(data.get('size'))
+    except (TypeError, ValueError):
+        raise ValueError("La taille du fichier (size, en octets) est requise")
+    max_size = current_app.config.get('UPLOAD_MAX_SIZE', 1024 * 1024 * 1024)
+    if not 0 < total_size <= max_size:
+        raise ValueError(f"La taille du fichier doit être comprise entre 1 et {max_size} octets")
+
+    expiry_date = data.get('expiry_date')
+    if expiry_date:
+        expiry_date = date.fromisoformat(expiry_date)
+
+    now = datetime.utcnow()
+    upload = UploadSession(
+        id=secrets.token_hex(16),
+        property_id=property_id,
+        document_type=data['document_type'],
+        file_name=file_name[-100:],
+        content_type=data.get('content_type'),
+        title=data.get('title'),
+        description=data.get('description'),
+        expiry_date=expiry_date or None,
+        total_size=total_size,
+        received_size=0,
+        sha256=_normalize_checksum(data.get('sha256')),
+        created_by=created_by,
+        created_at=now,
+        updated_at=now,
+        expires_at=now + timedelta(seconds=current_app.config.get('UPLOAD_SESSION_TTL', 86400))
+    )
+
+    os.makedirs(_upload_folder(), exist_ok=True)
+    open(_part_path(upload.id), 'wb').close()
+
+    db.session.add(upload)
+    db.session.commit()
+
+    return upload
+
+def get_upload_session(upload_id, user):
+    """
+    Récupère un envoi en cours de l'utilisateur (ou de n'importe quel utilisateur pour un administrateur).
+
+    Args:
+        upload_id (str): ID de l'envoi
+        user (User): Utilisateur courant
+
+    Returns:
+        UploadSession: L'envoi ou None s'il n'existe pas, a expiré ou appartient à un autre utilisateur
+    """
+    upload = db.session.get(UploadSession, upload_id)
+    if upload is None or upload.expires_at <= datetime.utcnow():
+        return None
+    if upload.created_by != user.id and user.role != 'admin':
+        return None
+    return upload
+
+def write_upload_chunk(upload, stream, offset, content_length=None):
+    """
+    Écrit un morceau de l'envoi à la position indiquée, au fil de sa réception.
+
+    Les octets écrits sur disque sont enregistrés même si la connexion est coupée
+    pendant le morceau : le client reprend l'envoi à partir de l'offset courant.
+
+    Args:
+        upload (UploadSession): Envoi en cours
+        stream (file): Corps de la requête
+        offset (int): Position du morceau dans le fichier
+        content_length (int, optional): Taille annoncée du morceau
+
+    Returns:
+        int: Nouvel offset (nombre d'octets reçus)
+
+    Raises:
+        UploadConflict: Si offset ne correspond pas au nombre d'octets déjà reçus
+        ValueError: Si le morceau dépasse la taille annoncée du fichier
+    """
+    if offset != upload.received_size:
+        raise UploadConflict(f"Position attendue : {upload.received_size}", upload.received_size)
+    remaining = upload.total_size - offset
+    if content_length is not None and content_length > remaining:
+        raise ValueError(f"Le morceau dépasse la taille annoncée du fichier ({remaining} octets restants)")
+
+    written = 0
+    overflow = False
+    disconnected = None
+    with open(_part_path(upload.id), 'r+b') as part:
+        part.seek(offset)
+        try:
+            while True:
+                block = stream.read(UPLOAD_BLOCK_SIZE)
+                if not block:
+                    break
+                if len(block) > remaining - written:
+                    overflow = True
+                    block = block[:remaining - written]
+                part.write(block)
+                written += len(block)
+                if overflow:
+                    break
+        except ClientDisconnected as e:
+            disconnected = e
+        part.flush()
+        # Les octets acquittés doivent survivre à un arrêt du serveur
+        os.fsync(part.fileno())
+
+    new_offset = _record_progress(upload, offset, written)
+    if disconnected is not None:
+        raise disconnected
+    if overflow:
+        raise ValueError(f"Le morceau dépasse la taille annoncée du fichier (octets reçus : {new_offset})")
+    return new_offset
+
+def finalize_upload(upload, sha256=None):
+    """
+    Termine un envoi : vérifie qu'il est complet et que son empreinte correspond,
+    stocke le fichier et crée le document du bien.
+
+    Args:
+        upload (UploadSession): Envoi complet
+        sha256 (str, optional): Empreinte SHA-256 du fichier (si elle n'a pas été
+            transmise à l'ouverture de l'envoi)
+
+    Returns:
+        PropertyDocument: Le document créé
+
+    Raises:
+        UploadConflict: Si l'envoi n'est pas complet
+        ValueError: Si l'empreinte est absente ou ne correspond pas au fichier reçu
+    """
+    # Verrou sur l'envoi : une finalisation concurrente attend puis ne le trouve plus
+    upload = db.session.query(UploadSession).filter_by(id=upload.id).with_for_update().first()
+    if upload is None:
+        raise ValueError("Envoi déjà finalisé ou annulé")
+    if upload.received_size != upload.total_size:
+        raise UploadConflict(f"Envoi incomplet : {upload.received_size} octets reçus sur {upload.total_size}",
+                             upload.received_size)
+
+    expected = _normalize_checksum(sha256) or upload.sha256
+    if expected is None:
+        raise ValueError("L'empreinte SHA-256 du fichier (sha256) est requise")
+
+    path = _part_path(upload.id)
+    digest = hashlib.sha256()
+    with open(path, 'rb') as part:
+        for block in iter(lambda: part.read(UPLOAD_BLOCK_SIZE), b''):
+            digest.update(block)
+    if digest.hexdigest() != expected:
+        raise ValueError("L'empreinte SHA-256 ne correspond pas au fichier reçu : annuler l'envoi et le recommencer")
+
+    with open(path, 'rb') as part:
+        storage_key, file_size = store_file(part, upload.file_name, upload.content_type)
+
+    # L'envoi est supprimé dans la même transaction que la création du document
+    db.session.delete(upload)
+    document = register_property_document(
+        upload.property_id,
+        storage_key,
+        upload.file_name,
+        file_size,
+        upload.content_type,
+        upload.document_type,
+        title=upload.title,
+        description=upload.description,
+        expiry_date=upload.expiry_date,
+        uploaded_by=upload.created_by
+    )
+    _remove_part(path)
+
+    return document
+
+def cancel_upload(upload):
+    """
+    Annule un envoi et supprime les octets reçus.
+
+    Args:
+        upload (UploadSession): Envoi en cours
+    """
+    db.session.delete(upload)
+    db.session.commit()
+    _remove_part(_part_path(upload.id))
+
+def expire_upload_sessions():
+    """
+    Supprime les envois expirés et les fichiers temporaires sans envoi (bien supprimé,
+    arrêt du serveur pendant l'ouverture d'un envoi).
+
+    Returns:
+        int: Nombre d'envois supprimés
+    """
+    now = datetime.utcnow()
+    expired = [upload_id for (upload_id,) in
+               db.session.query(UploadSession.id).filter(UploadSession.expires_at <= now).all()]
+    if expired:
+        UploadSession.query.filter(UploadSession.id.in_(expired), UploadSession.expires_at <= now) \
+            .delete(synchronize_session=False)
+    db.session.commit()
+    for upload_id in expired:
+        _remove_part(_part_path(upload_id))
+
+    folder = _upload_folder()
+    if os.path.isdir(folder):
+        ttl = current_app.config.get('UPLOAD_SESSION_TTL', 86400)
+        for name in os.listdir(folder):
+            path = os.path.join(folder, name)
+            if not name.endswith('.part') or os.path.getmtime(path) > time.time() - ttl:
+                continue
+            if db.session.get(UploadSession, name[:-len('.part')]) is None:
+                _remove_part(path)
+        db.session.rollback()
+
+    return len(expired)
+
+# Fonctions utilitaires
+
+def _upload_folder():
+    """Dossier des fichiers temporaires des envois."""
+    return current_app.config['UPLOAD_SESSION_DIR']
+
+def _part_path(upload_id):
+    """Fichier temporaire d'un envoi."""
+    return os.path.join(_upload_folder(), f'{upload_id}.part')
+
+def _remove_part(path):
+    """Supprime un fichier temporaire (sans erreur s'il n'existe plus)."""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+def _normalize_checksum(value):
+    """Empreinte SHA-256 en minuscules, ou None si absente."""
+    if not value:
+        return None
+    value = value.strip().lower()
+    if not SHA256_PATTERN.match(value):
+        raise ValueError("Empreinte SHA-256 invalide (64 caractères hexadécimaux attendus)")
+    return value
+
+def _record_progress(upload, offset, written):
+    """
+    Enregistre les octets écrits si aucun autre morceau n'a été enregistré entre-temps,
+    et repousse l'expiration de l'envoi.
+
+    Returns:
+        int: Nouvel offset
+
+    Raises:
+        UploadConflict: Si un morceau concurrent a été enregistré à la même position
+    """
+    now = datetime.utcnow()
+    table = UploadSession.__table__
+    result = db.session.execute(
+        table.update()
+        .where(table.c.id == upload.id, table.c.received_size == offset)
+        .values(received_size=offset + written, updated_at=now,
+                expires_at=now + timedelta(seconds=current_app.config.get('UPLOAD_SESSION_TTL', 86400)))
+    )
+    db.session.commit()
+    db.session.refresh(upload)
+    if result.rowcount == 0:
+        raise UploadConflict(f"Position attendue : {upload.received_size}", upload.received_size)
+    return upload.received_size
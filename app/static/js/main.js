@@ -21,8 +21,12 @@ document.addEventListener('DOMContentLoaded', function() {
     if (mainImage && thumbnails.length > 0) {
         thumbnails.forEach(thumbnail => {
             thumbnail.addEventListener('click', function() {
-                // Update main image
-                mainImage.src = this.src;
+                // Update main image (full-size derivative, WebP when available)
+                const mainSource = mainImage.parentElement.querySelector('source');
+                if (mainSource) {
+                    mainSource.srcset = this.dataset.fullWebp || '';
+                }
+                mainImage.src = this.dataset.full || this.src;
                 
                 // Update active state
                 thumbnails.forEach(t => t.classList.remove('active'));
@@ -0,0 +1,9 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Module d'initialisation des utilitaires.
+Ce fichier permet d'importer facilement les utilitaires de l'application.
+"""
+
+from app.utils.process import process_singleton, discard_process_singleton
@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Objets propres à chaque processus.
+Ce fichier gère les objets d'arrière-plan (threads, pools de processus, connexions)
+stockés dans app.extensions : chacun est créé au premier usage dans chaque processus,
+les workers issus d'un fork créant le leur, et arrêté à la fin du processus par un
+seul hook atexit.
+"""
+
+import atexit
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Verrou de création (réentrant : la création d'un objet peut en demander un autre)
+_lock = threading.RLock()
+
+# Fonctions d'arrêt des objets créés : {(id de l'application, clé): (pid, fonction)}
+_exit_callbacks = {}
+
+def process_singleton(app, key, factory, on_exit=None):
+    """
+    Objet du processus courant stocké dans app.extensions[key], créé par factory
+    s'il est absent ou s'il a été créé par un autre processus (avant un fork).
+
+    Args:
+        app (Flask): Application
+        key (str): Clé dans app.extensions
+        factory (callable): Fonction sans argument créant l'objet (qui doit avoir un attribut pid)
+        on_exit (callable, optional): Fonction recevant l'objet, appelée à la fin du processus
+
+    Returns:
+        L'objet du processus courant
+    """
+    instance = app.extensions.get(key)
+    if instance is not None and instance.pid == os.getpid():
+        return instance
+
+    with _lock:
+        instance = app.extensions.get(key)
+        if instance is None or instance.pid != os.getpid():
+            instance = factory()
+            app.extensions[key] = instance
+            if on_exit is not None:
+                # Remplace la fonction de l'objet précédent : un seul arrêt par clé
+                _exit_callbacks[(id(app), key)] = (os.getpid(), lambda: on_exit(instance))
+    return instance
+
+def discard_process_singleton(app, key, instance=None):
+    """
+    Retire l'objet du processus courant de app.extensions (un nouveau sera créé au
+    prochain usage). L'objet n'est pas arrêté : c'est à l'appelant de le faire.
+
+    Args:
+        app (Flask): Application
+        key (str): Clé dans app.extensions
+        instance (optional): Objet à retirer (rien n'est retiré si un autre l'a déjà remplacé)
+
+    Returns:
+        L'objet retiré s'il appartient au processus courant, sinon None
+    """
+    with _lock:
+        current = app.extensions.get(key)
+        if current is None or (instance is not None and current is not instance):
+            return None
+        del app.extensions[key]
+        _exit_callbacks.pop((id(app), key), None)
+    return current if current.pid == os.getpid() else None
+
+# Fonctions utilitaires
+
+def _run_exit_callbacks():
+    """Arrête les objets créés par le processus courant."""
+    with _lock:
+        callbacks = [callback for pid, callback in _exit_callbacks.values() if pid == os.getpid()]
+    for callback in callbacks:
+        try:
+            callback()
+        except Exception:
+            logger.warning("Arrêt d'un objet du processus impossible", exc_info=True)
+
+atexit.register(_run_exit_callbacks)
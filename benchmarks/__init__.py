@@ -0,0 +1,16 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Mesures de performance des services et des routes de l'API.
+
+- benchmarks.cases : scénarios mesurés (un appel de service ou de route chacun) ;
+- benchmarks.run : génère le jeu de données à chaque échelle (flask seed), mesure les
+  scénarios et enregistre les résultats en JSON ;
+- benchmarks.compare : compare deux fichiers de résultats.
+
+Exemple :
+    python -m benchmarks.run --scale 1 --scale 10 -o avant.json
+    python -m benchmarks.run --scale 1 --scale 10 -o apres.json
+    python -m benchmarks.compare avant.json apres.json
+"""
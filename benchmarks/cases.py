@@ -0,0 +1,801 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Scénarios mesurés par benchmarks.run.
+Ce fichier déclare, avec les décorateurs service_case et route_case, un scénario par
+fonction de service et par route de l'API (plusieurs pour les recherches : filtres,
+tri, pagination par curseur). Les scénarios reçoivent un BenchmarkContext qui désigne
+les objets du jeu de données généré (bien le plus demandé, propriétaire ayant le plus
+de biens, etc.) et le client de test authentifié.
+
+Les scénarios d'écriture créent puis suppriment ce qu'ils ajoutent, afin que le jeu
+de données reste identique d'une mesure à l'autre.
+"""
+
+import contextlib
+import hashlib
+import io
+from datetime import datetime, timedelta
+
+from app import db
+from app.models.__init__1 import (
+    User, Property, PropertyImage, PropertyDocument, Amenity, Client, PropertyVisit, Transaction, RentalAgreement
+)
+from app.models.client import client_property_interests
+from app.services.seed_service import SEED_REFERENCE_DATE
+
+_cases = []
+
+class BenchmarkCase:
+    """
+    Scénario mesuré.
+
+    Attributs:
+        name (str): Nom du scénario (clé des résultats)
+        kind (str): 'service' ou 'route'
+        function (callable): Fonction exécutée, appelée avec le BenchmarkContext
+        rules (tuple): Routes couvertes, au format 'MÉTHODE /règle' (scénarios de route)
+    """
+
+    def __init__(self, name, kind, function, rules=()):
+        self.name = name
+        self.kind = kind
+        self.function = function
+        self.rules = rules
+
+def service_case(name):
+    """
+    Décorateur déclarant un scénario d'appel de service.
+
+    Args:
+        name (str): Nom du scénario (ex: 'property_service.get_all_properties[city]')
+
+    Returns:
+        function: Le décorateur
+    """
+    def decorator(f):
+        _cases.append(BenchmarkCase(name, 'service', f))
+        return f
+    return decorator
+
+def route_case(name, *rules):
+    """
+    Décorateur déclarant un scénario de route.
+
+    Args:
+        name (str): Nom du scénario (ex: 'GET /api/properties/[city]')
+        *rules (str): Routes couvertes ('MÉTHODE /règle' de l'url_map) ; celle du nom par défaut
+
+    Returns:
+        function: Le décorateur
+    """
+    def decorator(f):
+        _cases.append(BenchmarkCase(name, 'route', f, rules or (name.split('[')[0],)))
+        return f
+    return decorator
+
+def get_cases(kinds=None, names=None):
+    """
+    Scénarios déclarés, dans l'ordre de déclaration.
+
+    Args:
+        kinds (iterable, optional): Types retenus ('service', 'route')
+        names (iterable, optional): Sous-chaînes des noms retenus
+
+    Returns:
+        list: Scénarios (BenchmarkCase)
+    """
+    return [
+        case for case in _cases
+        if (not kinds or case.kind in kinds) and (not names or any(name in case.name for name in names))
+    ]
+
+class BenchmarkError(Exception):
+    """Erreur levée lorsqu'un scénario n'obtient pas le résultat attendu (réponse en erreur)."""
+    pass
+
+class BenchmarkContext:
+    """
+    Objets du jeu de données utilisés par les scénarios, choisis parmi les plus
+    sollicités (ceux que l'asymétrie du générateur rend les plus coûteux).
+    """
+
+    def __init__(self, app, password):
+        """
+        Args:
+            app (Flask): Application (base déjà remplie par seed_database)
+            password (str): Mot de passe des utilisateurs générés
+        """
+        from app.services.auth_service import generate_auth_token
+
+        self.app = app
+        self.client = app.test_client()
+        self.password = password
+        self.year = SEED_REFERENCE_DATE.year
+
+        with app.app_context():
+            session = db.session
+            self.admin_id = session.query(User.id).filter(User.role == 'admin').order_by(User.id).scalar()
+            self.property_id = session.query(client_property_interests.c.property_id).group_by(
+                client_property_interests.c.property_id
+            ).order_by(db.func.count().desc(), client_property_interests.c.property_id).limit(1).scalar()
+            self.reference_code, self.city = session.query(
+                Property.reference_code, Property.city
+            ).filter(Property.id == self.property_id).one()
+            self.latitude, self.longitude = (float(value) for value in session.query(
+                db.func.avg(Property.latitude), db.func.avg(Property.longitude)
+            ).filter(Property.city == self.city).one())
+            self.owner_id = _most_frequent(session, Property.owner_id)
+            self.amenity_id = session.query(Amenity.id).order_by(Amenity.id).limit(1).scalar()
+            self.client_id = session.query(client_property_interests.c.client_id).group_by(
+                client_property_interests.c.client_id
+            ).order_by(db.func.count().desc(), client_property_interests.c.client_id).limit(1).scalar()
+            self.visit_client_id = _most_frequent(session, PropertyVisit.client_id)
+            self.agent_id = _most_frequent(session, Client.assigned_agent_id)
+            self.transaction_property_id = _most_frequent(session, Transaction.property_id)
+            self.transaction_client_id = _most_frequent(session, Transaction.client_id)
+            self.transaction_id = session.query(db.func.min(RentalAgreement.transaction_id)).scalar()
+            self.token = generate_auth_token(self.admin_id)
+            db.session.remove()
+
+        self.headers = {'Authorization': f'Bearer {self.token}'}
+
+    def request(self, method, url, expected=(200,), **kwargs):
+        """
+        Envoie une requête authentifiée avec le client de test et lit toute la réponse.
+
+        Args:
+            method (str): Méthode HTTP
+            url (str): URL
+            expected (tuple, optional): Codes HTTP attendus
+            **kwargs: Arguments du client de test (query_string, json, data, ...)
+
+        Returns:
+            Response: Réponse
+
+        Raises:
+            BenchmarkError: Si le code HTTP n'est pas celui attendu
+        """
+        kwargs.setdefault('headers', self.headers)
+        response = self.client.open(url, method=method, **kwargs)
+        body = response.get_data()
+        if response.status_code not in expected:
+            raise BenchmarkError(f'{method} {url} : HTTP {response.status_code} {body[:120]!r}')
+        return response
+
+    def get(self, url, **query_string):
+        """Requête GET authentifiée (paramètres de requête en arguments nommés)."""
+        return self.request('GET', url, query_string=query_string)
+
+def _most_frequent(session, column):
+    """Valeur la plus fréquente d'une colonne (la plus petite en cas d'égalité)."""
+    return session.query(column).filter(column.isnot(None)).group_by(column).order_by(
+        db.func.count().desc(), column
+    ).limit(1).scalar()
+
+def _unique():
+    """Suffixe unique des objets créés par les scénarios d'écriture."""
+    return datetime.utcnow().strftime('%H%M%S%f')
+
+def _property_data(ctx):
+    """Données d'un bien créé par un scénario d'écriture."""
+    return {
+        'title': 'Appartement de mesure', 'property_type': 'apartment', 'status': 'for_sale',
+        'address_line1': '1 rue de la Mesure', 'city': ctx.city, 'postal_code': '75011', 'country': 'France',
+        'latitude': ctx.latitude, 'longitude': ctx.longitude, 'total_area': 48.5, 'asking_price': 350000,
+        'owner_id': ctx.owner_id, 'amenities': [ctx.amenity_id]
+    }
+
+def _delete_objects(ctx, model, *ids):
+    """Supprime des objets créés par un scénario de route sans route de suppression (événements ORM compris)."""
+    with ctx.app.app_context():
+        for object_id in ids:
+            db.session.delete(db.session.get(model, object_id))
+        db.session.commit()
+
+@contextlib.contextmanager
+def _enabled(ctx, *options):
+    """Active des options booléennes de la configuration le temps d'un scénario."""
+    previous = {option: ctx.app.config.get(option) for option in options}
+    ctx.app.config.update(dict.fromkeys(options, True))
+    try:
+        yield
+    finally:
+        ctx.app.config.update(previous)
+
+def _image_file():
+    """Image PNG envoyée par les scénarios d'ajout d'image."""
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new('RGB', (640, 480), (200, 180, 150)).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+_IMAGE = _image_file()
+
+# Document envoyé par les scénarios d'ajout de document (64 Ko, deux morceaux pour /api/uploads)
+_DOCUMENT = b'Diagnostic de performance energetique\n' * 1724
+
+def _transaction_data(ctx):
+    """Données d'une transaction créée par un scénario d'écriture."""
+    return {
+        'transaction_type': 'sale', 'property_id': ctx.property_id, 'client_id': ctx.client_id,
+        'transaction_date': SEED_REFERENCE_DATE.isoformat(), 'amount': 340000, 'status': 'pending'
+    }
+
+# Services : biens immobiliers
+
+@service_case('property_service.get_property_by_id')
+def _property_by_id(ctx):
+    from app.services.property_service import get_property_by_id
+    get_property_by_id(ctx.property_id)
+
+@service_case('property_service.get_property_by_reference')
+def _property_by_reference(ctx):
+    from app.services.property_service import get_property_by_reference
+    get_property_by_reference(ctx.reference_code)
+
+@service_case('property_service.get_all_properties')
+def _all_properties(ctx):
+    from app.services.property_service import get_all_properties
+    get_all_properties()
+
+@service_case('property_service.get_all_properties[city,price]')
+def _all_properties_city(ctx):
+    from app.services.property_service import get_all_properties, parse_property_filters
+    get_all_properties(parse_property_filters({'city': ctx.city, 'min_price': '200000', 'max_price': '900000'}),
+                       sort='-price')
+
+@service_case('property_service.get_all_properties[deep_page]')
+def _all_properties_deep_page(ctx):
+    from app.services.property_service import get_all_properties
+    get_all_properties(page=40, per_page=10)
+
+@service_case('property_service.get_all_properties[cursor]')
+def _all_properties_cursor(ctx):
+    from app.services.property_service import get_all_properties
+    get_all_properties(per_page=20, cursor='', sort='-created_at')
+
+@service_case('property_service.get_all_properties[q]')
+def _all_properties_text(ctx):
+    from app.services.property_service import get_all_properties, parse_property_filters
+    get_all_properties(parse_property_filters({'q': 'lumineux calme'}))
+
+@service_case('property_service.get_all_properties[radius]')
+def _all_properties_radius(ctx):
+    from app.services.property_service import get_all_properties, parse_property_filters
+    get_all_properties(parse_property_filters({
+        'lat': str(ctx.latitude), 'lng': str(ctx.longitude), 'radius_km': '3'
+    }))
+
+@service_case('property_service.get_all_properties[amenity,bedrooms]')
+def _all_properties_amenity(ctx):
+    from app.services.property_service import get_all_properties, parse_property_filters
+    get_all_properties(parse_property_filters({'amenity_id': str(ctx.amenity_id), 'bedrooms': '2'}))
+
+@service_case('property_service.get_property_images')
+def _property_images(ctx):
+    from app.services.property_service import get_property_images
+    get_property_images(ctx.property_id)
+
+@service_case('property_service.get_primary_images')
+def _primary_images(ctx):
+    from app.services.property_service import get_all_properties, get_primary_images
+    properties, _, _ = get_all_properties(per_page=50)
+    get_primary_images([prop.id for prop in properties])
+
+@service_case('property_service.get_property_documents')
+def _property_documents(ctx):
+    from app.services.property_service import get_property_documents
+    get_property_documents(ctx.property_id)
+
+@service_case('property_service.get_all_amenities')
+def _all_amenities(ctx):
+    from app.services.property_service import get_all_amenities
+    get_all_amenities()
+
+@service_case('property_service.create_update_delete_property')
+def _property_write(ctx):
+    from app.services.property_service import create_property, update_property, delete_property
+    prop = create_property(_property_data(ctx), ctx.admin_id)
+    update_property(prop.id, {'asking_price': 345000, 'status': 'for_sale'})
+    delete_property(prop.id)
+
+@service_case('facet_service.get_property_facets')
+def _facets(ctx):
+    from app.services.facet_service import get_property_facets
+    get_property_facets()
+
+@service_case('facet_service.get_property_facets[city]')
+def _facets_city(ctx):
+    from app.services.facet_service import get_property_facets
+    from app.services.property_service import parse_property_filters
+    get_property_facets(parse_property_filters({'city': ctx.city}))
+
+# Services : propriétaires
+
+@service_case('owner_service.get_owner_by_id')
+def _owner_by_id(ctx):
+    from app.services.owner_service import get_owner_by_id
+    get_owner_by_id(ctx.owner_id)
+
+@service_case('owner_service.get_all_owners')
+def _all_owners(ctx):
+    from app.services.owner_service import get_all_owners
+    get_all_owners()
+
+@service_case('owner_service.get_all_owners[search]')
+def _all_owners_search(ctx):
+    from app.services.owner_service import get_all_owners
+    get_all_owners(search='Martin')
+
+@service_case('owner_service.get_owner_properties')
+def _owner_properties(ctx):
+    from app.services.owner_service import get_owner_properties
+    get_owner_properties(ctx.owner_id)
+
+@service_case('owner_service.create_update_delete_owner')
+def _owner_write(ctx):
+    from app.services.owner_service import create_owner, update_owner, delete_owner
+    owner = create_owner({'first_name': 'Mesure', 'last_name': 'Propriétaire',
+                          'email': f'mesure.{_unique()}@example.com'}, ctx.admin_id)
+    update_owner(owner.id, {'phone': '0102030405'})
+    delete_owner(owner.id)
+
+# Services : clients
+
+@service_case('client_service.get_client_by_id')
+def _client_by_id(ctx):
+    from app.services.client_service import get_client_by_id
+    get_client_by_id(ctx.client_id)
+
+@service_case('client_service.get_all_clients')
+def _all_clients(ctx):
+    from app.services.client_service import get_all_clients
+    get_all_clients()
+
+@service_case('client_service.get_all_clients[search]')
+def _all_clients_search(ctx):
+    from app.services.client_service import get_all_clients
+    get_all_clients(search='Dubois')
+
+@service_case('client_service.get_all_clients[agent,type]')
+def _all_clients_agent(ctx):
+    from app.services.client_service import get_all_clients
+    get_all_clients(client_type='buyer', assigned_agent_id=ctx.agent_id)
+
+@service_case('client_service.get_client_interested_properties')
+def _client_interests(ctx):
+    from app.services.client_service import get_client_interested_properties, get_client_interest_details
+    properties, _, _ = get_client_interested_properties(ctx.client_id)
+    get_client_interest_details(ctx.client_id, [prop.id for prop in properties])
+
+@service_case('client_service.add_remove_property_interest')
+def _client_interest_write(ctx):
+    from app.services.client_service import add_property_interest, remove_property_interest
+    add_property_interest(ctx.visit_client_id, ctx.transaction_property_id, 'medium')
+    remove_property_interest(ctx.visit_client_id, ctx.transaction_property_id)
+
+@service_case('client_service.get_client_visits')
+def _client_visits(ctx):
+    from app.services.client_service import get_client_visits
+    get_client_visits(ctx.visit_client_id)
+
+@service_case('client_service.schedule_update_property_visit')
+def _client_visit_write(ctx):
+    from app.services.client_service import schedule_property_visit, update_property_visit
+    visit_date = datetime.combine(SEED_REFERENCE_DATE, datetime.min.time()) + timedelta(days=7, hours=10)
+    visit = schedule_property_visit(ctx.client_id, ctx.property_id, visit_date, accompanied_by=ctx.admin_id)
+    update_property_visit(visit.id, {'status': 'cancelled'})
+    db.session.delete(visit)
+    db.session.commit()
+
+@service_case('client_service.create_update_delete_client')
+def _client_write(ctx):
+    from app.services.client_service import create_client, update_client, delete_client
+    client = create_client({'first_name': 'Mesure', 'last_name': 'Client', 'client_type': 'buyer',
+                            'email': f'mesure.{_unique()}@example.com'}, ctx.admin_id)
+    update_client(client.id, {'budget_max': 500000})
+    delete_client(client.id)
+
+# Services : transactions
+
+@service_case('transaction_service.get_transaction_by_id')
+def _transaction_by_id(ctx):
+    from app.services.transaction_service import get_transaction_by_id
+    get_transaction_by_id(ctx.transaction_id)
+
+@service_case('transaction_service.get_all_transactions')
+def _all_transactions(ctx):
+    from app.services.transaction_service import get_all_transactions
+    get_all_transactions()
+
+@service_case('transaction_service.get_all_transactions[type,dates]')
+def _all_transactions_filtered(ctx):
+    from app.services.transaction_service import get_all_transactions, parse_transaction_filters
+    get_all_transactions(filters=parse_transaction_filters({
+        'transaction_type': 'sale', 'start_date': f'{ctx.year - 1}-01-01', 'end_date': f'{ctx.year}-12-31'
+    }), sort='-amount')
+
+@service_case('transaction_service.get_rental_agreement')
+def _rental_agreement(ctx):
+    from app.services.transaction_service import get_rental_agreement
+    get_rental_agreement(ctx.transaction_id)
+
+@service_case('transaction_service.get_property_transactions')
+def _property_transactions(ctx):
+    from app.services.transaction_service import get_property_transactions
+    get_property_transactions(ctx.transaction_property_id)
+
+@service_case('transaction_service.get_client_transactions')
+def _client_transactions(ctx):
+    from app.services.transaction_service import get_client_transactions
+    get_client_transactions(ctx.transaction_client_id)
+
+@service_case('transaction_service.create_status_delete_transaction')
+def _transaction_write(ctx):
+    from app.services.transaction_service import create_transaction, change_transaction_status, delete_transaction
+    data = dict(_transaction_data(ctx), transaction_date=SEED_REFERENCE_DATE)
+    transaction = create_transaction(data, ctx.admin_id)
+    change_transaction_status(transaction.id, 'cancelled')
+    delete_transaction(transaction.id)
+
+# Services : tableau de bord, utilisateurs, import et export
+
+@service_case('dashboard_service.get_dashboard_stats')
+def _dashboard_stats(ctx):
+    from app.services.dashboard_service import get_dashboard_stats
+    get_dashboard_stats(ctx.year)
+
+@service_case('activity_log.get_recent_activities')
+def _recent_activities(ctx):
+    from app.services.activity_log import get_recent_activities
+    get_recent_activities()
+
+@service_case('auth_service.verify_auth_token')
+def _verify_token(ctx):
+    from app.services.auth_service import verify_auth_token
+    verify_auth_token(ctx.token)
+
+@service_case('auth_service.get_all_users')
+def _all_users(ctx):
+    from app.services.auth_service import get_all_users
+    get_all_users()
+
+@service_case('export_service.export_records[properties]')
+def _export_properties(ctx):
+    from app.services.export_service import export_records
+    for _ in export_records('properties', {}, 'csv'):
+        pass
+
+@service_case('export_service.export_records[transactions]')
+def _export_transactions(ctx):
+    from app.services.export_service import export_records
+    for _ in export_records('transactions', {}, 'ndjson'):
+        pass
+
+@service_case('import_service.import_records[dry_run]')
+def _import_dry_run(ctx):
+    from app.services.import_service import import_records
+    lines = ['first_name,last_name,email,city']
+    lines.extend(f'Mesure,Propriétaire {number},mesure.{number}@example.com,{ctx.city}' for number in range(200))
+    import_records('owners', io.StringIO('\n'.join(lines)), 'csv', dry_run=True)
+
+# Routes : biens immobiliers
+
+@route_case('GET /api/properties/')
+def _route_properties(ctx):
+    ctx.get('/api/properties/')
+
+@route_case('GET /api/properties/[city,price]')
+def _route_properties_city(ctx):
+    ctx.get('/api/properties/', city=ctx.city, min_price=200000, max_price=900000, sort='-price')
+
+@route_case('GET /api/properties/[cursor]')
+def _route_properties_cursor(ctx):
+    ctx.get('/api/properties/', cursor='', per_page=20)
+
+@route_case('GET /api/properties/[q]')
+def _route_properties_text(ctx):
+    ctx.get('/api/properties/', q='lumineux calme')
+
+@route_case('GET /api/properties/[radius]')
+def _route_properties_radius(ctx):
+    ctx.get('/api/properties/', lat=ctx.latitude, lng=ctx.longitude, radius_km=3)
+
+@route_case('GET /api/properties/facets')
+def _route_facets(ctx):
+    ctx.get('/api/properties/facets', city=ctx.city)
+
+@route_case('GET /api/properties/<int:property_id>')
+def _route_property(ctx):
+    ctx.get(f'/api/properties/{ctx.property_id}')
+
+@route_case('GET /api/properties/reference/<reference_code>')
+def _route_property_reference(ctx):
+    ctx.get(f'/api/properties/reference/{ctx.reference_code}')
+
+@route_case('GET /api/properties/amenities')
+def _route_amenities(ctx):
+    ctx.get('/api/properties/amenities')
+
+@route_case('POST+PUT+DELETE /api/properties/',
+            'POST /api/properties/', 'PUT /api/properties/<int:property_id>', 'DELETE /api/properties/<int:property_id>')
+def _route_property_write(ctx):
+    response = ctx.request('POST', '/api/properties/', expected=(201,), json=_property_data(ctx))
+    property_id = response.get_json()['property']['id']
+    ctx.request('PUT', f'/api/properties/{property_id}', json={'asking_price': 345000})
+    ctx.request('DELETE', f'/api/properties/{property_id}')
+
+@route_case('POST /api/properties/<int:property_id>/images')
+def _route_property_image_write(ctx):
+    response = ctx.request('POST', f'/api/properties/{ctx.property_id}/images', expected=(201,), data={
+        'image': (io.BytesIO(_IMAGE), 'mesure.png', 'image/png'), 'title': 'Image de mesure'
+    })
+    # Pas de route de suppression des images ; déclinaisons générées par le pool du processus
+    _delete_objects(ctx, PropertyImage, response.get_json()['image']['id'])
+
+@route_case('POST /api/properties/<int:property_id>/documents')
+def _route_property_document_write(ctx):
+    response = ctx.request('POST', f'/api/properties/{ctx.property_id}/documents', expected=(201,), data={
+        'document': (io.BytesIO(_DOCUMENT), 'mesure.txt', 'text/plain'), 'document_type': 'diagnostic'
+    })
+    _delete_objects(ctx, PropertyDocument, response.get_json()['document']['id'])
+
+@route_case('POST /api/properties/amenities')
+def _route_amenity_write(ctx):
+    response = ctx.request('POST', '/api/properties/amenities', expected=(201,), json={
+        'name': f'Mesure {_unique()}', 'category': 'Mesure'
+    })
+    _delete_objects(ctx, Amenity, response.get_json()['amenity']['id'])
+
+# Routes : propriétaires
+
+@route_case('GET /api/owners/')
+def _route_owners(ctx):
+    ctx.get('/api/owners/')
+
+@route_case('GET /api/owners/[search]')
+def _route_owners_search(ctx):
+    ctx.get('/api/owners/', search='Martin')
+
+@route_case('GET /api/owners/<int:owner_id>')
+def _route_owner(ctx):
+    ctx.get(f'/api/owners/{ctx.owner_id}')
+
+@route_case('GET /api/owners/<int:owner_id>/properties')
+def _route_owner_properties(ctx):
+    ctx.get(f'/api/owners/{ctx.owner_id}/properties')
+
+@route_case('POST+PUT+DELETE /api/owners/',
+            'POST /api/owners/', 'PUT /api/owners/<int:owner_id>', 'DELETE /api/owners/<int:owner_id>')
+def _route_owner_write(ctx):
+    response = ctx.request('POST', '/api/owners/', expected=(201,), json={
+        'first_name': 'Mesure', 'last_name': 'Propriétaire', 'email': f'mesure.{_unique()}@example.com'
+    })
+    owner_id = response.get_json()['owner']['id']
+    ctx.request('PUT', f'/api/owners/{owner_id}', json={'phone': '0102030405'})
+    ctx.request('DELETE', f'/api/owners/{owner_id}')
+
+# Routes : clients
+
+@route_case('GET /api/clients/')
+def _route_clients(ctx):
+    ctx.get('/api/clients/')
+
+@route_case('GET /api/clients/[search]')
+def _route_clients_search(ctx):
+    ctx.get('/api/clients/', search='Dubois')
+
+@route_case('GET /api/clients/<int:client_id>')
+def _route_client(ctx):
+    ctx.get(f'/api/clients/{ctx.client_id}')
+
+@route_case('GET /api/clients/<int:client_id>/interests')
+def _route_client_interests(ctx):
+    ctx.get(f'/api/clients/{ctx.client_id}/interests')
+
+@route_case('POST+DELETE /api/clients/<int:client_id>/interests/<int:property_id>',
+            'POST /api/clients/<int:client_id>/interests/<int:property_id>',
+            'DELETE /api/clients/<int:client_id>/interests/<int:property_id>')
+def _route_client_interest_write(ctx):
+    url = f'/api/clients/{ctx.visit_client_id}/interests/{ctx.transaction_property_id}'
+    ctx.request('POST', url, expected=(200, 201), json={'interest_level': 'medium'})
+    ctx.request('DELETE', url)
+
+@route_case('GET /api/clients/<int:client_id>/visits')
+def _route_client_visits(ctx):
+    ctx.get(f'/api/clients/{ctx.visit_client_id}/visits')
+
+@route_case('POST+PUT /api/clients/<int:client_id>/visits',
+            'POST /api/clients/<int:client_id>/visits', 'PUT /api/clients/<int:client_id>/visits/<int:visit_id>')
+def _route_client_visit_write(ctx):
+    visit_date = datetime.combine(SEED_REFERENCE_DATE, datetime.min.time()) + timedelta(days=7, hours=10)
+    response = ctx.request('POST', f'/api/clients/{ctx.client_id}/visits', expected=(201,), json={
+        'property_id': ctx.property_id, 'visit_date': visit_date.isoformat()
+    })
+    visit_id = response.get_json()['visit']['id']
+    ctx.request('PUT', f'/api/clients/{ctx.client_id}/visits/{visit_id}', json={'status': 'cancelled'})
+    # Pas de route de suppression des visites
+    with ctx.app.app_context():
+        db.session.execute(db.delete(PropertyVisit).where(PropertyVisit.id == visit_id))
+        db.session.commit()
+
+@route_case('POST+PUT+DELETE /api/clients/',
+            'POST /api/clients/', 'PUT /api/clients/<int:client_id>', 'DELETE /api/clients/<int:client_id>')
+def _route_client_write(ctx):
+    response = ctx.request('POST', '/api/clients/', expected=(201,), json={
+        'first_name': 'Mesure', 'last_name': 'Client', 'client_type': 'buyer',
+        'email': f'mesure.{_unique()}@example.com'
+    })
+    client_id = response.get_json()['client']['id']
+    ctx.request('PUT', f'/api/clients/{client_id}', json={'budget_max': 500000})
+    ctx.request('DELETE', f'/api/clients/{client_id}')
+
+# Routes : transactions
+
+@route_case('GET /api/transactions/')
+def _route_transactions(ctx):
+    ctx.get('/api/transactions/')
+
+@route_case('GET /api/transactions/[type,dates]')
+def _route_transactions_filtered(ctx):
+    ctx.get('/api/transactions/', transaction_type='sale',
+            start_date=f'{ctx.year - 1}-01-01', end_date=f'{ctx.year}-12-31', sort='-amount')
+
+@route_case('GET /api/transactions/<int:transaction_id>')
+def _route_transaction(ctx):
+    ctx.get(f'/api/transactions/{ctx.transaction_id}')
+
+@route_case('GET /api/transactions/<int:transaction_id>/rental-agreement')
+def _route_rental_agreement(ctx):
+    ctx.get(f'/api/transactions/{ctx.transaction_id}/rental-agreement')
+
+@route_case('GET /api/transactions/property/<int:property_id>')
+def _route_property_transactions(ctx):
+    ctx.get(f'/api/transactions/property/{ctx.transaction_property_id}')
+
+@route_case('GET /api/transactions/client/<int:client_id>')
+def _route_client_transactions(ctx):
+    ctx.get(f'/api/transactions/client/{ctx.transaction_client_id}')
+
+@route_case('POST+PUT+DELETE /api/transactions/',
+            'POST /api/transactions/', 'PUT /api/transactions/<int:transaction_id>',
+            'PUT /api/transactions/<int:transaction_id>/status', 'DELETE /api/transactions/<int:transaction_id>')
+def _route_transaction_write(ctx):
+    response = ctx.request('POST', '/api/transactions/', expected=(201,), json=_transaction_data(ctx))
+    transaction_id = response.get_json()['transaction']['id']
+    ctx.request('PUT', f'/api/transactions/{transaction_id}', json={'notes': 'Offre de mesure'})
+    ctx.request('PUT', f'/api/transactions/{transaction_id}/status', json={'status': 'cancelled'})
+    ctx.request('DELETE', f'/api/transactions/{transaction_id}')
+
+@route_case('POST+PUT /api/transactions/<int:transaction_id>/rental-agreement',
+            'POST /api/transactions/<int:transaction_id>/rental-agreement',
+            'PUT /api/transactions/<int:transaction_id>/rental-agreement')
+def _route_rental_agreement_write(ctx):
+    data = dict(_transaction_data(ctx), transaction_type='rental', amount=1200)
+    response = ctx.request('POST', '/api/transactions/', expected=(201,), json=data)
+    transaction_id = response.get_json()['transaction']['id']
+    url = f'/api/transactions/{transaction_id}/rental-agreement'
+    ctx.request('POST', url, expected=(201,), json={
+        'start_date': SEED_REFERENCE_DATE.isoformat(),
+        'end_date': SEED_REFERENCE_DATE.replace(year=SEED_REFERENCE_DATE.year + 1).isoformat(),
+        'rent_amount': 1200, 'rent_frequency': 'monthly', 'deposit_amount': 2400, 'payment_day': 5
+    })
+    ctx.request('PUT', url, json={'payment_day': 10})
+    # La suppression de la transaction supprime son contrat
+    ctx.request('PUT', f'/api/transactions/{transaction_id}/status', json={'status': 'cancelled'})
+    ctx.request('DELETE', f'/api/transactions/{transaction_id}')
+
+# Routes : envoi reprenable de documents
+
+@route_case('POST+PUT+GET+POST /api/uploads/',
+            'POST /api/uploads/', 'PUT /api/uploads/<upload_id>', 'GET /api/uploads/<upload_id>',
+            'POST /api/uploads/<upload_id>/finalize')
+def _route_upload_write(ctx):
+    response = ctx.request('POST', '/api/uploads/', expected=(201,), json={
+        'property_id': ctx.property_id, 'file_name': 'mesure.txt', 'size': len(_DOCUMENT),
+        'document_type': 'diagnostic', 'content_type': 'text/plain',
+        'sha256': hashlib.sha256(_DOCUMENT).hexdigest()
+    })
+    url = f"/api/uploads/{response.get_json()['upload']['id']}"
+    half = len(_DOCUMENT) // 2
+    ctx.request('PUT', url, query_string={'offset': 0}, data=_DOCUMENT[:half])
+    # Reprise : position courante puis second morceau
+    offset = int(ctx.request('GET', url).headers['Upload-Offset'])
+    ctx.request('PUT', url, query_string={'offset': offset}, data=_DOCUMENT[offset:])
+    response = ctx.request('POST', f'{url}/finalize', expected=(201,))
+    _delete_objects(ctx, PropertyDocument, response.get_json()['document']['id'])
+
+@route_case('POST+DELETE /api/uploads/', 'DELETE /api/uploads/<upload_id>')
+def _route_upload_cancel(ctx):
+    response = ctx.request('POST', '/api/uploads/', expected=(201,), json={
+        'property_id': ctx.property_id, 'file_name': 'mesure.txt', 'size': len(_DOCUMENT),
+        'document_type': 'diagnostic'
+    })
+    ctx.request('DELETE', f"/api/uploads/{response.get_json()['upload']['id']}")
+
+# Routes : import, export, authentification, administration, supervision
+
+@route_case('POST /api/import/<entity>[owners,dry_run]')
+def _route_import_dry_run(ctx):
+    lines = ['first_name,last_name,email,city']
+    lines.extend(f'Mesure,Propriétaire {number},mesure.{number}@example.com,{ctx.city}' for number in range(200))
+    ctx.request('POST', '/api/import/owners', query_string={'dry_run': '1'},
+                data='\n'.join(lines).encode('utf-8'), content_type='text/csv')
+
+@route_case('GET /api/export/<entity>[properties]')
+def _route_export_properties(ctx):
+    ctx.get('/api/export/properties', format='csv')
+
+@route_case('GET /api/export/<entity>[visits]')
+def _route_export_visits(ctx):
+    ctx.get('/api/export/visits', format='ndjson')
+
+@route_case('POST /auth/login')
+def _route_login(ctx):
+    ctx.request('POST', '/auth/login', headers={}, json={'username': 'admin', 'password': ctx.password})
+
+@route_case('GET /auth/profile')
+def _route_profile(ctx):
+    ctx.get('/auth/profile')
+
+@route_case('POST+PUT+PUT+DELETE /auth/register',
+            'POST /auth/register', 'PUT /auth/profile', 'PUT /auth/users/<int:user_id>',
+            'DELETE /auth/users/<int:user_id>')
+def _route_user_write(ctx):
+    suffix = _unique()
+    response = ctx.request('POST', '/auth/register', expected=(201,), headers={}, json={
+        'username': f'mesure{suffix}', 'email': f'mesure.{suffix}@example.com', 'password': ctx.password
+    })
+    user_id = response.get_json()['user']['id']
+    ctx.request('PUT', '/auth/profile', headers={'Authorization': f"Bearer {response.get_json()['token']}"},
+                json={'first_name': 'Mesure'})
+    ctx.request('PUT', f'/auth/users/{user_id}', json={'last_name': 'Utilisateur'})
+    ctx.request('DELETE', f'/auth/users/{user_id}')
+
+@route_case('POST /auth/logout')
+def _route_logout(ctx):
+    # Déconnexion de la session Flask-Login (ouverte sans mesurer /auth/login)
+    with ctx.client.session_transaction() as session:
+        session['_user_id'] = str(ctx.admin_id)
+        session['_fresh'] = True
+    ctx.request('POST', '/auth/logout', headers={})
+
+@route_case('POST /auth/token/refresh')
+def _route_token_refresh(ctx):
+    ctx.request('POST', '/auth/token/refresh')
+
+@route_case('GET /auth/users')
+def _route_users(ctx):
+    ctx.get('/auth/users')
+
+@route_case('GET /auth/users/<int:user_id>')
+def _route_user(ctx):
+    ctx.get(f'/auth/users/{ctx.admin_id}')
+
+@route_case('GET+DELETE /api/admin/sql-stats', 'GET /api/admin/sql-stats', 'DELETE /api/admin/sql-stats')
+def _route_sql_stats(ctx):
+    with _enabled(ctx, 'SQL_STATS_ENABLED'):
+        ctx.get('/api/admin/sql-stats', sort='total_ms', limit=20)
+        ctx.request('DELETE', '/api/admin/sql-stats')
+
+@route_case('POST+GET+DELETE /api/admin/profiling',
+            'POST /api/admin/profiling', 'GET /api/admin/profiling', 'GET /api/admin/profiling/<session_id>',
+            'GET /api/admin/profiling/<session_id>/result', 'DELETE /api/admin/profiling/<session_id>')
+def _route_profiling(ctx):
+    # Option activée après la création de l'application : aucune requête n'est profilée
+    with _enabled(ctx, 'PROFILING_ENABLED'):
+        response = ctx.request('POST', '/api/admin/profiling', expected=(201,), json={
+            'mode': 'requests', 'endpoint': 'properties.get_properties', 'count': 5, 'duration': 60
+        })
+        url = f"/api/admin/profiling/{response.get_json()['id']}"
+        ctx.get('/api/admin/profiling')
+        ctx.get(url)
+        ctx.get(f'{url}/result')
+        ctx.request('DELETE', url)
+
+@route_case('GET /metrics')
+def _route_metrics(ctx):
+    ctx.get('/metrics')
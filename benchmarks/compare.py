@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Comparaison de deux fichiers de résultats de benchmarks.run.
+Pour chaque échelle et chaque scénario mesurés dans les deux fichiers, affiche la
+durée médiane avant et après, l'écart relatif et l'évolution du nombre de requêtes
+SQL. Un écart de durée n'est signalé que s'il dépasse à la fois le seuil relatif et
+le seuil absolu (bruit de mesure des scénarios très courts) ; toute hausse du nombre
+de requêtes SQL est signalée.
+
+Usage :
+    python -m benchmarks.compare avant.json apres.json [--threshold 10] [--fail]
+"""
+
+import argparse
+import json
+import sys
+
+def compare_results(before, after, threshold=10.0, min_delta_ms=0.5):
+    """
+    Compare deux résultats de mesures.
+
+    Args:
+        before (dict): Résultats de référence
+        after (dict): Nouveaux résultats
+        threshold (float): Écart relatif signalé (pourcentage de la médiane de référence)
+        min_delta_ms (float): Écart absolu minimal signalé (millisecondes)
+
+    Returns:
+        list: Lignes de comparaison (dict : scale, case, before_ms, after_ms, change_pct,
+            before_queries, after_queries, status parmi 'regression', 'improvement',
+            'unchanged', 'error', 'added', 'removed')
+    """
+    rows = []
+    for scale in sorted(set(before['scales']) | set(after['scales']), key=int):
+        old_cases = before['scales'].get(scale, {}).get('cases', {})
+        new_cases = after['scales'].get(scale, {}).get('cases', {})
+        names = list(old_cases) + [name for name in new_cases if name not in old_cases]
+        for name in names:
+            old, new = old_cases.get(name), new_cases.get(name)
+            row = {'scale': int(scale), 'case': name, 'before_ms': None, 'after_ms': None, 'change_pct': None,
+                   'before_queries': None, 'after_queries': None}
+            if old is None or new is None:
+                row['status'] = 'added' if old is None else 'removed'
+            elif 'error' in old or 'error' in new:
+                row['status'] = 'error'
+                row['error'] = new.get('error') or old.get('error')
+            else:
+                row.update(before_ms=old['median_ms'], after_ms=new['median_ms'],
+                           before_queries=old['queries'], after_queries=new['queries'])
+                delta = new['median_ms'] - old['median_ms']
+                row['change_pct'] = delta / old['median_ms'] * 100 if old['median_ms'] else None
+                significant = abs(delta) >= min_delta_ms and row['change_pct'] is not None \
+                    and abs(row['change_pct']) >= threshold
+                if new['queries'] > old['queries'] or (significant and delta > 0):
+                    row['status'] = 'regression'
+                elif new['queries'] < old['queries'] or significant:
+                    row['status'] = 'improvement'
+                else:
+                    row['status'] = 'unchanged'
+            rows.append(row)
+    return rows
+
+# Fonctions utilitaires
+
+def _describe(results):
+    """Résumé du contexte d'une mesure (commit, base de données)."""
+    metadata = results.get('metadata', {})
+    commit = (metadata.get('git_commit') or 'inconnu')[:10] + (' (modifié)' if metadata.get('git_dirty') else '')
+    database = metadata.get('database', {})
+    return f"{commit}, {database.get('dialect')} {database.get('server_version')}, {metadata.get('created_at')}"
+
+def _format_row(row):
+    """Ligne du tableau de comparaison."""
+    labels = {'regression': 'RÉGRESSION', 'improvement': 'amélioration', 'unchanged': '',
+              'error': 'erreur', 'added': 'nouveau', 'removed': 'supprimé'}
+    if row['before_ms'] is None:
+        timing = ''
+    else:
+        change = f"{row['change_pct']:+.1f} %" if row['change_pct'] is not None else ''
+        timing = f"{row['before_ms']:10.2f} {row['after_ms']:10.2f} {change:>9}"
+    queries = ''
+    if row['before_queries'] is not None:
+        queries = f"{row['before_queries']}" if row['before_queries'] == row['after_queries'] else \
+            f"{row['before_queries']} -> {row['after_queries']}"
+    return f"{row['scale']:>6}  {row['case'][:60]:<60} {timing:>31} {queries:>9}  {labels[row['status']]}"
+
+def main(argv=None):
+    """Point d'entrée de la ligne de commande."""
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.compare', description=__doc__.split('\n')[1])
+    parser.add_argument('before', help="Résultats de référence (JSON)")
+    parser.add_argument('after', help="Nouveaux résultats (JSON)")
+    parser.add_argument('--threshold', type=float, default=10.0,
+                        help="Écart relatif signalé, en pourcentage (défaut : 10)")
+    parser.add_argument('--min-delta', type=float, default=0.5,
+                        help="Écart absolu minimal signalé, en millisecondes (défaut : 0.5)")
+    parser.add_argument('--all', action='store_true', help="Affiche aussi les scénarios inchangés")
+    parser.add_argument('--fail', action='store_true', help="Code de sortie 1 en cas de régression")
+    args = parser.parse_args(argv)
+
+    with open(args.before, encoding='utf-8') as f:
+        before = json.load(f)
+    with open(args.after, encoding='utf-8') as f:
+        after = json.load(f)
+
+    print(f"Avant : {_describe(before)}")
+    print(f"Après : {_describe(after)}")
+    if before.get('parameters') != after.get('parameters'):
+        print(f"Attention : paramètres différents ({before.get('parameters')} / {after.get('parameters')})")
+    print()
+    print(f"{'Échelle':>6}  {'Scénario':<60} {'avant ms':>10} {'après ms':>10} {'écart':>9} {'requêtes':>9}")
+
+    rows = compare_results(before, after, args.threshold, args.min_delta)
+    for row in rows:
+        if args.all or row['status'] != 'unchanged':
+            print(_format_row(row))
+
+    counts = {status: sum(row['status'] == status for row in rows) for status in ('regression', 'improvement', 'error')}
+    print()
+    print(f"{counts['regression']} régression(s), {counts['improvement']} amélioration(s), "
+          f"{counts['error']} scénario(s) en erreur sur {len(rows)}.")
+    if args.fail and counts['regression']:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,258 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Exécution des mesures de performance.
+Pour chaque échelle, la base de mesure est vidée puis remplie par le générateur de
+données (seed_database, même graine à chaque exécution), et chaque scénario de
+benchmarks.cases est exécuté plusieurs fois : durée (min, médiane, moyenne, p95, max),
+nombre et durée des requêtes SQL. Les résultats sont enregistrés en JSON avec le
+contexte de la mesure (commit, Python, base de données) pour être comparés avec
+benchmarks.compare.
+
+Usage :
+    python -m benchmarks.run [--scale N ...] [--database URL --yes] [-o resultats.json]
+
+La base de mesure est celle de BenchmarkConfig (instance/benchmark.db, ou
+BENCHMARK_DATABASE_URL) : toutes ses tables sont vidées.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+from app import db
+from app.services.seed_service import seed_database
+from app.services.sql_metrics import collect_queries
+from benchmarks.cases import BenchmarkContext, get_cases
+
+# Version du format des résultats
+RESULTS_VERSION = 1
+
+# Mot de passe des utilisateurs générés (scénario de connexion)
+BENCHMARK_PASSWORD = 'benchmark'
+
+# Préfixes des routes dont la couverture par les scénarios est vérifiée
+API_PREFIXES = ('/api/', '/auth/', '/metrics')
+
+def run_benchmarks(app, scales=(1,), skew=1.0, seed=42, repeat=10, warmup=2, kinds=None, names=None,
+                   progress=None):
+    """
+    Mesure les scénarios à plusieurs échelles.
+
+    Args:
+        app (Flask): Application (sa base est vidée)
+        scales (iterable): Échelles du jeu de données (voir seed_database)
+        skew (float): Asymétrie du jeu de données
+        seed (int): Graine du générateur
+        repeat (int): Nombre d'exécutions mesurées par scénario
+        warmup (int): Nombre d'exécutions préalables non mesurées
+        kinds (iterable, optional): Types de scénarios ('service', 'route')
+        names (iterable, optional): Sous-chaînes des noms des scénarios retenus
+        progress (callable, optional): Appelée avec un message après chaque étape
+
+    Returns:
+        dict: Résultats (métadonnées, résultats par échelle, routes non couvertes)
+    """
+    cases = get_cases(kinds, names)
+    results = {
+        'version': RESULTS_VERSION,
+        'metadata': _metadata(app),
+        'parameters': {'skew': skew, 'seed': seed, 'repeat': repeat, 'warmup': warmup},
+        'scales': {},
+        'uncovered_routes': uncovered_routes(app, cases)
+    }
+
+    for scale in scales:
+        with app.app_context():
+            started = time.perf_counter()
+            counts = seed_database(scale, skew, seed, reset=True, password=BENCHMARK_PASSWORD)
+            seed_seconds = time.perf_counter() - started
+            db.session.remove()
+        counts.pop('password')
+        if progress:
+            progress(f"Échelle {scale} : {sum(counts.values())} lignes générées en {seed_seconds:.1f} s")
+
+        ctx = BenchmarkContext(app, BENCHMARK_PASSWORD)
+        measures = {}
+        for case in cases:
+            measures[case.name] = measure_case(app, case, ctx, repeat, warmup)
+            if progress:
+                measure = measures[case.name]
+                summary = measure['error'] if 'error' in measure else \
+                    f"{measure['median_ms']:.2f} ms, {measure['queries']} requête(s) SQL"
+                progress(f"  {case.name} : {summary}")
+
+        results['scales'][str(scale)] = {
+            'seed_seconds': round(seed_seconds, 3),
+            'rows': counts,
+            'cases': measures
+        }
+    return results
+
+def measure_case(app, case, ctx, repeat=10, warmup=2):
+    """
+    Mesure un scénario.
+
+    Les scénarios de service s'exécutent chacun dans un nouveau contexte d'application
+    (nouvelle session, comme une requête) ; ceux de route passent par le client de test.
+
+    Args:
+        app (Flask): Application
+        case (BenchmarkCase): Scénario
+        ctx (BenchmarkContext): Objets du jeu de données
+        repeat (int): Nombre d'exécutions mesurées
+        warmup (int): Nombre d'exécutions préalables non mesurées
+
+    Returns:
+        dict: Durées en millisecondes (min_ms, median_ms, mean_ms, p95_ms, max_ms), requêtes
+            SQL (queries, sql_ms : médianes), ou error si le scénario échoue
+    """
+    durations = []
+    queries = []
+    sql_durations = []
+    for run in range(warmup + repeat):
+        try:
+            if case.kind == 'service':
+                with app.app_context():
+                    duration, stats = _timed(case.function, ctx)
+            else:
+                duration, stats = _timed(case.function, ctx)
+        except Exception as e:
+            return {'error': f'{type(e).__name__}: {e}'.splitlines()[0]}
+        if run >= warmup:
+            durations.append(duration * 1000)
+            queries.append(stats.count)
+            sql_durations.append(stats.duration * 1000)
+
+    durations.sort()
+    return {
+        'runs': repeat,
+        'min_ms': round(durations[0], 3),
+        'median_ms': round(statistics.median(durations), 3),
+        'mean_ms': round(statistics.fmean(durations), 3),
+        'p95_ms': round(durations[min(len(durations) - 1, int(len(durations) * 0.95))], 3),
+        'max_ms': round(durations[-1], 3),
+        'queries': int(statistics.median(queries)),
+        'sql_ms': round(statistics.median(sql_durations), 3)
+    }
+
+def uncovered_routes(app, cases):
+    """
+    Routes de l'API qu'aucun scénario ne mesure.
+
+    Args:
+        app (Flask): Application
+        cases (list): Scénarios
+
+    Returns:
+        list: Routes au format 'MÉTHODE /règle'
+    """
+    covered = {rule for case in cases for rule in case.rules}
+    routes = set()
+    for rule in app.url_map.iter_rules():
+        if rule.rule.startswith(API_PREFIXES):
+            routes.update(f'{method} {rule.rule}' for method in rule.methods - {'HEAD', 'OPTIONS'})
+    return sorted(routes - covered)
+
+# Fonctions utilitaires
+
+def _timed(function, ctx):
+    """Exécute un scénario et retourne (durée en secondes, requêtes SQL)."""
+    with collect_queries() as stats:
+        started = time.perf_counter()
+        function(ctx)
+        duration = time.perf_counter() - started
+    return duration, stats
+
+def _metadata(app):
+    """Contexte de la mesure : commit, Python, plateforme, base de données."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    commit = dirty = None
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=root, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=root,
+                                    capture_output=True, text=True, check=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        pass
+
+    with app.app_context():
+        engine = db.engine
+        with engine.connect() as connection:
+            server_version = '.'.join(str(part) for part in connection.dialect.server_version_info or ())
+
+    return {
+        'created_at': datetime.utcnow().isoformat(timespec='seconds') + 'Z',
+        'git_commit': commit,
+        'git_dirty': dirty,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'database': {'dialect': engine.dialect.name, 'server_version': server_version},
+        'cache_backend': app.config.get('CACHE_BACKEND')
+    }
+
+def main(argv=None):
+    """Point d'entrée de la ligne de commande."""
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.run', description=__doc__.split('\n')[1])
+    parser.add_argument('--scale', type=int, action='append', dest='scales',
+                        help="Échelle du jeu de données (répétable ; 1 par défaut)")
+    parser.add_argument('--skew', type=float, default=1.0, help="Asymétrie du jeu de données (défaut : 1.0)")
+    parser.add_argument('--seed', type=int, default=42, help="Graine du générateur (défaut : 42)")
+    parser.add_argument('--repeat', type=int, default=10, help="Exécutions mesurées par scénario (défaut : 10)")
+    parser.add_argument('--warmup', type=int, default=2, help="Exécutions non mesurées par scénario (défaut : 2)")
+    parser.add_argument('--kind', choices=('service', 'route'), action='append', dest='kinds',
+                        help="Limite les mesures à un type de scénario")
+    parser.add_argument('--only', action='append', dest='names', metavar='NOM',
+                        help="Limite les mesures aux scénarios dont le nom contient NOM (répétable)")
+    parser.add_argument('--database', metavar='URL',
+                        help="Base de mesure (SQLite ou PostgreSQL local), VIDÉE à chaque échelle")
+    parser.add_argument('--yes', action='store_true', help="Confirme que la base indiquée par --database peut être vidée")
+    parser.add_argument('-o', '--output', help="Fichier des résultats (instance/benchmarks/<date>-<commit>.json par défaut)")
+    args = parser.parse_args(argv)
+
+    if args.repeat < 1 or args.warmup < 0 or any(scale < 1 for scale in args.scales or ()):
+        parser.error("--repeat et --scale doivent être au moins 1, --warmup positif ou nul")
+    if args.database and not args.yes:
+        parser.error("--database : toutes les tables de cette base seront vidées, ajouter --yes pour confirmer")
+
+    from app import create_app
+    from app.config import BenchmarkConfig
+
+    config = BenchmarkConfig
+    if args.database:
+        config = type('BenchmarkConfig', (BenchmarkConfig,), {'SQLALCHEMY_DATABASE_URI': args.database})
+    if config.SQLALCHEMY_DATABASE_URI.startswith('sqlite:///'):
+        os.makedirs(os.path.dirname(os.path.abspath(config.SQLALCHEMY_DATABASE_URI[len('sqlite:///'):])), exist_ok=True)
+    app = create_app(config)
+
+    results = run_benchmarks(
+        app, args.scales or [1], args.skew, args.seed, args.repeat, args.warmup, args.kinds, args.names,
+        progress=lambda message: print(message, file=sys.stderr)
+    )
+
+    output = args.output
+    if not output:
+        commit = (results['metadata']['git_commit'] or 'inconnu')[:10]
+        output = os.path.join(app.instance_path, 'benchmarks',
+                              f"{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}-{commit}.json")
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+        f.write('\n')
+
+    errors = sum('error' in measure for scale in results['scales'].values() for measure in scale['cases'].values())
+    print(f"Résultats enregistrés dans {output} ({errors} scénario(s) en erreur).", file=sys.stderr)
+    if results['uncovered_routes']:
+        print(f"Routes non mesurées : {', '.join(results['uncovered_routes'])}", file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,30 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Configuration de gunicorn, chargée automatiquement lorsque gunicorn est lancé depuis
+la racine du projet (gunicorn run:app).
+Elle prépare le mode multiprocessus des métriques Prometheus : chaque worker écrit
+ses valeurs dans PROMETHEUS_MULTIPROC_DIR, cumulées à chaque lecture de /metrics.
+"""
+
+import glob
+import os
+
+# Dossier des fichiers de métriques des workers (défini avant le chargement de l'application)
+os.environ.setdefault(
+    'PROMETHEUS_MULTIPROC_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'prometheus')
+)
+
+def on_starting(server):
+    """Supprime les fichiers de métriques d'une exécution précédente."""
+    directory = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    os.makedirs(directory, exist_ok=True)
+    for path in glob.glob(os.path.join(directory, '*.db')):
+        os.remove(path)
+
+def child_exit(server, worker):
+    """Retire des jauges (requêtes en cours, connexions du pool) les valeurs d'un worker arrêté."""
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
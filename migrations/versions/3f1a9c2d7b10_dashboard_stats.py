@@ -0,0 +1,99 @@
+"""Table d'agrégats du tableau de bord
+
+Revision ID: 3f1a9c2d7b10
+Revises:
+Create Date: 2024-05-06 09:12:41.204518
+
+Le schéma de base est créé par db.create_all() au démarrage de l'application ;
+cette révision ne crée la table que si elle est absente, ajoute la colonne shard
+(compteurs répartis sur plusieurs lignes) aux tables créées sans elle, puis remplit
+la table si elle est vide (le tableau de bord ne la reconstruit jamais lui-même).
+"""
+from collections import defaultdict
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1a9c2d7b10'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+dashboard_stats = sa.table(
+    'dashboard_stats',
+    sa.column('entity', sa.String), sa.column('dimension', sa.String), sa.column('bucket', sa.String),
+    sa.column('shard', sa.SmallInteger), sa.column('value', sa.Integer), sa.column('updated_at', sa.DateTime)
+)
+properties = sa.table('properties', sa.column('id'), sa.column('status'), sa.column('property_type'))
+transactions = sa.table('transactions', sa.column('id'), sa.column('transaction_type'),
+                        sa.column('transaction_date', sa.Date))
+owners = sa.table('owners', sa.column('id'))
+clients = sa.table('clients', sa.column('id'))
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    if not inspector.has_table('dashboard_stats'):
+        op.create_table('dashboard_stats',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('entity', sa.String(length=30), nullable=False),
+            sa.Column('dimension', sa.String(length=30), nullable=False),
+            sa.Column('bucket', sa.String(length=50), nullable=False),
+            sa.Column('shard', sa.SmallInteger(), nullable=False, server_default='0'),
+            sa.Column('value', sa.Integer(), nullable=False),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('entity', 'dimension', 'bucket', 'shard', name='uq_dashboard_stats_key')
+        )
+    elif 'shard' not in {column['name'] for column in inspector.get_columns('dashboard_stats')}:
+        with op.batch_alter_table('dashboard_stats') as batch_op:
+            batch_op.add_column(sa.Column('shard', sa.SmallInteger(), nullable=False, server_default='0'))
+            batch_op.drop_constraint('uq_dashboard_stats_key', type_='unique')
+            batch_op.create_unique_constraint('uq_dashboard_stats_key', ['entity', 'dimension', 'bucket', 'shard'])
+
+    if bind.execute(sa.select(sa.func.count()).select_from(dashboard_stats)).scalar():
+        return
+    if not all(inspector.has_table(name) for name in ('properties', 'transactions', 'owners', 'clients')):
+        return
+
+    # Mêmes compteurs que rebuild_dashboard_stats (app.services.dashboard_service)
+    counters = defaultdict(int)
+    counters[('property', 'total', '')] = 0
+    for status, property_type, count in bind.execute(
+        sa.select(properties.c.status, properties.c.property_type, sa.func.count(properties.c.id))
+        .group_by(properties.c.status, properties.c.property_type)
+    ):
+        counters[('property', 'total', '')] += count
+        counters[('property', 'status', status or '')] += count
+        counters[('property', 'property_type', property_type or '')] += count
+
+    year = sa.extract('year', transactions.c.transaction_date)
+    month = sa.extract('month', transactions.c.transaction_date)
+    counters[('transaction', 'total', '')] = 0
+    for transaction_type, row_year, row_month, count in bind.execute(
+        sa.select(transactions.c.transaction_type, year, month, sa.func.count(transactions.c.id))
+        .group_by(transactions.c.transaction_type, year, month)
+    ):
+        counters[('transaction', 'total', '')] += count
+        counters[('transaction', 'transaction_type', transaction_type or '')] += count
+        if row_year and transaction_type:
+            counters[('transaction', f'{transaction_type}_month', f'{int(row_year):04d}-{int(row_month):02d}')] += count
+
+    counters[('owner', 'total', '')] = bind.execute(sa.select(sa.func.count()).select_from(owners)).scalar()
+    counters[('client', 'total', '')] = bind.execute(sa.select(sa.func.count()).select_from(clients)).scalar()
+
+    now = datetime.utcnow()
+    op.bulk_insert(dashboard_stats, [
+        {'entity': entity, 'dimension': dimension, 'bucket': bucket, 'shard': 0, 'value': value, 'updated_at': now}
+        for (entity, dimension, bucket), value in counters.items()
+    ])
+
+
+def downgrade():
+    op.drop_table('dashboard_stats')
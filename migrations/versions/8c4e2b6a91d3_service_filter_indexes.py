@@ -0,0 +1,89 @@
+"""Index des filtres et tris des services
+
+Revision ID: 8c4e2b6a91d3
+Revises: 3f1a9c2d7b10
+Create Date: 2024-05-06 10:03:17.558120
+
+Index composites et partiels correspondant aux requêtes de get_all_properties,
+transaction_service et client_service (vérifiés par `flask check-indexes`).
+Sur PostgreSQL, ils sont créés avec CREATE INDEX CONCURRENTLY, hors transaction,
+pour ne pas bloquer les écritures sur les tables existantes.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c4e2b6a91d3'
+down_revision = '3f1a9c2d7b10'
+branch_labels = None
+depends_on = None
+
+
+def _partial(predicate):
+    """Prédicat d'index partiel pour PostgreSQL et SQLite."""
+    return {'postgresql_where': sa.text(predicate), 'sqlite_where': sa.text(predicate)}
+
+
+# (nom, table, colonnes, options)
+INDEXES = [
+    ('ix_properties_status_created_at', 'properties', ['status', 'created_at'], {}),
+    ('ix_properties_type_status', 'properties', ['property_type', 'status'], {}),
+    ('ix_properties_owner_id', 'properties', ['owner_id'], {}),
+    ('ix_properties_city_trgm', 'properties', ['city'],
+     {'postgresql_using': 'gin', 'postgresql_ops': {'city': 'gin_trgm_ops'}}),
+    ('ix_properties_created_at_id', 'properties', ['created_at', 'id'], {}),
+    ('ix_properties_asking_price_id', 'properties', ['asking_price', 'id'], {}),
+    ('ix_properties_total_area_id', 'properties', ['total_area', 'id'], {}),
+    ('ix_properties_rental_price', 'properties', ['rental_price'], _partial('rental_price IS NOT NULL')),
+    ('ix_properties_num_bedrooms', 'properties', ['num_bedrooms'], _partial('num_bedrooms IS NOT NULL')),
+    ('ix_properties_num_bathrooms', 'properties', ['num_bathrooms'], _partial('num_bathrooms IS NOT NULL')),
+
+    ('ix_transactions_property_id_date', 'transactions', ['property_id', 'transaction_date'], {}),
+    ('ix_transactions_client_id_date', 'transactions', ['client_id', 'transaction_date'], {}),
+    ('ix_transactions_status_date', 'transactions', ['status', 'transaction_date'], {}),
+    ('ix_transactions_type_date', 'transactions', ['transaction_type', 'transaction_date'], {}),
+    ('ix_transactions_date_id', 'transactions', ['transaction_date', 'id'], {}),
+    ('ix_transactions_created_at_id', 'transactions', ['created_at', 'id'], {}),
+    ('ix_transactions_amount_id', 'transactions', ['amount', 'id'], {}),
+    ('ix_transactions_handled_by', 'transactions', ['handled_by'], _partial('handled_by IS NOT NULL')),
+    ('ix_transactions_client_id_pending', 'transactions', ['client_id'], _partial("status = 'pending'")),
+
+    ('ix_clients_client_type', 'clients', ['client_type'], {}),
+    ('ix_clients_assigned_agent_id', 'clients', ['assigned_agent_id'], _partial('assigned_agent_id IS NOT NULL')),
+    ('ix_clients_created_at_id', 'clients', ['created_at', 'id'], {}),
+    ('ix_clients_last_name_id', 'clients', ['last_name', 'id'], {}),
+
+    ('ix_owners_created_at_id', 'owners', ['created_at', 'id'], {}),
+    ('ix_owners_last_name_id', 'owners', ['last_name', 'id'], {}),
+
+    ('ix_property_visits_client_id_date', 'property_visits', ['client_id', 'visit_date'], {}),
+    ('ix_property_visits_client_id_status_date', 'property_visits', ['client_id', 'status', 'visit_date'], {}),
+    ('ix_property_visits_property_id_date', 'property_visits', ['property_id', 'visit_date'], {}),
+    ('ix_property_visits_status_date', 'property_visits', ['status', 'visit_date'], {}),
+    ('ix_property_visits_date', 'property_visits', ['visit_date'], {}),
+    ('ix_property_visits_created_at_id', 'property_visits', ['created_at', 'id'], {}),
+    ('ix_property_visits_scheduled_date', 'property_visits', ['visit_date'], _partial("status = 'scheduled'")),
+]
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        # CREATE INDEX CONCURRENTLY est interdit dans un bloc de transaction
+        with op.get_context().autocommit_block():
+            for name, table, columns, options in INDEXES:
+                op.create_index(name, table, columns, if_not_exists=True, postgresql_concurrently=True, **options)
+    else:
+        for name, table, columns, options in INDEXES:
+            op.create_index(name, table, columns, if_not_exists=True, **options)
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            for name, table, columns, options in reversed(INDEXES):
+                op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
+    else:
+        for name, table, columns, options in reversed(INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True)
@@ -0,0 +1,53 @@
+"""Journal d'activité
+
+Revision ID: a1c3e5f7b268
+Revises: f3a5b7c9d146
+Create Date: 2024-06-10 14:27:05.318642
+
+Crée la table activities si elle est absente (le modèle n'était pas importé, donc
+pas créé par db.create_all()), et l'index servant les activités récentes du tableau
+de bord, avec CREATE INDEX CONCURRENTLY sur PostgreSQL.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a1c3e5f7b268'
+down_revision = 'f3a5b7c9d146'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if not sa.inspect(op.get_bind()).has_table('activities'):
+        op.create_table('activities',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=True),
+            sa.Column('activity_type', sa.String(length=50), nullable=False),
+            sa.Column('description', sa.Text(), nullable=False),
+            sa.Column('entity_type', sa.String(length=50), nullable=True),
+            sa.Column('entity_id', sa.Integer(), nullable=True),
+            sa.Column('ip_address', sa.String(length=50), nullable=True),
+            sa.Column('user_agent', sa.String(length=255), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='SET NULL'),
+            sa.PrimaryKeyConstraint('id')
+        )
+
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            op.create_index('ix_activities_created_at_id', 'activities', ['created_at', 'id'],
+                            if_not_exists=True, postgresql_concurrently=True)
+    else:
+        op.create_index('ix_activities_created_at_id', 'activities', ['created_at', 'id'], if_not_exists=True)
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            op.drop_index('ix_activities_created_at_id', table_name='activities', if_exists=True,
+                          postgresql_concurrently=True)
+    else:
+        op.drop_index('ix_activities_created_at_id', table_name='activities', if_exists=True)
+    op.drop_table('activities')
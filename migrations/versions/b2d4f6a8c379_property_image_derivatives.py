@@ -0,0 +1,41 @@
+"""Déclinaisons des images des biens
+
+Revision ID: b2d4f6a8c379
+Revises: a1c3e5f7b268
+Create Date: 2024-06-12 09:41:22.507314
+
+Ajoute à property_images l'état de la génération des déclinaisons (vignette, image
+de carte, image pleine taille) et leurs chemins. Les images existantes restent sans
+déclinaisons jusqu'à l'exécution de `flask process-images`.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b2d4f6a8c379'
+down_revision = 'a1c3e5f7b268'
+branch_labels = None
+depends_on = None
+
+
+COLUMNS = (
+    sa.Column('processing_status', sa.String(length=20), nullable=True),
+    sa.Column('thumbnail_path', sa.String(length=255), nullable=True),
+    sa.Column('card_path', sa.String(length=255), nullable=True),
+    sa.Column('full_path', sa.String(length=255), nullable=True),
+    sa.Column('processed_at', sa.DateTime(), nullable=True),
+)
+
+
+def upgrade():
+    existing = {column['name'] for column in sa.inspect(op.get_bind()).get_columns('property_images')}
+    for column in COLUMNS:
+        if column.name not in existing:
+            op.add_column('property_images', column)
+
+
+def downgrade():
+    with op.batch_alter_table('property_images') as batch_op:
+        for column in reversed(COLUMNS):
+            batch_op.drop_column(column.name)
@@ -0,0 +1,88 @@
+"""Recherche plein texte des biens immobiliers
+
+Revision ID: b7d2e4f6a813
+Revises: 8c4e2b6a91d3
+Create Date: 2024-05-13 14:27:09.811342
+
+PostgreSQL : colonne tsvector générée (titre > ville > description, configuration
+'french') et index GIN créé avec CREATE INDEX CONCURRENTLY.
+SQLite : table FTS5 synchronisée par triggers, remplie à partir des biens existants.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7d2e4f6a813'
+down_revision = '8c4e2b6a91d3'
+branch_labels = None
+depends_on = None
+
+
+SQLITE_TRIGGERS = {
+    'properties_fts_ai': """
+        CREATE TRIGGER IF NOT EXISTS properties_fts_ai AFTER INSERT ON properties BEGIN
+            INSERT INTO properties_fts(rowid, title, city, description)
+            VALUES (new.id, new.title, new.city, new.description);
+        END
+    """,
+    'properties_fts_ad': """
+        CREATE TRIGGER IF NOT EXISTS properties_fts_ad AFTER DELETE ON properties BEGIN
+            INSERT INTO properties_fts(properties_fts, rowid, title, city, description)
+            VALUES ('delete', old.id, old.title, old.city, old.description);
+        END
+    """,
+    'properties_fts_au': """
+        CREATE TRIGGER IF NOT EXISTS properties_fts_au AFTER UPDATE OF title, city, description ON properties BEGIN
+            INSERT INTO properties_fts(properties_fts, rowid, title, city, description)
+            VALUES ('delete', old.id, old.title, old.city, old.description);
+            INSERT INTO properties_fts(rowid, title, city, description)
+            VALUES (new.id, new.title, new.city, new.description);
+        END
+    """
+}
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'postgresql':
+        op.execute("""
+            ALTER TABLE properties ADD COLUMN IF NOT EXISTS search_vector tsvector
+            GENERATED ALWAYS AS (
+                setweight(to_tsvector('french', coalesce(title, '')), 'A') ||
+                setweight(to_tsvector('french', coalesce(city, '')), 'B') ||
+                setweight(to_tsvector('french', coalesce(description, '')), 'C')
+            ) STORED
+        """)
+        with op.get_context().autocommit_block():
+            op.create_index('ix_properties_search_vector', 'properties', [sa.text('search_vector')],
+                            if_not_exists=True, postgresql_using='gin', postgresql_concurrently=True)
+
+    elif dialect == 'sqlite':
+        op.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS properties_fts USING fts5(
+                title, city, description,
+                content='properties', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2'
+            )
+        """)
+        for statement in SQLITE_TRIGGERS.values():
+            op.execute(statement)
+        # Indexation des biens existants
+        op.execute("INSERT INTO properties_fts(properties_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'postgresql':
+        with op.get_context().autocommit_block():
+            op.drop_index('ix_properties_search_vector', table_name='properties',
+                          if_exists=True, postgresql_concurrently=True)
+        op.execute('ALTER TABLE properties DROP COLUMN IF EXISTS search_vector')
+
+    elif dialect == 'sqlite':
+        for name in SQLITE_TRIGGERS:
+            op.execute(f'DROP TRIGGER IF EXISTS {name}')
+        op.execute('DROP TABLE IF EXISTS properties_fts')
@@ -0,0 +1,67 @@
+"""Stockage des fichiers adressé par contenu
+
+Revision ID: c3e5a7b9d480
+Revises: b2d4f6a8c379
+Create Date: 2024-06-14 10:18:47.226031
+
+Crée la table stored_files (un fichier par contenu, avec son nombre de références)
+et ajoute storage_key à property_images et property_documents. Les fichiers existants
+restent servis depuis app/static/uploads jusqu'à `flask storage-migrate`.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3e5a7b9d480'
+down_revision = 'b2d4f6a8c379'
+branch_labels = None
+depends_on = None
+
+
+REFERENCES = ('property_images', 'property_documents')
+
+
+def upgrade():
+    bind = op.get_bind()
+    if not sa.inspect(bind).has_table('stored_files'):
+        op.create_table('stored_files',
+            sa.Column('key', sa.String(length=100), nullable=False),
+            sa.Column('size', sa.BigInteger(), nullable=False),
+            sa.Column('content_type', sa.String(length=100), nullable=True),
+            sa.Column('ref_count', sa.Integer(), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('last_used_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('key')
+        )
+
+    for table in REFERENCES:
+        if 'storage_key' in {column['name'] for column in sa.inspect(bind).get_columns(table)}:
+            continue
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.add_column(sa.Column('storage_key', sa.String(length=100), nullable=True))
+            batch_op.create_foreign_key(f'fk_{table}_storage_key', 'stored_files', ['storage_key'], ['key'])
+
+    for table in REFERENCES:
+        if bind.dialect.name == 'postgresql':
+            with op.get_context().autocommit_block():
+                op.create_index(f'ix_{table}_storage_key', table, ['storage_key'],
+                                if_not_exists=True, postgresql_concurrently=True)
+        else:
+            op.create_index(f'ix_{table}_storage_key', table, ['storage_key'], if_not_exists=True)
+
+
+def downgrade():
+    for table in REFERENCES:
+        if op.get_bind().dialect.name == 'postgresql':
+            with op.get_context().autocommit_block():
+                op.drop_index(f'ix_{table}_storage_key', table_name=table, if_exists=True,
+                              postgresql_concurrently=True)
+        else:
+            op.drop_index(f'ix_{table}_storage_key', table_name=table, if_exists=True)
+
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_constraint(f'fk_{table}_storage_key', type_='foreignkey')
+            batch_op.drop_column('storage_key')
+
+    op.drop_table('stored_files')
@@ -0,0 +1,48 @@
+"""Envois reprenables de documents
+
+Revision ID: d4f6b8c0e591
+Revises: c3e5a7b9d480
+Create Date: 2024-06-21 15:42:09.318452
+
+Crée la table upload_sessions des envois de documents par morceaux en cours
+(les morceaux sont écrits dans UPLOAD_SESSION_DIR, pas en base).
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4f6b8c0e591'
+down_revision = 'c3e5a7b9d480'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if not sa.inspect(op.get_bind()).has_table('upload_sessions'):
+        op.create_table('upload_sessions',
+            sa.Column('id', sa.String(length=32), nullable=False),
+            sa.Column('property_id', sa.Integer(), nullable=False),
+            sa.Column('document_type', sa.String(length=50), nullable=False),
+            sa.Column('file_name', sa.String(length=100), nullable=False),
+            sa.Column('content_type', sa.String(length=100), nullable=True),
+            sa.Column('title', sa.String(length=100), nullable=True),
+            sa.Column('description', sa.Text(), nullable=True),
+            sa.Column('expiry_date', sa.Date(), nullable=True),
+            sa.Column('total_size', sa.BigInteger(), nullable=False),
+            sa.Column('received_size', sa.BigInteger(), nullable=False),
+            sa.Column('sha256', sa.String(length=64), nullable=True),
+            sa.Column('created_by', sa.Integer(), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.Column('expires_at', sa.DateTime(), nullable=False),
+            sa.ForeignKeyConstraint(['property_id'], ['properties.id'], ondelete='CASCADE'),
+            sa.ForeignKeyConstraint(['created_by'], ['users.id'], ondelete='CASCADE'),
+            sa.PrimaryKeyConstraint('id')
+        )
+    op.create_index('ix_upload_sessions_expires_at', 'upload_sessions', ['expires_at'], if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index('ix_upload_sessions_expires_at', table_name='upload_sessions', if_exists=True)
+    op.drop_table('upload_sessions')
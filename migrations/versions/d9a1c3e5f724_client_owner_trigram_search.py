@@ -0,0 +1,47 @@
+"""Index trigrammes de recherche des clients et propriétaires
+
+Revision ID: d9a1c3e5f724
+Revises: b7d2e4f6a813
+Create Date: 2024-05-21 11:40:52.093617
+
+PostgreSQL uniquement : index GIN pg_trgm sur la concaténation des champs recherchés,
+créés avec CREATE INDEX CONCURRENTLY. L'expression doit rester identique à celle
+de app.models.fuzzy_search pour que l'index soit utilisé.
+Les autres moteurs utilisent l'index n-grammes en mémoire (aucune migration).
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'd9a1c3e5f724'
+down_revision = 'b7d2e4f6a813'
+branch_labels = None
+depends_on = None
+
+
+DOCUMENTS = {
+    'clients': "(coalesce(first_name, '') || ' ' || coalesce(last_name, '') || ' ' || coalesce(email, '') "
+               "|| ' ' || coalesce(phone, '') || ' ' || coalesce(city, ''))",
+    'owners': "(coalesce(first_name, '') || ' ' || coalesce(last_name, '') || ' ' || coalesce(email, '') "
+              "|| ' ' || coalesce(phone, ''))"
+}
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    with op.get_context().autocommit_block():
+        for table, document in DOCUMENTS.items():
+            op.execute(f'CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_{table}_search_trgm ON {table} '
+                       f'USING gin ({document} gin_trgm_ops)')
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    with op.get_context().autocommit_block():
+        for table in DOCUMENTS:
+            op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS ix_{table}_search_trgm')
@@ -0,0 +1,86 @@
+"""Cellule géographique des biens immobiliers
+
+Revision ID: e2f4a6b8c035
+Revises: d9a1c3e5f724
+Create Date: 2024-05-28 16:05:33.472190
+
+Ajoute la colonne geo_cell (geohash entier, voir app.models.property_geo), la calcule
+pour les biens existants et crée l'index (geo_cell, latitude, longitude), avec
+CREATE INDEX CONCURRENTLY sur PostgreSQL.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2f4a6b8c035'
+down_revision = 'd9a1c3e5f724'
+branch_labels = None
+depends_on = None
+
+
+AXIS_BITS = 26
+BATCH_SIZE = 5000
+
+
+def _axis_index(value, minimum, span):
+    size = 1 << AXIS_BITS
+    return min(max(int((value - minimum) / span * size), 0), size - 1)
+
+
+def _encode_geo_cell(latitude, longitude):
+    lng_index = _axis_index(float(longitude), -180.0, 360.0)
+    lat_index = _axis_index(float(latitude), -90.0, 180.0)
+    code = 0
+    for bit in range(AXIS_BITS - 1, -1, -1):
+        code = (code << 2) | (((lng_index >> bit) & 1) << 1) | ((lat_index >> bit) & 1)
+    return code
+
+
+def upgrade():
+    bind = op.get_bind()
+    if 'geo_cell' not in {column['name'] for column in sa.inspect(bind).get_columns('properties')}:
+        op.add_column('properties', sa.Column('geo_cell', sa.BigInteger(), nullable=True))
+
+    # Calcul de la cellule des biens existants, par lots
+    properties = sa.table('properties', sa.column('id'), sa.column('latitude'), sa.column('longitude'),
+                          sa.column('geo_cell'))
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(properties.c.id, properties.c.latitude, properties.c.longitude)
+            .where(properties.c.id > last_id, properties.c.geo_cell.is_(None),
+                   properties.c.latitude.isnot(None), properties.c.longitude.isnot(None))
+            .order_by(properties.c.id).limit(BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+        bind.execute(
+            properties.update().where(properties.c.id == sa.bindparam('row_id')).values(geo_cell=sa.bindparam('cell')),
+            [{'row_id': row.id, 'cell': _encode_geo_cell(row.latitude, row.longitude)} for row in rows]
+        )
+        last_id = rows[-1].id
+
+    options = {
+        'postgresql_where': sa.text('geo_cell IS NOT NULL'),
+        'sqlite_where': sa.text('geo_cell IS NOT NULL')
+    }
+    if bind.dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            op.create_index('ix_properties_geo_cell', 'properties', ['geo_cell', 'latitude', 'longitude'],
+                            if_not_exists=True, postgresql_concurrently=True, **options)
+    else:
+        op.create_index('ix_properties_geo_cell', 'properties', ['geo_cell', 'latitude', 'longitude'],
+                        if_not_exists=True, **options)
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            op.drop_index('ix_properties_geo_cell', table_name='properties', if_exists=True,
+                          postgresql_concurrently=True)
+    else:
+        op.drop_index('ix_properties_geo_cell', table_name='properties', if_exists=True)
+
+    with op.batch_alter_table('properties') as batch_op:
+        batch_op.drop_column('geo_cell')
@@ -0,0 +1,43 @@
+"""File de tâches d'arrière-plan
+
+Revision ID: e5a7c9d1f602
+Revises: d4f6b8c0e591
+Create Date: 2024-06-27 09:26:51.804117
+
+Crée la table jobs de la file de tâches exécutées par `flask worker`.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a7c9d1f602'
+down_revision = 'd4f6b8c0e591'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if not sa.inspect(op.get_bind()).has_table('jobs'):
+        op.create_table('jobs',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('name', sa.String(length=100), nullable=False),
+            sa.Column('queue', sa.String(length=50), nullable=False),
+            sa.Column('payload', sa.JSON(), nullable=False),
+            sa.Column('status', sa.String(length=20), nullable=False),
+            sa.Column('attempts', sa.Integer(), nullable=False),
+            sa.Column('max_attempts', sa.Integer(), nullable=False),
+            sa.Column('run_at', sa.DateTime(), nullable=False),
+            sa.Column('locked_by', sa.String(length=100), nullable=True),
+            sa.Column('locked_at', sa.DateTime(), nullable=True),
+            sa.Column('last_error', sa.Text(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('finished_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id')
+        )
+    op.create_index('ix_jobs_queue_status_run_at', 'jobs', ['queue', 'status', 'run_at'], if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index('ix_jobs_queue_status_run_at', table_name='jobs', if_exists=True)
+    op.drop_table('jobs')
@@ -0,0 +1,35 @@
+"""Index sur la date de mise à jour des biens immobiliers
+
+Revision ID: f3a5b7c9d146
+Revises: e2f4a6b8c035
+Create Date: 2024-06-03 10:12:48.913562
+
+Sert la relecture incrémentale (updated_at >= ...) de l'instantané en colonnes des
+biens, avec CREATE INDEX CONCURRENTLY sur PostgreSQL.
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3a5b7c9d146'
+down_revision = 'e2f4a6b8c035'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            op.create_index('ix_properties_updated_at', 'properties', ['updated_at'],
+                            if_not_exists=True, postgresql_concurrently=True)
+    else:
+        op.create_index('ix_properties_updated_at', 'properties', ['updated_at'], if_not_exists=True)
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            op.drop_index('ix_properties_updated_at', table_name='properties', if_exists=True,
+                          postgresql_concurrently=True)
+    else:
+        op.drop_index('ix_properties_updated_at', table_name='properties', if_exists=True)
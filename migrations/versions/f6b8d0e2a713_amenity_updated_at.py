@@ -0,0 +1,32 @@
+"""Date de mise à jour des équipements
+
+Revision ID: f6b8d0e2a713
+Revises: e5a7c9d1f602
+Create Date: 2024-07-08 14:37:05.618204
+
+Ajoute amenities.updated_at, comprise dans les validateurs (ETag, Last-Modified) de
+la fiche des biens : la modification d'un équipement change la fiche des biens qui
+le possèdent. Les équipements existants reçoivent la date de la migration.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f6b8d0e2a713'
+down_revision = 'e5a7c9d1f602'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    if 'updated_at' not in {column['name'] for column in sa.inspect(bind).get_columns('amenities')}:
+        op.add_column('amenities', sa.Column('updated_at', sa.DateTime(), nullable=True))
+    amenities = sa.table('amenities', sa.column('updated_at', sa.DateTime))
+    bind.execute(amenities.update().where(amenities.c.updated_at.is_(None)).values(updated_at=sa.func.now()))
+
+
+def downgrade():
+    with op.batch_alter_table('amenities') as batch_op:
+        batch_op.drop_column('updated_at')
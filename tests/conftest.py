@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Fixtures des tests : application de test sur une base SQLite temporaire, remplie
+par le générateur de données (flask seed, échelle 1).
+"""
+
+import os
+
+import pytest
+
+from app import create_app, db
+from app.config import TestingConfig
+from app.services.seed_service import seed_database
+
+# Mot de passe des utilisateurs générés
+TEST_PASSWORD = 'test'
+
+@pytest.fixture(scope='session')
+def app(tmp_path_factory):
+    """Application de test (base SQLite et dossiers de fichiers temporaires) avec un jeu de données généré."""
+    directory = tmp_path_factory.mktemp('instance')
+    config = type('SQLiteTestingConfig', (TestingConfig,), {
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(directory, 'test.db'),
+        'STORAGE_BACKEND': 'local',
+        'STORAGE_LOCAL_ROOT': os.path.join(directory, 'files'),
+        'UPLOAD_SESSION_DIR': os.path.join(directory, 'uploads'),
+        'CACHE_DIR': os.path.join(directory, 'cache'),
+        'SQL_STATS_PATH': os.path.join(directory, 'sql_stats.db'),
+        'PROFILING_DIR': os.path.join(directory, 'profiling')
+    })
+    app = create_app(config)
+    with app.app_context():
+        seed_database(scale=1, password=TEST_PASSWORD)
+        db.session.remove()
+    return app
+
+@pytest.fixture
+def auth_headers(app):
+    """En-têtes d'authentification de l'administrateur généré."""
+    from app.models.__init__1 import User
+    from app.services.auth_service import generate_auth_token
+
+    with app.app_context():
+        admin_id = db.session.query(User.id).filter(User.role == 'admin').scalar()
+        token = generate_auth_token(admin_id)
+        db.session.remove()
+    return {'Authorization': f'Bearer {token}'}
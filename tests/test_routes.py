@@ -0,0 +1,568 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests des routes de l'API : nombre de requêtes SQL des endpoints de liste et de
+détail sur le jeu de données généré (assert_max_queries, budgets des endpoints),
+requêtes conditionnelles, recherche textuelle et géographique, facettes, import et
+export en masse, cache d'authentification, envoi reprenable de documents, service
+des fichiers du stockage local.
+"""
+
+import csv
+import gzip
+import hashlib
+import io
+import json
+import os
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import db
+from app.models.__init__1 import Amenity, Owner, Property, PropertyDocument, UploadSession
+from app.models.client import client_property_interests
+from app.models.property import property_amenities
+from app.services import export_service, search_service
+from app.services.auth_service import create_user, generate_auth_token
+from app.services.property_service import create_property
+from app.services.sql_metrics import QueryBudgetExceeded, assert_max_queries, collect_queries
+from app.services.storage import derived_key, get_storage
+from app.services.upload_service import expire_upload_sessions
+
+def _most_interested(app, column):
+    """Valeur de column la plus fréquente parmi les intérêts clients (bien le plus demandé, client le plus intéressé)."""
+    with app.app_context():
+        value = db.session.query(column).group_by(column).order_by(db.func.count().desc(), column).limit(1).scalar()
+        db.session.remove()
+    return value
+
+def _user_headers(app, username):
+    """Crée un utilisateur et retourne son ID et ses en-têtes d'authentification."""
+    with app.app_context():
+        user_id = create_user(username, f'{username}@example.com', 'test').id
+        token = generate_auth_token(user_id)
+        db.session.remove()
+    return user_id, {'Authorization': f'Bearer {token}'}
+
+def _create_properties(app, *specs):
+    """Crée des biens pour le premier propriétaire (specs : champs propres à chaque bien) et retourne leurs ID."""
+    with app.app_context():
+        reference = db.session.query(Property).order_by(Property.id).first()
+        ids = [create_property({
+            'title': 'Bien de test', 'property_type': 'apartment', 'status': 'for_sale',
+            'address_line1': '1 rue des Tests', 'city': 'Lyon', 'postal_code': '69001', 'country': 'France',
+            'total_area': 50, 'owner_id': reference.owner_id, **spec
+        }, reference.created_by).id for spec in specs]
+        db.session.remove()
+    return ids
+
+def _delete_properties(app, ids):
+    """Supprime des biens créés par un test."""
+    with app.app_context():
+        Property.query.filter(Property.id.in_(ids)).delete(synchronize_session=False)
+        db.session.commit()
+        db.session.remove()
+
+def _get_profile(client, headers):
+    """Appelle /auth/profile avec une session neuve, comme une requête de production
+    (le contexte poussé par pytest-flask est sinon partagé par les requêtes)."""
+    response = client.get('/auth/profile', headers=headers)
+    db.session.remove()
+    return response.status_code
+
+def _user_queries(stats):
+    """Requêtes d'un bloc lisant la table des utilisateurs."""
+    return [statement for statement in stats.statements if 'FROM users' in statement]
+
+def test_properties_list_queries(app, auth_headers):
+    client = app.test_client()
+    with assert_max_queries(6):
+        response = client.get('/api/properties/', headers=auth_headers, query_string={'per_page': 50})
+    assert response.status_code == 200
+    assert len(response.get_json()['properties']) == 50
+
+def test_property_detail_queries(app, auth_headers):
+    property_id = _most_interested(app, client_property_interests.c.property_id)
+    client = app.test_client()
+    with assert_max_queries(8):
+        response = client.get(f'/api/properties/{property_id}', headers=auth_headers)
+    assert response.status_code == 200
+    assert response.get_json()['id'] == property_id
+
+def test_client_interests_queries(app, auth_headers):
+    client_id = _most_interested(app, client_property_interests.c.client_id)
+    client = app.test_client()
+    with assert_max_queries(6):
+        response = client.get(f'/api/clients/{client_id}/interests', headers=auth_headers)
+    assert response.status_code == 200
+    assert len(response.get_json()['properties']) > 1
+
+def test_property_etag_changes_with_amenity(app, auth_headers):
+    with app.app_context():
+        property_id, amenity_id = db.session.query(
+            property_amenities.c.property_id, property_amenities.c.amenity_id
+        ).order_by(property_amenities.c.property_id).first()
+        db.session.remove()
+    client = app.test_client()
+    etag = client.get(f'/api/properties/{property_id}', headers=auth_headers).headers['ETag']
+    db.session.remove()
+    response = client.get(f'/api/properties/{property_id}', headers={**auth_headers, 'If-None-Match': etag})
+    assert response.status_code == 304
+    db.session.remove()
+
+    with app.app_context():
+        amenity = db.session.get(Amenity, amenity_id)
+        amenity.description = f'{amenity.description or ""} (modifié)'
+        db.session.commit()
+        db.session.remove()
+
+    response = client.get(f'/api/properties/{property_id}', headers={**auth_headers, 'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+def test_properties_text_search_ranking(app, auth_headers, monkeypatch):
+    # Mot présent dans le titre (poids le plus fort), la ville, puis la seule description
+    in_description, in_title, in_city, other = _create_properties(
+        app,
+        {'title': 'Maison de ville', 'description': 'Cuisine zorbaline entièrement équipée'},
+        {'title': 'Loft zorbaline', 'description': 'Lumineux, proche du métro'},
+        {'title': 'Appartement familial', 'description': 'Calme', 'city': 'Saint-Zorbaline'},
+        {'title': 'Studio', 'description': 'Rénové'},
+    )
+    client = app.test_client()
+
+    def search(q, **params):
+        response = client.get('/api/properties/', headers=auth_headers, query_string={'q': q, **params})
+        db.session.remove()
+        assert response.status_code == 200
+        return [prop['id'] for prop in response.get_json()['properties']]
+
+    try:
+        assert search('zorbaline') == [in_title, in_city, in_description]
+        # Préfixe de mot, casse et syntaxe FTS5 de l'utilisateur ignorées
+        assert search('ZORBAL') == [in_title, in_city, in_description]
+        assert search('zorbaline" * (') == [in_title, in_city, in_description]
+        # Tous les mots sont requis ; un tri explicite remplace la pertinence
+        assert search('zorbaline lyon') == [in_title, in_description]
+        assert search('zorbaline', sort='id') == sorted([in_title, in_city, in_description])
+        assert search('!!!') == []
+
+        # Autres moteurs : ILIKE sans classement
+        with app.app_context():
+            with monkeypatch.context() as patch:
+                patch.setattr(db.session.get_bind().dialect, 'name', 'mysql')
+                query, _ = search_service.apply_text_search(Property.query, 'zorbaline')
+            assert {prop.id for prop in query} == {in_title, in_city, in_description}
+            db.session.remove()
+    finally:
+        _delete_properties(app, [in_description, in_title, in_city, other])
+
+def test_properties_geo_filters(app, auth_headers):
+    # Centre, 10 km et 100 km au nord ; deux biens de part et d'autre de l'antiméridien
+    center, near, far, east, west = _create_properties(
+        app,
+        {'latitude': 47.0, 'longitude': 3.0},
+        {'latitude': 47.09, 'longitude': 3.0},
+        {'latitude': 47.9, 'longitude': 3.0},
+        {'latitude': -10.0, 'longitude': 179.95},
+        {'latitude': -10.0, 'longitude': -179.95},
+    )
+    created = {center, near, far, east, west}
+    client = app.test_client()
+
+    def search(**params):
+        response = client.get('/api/properties/', headers=auth_headers, query_string={'per_page': 100, **params})
+        db.session.remove()
+        return response
+
+    def found(**params):
+        response = search(**params)
+        assert response.status_code == 200, response.get_json()
+        return [prop['id'] for prop in response.get_json()['properties'] if prop['id'] in created]
+
+    try:
+        # Rayon : tri par distance croissante par défaut
+        assert found(lat=47.0, lng=3.0, radius_km=20) == [center, near]
+        assert found(lat=47.0, lng=3.0, radius_km=20, sort='-distance') == [near, center]
+        assert found(lat=47.0, lng=3.0, radius_km=150) == [center, near, far]
+        assert found(lat=-10.0, lng=179.99, radius_km=20) == [east, west]
+        # Rectangle, y compris à cheval sur l'antiméridien
+        assert set(found(bbox='2.9,46.95,3.1,47.2')) == {center, near}
+        assert set(found(bbox='179.9,-10.1,-179.9,-9.9')) == {east, west}
+
+        # Erreurs : tri par distance sans point, point incomplet ou invalide, rayon et rectangle invalides
+        for params in ({'sort': 'distance'}, {'lat': 47.0}, {'lat': 95.0, 'lng': 3.0},
+                       {'lat': 47.0, 'lng': 3.0, 'radius_km': -1}, {'bbox': '2.9,46.95,3.1'},
+                       {'bbox': '2.9,47.2,3.1,46.95'}, {'lat': 47.0, 'lng': 3.0, 'sort': 'distance', 'cursor': ''}):
+            response = search(**params)
+            assert response.status_code == 400, params
+            assert response.get_json()['message']
+    finally:
+        _delete_properties(app, list(created))
+
+def test_property_facets_match_listing(app, auth_headers):
+    with app.app_context():
+        status, amenity_id = db.session.query(Property.status).order_by(Property.id).limit(1).scalar(), \
+            db.session.query(db.func.min(property_amenities.c.amenity_id)).scalar()
+        db.session.remove()
+    client = app.test_client()
+
+    def get(url, filters):
+        response = client.get(url, headers=auth_headers, query_string=filters)
+        db.session.remove()
+        assert response.status_code == 200, response.get_json()
+        return response.get_json()
+
+    def total(filters):
+        return get('/api/properties/', {**filters, 'per_page': 1})['pagination']['total_items']
+
+    for filters in ({}, {'status': status, 'min_area': 60}, {'amenity_id': amenity_id, 'bedrooms': 2},
+                    {'transaction_type': 'rent', 'lat': 46.5, 'lng': 2.5, 'radius_km': 400}):
+        facets = get('/api/properties/facets', filters)
+        assert facets['total'] == total(filters), filters
+
+        # Chaque facette est comptée sans son propre filtre
+        for facet in ('property_type', 'status'):
+            for item in facets[facet]:
+                assert item['count'] == total({**filters, facet: item['value']}), (filters, facet, item)
+        for item in facets['amenity']:
+            assert item['count'] == total({**filters, 'amenity_id': item['id']}), (filters, item)
+        others = {key: value for key, value in filters.items() if key != 'bedrooms'}
+        for item in facets['bedrooms']:
+            bedrooms = int(item['value'].rstrip('+'))
+            assert sum(other['count'] for other in facets['bedrooms'] if int(other['value'].rstrip('+')) >= bedrooms) \
+                == total({**others, 'bedrooms': bedrooms}), (filters, item)
+        bins = facets['price']['bins']
+        if bins:
+            assert sum(item['count'] for item in bins) == \
+                total({**filters, 'min_price': bins[0]['min'], 'max_price': bins[-1]['max']}), filters
+
+def test_import_reports_error_rows_and_dry_run(app, auth_headers):
+    with app.app_context():
+        existing_email = db.session.query(Owner.email).filter(Owner.email.isnot(None)).order_by(Owner.id).limit(1).scalar()
+        db.session.remove()
+    content = '\n'.join([
+        'first_name,last_name,email,phone,couleur',
+        'Irène,Valcourt,irene.valcourt@example.org,0102030405,bleu',
+        'Sans,,sans.nom@example.org,,',
+        f'Déjà,Connu,{existing_email},,',
+        'Irène,Doublon,irene.valcourt@example.org,,',
+        'Trop,De,colonnes@example.org,,,en trop',
+        'Basile,Ferrand,basile.ferrand@example.org,,',
+    ]) + '\n'
+    client = app.test_client()
+
+    def import_owners(**params):
+        response = client.post('/api/import/owners', headers={**auth_headers, 'Content-Type': 'text/csv'},
+                               query_string=params, data=content.encode('utf-8'))
+        db.session.remove()
+        assert response.status_code == 200, response.get_json()
+        return response.get_json()
+
+    def imported():
+        with app.app_context():
+            count = Owner.query.filter(Owner.email.in_(['irene.valcourt@example.org',
+                                                        'basile.ferrand@example.org'])).count()
+            db.session.remove()
+        return count
+
+    # Validation seule : même rapport, rien n'est inséré
+    report = import_owners(dry_run='1')
+    assert report['dry_run'] and report['processed'] == 6 and report['inserted'] == 2
+    assert [error['line'] for error in report['errors']] == [3, 4, 5, 6]
+    assert report['errors'][0]['errors'] == {'last_name': 'Champ requis'}
+    assert 'existe déjà' in report['errors'][1]['errors']['email']
+    assert 'plusieurs fois' in report['errors'][2]['errors']['email']
+    assert report['ignored_columns'] == ['couleur']
+    assert imported() == 0
+
+    report = import_owners()
+    assert not report['dry_run'] and report['inserted'] == 2 and report['error_count'] == 4
+    assert imported() == 2
+
+    # Nouvel import : les lignes déjà importées sont ignorées
+    report = import_owners(on_duplicate='skip')
+    assert report['inserted'] == 0 and report['skipped'] == 4
+    assert [error['line'] for error in report['errors']] == [3, 6]
+
+    # NDJSON : lignes illisibles, propriétaire inexistant, équipements par nom
+    with app.app_context():
+        owner_id = db.session.query(db.func.min(Owner.id)).scalar()
+        amenity = db.session.query(Amenity).order_by(Amenity.id).first()
+        amenity_id, amenity_name = amenity.id, amenity.name
+        db.session.remove()
+    record = {'title': 'Import NDJSON', 'property_type': 'house', 'status': 'for_sale', 'address_line1': '2 rue',
+              'city': 'Nantes', 'postal_code': '44000', 'country': 'France', 'total_area': 80}
+    lines = [
+        json.dumps({**record, 'owner_id': owner_id, 'reference_code': 'IMP-NDJSON-1',
+                    'amenities': [amenity_name.upper()]}),
+        '{"title": ',
+        '[1, 2]',
+        json.dumps({**record, 'owner_id': 10 ** 9}),
+        json.dumps({**record, 'owner_id': owner_id, 'amenities': 'inexistant'}),
+    ]
+    response = client.post('/api/import/properties', headers={**auth_headers, 'Content-Type': 'application/x-ndjson'},
+                           data='\n'.join(lines).encode('utf-8'))
+    db.session.remove()
+    report = response.get_json()
+    assert response.status_code == 200 and report['inserted'] == 1
+    assert [error['line'] for error in report['errors']] == [2, 3, 4, 5]
+    assert 'introuvable' in report['errors'][2]['errors']['owner_id']
+    with app.app_context():
+        prop = Property.query.filter_by(reference_code='IMP-NDJSON-1').one()
+        assert [item.id for item in prop.amenities] == [amenity_id]
+        db.session.remove()
+
+    with app.app_context():
+        Owner.query.filter(Owner.email.in_(['irene.valcourt@example.org', 'basile.ferrand@example.org'])) \
+            .delete(synchronize_session=False)
+        db.session.commit()
+        db.session.remove()
+    _delete_properties(app, [prop.id])
+
+def test_export_csv_and_ndjson_content(app, auth_headers, monkeypatch):
+    # Petits morceaux : l'export est envoyé en plusieurs fois
+    monkeypatch.setattr(export_service, 'EXPORT_BUFFER_SIZE', 512)
+    with app.app_context():
+        status = db.session.query(Property.status).order_by(Property.id).limit(1).scalar()
+        expected = {prop.id: prop for prop in Property.query.filter_by(status=status)}
+        db.session.expunge_all()
+        db.session.remove()
+    client = app.test_client()
+
+    def export(**params):
+        response = client.get('/api/export/properties', headers=auth_headers, query_string={'status': status, **params})
+        db.session.remove()
+        return response
+
+    response = export()
+    assert response.status_code == 200 and response.is_streamed
+    assert response.mimetype == 'text/csv'
+    assert response.headers['Content-Disposition'].startswith('attachment; filename="properties-')
+    body = response.get_data()
+    rows = list(csv.DictReader(io.StringIO(body.decode('utf-8'))))
+    assert 'geo_cell' not in rows[0] and 'reference_code' in rows[0]
+    assert [int(row['id']) for row in rows] == sorted(expected)
+    for row in rows:
+        prop = expected[int(row['id'])]
+        assert row['title'] == prop.title and row['status'] == status
+        assert row['created_at'] == prop.created_at.isoformat()
+        assert row['has_garage'] == ('true' if prop.has_garage else 'false')
+        assert row['asking_price'] == ('' if prop.asking_price is None else str(prop.asking_price))
+
+    response = export(format='ndjson')
+    assert response.status_code == 200 and response.mimetype == 'application/x-ndjson'
+    records = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [record['id'] for record in records] == sorted(expected)
+    for record in records:
+        prop = expected[record['id']]
+        assert record['title'] == prop.title and record['has_garage'] is bool(prop.has_garage)
+        assert record['total_area'] == float(prop.total_area)
+        assert record['created_at'] == prop.created_at.isoformat()
+
+    response = export(gzip='1')
+    assert response.mimetype == 'application/gzip'
+    assert response.headers['Content-Disposition'].endswith('.csv.gz"')
+    assert gzip.decompress(response.get_data()) == body
+
+    assert export(format='xml').status_code == 400
+    assert client.get('/api/export/owners', headers=auth_headers).status_code == 404
+
+def test_query_budget_strict(app, auth_headers, monkeypatch):
+    # SQL_QUERY_BUDGET_STRICT (TestingConfig) : un dépassement du budget fait échouer la requête
+    view = app.view_functions['properties.get_properties']
+    monkeypatch.setattr(view, 'query_budget', 1)
+    client = app.test_client()
+    with pytest.raises(QueryBudgetExceeded):
+        client.get('/api/properties/', headers=auth_headers)
+
+def test_auth_user_cached_across_requests(app):
+    # Le cache d'authentification est actif bien que CACHE_BACKEND vaille 'null'
+    assert app.config['CACHE_BACKEND'] == 'null'
+    _, headers = _user_headers(app, 'auth_cache_reader')
+    client = app.test_client()
+    counts = []
+    for _ in range(3):
+        with collect_queries(record=True) as stats:
+            assert _get_profile(client, headers) == 200
+        counts.append(len(_user_queries(stats)))
+    assert counts == [1, 0, 0]
+
+def test_auth_user_deactivation_next_request(app, auth_headers):
+    user_id, headers = _user_headers(app, 'auth_cache_deactivated')
+    client = app.test_client()
+    assert _get_profile(client, headers) == 200
+    assert _get_profile(client, headers) == 200
+
+    response = client.put(f'/auth/users/{user_id}', headers=auth_headers, json={'is_active': False})
+    assert response.status_code == 200
+    db.session.remove()
+    assert _get_profile(client, headers) == 401
+
+    response = client.put(f'/auth/users/{user_id}', headers=auth_headers, json={'is_active': True})
+    assert response.status_code == 200
+    db.session.remove()
+    assert _get_profile(client, headers) == 200
+
+# Envoi reprenable de documents (/api/uploads)
+
+def _open_upload(app, client, headers, content, **data):
+    """Ouvre un envoi de content pour le premier bien et retourne son URL."""
+    with app.app_context():
+        property_id = db.session.query(db.func.min(Property.id)).scalar()
+        db.session.remove()
+    response = client.post('/api/uploads/', headers=headers, json={
+        'property_id': property_id, 'file_name': 'bail.pdf', 'size': len(content), 'document_type': 'contract',
+        **data
+    })
+    assert response.status_code == 201
+    db.session.remove()
+    return response.headers['Location']
+
+def test_upload_offset_mismatch(app, auth_headers):
+    client = app.test_client()
+    url = _open_upload(app, client, auth_headers, b'0123456789')
+    response = client.put(url, headers=auth_headers, query_string={'offset': 4}, data=b'456789')
+    assert response.status_code == 409
+    assert response.headers['Upload-Offset'] == '0' and response.get_json()['offset'] == 0
+
+    assert client.put(url, headers=auth_headers, query_string={'offset': 0}, data=b'0123').status_code == 200
+    db.session.remove()
+    response = client.put(url, headers={**auth_headers, 'Upload-Offset': '0'}, data=b'0123')
+    assert response.status_code == 409 and response.headers['Upload-Offset'] == '4'
+    db.session.remove()
+
+def test_upload_resumes_after_interruption(app, auth_headers):
+    content = os.urandom(3000)
+    client = app.test_client()
+    url = _open_upload(app, client, auth_headers, content)
+
+    # Connexion coupée après 1000 octets d'un morceau annoncé de 2000
+    response = client.put(url, headers=auth_headers, query_string={'offset': 0}, data=content[:1000],
+                          environ_overrides={'CONTENT_LENGTH': '2000'})
+    assert response.status_code == 400
+    db.session.remove()
+    response = client.head(url, headers=auth_headers)
+    assert response.status_code == 200 and response.headers['Upload-Offset'] == '1000'
+    db.session.remove()
+
+    response = client.put(url, headers=auth_headers, query_string={'offset': 1000}, data=content[1000:])
+    assert response.status_code == 200 and response.headers['Upload-Offset'] == '3000'
+    db.session.remove()
+    response = client.post(f'{url}/finalize', headers=auth_headers,
+                           json={'sha256': hashlib.sha256(content).hexdigest()})
+    assert response.status_code == 201
+    db.session.remove()
+
+    with app.app_context():
+        document = db.session.get(PropertyDocument, response.get_json()['document']['id'])
+        with get_storage().open(document.file_path) as stream:
+            assert stream.read() == content
+        db.session.remove()
+    assert client.get(url, headers=auth_headers).status_code == 404
+    db.session.remove()
+
+def test_upload_checksum_mismatch(app, auth_headers):
+    content = b'contrat de location'
+    client = app.test_client()
+    url = _open_upload(app, client, auth_headers, content, sha256=hashlib.sha256(b'autre contenu').hexdigest())
+
+    # Envoi incomplet : finalisation refusée avec la position courante
+    response = client.post(f'{url}/finalize', headers=auth_headers)
+    assert response.status_code == 409 and response.headers['Upload-Offset'] == '0'
+    db.session.remove()
+
+    assert client.put(url, headers=auth_headers, query_string={'offset': 0}, data=content).status_code == 200
+    db.session.remove()
+    response = client.post(f'{url}/finalize', headers=auth_headers)
+    assert response.status_code == 400
+    assert 'SHA-256' in response.get_json()['message']
+    db.session.remove()
+    # L'envoi est conservé : le client peut l'annuler
+    assert client.get(url, headers=auth_headers).status_code == 200
+    db.session.remove()
+    assert client.delete(url, headers=auth_headers).status_code == 200
+    db.session.remove()
+
+def test_expired_upload_sessions_collected(app, auth_headers):
+    client = app.test_client()
+    url = _open_upload(app, client, auth_headers, b'0123456789')
+    assert client.put(url, headers=auth_headers, query_string={'offset': 0}, data=b'01234').status_code == 200
+    db.session.remove()
+    upload_id = url.rsplit('/', 1)[1]
+    folder = app.config['UPLOAD_SESSION_DIR']
+    part = os.path.join(folder, f'{upload_id}.part')
+    # Fichier temporaire sans envoi (arrêt du serveur pendant l'ouverture), ancien et récent
+    orphan, recent = os.path.join(folder, 'orphelin.part'), os.path.join(folder, 'recent.part')
+    for path in (orphan, recent):
+        open(path, 'wb').close()
+    old = time.time() - app.config['UPLOAD_SESSION_TTL'] - 60
+    os.utime(orphan, (old, old))
+
+    with app.app_context():
+        db.session.query(UploadSession).filter_by(id=upload_id).update(
+            {'expires_at': datetime.utcnow() - timedelta(seconds=1)})
+        db.session.commit()
+        assert expire_upload_sessions() == 1
+        assert db.session.get(UploadSession, upload_id) is None
+        db.session.remove()
+
+    assert not os.path.exists(part) and not os.path.exists(orphan)
+    assert os.path.exists(recent)
+    os.remove(recent)
+    assert client.get(url, headers=auth_headers).status_code == 404
+    db.session.remove()
+
+# Service des fichiers du stockage local (/files)
+
+def test_files_range_and_conditional_requests(app, monkeypatch):
+    content = bytes(range(256)) * 4
+    with app.app_context():
+        key, size = get_storage().put(io.BytesIO(content), '.pdf')
+        derived = derived_key(key, 'apercu', '.jpg')
+        get_storage().put_at(derived, io.BytesIO(b'declinaison'))
+    client = app.test_client()
+
+    response = client.get(f'/files/{key}')
+    assert response.status_code == 200 and response.data == content
+    assert response.headers['Accept-Ranges'] == 'bytes'
+    assert response.mimetype == 'application/pdf'
+    assert response.cache_control.immutable and response.cache_control.max_age == 31536000
+    etag = response.headers['ETag']
+
+    response = client.get(f'/files/{key}', headers={'Range': 'bytes=100-199'})
+    assert response.status_code == 206
+    assert response.headers['Content-Range'] == f'bytes 100-199/{size}'
+    assert response.data == content[100:200]
+    response = client.get(f'/files/{key}', headers={'Range': 'bytes=-10'})
+    assert response.status_code == 206 and response.data == content[-10:]
+    response = client.get(f'/files/{key}', headers={'Range': f'bytes={size}-'})
+    assert response.status_code == 416
+    assert response.headers['Content-Range'] == f'bytes */{size}'
+
+    response = client.get(f'/files/{key}', headers={'If-None-Match': etag})
+    assert response.status_code == 304 and response.data == b''
+    assert client.get(f'/files/{key}', headers={'If-None-Match': '"autre"'}).status_code == 200
+    # If-Range périmé : fichier complet
+    response = client.get(f'/files/{key}', headers={'Range': 'bytes=0-9', 'If-Range': '"autre"'})
+    assert response.status_code == 200 and response.data == content
+
+    # Fichier dérivé (régénérable) : revalidé après FILES_CACHE_MAX_AGE
+    response = client.get(f'/files/{derived}')
+    assert response.status_code == 200 and response.data == b'declinaison'
+    assert not response.cache_control.immutable and response.cache_control.max_age == 86400
+    assert client.get(f'/files/{key[:-4]}.txt').status_code == 404
+    assert client.get('/files/../config.py').status_code == 404
+
+    # Envoi confié au proxy : en-tête X-Accel-Redirect, sans contenu
+    monkeypatch.setitem(app.config, 'FILES_X_ACCEL_REDIRECT', '/protected/')
+    response = client.get(f'/files/{key}')
+    assert response.status_code == 200 and response.data == b''
+    assert response.headers['X-Accel-Redirect'] == f'/protected/{key}'
+
+    # Contenus sans référence : supprimés pour ne pas fausser le ramasse-miettes
+    with app.app_context():
+        for path in (derived, key):
+            get_storage().delete(path)
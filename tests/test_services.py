@@ -0,0 +1,459 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests des services sur le jeu de données généré.
+"""
+
+import io
+import itertools
+import sqlite3
+import time
+from datetime import datetime, timedelta
+
+import flask
+import pytest
+from PIL import Image
+from sqlalchemy.exc import OperationalError
+
+from app import db
+from app.models.__init__1 import Activity, Client, DashboardStat, Owner, Property, PropertyImage, StoredFile
+from app.services import (
+    activity_log, dashboard_service, image_service, index_check, job_queue, ngram_index, profiling,
+    property_snapshot, query_cache, search_service, storage
+)
+from app.services.client_service import get_all_clients
+from app.services.owner_service import get_all_owners
+from app.services.property_service import get_all_properties, register_property_document
+from app.services.sql_metrics import collect_queries
+
+def _wait_for(condition, timeout=10.0):
+    """Attend qu'une condition (travail d'un thread d'arrière-plan) soit vraie."""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "délai d'attente dépassé"
+        time.sleep(0.01)
+
+def _ngram_search(model, text):
+    """Recherche dans l'index n-grammes, une fois celui-ci construit."""
+    _wait_for(lambda: ngram_index.search_ngram_index(model, text, search_service.FUZZY_THRESHOLD, None) is not None)
+    return ngram_index.search_ngram_index(model, text, search_service.FUZZY_THRESHOLD, None)
+
+# Recherche approximative (index n-grammes, hors PostgreSQL)
+
+def test_fuzzy_search_limit_applies_after_filters(app, monkeypatch):
+    monkeypatch.setattr(search_service, 'FUZZY_MAX_RESULTS', 5)
+    with app.app_context():
+        agent_id, count = db.session.query(Client.assigned_agent_id, db.func.count()).filter(
+            Client.assigned_agent_id.isnot(None)
+        ).group_by(Client.assigned_agent_id).order_by(db.func.count()).first()
+        # Toutes les adresses se terminent par example.com : tous les clients correspondent
+        assert len(_ngram_search(Client, 'example')) > 5
+
+        clients, _, total = get_all_clients(per_page=50, search='example', assigned_agent_id=agent_id)
+        assert total == min(5, count)
+        assert all(client.assigned_agent_id == agent_id for client in clients)
+        db.session.remove()
+
+def test_ngram_index_reads_other_process_writes(app, monkeypatch):
+    monkeypatch.setattr(ngram_index, 'NGRAM_CHECK_INTERVAL', 0)
+    with app.app_context():
+        _ngram_search(Client, 'example')
+        # Écriture hors de l'ORM du processus (comme celle d'un autre worker)
+        with db.engine.begin() as connection:
+            client_id = connection.execute(Client.__table__.insert().values(
+                first_name='Zéphyrine', last_name='Quaglio', client_type='buyer'
+            )).inserted_primary_key[0]
+
+        def found():
+            matches = ngram_index.search_ngram_index(Client, 'Quaglio', search_service.FUZZY_THRESHOLD, None)
+            return client_id in dict(matches or ())
+        _wait_for(found)
+
+        with db.engine.begin() as connection:
+            connection.execute(Client.__table__.delete().where(Client.__table__.c.id == client_id))
+        db.session.remove()
+
+def test_fuzzy_search_tolerates_typos(app, monkeypatch):
+    monkeypatch.setattr(ngram_index, 'NGRAM_CHECK_INTERVAL', 0)
+    with app.app_context():
+        client = Client(first_name='Bartholomée', last_name='Quintanilla', client_type='buyer',
+                        email='b.quintanilla@example.org', city='Montauban')
+        owner = Owner(first_name='Anastasia', last_name='Wojciechowska', email='a.wojciechowska@example.org')
+        db.session.add_all([client, owner])
+        db.session.commit()
+        client_id, owner_id = client.id, owner.id
+        for model, row_id, text in ((Client, client_id, 'Quintanilla'), (Owner, owner_id, 'Wojciechowska')):
+            _wait_for(lambda: row_id in dict(
+                ngram_index.search_ngram_index(model, text, search_service.FUZZY_THRESHOLD, None) or ()))
+
+        # Lettre manquante, accents omis, lettre remplacée, lettres inversées
+        for search in ('Quintanila', 'Bartholomee Quintanilla', 'Quintanillo Montauban'):
+            clients, _, _ = get_all_clients(per_page=5, search=search)
+            assert clients[0].id == client_id, search
+        owners, _, _ = get_all_owners(per_page=5, search='Wojciechowksa')
+        assert owners[0].id == owner_id
+        clients, _, _ = get_all_clients(per_page=5, search='Quintanilla', client_type='tenant')
+        assert client_id not in [row.id for row in clients]
+        with pytest.raises(ValueError):
+            get_all_owners(search='Wojciechowska', cursor='', sort='relevance')
+
+        db.session.delete(db.session.get(Client, client_id))
+        db.session.delete(db.session.get(Owner, owner_id))
+        db.session.commit()
+        db.session.remove()
+
+# Tableau de bord (compteurs répartis sur plusieurs lignes)
+
+def test_dashboard_counters_sum_shards(app, monkeypatch):
+    shards = itertools.cycle(range(3))
+    monkeypatch.setattr(dashboard_service.random, 'randrange', lambda stop: next(shards))
+    with app.app_context():
+        before = dashboard_service.get_dashboard_stats()['clients_count']
+        clients = [Client(first_name='Test', last_name=f'Compteur {index}', client_type='buyer') for index in range(3)]
+        for client in clients:
+            db.session.add(client)
+            db.session.commit()
+
+        rows = DashboardStat.query.filter_by(entity='client', dimension='total').all()
+        assert {row.shard for row in rows} >= {0, 1, 2}
+        assert dashboard_service.get_dashboard_stats()['clients_count'] == before + 3
+        assert dashboard_service.rebuild_dashboard_stats()[('client', 'total', '')] == before + 3
+
+        for client in clients:
+            db.session.delete(client)
+        db.session.commit()
+        assert dashboard_service.get_dashboard_stats()['clients_count'] == before
+        db.session.remove()
+
+# Instantané des biens : mêmes résultats que le moteur SQL
+
+def test_property_snapshot_matches_sql(app, monkeypatch, tmp_path):
+    pytest.importorskip('numpy')
+    monkeypatch.setitem(app.config, 'PROPERTY_SNAPSHOT_DIR', str(tmp_path))
+    with app.app_context():
+        ref = Property.query.filter(Property.latitude.isnot(None), Property.amenities.any(),
+                                    Property.asking_price.isnot(None), Property.total_area.isnot(None)).first()
+        lat, lng = float(ref.latitude), float(ref.longitude)
+        price, area = float(ref.asking_price), float(ref.total_area)
+        property_snapshot.refresh_property_snapshot(full=True)
+
+        sorts = [None, 'created_at', '-created_at', 'price', '-price', 'area', '-area', 'id', '-id']
+        cases = [({}, sorts)] + [(filters, sorts) for filters in (
+            {'property_type': ref.property_type},
+            {'status': ref.status},
+            {'city': 'a'},
+            {'min_price': price / 2, 'max_price': price * 2},
+            {'transaction_type': 'rent', 'min_price': 500},
+            {'min_area': area / 2, 'max_area': area * 2},
+            {'bedrooms': 2, 'bathrooms': 1},
+            {'owner_id': ref.owner_id},
+            {'amenity_id': ref.amenities[0].id},
+            {'bbox': f'{lng - 2},{lat - 2},{lng + 2},{lat + 2}'},
+        )] + [({'lat': lat, 'lng': lng, 'radius_km': 100}, sorts + ['distance', '-distance'])]
+
+        for filters, case_sorts in cases:
+            for sort in case_sorts:
+                for page in (1, 2):
+                    monkeypatch.setitem(app.config, 'PROPERTY_SNAPSHOT_ENABLED', True)
+                    ids, total = property_snapshot.search_property_snapshot(filters, page, 10, sort)
+                    monkeypatch.setitem(app.config, 'PROPERTY_SNAPSHOT_ENABLED', False)
+                    properties, _, sql_total = get_all_properties(filters, page, 10, sort=sort)
+                    assert (ids, total) == ([prop.id for prop in properties], sql_total), (filters, sort, page)
+        db.session.remove()
+
+# Couverture des filtres par les index (flask check-indexes)
+
+def test_check_indexes_city_ilike_needs_trigram_index(app):
+    with app.app_context():
+        # Sur SQLite, l'index ix_properties_city_trgm est un B-tree : il ne sert pas ILIKE '%...%'
+        assert index_check.find_unsupported_filters() == [
+            ("get_all_properties {'city': 'Paris'}", 'properties.city', 'filtre ILIKE')
+        ]
+        assert index_check._has_trigram_index(Property.__table__.c.city)
+        assert not index_check._has_trigram_index(Property.__table__.c.status)
+
+# Stockage par contenu : compteur de références et ramasse-miettes
+
+def _stored_file(key):
+    """Ligne de stored_files d'une clé (None si absente)."""
+    db.session.expire_all()
+    return db.session.get(StoredFile, key)
+
+def test_storage_ref_count_and_garbage_collection(app):
+    with app.app_context():
+        property_id = db.session.query(Property.id).order_by(Property.id).first()[0]
+        content = b'Contenu du cycle de vie du stockage'
+        key, size = storage.store_file(io.BytesIO(content), 'bail.txt', 'text/plain')
+        assert storage.store_file(io.BytesIO(content), 'copie.txt', 'text/plain') == (key, size)
+        assert _stored_file(key).ref_count == 0
+
+        documents = [register_property_document(property_id, key, name, size, 'text/plain', 'other')
+                     for name in ('bail.txt', 'copie.txt')]
+        assert _stored_file(key).ref_count == 2
+
+        db.session.delete(documents[0])
+        db.session.commit()
+        assert _stored_file(key).ref_count == 1
+        assert storage.collect_garbage(grace=0) == (0, 0)
+        assert storage.get_storage().exists(key)
+
+        # Dernière référence supprimée : le fichier est conservé pendant STORAGE_ORPHAN_GRACE
+        db.session.delete(documents[1])
+        db.session.commit()
+        assert _stored_file(key).ref_count == 0
+        assert storage.get_storage().exists(key)
+
+        # Compteur faussé par une écriture hors de l'ORM : recalculé par le ramasse-miettes
+        db.session.execute(StoredFile.__table__.update().where(StoredFile.key == key).values(ref_count=3))
+        db.session.commit()
+        assert storage.collect_garbage(grace=0) == (1, 1)
+        assert _stored_file(key) is None
+        assert not storage.get_storage().exists(key)
+        db.session.remove()
+
+def test_store_file_rewrites_content_collected_during_upload(app, monkeypatch):
+    with app.app_context():
+        content = b'Contenu supprime par le ramasse-miettes pendant son envoi'
+        key, size = storage.store_file(io.BytesIO(content), 'plan.txt', 'text/plain')
+        local = storage.get_storage()
+        put = local.put
+        puts = []
+
+        def put_then_collect(stream, extension=''):
+            # Le ramasse-miettes supprime le contenu entre son écriture et son enregistrement
+            result = put(stream, extension)
+            puts.append(result)
+            if len(puts) == 1:
+                assert storage._delete_unreferenced([key], datetime.utcnow() + timedelta(seconds=1)) == [key]
+            return result
+        monkeypatch.setattr(local, 'put', put_then_collect)
+
+        assert storage.store_file(io.BytesIO(content), 'plan.txt', 'text/plain') == (key, size)
+        assert len(puts) == 2
+        assert local.exists(key)
+        assert _stored_file(key).ref_count == 0
+
+        assert storage.collect_garbage(grace=0)[1] == 1
+        assert not local.exists(key)
+        db.session.remove()
+
+def test_s3_storage(monkeypatch):
+    moto = pytest.importorskip('moto')
+    import boto3
+
+    for name in ('AWS_ACCESS_KEY_ID', 'AWS_SECRET_ACCESS_KEY', 'AWS_SESSION_TOKEN'):
+        monkeypatch.setenv(name, 'test')
+    with moto.mock_aws():
+        boto3.client('s3', region_name='us-east-1').create_bucket(Bucket='media')
+        s3 = storage.S3Storage('media', prefix='/uploads/', region='us-east-1')
+        uploads = []
+        upload = s3._upload
+        monkeypatch.setattr(s3, '_upload', lambda key, stream: uploads.append(key) or upload(key, stream))
+
+        key, size = s3.put(io.BytesIO(b'%PDF-1.4 contenu'), '.PDF')
+        assert storage.is_content_key(key) and key.endswith('.pdf') and size == 16
+        # Contenu déjà présent : pas de nouvel envoi
+        assert s3.put(io.BytesIO(b'%PDF-1.4 contenu'), '.pdf') == (key, 16)
+        assert uploads == [key]
+
+        head = s3.client.head_object(Bucket='media', Key=f'uploads/{key}')
+        assert head['ContentType'] == 'application/pdf'
+        assert 'immutable' in head['CacheControl']
+        assert s3.exists(key) and not s3.exists('ab/cd/absent.pdf')
+        with s3.open(key) as stream:
+            assert stream.read() == b'%PDF-1.4 contenu'
+
+        s3.put_at('exports/biens.csv', io.BytesIO(b'id\n1\n'))
+        listed = dict(s3.list())
+        assert set(listed) == {key, 'exports/biens.csv'}
+        assert all(modified.tzinfo is None for modified in listed.values())
+        assert [name for name, _ in s3.list('exports/')] == ['exports/biens.csv']
+
+        url = s3.url(key)
+        assert f'/uploads/{key}' in url and 'Signature' in url
+        public = storage.S3Storage('media', prefix='uploads', public_url='https://cdn.example.com/')
+        assert public.url(key) == f'https://cdn.example.com/uploads/{key}'
+
+        s3.delete(key)
+        assert not s3.exists(key)
+        assert [name for name, _ in s3.list()] == ['exports/biens.csv']
+
+# Déclinaisons des images
+
+def _derivative(local, key, size, image_format):
+    """Image d'une déclinaison (chargée, avec son format)."""
+    with local.open(storage.derived_key(key, size, image_service.IMAGE_FORMATS[image_format][1])) as stream:
+        image = Image.open(io.BytesIO(stream.read()))
+        image.load()
+    return image
+
+def test_generate_derivatives(tmp_path):
+    local = storage.LocalStorage(str(tmp_path))
+
+    # Photo paysage pivotée par l'EXIF (orientation 6 : rotation de 90°)
+    buffer = io.BytesIO()
+    exif = Image.Exif()
+    exif[0x0112] = 6
+    Image.new('RGB', (3000, 1500), (200, 30, 30)).save(buffer, 'JPEG', exif=exif.tobytes())
+    buffer.seek(0)
+    key, _ = local.put(buffer, '.jpg')
+
+    keys = image_service.generate_derivatives(local, key)
+    assert keys == {size: storage.derived_key(key, size, '.jpg') for size in ('full', 'card', 'thumbnail')}
+    expected = {'full': (1024, 2048), 'card': (400, 800), 'thumbnail': (160, 320)}
+    for size, dimensions in expected.items():
+        for image_format, pil_format in (('jpeg', 'JPEG'), ('webp', 'WEBP')):
+            image = _derivative(local, key, size, image_format)
+            assert image.format == pil_format
+            assert image.size == dimensions
+            # Orientation appliquée aux pixels, métadonnées non recopiées
+            assert 0x0112 not in image.getexif()
+
+    # Déclinaisons déjà présentes : rien n'est régénéré, sauf si force est vrai
+    thumbnail = storage.derived_key(key, 'thumbnail', '.webp')
+    local.put_at(thumbnail, io.BytesIO(b'ancienne vignette'))
+    assert image_service.generate_derivatives(local, key) == keys
+    with local.open(thumbnail) as stream:
+        assert stream.read() == b'ancienne vignette'
+    image_service.generate_derivatives(local, key, force=True)
+    assert _derivative(local, key, 'thumbnail', 'webp').size == (160, 320)
+
+    # Petite image transparente : pas d'agrandissement, fond blanc en JPEG
+    buffer = io.BytesIO()
+    Image.new('RGBA', (200, 100), (0, 0, 0, 0)).save(buffer, 'PNG')
+    buffer.seek(0)
+    key, _ = local.put(buffer, '.png')
+    image_service.generate_derivatives(local, key)
+    for size in ('full', 'card', 'thumbnail'):
+        jpeg = _derivative(local, key, size, 'jpeg')
+        assert jpeg.size == (200, 100) and jpeg.mode == 'RGB'
+        assert jpeg.getpixel((100, 50)) == (255, 255, 255)
+        webp = _derivative(local, key, size, 'webp')
+        assert webp.size == (200, 100) and webp.mode == 'RGBA'
+        assert webp.getpixel((100, 50))[3] == 0
+
+# Cache des requêtes : invalidation des écritures faites hors de l'ORM
+
+def test_core_writes_invalidate_query_cache(app, monkeypatch):
+    cache = query_cache.MemoryCache()
+    monkeypatch.setitem(app.extensions, 'query_cache', cache)
+    with app.app_context():
+        image = db.session.query(PropertyImage).order_by(PropertyImage.id).first()
+        image_id, property_id, status = image.id, image.property_id, image.processing_status
+        cache.set('property', b'bien', {f'properties:{property_id}'}, 60, time.time())
+        image_service._store_derivatives(app, image_id, None)
+        assert cache.get('property') is None
+
+        key, size = storage.store_file(io.BytesIO(b'Contenu mis en cache'), 'note.txt', 'text/plain')
+        cache.set('stored_file', b'fichier', {f'stored_files:{key}'}, 60, time.time())
+        document = register_property_document(property_id, key, 'note.txt', size, 'text/plain', 'other')
+        assert cache.get('stored_file') is None
+
+        db.session.delete(document)
+        db.session.execute(PropertyImage.__table__.update().where(PropertyImage.id == image_id)
+                           .values(processing_status=status))
+        db.session.commit()
+        db.session.remove()
+
+# Journal d'activité : écriture par lots
+
+def test_activity_writer_retries_and_isolates_invalid_rows(app, monkeypatch):
+    monkeypatch.setattr(activity_log, 'ACTIVITY_LOG_RETRY_DELAY', 0)
+    insert = activity_log._insert
+    calls = []
+
+    def flaky_insert(rows):
+        # Première tentative refusée (base momentanément indisponible)
+        calls.append(rows)
+        if len(calls) == 1:
+            raise OperationalError('INSERT', {}, Exception('base indisponible'))
+        insert(rows)
+    monkeypatch.setattr(activity_log, '_insert', flaky_insert)
+
+    with app.app_context():
+        before = db.session.query(db.func.count(Activity.id)).scalar()
+        writer = activity_log.ActivityWriter(app)
+        writer._write([{'activity_type': 'test', 'description': 'Réessayée'}])
+        # Une entrée invalide (description obligatoire) n'entraîne pas la perte des autres
+        writer._write([{'activity_type': 'test', 'description': 'Conservée'},
+                       {'activity_type': 'test', 'description': None}])
+        writer.stop()
+
+        descriptions = db.session.query(Activity.description).filter(Activity.activity_type == 'test').all()
+        assert sorted(description for description, in descriptions) == ['Conservée', 'Réessayée']
+        assert db.session.query(db.func.count(Activity.id)).scalar() == before + 2
+        db.session.remove()
+
+# Profilage à la demande
+
+def test_profiling_claim_failure_does_not_fail_request(app, monkeypatch):
+    class BrokenAgent:
+        request_sessions = {'properties.get_properties': 'session'}
+
+        def claim(self, session_id):
+            raise sqlite3.OperationalError('database is locked')
+    monkeypatch.setattr(profiling, 'get_profiling_agent', BrokenAgent)
+
+    with app.test_request_context('/api/properties/'):
+        profiling._start_request()
+        assert 'profiling' not in flask.g
+
+# Propagation de updated_at aux objets parents
+
+def test_parent_timestamps_updated_without_loading_parents(app):
+    past = datetime(2000, 1, 1)
+    with app.app_context():
+        property_id, owner_id = db.session.query(Property.id, Property.owner_id).order_by(Property.id).first()
+        other_owner_id = db.session.query(Owner.id).filter(Owner.id != owner_id).order_by(Owner.id).limit(1).scalar()
+        for model, row_id in ((Property, property_id), (Owner, owner_id), (Owner, other_owner_id)):
+            db.session.execute(model.__table__.update().where(model.id == row_id).values(updated_at=past))
+        db.session.commit()
+
+        image = PropertyImage(property_id=property_id, file_path='test/image.jpg', file_name='image.jpg')
+        db.session.add(image)
+        with collect_queries(record=True) as stats:
+            db.session.commit()
+        assert not any('FROM properties' in statement for statement in stats.statements)
+        assert db.session.get(Property, property_id).updated_at > past
+        assert db.session.get(Owner, owner_id).updated_at == past
+
+        # Bien rattaché à un autre propriétaire : les deux propriétaires changent
+        prop = db.session.get(Property, property_id)
+        prop.owner_id = other_owner_id
+        db.session.commit()
+        db.session.expire_all()
+        assert db.session.get(Owner, owner_id).updated_at > past
+        assert db.session.get(Owner, other_owner_id).updated_at > past
+
+        prop.owner_id = owner_id
+        db.session.delete(image)
+        db.session.commit()
+        db.session.remove()
+
+# File de tâches (JOB_QUEUE_SYNC)
+
+def test_sync_job_waits_for_caller_commit(app, monkeypatch):
+    calls = []
+    monkeypatch.setitem(job_queue._handlers, 'test.record', job_queue.JobHandler(
+        lambda value: calls.append((value, db.session.query(db.func.count(Owner.id)).scalar())), 'default', None
+    ))
+    with app.app_context():
+        owners = db.session.query(db.func.count(Owner.id)).scalar()
+        db.session.add(Owner(first_name='Tâche', last_name='Annulée'))
+        assert job_queue.enqueue('test.record', {'value': 'annulée'}, commit=False) is None
+        db.session.rollback()
+        assert calls == []
+
+        owner = Owner(first_name='Tâche', last_name='Validée')
+        db.session.add(owner)
+        job_queue.enqueue('test.record', {'value': 'validée'}, commit=False)
+        assert calls == []
+        db.session.commit()
+        # Exécutée une fois la transaction validée : elle voit ses écritures
+        assert calls == [('validée', owners + 1)]
+
+        db.session.delete(owner)
+        db.session.commit()
+        assert len(calls) == 1
+        db.session.remove()
@@ -0,0 +1,36 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests des utilitaires.
+"""
+
+import os
+
+from app.utils import discard_process_singleton, process_singleton
+from app.utils import process
+
+class _Worker:
+    """Objet d'arrière-plan minimal (créé par un processus donné)."""
+
+    def __init__(self, pid=None):
+        self.pid = pid or os.getpid()
+        self.stopped = False
+
+def test_process_singleton_per_process(app, monkeypatch):
+    monkeypatch.setattr(process, '_exit_callbacks', {})
+    key = 'test_worker'
+    first = process_singleton(app, key, _Worker, on_exit=lambda worker: setattr(worker, 'stopped', True))
+    assert process_singleton(app, key, _Worker) is first
+
+    # Objet hérité d'un autre processus (fork) : remplacé, avec une seule fonction d'arrêt
+    app.extensions[key] = _Worker(pid=first.pid + 1)
+    second = process_singleton(app, key, _Worker, on_exit=lambda worker: setattr(worker, 'stopped', True))
+    assert second is not first and second.pid == os.getpid()
+    assert len(process._exit_callbacks) == 1
+    process._run_exit_callbacks()
+    assert second.stopped and not first.stopped
+
+    assert discard_process_singleton(app, key, first) is None
+    assert discard_process_singleton(app, key) is second
+    assert key not in app.extensions and not process._exit_callbacks